@@ -0,0 +1,136 @@
+# ---------------------------------------------------------------------------
+# FireIgnitionBenchmark.py
+# Script benchmarks the Fire Ignition stages (ingest, reference, moving window average, fire ignition proportion, summarize and plot) offline on
+# synthetic daily water balance deficit data - no Climate Analyzer or THREDDS download is required.
+# Synthetic station tables are written in the Climate Analyzer daily Water Balance .csv layout and projections in the merged layout of
+# GCM_wb_thredds_point_extractor_v3.py for the defined number of stations, GCMs, RCPs and years.
+# Output is a .json report with the seconds per stage and repeat (see fire_ignition/benchmark.py).  If 'baselineReport' is defined the stage
+# median seconds are compared to the baseline report and stages slower than 'regressionThreshold' are logged as WARNING.
+
+#Updates:
+# 20261018 - Initial version.
+
+#Dependicies:
+#Python Version 3.10, Pandas, Numpy, matplotlib (plot stage), fire_ignition package (folder 'fire_ignition' in the same folder as this script)
+
+#Script Name: FireIgnitionBenchmark.py
+
+##Import Libraries
+import traceback, sys, os
+import datetime
+from datetime import date
+
+from fire_ignition.benchmark import runBenchmark, compareBenchmarkReports
+from fire_ignition.synthetic import gcmList, rcpList
+
+###################################################
+# Start of Parameters requiring set up.
+###################################################
+
+#Get Current Date
+today = date.today()
+strDate = today.strftime("%Y%m%d")
+
+stationCount = 2   #Number of synthetic Gridmet stations (one projections table per station)
+gcms = gcmList     #GCMs in the synthetic projections (default the 11 NPS Water Balance version 1.5 GCMs)
+rcps = rcpList     #RCPs in the synthetic projections (default 'rcp45', 'rcp85')
+stationStartYear = 1980      #First year of the synthetic station tables (tables end at the current date plus 60 days)
+projectionStartYear = 2006   #First year of the synthetic projections
+projectionEndYear = 2099     #Last year of the synthetic projections (must include 2031-2090)
+movingWindowsDay = 14        #Number of days in the station moving window average
+movingWindowsDayProj = 7     #Number of days in the projections moving window average
+repeats = 3                  #Number of times each stage is run
+runPlot = True               #True|False - include the plot stage (requires matplotlib)
+
+baselineReport = None        #Baseline .json report to compare to, None no comparison
+regressionThreshold = 1.10   #Stage median seconds / baseline median seconds above which a stage is logged as a regression
+
+outputFolder = r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\Benchmark"  #Folder for the .json report
+workspace = outputFolder + "\\workspace"   #Folder for the synthetic inputs and plots
+outName = 'FireIgnitionBenchmark'   #Output .json filename
+logFileName = workspace + "\\" + outName + ".LogFile.txt"
+
+#######################################
+## Below are paths which are hard coded
+#######################################
+
+#################################
+# Checking for directories and Log File
+##################################
+if os.path.exists(outputFolder):
+    pass
+else:
+    os.makedirs(outputFolder)
+
+if os.path.exists(workspace):
+    pass
+else:
+    os.makedirs(workspace)
+
+# Check if logFile exists
+if os.path.exists(logFileName):
+    pass
+else:
+    logFile = open(logFileName, "w")  # Creating index file if it doesn't exist
+    logFile.close()
+
+def main():
+
+    try:
+
+        outFull = outputFolder + "\\" + outName + "_" + strDate + ".json"
+        report = runBenchmark(workspace, stationCount, gcms, rcps, stationStartYear, projectionStartYear, projectionEndYear, movingWindowsDay,
+                              movingWindowsDayProj, repeats, runPlot, outFull, today)
+
+        logFile = open(logFileName, "a")
+        for stage, stageReport in report["stages"].items():
+            messageTime = timeFun()
+            if "skipped" in stageReport:
+                scriptMsg = "Benchmark stage - " + stage + " - skipped (" + stageReport["skipped"] + ") - " + messageTime
+            elif "median" in stageReport:
+                scriptMsg = "Benchmark stage - " + stage + " - median " + str(round(stageReport["median"], 3)) + " seconds - min " + \
+                            str(round(stageReport["min"], 3)) + " seconds - " + messageTime
+            else:
+                scriptMsg = "Benchmark stage - " + stage + " - " + str(round(stageReport["seconds"][0], 3)) + " seconds - " + messageTime
+            print(scriptMsg)
+            logFile.write(scriptMsg + "\n")
+
+        if baselineReport is not None:
+            comparison = compareBenchmarkReports(baselineReport, report, regressionThreshold)
+            for stage, stageComparison in comparison.items():
+                messageTime = timeFun()
+                scriptMsg = "Benchmark stage - " + stage + " - " + str(round(stageComparison["ratio"], 2)) + " x baseline - " + messageTime
+                if stageComparison["regression"]:
+                    scriptMsg = "WARNING - Regression - " + scriptMsg
+                print(scriptMsg)
+                logFile.write(scriptMsg + "\n")
+
+        messageTime = timeFun()
+        scriptMsg = "Successfully processed Benchmark: " + outFull + " - " + messageTime
+        print(scriptMsg)
+        logFile.write(scriptMsg + "\n")
+        logFile.close()
+
+    except:
+        messageTime = timeFun()
+        scriptMsg = "Exiting Error - FireIgnitionBenchmark - " + messageTime
+        print (scriptMsg)
+        logFile = open(logFileName, "a")
+        logFile.write(scriptMsg + "\n")
+
+        traceback.print_exc(file=sys.stdout)
+        logFile.close()
+
+#Functions Below
+# Function to Get the Date/Time
+def timeFun():
+    from datetime import datetime
+    b = datetime.now()
+    messageTime = b.isoformat()
+    return messageTime
+
+
+if __name__ == '__main__':
+
+    # Analyses routine ---------------------------------------------------------
+    main()
@@ -0,0 +1,144 @@
+# ---------------------------------------------------------------------------
+# FireIgnitionPotentialNowCastBatch.py
+# Script runs the Fire Ignition Potential Now Cast (see FireIgnitionPotentialNowCastSummarize.py) for a list of Gridmet stations on Climate Analyzer in one run.
+# Climate Analyzer station tables are downloaded concurrently (maximum 'maxDownloads' at a time), and as each download completes the station Now Cast
+# (previous 25 years annual summaries and the Now Cast summary by High, Medium, and Low Fire Ignition Potential for Forested and Non-Forested models)
+# is processed in a process pool ('workerCount' processes).
+# Output is one Now Cast summary file per station (outputFolder\{siteName}\{outName}_{date}.csv - same table as FireIgnitionPotentialNowCastSummarize.py)
+# and one combined summary for all stations (outputFolder\{outName}_AllStations_{date}.csv).  A station which fails (download or processing) is logged
+# as a WARNING and does not stop the remaining stations.
+
+#Updates:
+# 20261018 - Initial version.
+# 20261018 - Added 'nowCastStateFolder' - per station Now Cast state (fire_ignition/state.py), only the open year and the Now Cast are evaluated each run.
+# 20261018 - Added 'stationStoreFolder' - station tables are read from the station store (fire_ignition/station_store.py) and only pulled when the store was not refreshed within 'stationStoreMaxAgeHours'.
+# 20261018 - Added 'stationStoreDeltaFetch' and 'stationStoreFullRefreshDays' - delta pulls from the last closed year with a full pull every 'stationStoreFullRefreshDays' days.
+
+#Dependicies:
+#Python Version 3.10, Pandas, Numpy, fire_ignition package (folder 'fire_ignition' in the same folder as this script)
+
+#Script Name: FireIgnitionPotentialNowCastBatch.py
+
+##Import Libraries
+import traceback, sys, os
+import datetime
+from datetime import date
+
+from fire_ignition.batch import runNowCastBatch
+
+###################################################
+# Start of Parameters requiring set up.
+###################################################
+
+#Get Current Date
+today = date.today()
+strDate = today.strftime("%Y%m%d")
+
+stationList = ['bearlake_from_grid', 'eastinlet_from_grid']   #List of Gridmet Station Names on Climate Analyzer to be processed
+inFieldFieldNowCast = 'D (MM)'  #Field in the Now Cast data being used in the fire ignition potential model (this will be the deficit field).
+movingWindowsDay = 14     #Number of days in the moving window average (default use 14)
+
+#Define the Historic/Current reference parameters:
+refYearStartDate= '1/1/1984'   #Start Year/Date for which Fire Ignition Model was evaluated (Jan 1 of Start Year)
+refYearEndDate = '12/31/2021'       #End Year/Date for which Fire Ignition Model was evaluated (Dec 31 of End Year
+
+#Reference Index - sorted Forest and Non-Forest reference values are persisted (.npy with .json metadata) by station, field and fire season
+referenceIndexFolder = r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\ROMO\GridMetStations\ReferenceIndex"   #Folder with the reference index files - shared with the Historic and Now Cast scripts, None derives the reference each run
+
+maxDownloads = 4   #Maximum number of concurrent Climate Analyzer downloads
+workerCount = 8    #Number of Now Cast worker processes
+
+#Now Cast State - closed year annual summaries and the rolling window state are persisted by station, each run only evaluates the open (current) year and the Now Cast
+nowCastStateFolder = r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\ROMO\GridMetStations\NowCastState"   #Folder with the Now Cast state files, None evaluates the full series each run
+
+#Station Store - parsed Climate Analyzer daily table persisted by station as Parquet (closed years written once, open year and Now Cast replaced on refresh) - shared with the Historic and Now Cast scripts
+stationStoreFolder = None   #Folder with the station store (e.g. r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\ROMO\GridMetStations\StationStore"), None the station tables are pulled to the workspace each run
+stationStoreMaxAgeHours = 12   #Hours after which the station store is pulled again
+stationStoreDeltaFetch = True   #True|False - True a refresh only pulls the last closed year through the Now Cast (overlap year validated against the store, a revised history triggers a full pull), False pulls the full table
+stationStoreFullRefreshDays = 30   #Days after which the full table is pulled again with 'stationStoreDeltaFetch', None only when the overlap year does not match
+
+outputFolder = r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\ROMO\GridMetStations"  #Folder for the output Data Package Products - station output is written to a sub folder by station name
+workspace = outputFolder + "\\workspace"
+outName = 'FireIgnitionNowCastwSummary'   #Output .csv filename
+logFileName = workspace + "\\" + outName + "_Batch.LogFile.txt"
+
+#######################################
+## Below are paths which are hard coded
+#######################################
+
+#################################
+# Checking for directories and Log File
+##################################
+if os.path.exists(outputFolder):
+    pass
+else:
+    os.makedirs(outputFolder)
+
+if os.path.exists(workspace):
+    pass
+else:
+    os.makedirs(workspace)
+
+# Check if logFile exists
+if os.path.exists(logFileName):
+    pass
+else:
+    logFile = open(logFileName, "w")  # Creating index file if it doesn't exist
+    logFile.close()
+
+def main():
+
+    try:
+
+        pipelineOptions = {"inFileField": inFieldFieldNowCast, "movingWindowDays": movingWindowsDay, "refYearStartDate": refYearStartDate,
+                           "refYearEndDate": refYearEndDate, "referenceIndexFolder": referenceIndexFolder, "today": today}
+
+        dfallFiles, stationReport = runNowCastBatch(stationList, workspace, outputFolder, outName, maxDownloads=maxDownloads, workerCount=workerCount,
+                                                    pipelineOptions=pipelineOptions, stateFolder=nowCastStateFolder,
+                                                    storeFolder=stationStoreFolder, storeMaxAgeHours=stationStoreMaxAgeHours,
+                                                    deltaFetch=stationStoreDeltaFetch, fullRefreshDays=stationStoreFullRefreshDays)
+
+        logFile = open(logFileName, "a")
+        failedList = []
+        for report in stationReport:
+            messageTime = timeFun()
+            if report["status"] == "Success":
+                scriptMsg = "Successfully processed Now Cast - " + report["siteName"] + " - download " + str(round(report["fetchSeconds"], 1)) + " seconds - processing " + \
+                            str(round(report["processSeconds"], 1)) + " seconds: " + report["outFile"] + " - " + messageTime
+            else:
+                failedList.append(report["siteName"])
+                scriptMsg = "WARNING - Now Cast failed - " + report["siteName"] + " - stage '" + report["stage"] + "' - " + messageTime + "\n" + str(report["error"])
+            print(scriptMsg)
+            logFile.write(scriptMsg + "\n")
+
+        messageTime = timeFun()
+        scriptMsg = "Processed Now Cast Batch - " + str(len(stationList) - len(failedList)) + " of " + str(len(stationList)) + " Stations - " + messageTime
+        if len(failedList) > 0:
+            scriptMsg = scriptMsg + " - WARNING failed Stations: " + ", ".join(failedList)
+        print(scriptMsg)
+        logFile.write(scriptMsg + "\n")
+        logFile.close()
+
+    except:
+        messageTime = timeFun()
+        scriptMsg = "Exiting Error - FireIgnitionPotentialNowCastBatch - " + messageTime
+        print (scriptMsg)
+        logFile = open(logFileName, "a")
+        logFile.write(scriptMsg + "\n")
+
+        traceback.print_exc(file=sys.stdout)
+        logFile.close()
+
+#Functions Below
+# Function to Get the Date/Time
+def timeFun():
+    from datetime import datetime
+    b = datetime.now()
+    messageTime = b.isoformat()
+    return messageTime
+
+
+if __name__ == '__main__':
+
+    # Analyses routine ---------------------------------------------------------
+    main()
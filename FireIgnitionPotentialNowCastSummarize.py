@@ -14,20 +14,29 @@
 # 20230519 - Updated Fire Ignition Model to Steve Huysman Version 2.0 Southern Rockies first order https://huysman.net/research/fire/southern_rockies.html
 # Fire Ignition Model version 2.0 included used Monitoring Trends Burn Severity data from 1984-1-1 through 2021-12-31 (Note Version FI model 1.0 used MTBS data through 2015-12-31.
 # 20230828 - Updated to allow for Dynamic Gridmet Station processing.  Address depricated append to concat usage.  Addressed bug in DateTime field name if already exists.
+# 20261018 - define_IgnitionProportion vectorized - reference values are sorted once and all percentiles derived via one binary search (np.searchsorted) pass. Output is unchanged.
+# 20261018 - Added Reference Index (variables 'useReferenceIndex' and 'referenceIndexFolder') - Forest and Non-Forest reference values are persisted as a sorted .npy file and loaded as a memory map on subsequent runs.
+# 20261018 - Added Now Cast State (variables 'useNowCastState' and 'nowCastStateFolder') - annual summaries of closed years and the rolling window state are persisted by station (fire_ignition/state.py), each run only evaluates the open year and the Now Cast.
+# 20261018 - Added 'useFetchClient' - the Climate Analyzer table is streamed straight into the parser over a keep-alive connection with gzip transfer encoding (fire_ignition/http_client.py), no work .csv file.
+# 20261018 - Added 'fastCSVParser' - the Climate Analyzer daily table is located in one scan of the raw bytes and parsed with the C engine, explicit data types and the fixed date format (fire_ignition/climate_analyzer.py), no python engine parse or date format inference.
+# 20261018 - Added Station Store (variables 'useStationStore', 'stationStoreFolder' and 'stationStoreMaxAgeHours') - the parsed Climate Analyzer table is persisted by station as Parquet (fire_ignition/station_store.py), closed years are written once and only the open year and Now Cast are replaced; a store refreshed within 'stationStoreMaxAgeHours' is not pulled again.
+# 20261018 - Added 'stationStoreDeltaFetch' and 'stationStoreFullRefreshDays' - the station store is refreshed with a delta pull from the last closed year (overlap validated against the store) and a full pull every 'stationStoreFullRefreshDays' days.
+# 20261018 - Reference List/Index, Moving Window Average and Fire Ignition Proportion routines are imported from the fire_ignition package (fire_ignition/reference.py and fire_ignition/ignition.py), the script copies were removed.
 #Dependicies:
-#Python Version 3.10, Pandas, urllib
+#Python Version 3.10, Pandas, urllib, fire_ignition package (folder 'fire_ignition' next to this script)
 
 #Script Name: FireIgnitionPotentialNowCastSummarize.py
 #Created by Kirk Sherrill - Data Manager Rock Mountain Network - I&M National Park Service
 #Date: June 29, 2022
 
 ##Import Libraries
-import pandas as pd, traceback, sys, os
+import pandas as pd, traceback, sys, os, io
 import numpy as np
 import urllib
 from urllib.request import urlretrieve
 import datetime
 from datetime import date
+from fire_ignition import ignition, reference
 
 #os.chdir('/var/www/html/ca_backend/python/sherrill')
 
@@ -53,6 +62,21 @@ serviceURL = "http://www.climateanalyzer.science/python/wb2.py?csv_output=true&s
 refYearStartDate= '1/1/1984'   #Start Year/Date for which Fire Ignition Model was evaluated (Jan 1 of Start Year)
 refYearEndDate = '12/31/2021'       #End Year/Date for which Fire Ignition Model was evaluated (Dec 31 of End Year
 
+#Reference Index - sorted Forest and Non-Forest reference values are persisted (.npy with .json metadata) by station, field, fire season and reference years
+useReferenceIndex = 'Yes'   #'Yes'|'No' - 'Yes' loads the reference from the reference index (created on the first run), 'No' derives the reference each run
+referenceIndexFolder = r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\ROMO\GridMetStations\ReferenceIndex"   #Folder with the reference index files - shared by the Historic and Now Cast scripts
+
+useFetchClient = 'No'   #'Yes'|'No' - 'Yes' streams the Climate Analyzer table into the parser (keep-alive, gzip, reports bytes and time to first byte - requires the 'fire_ignition' package folder next to this script), 'No' downloads to the workspace .csv file
+
+fastCSVParser = 'Yes'   #'Yes'|'No' - 'Yes' parses only the Climate Analyzer daily table (preamble and monthly summary footer found in one scan) with the C engine, explicit data types and the fixed date format (requires the 'fire_ignition' package folder next to this script), 'No' python engine parse
+
+#Station Store - parsed Climate Analyzer daily table persisted by station as Parquet (closed years written once, open year and Now Cast replaced on refresh) - shared by the Historic, Now Cast and Now Cast Batch scripts (requires the 'fire_ignition' package folder next to this script)
+useStationStore = 'No'   #'Yes'|'No' - 'Yes' reads the station table from the station store, pulled from Climate Analyzer only if the store was not refreshed within 'stationStoreMaxAgeHours', 'No' pulls the table each run
+stationStoreFolder = r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\ROMO\GridMetStations\StationStore"   #Folder with the station store - shared by the Historic, Now Cast and Now Cast Batch scripts
+stationStoreMaxAgeHours = 12   #Hours after which the station store is pulled again
+stationStoreDeltaFetch = 'Yes'   #'Yes'|'No' - 'Yes' a refresh only pulls the last closed year through the Now Cast (Climate Analyzer 'year1' set to the last closed year, stitched onto the stored history after the last closed year is validated - a revised history triggers a full pull), 'No' pulls the full table
+stationStoreFullRefreshDays = 30   #Days after which the full table is pulled again with 'stationStoreDeltaFetch' (picks up revisions of older years), None only when the overlap year does not match
+
 
 web = 'False'  #'True'|'False' - Parameter defining output to web (i.e. location of script) or defined output directory.
 #Output Directory/LogFile Information
@@ -62,6 +86,10 @@ workspace = outputFolder + "\\workspace"
 outName = 'FireIgnitionNowCastwSummary'   #Output .csv filename
 logFileName = workspace + "\\" + outName + ".LogFile.txt"
 
+#Now Cast State - closed year annual summaries, rolling window state and a hash of the Now Cast window are persisted by station (requires the 'fire_ignition' package folder next to this script)
+useNowCastState = 'No'   #'Yes'|'No' - 'Yes' only the open (current) year and the Now Cast are evaluated, closed years are summarized from the state (created on the first run). Uses the 'fire_ignition' fire season definitions.
+nowCastStateFolder = workspace + "\\NowCastState"   #Folder with the Now Cast state files
+
 #logFileName = outName + ".LogFile.txt"
 
 #Fire Year Parameters by Vegtation Type
@@ -118,67 +146,61 @@ def main():
 
             print("Success - Function processNowCast ")
 
+        ####################################################
+        #Incremental Now Cast - closed years are summarized from the persisted station state, only the open year and Now Cast are evaluated
+        ####################################################
+        if useNowCastState.lower() == "yes":
+            outVal = processNowCastIncremental(dfPlus60)
+            if outVal[0] != "Success function":
+                print("WARNING - Function processNowCastIncremental failed - Exiting Script")
+                exit()
+            else:
+                messageTime = timeFun()
+                scriptMsg = "Success - Processing appended last 25 Year Summaries - Now Cast State " + outVal[2]["mode"] + " - " + str(outVal[2]["recordsEvaluated"]) + " records evaluated - " + messageTime
+                print(scriptMsg)
+                logFile = open(logFileName, "a")
+                logFile.write(scriptMsg + "\n")
+
+            # Export output final dataframe - the full processing below is not run
+            outFun = exportNowCast(outVal[1], messageTime)
+            if outFun[0] != "Success function":
+                print("WARNING - Function exportNowCast failed - Exiting Script")
+                exit()
+            return
+
         ####################################################
         #Run Functions for the Historic/Current Time Periods
         ####################################################
 
 
-        #Create Reference List for Forested Vegetation Type
-        outVal = define_ReferenceList(forest_start_DOY, forest_end_DOY, refYearStartDate, refYearEndDate, dfPlus60, inFieldFieldNowCast, "DATE")
-        if outVal[0] != "Success function":
-            print("WARNING - Function define_ReferenceList failed - Exiting Script")
-            exit()
+        #Reference Index folder - None derives the reference each run
+        if useReferenceIndex.lower() == "yes":
+            indexFolder = referenceIndexFolder
         else:
-            print("Success - Function define_ReferenceList - Forested Vegetation")
-            # Assign the reference Data Frame
-            refDF_Forest = outVal[1]
+            indexFolder = None
 
-        # Create Reference List for Non Forest Vegetation Type
-        outVal = define_ReferenceList(nonforest_start_DOY, nonforest_end_DOY, refYearStartDate, refYearEndDate, dfPlus60, inFieldFieldNowCast, "DATE")
-        if outVal[0] != "Success function":
-            print("WARNING - Function define_ReferenceList failed - Exiting Script")
-            exit()
-        else:
-            print("Success - Function define_ReferenceList - Non Forest Vegetation")
-            # Assign the reference Data Frame
-            refDF_NonForest = outVal[1]
+        #Create Reference List for Forested Vegetation Type - sorted reference values (fire_ignition/reference.py)
+        refSorted_Forest = reference.define_ReferenceIndex(dfPlus60, inFieldFieldNowCast, "DATE", forest_start_DOY, forest_end_DOY, refYearStartDate, refYearEndDate, siteName, indexFolder)
+        print("Success - Function define_ReferenceIndex - Forested Vegetation")
 
-        # Define Moving Window Averages
-        outVal = define_MovingWindowAverage(dfPlus60, movingWindowsDay, inFieldFieldNowCast)
-        if outVal[0] != "Success function":
-            print("WARNING - Function define_MovingWindowAverage failed - Exiting Script")
-            exit()
-        else:
-            print("Success - Function define_MovingWindowAverages")
-            # Assign output to DF
-            dfHistCur_wAvg = outVal[1]
+        # Create Reference List for Non Forest Vegetation Type
+        refSorted_NonForest = reference.define_ReferenceIndex(dfPlus60, inFieldFieldNowCast, "DATE", nonforest_start_DOY, nonforest_end_DOY, refYearStartDate, refYearEndDate, siteName, indexFolder)
+        print("Success - Function define_ReferenceIndex - Non Forest Vegetation")
 
+        # Define Moving Window Averages (fire_ignition/ignition.py)
+        dfHistCur_wAvg = ignition.define_MovingWindowAverage(dfPlus60, movingWindowsDay, inFieldFieldNowCast)
+        dfHistCur_wAvg.reset_index(drop=True, inplace=True)
+        print("Success - Function define_MovingWindowAverages")
 
         # Define Percentiles - for Historic/Cur data, and using Forest Fire Season
-        outVal = define_IgnitionProportion(dfHistCur_wAvg, inFieldFieldNowCast, refDF_Forest, inFieldFieldNowCast, "PercForest", "PropFiresForest", "Forest")
-        if outVal[0] != "Success function":
-            print("WARNING - Function define_IgnitionProportion failed - for 'Historic/Current - Forest Fire Season' - Exiting Script")
-            exit()
-        else:
-            print("Success - Function define_IgnitionProportion - for 'Historic/Current - Forest Fire Season'")
-
-            #Data Frame with the Ignition Potential Calculation
-            dfwIgnition = outVal[1]
-            dfwIgnition.reset_index(drop=True, inplace=True)
-
-        #if siteType == "NonForest":
+        field14Average = inFieldFieldNowCast + "_" + str(movingWindowsDay)
+        dfwIgnition = ignition.define_IgnitionProportion(dfHistCur_wAvg, field14Average, refSorted_Forest, "PercForest", "PropFiresForest", "Forest")
+        print("Success - Function define_IgnitionProportion - for 'Historic/Current - Forest Fire Season'")
 
         # Define Percentiles - for Historic/Cur data, and using Grassland Fire Season
-        outVal = define_IgnitionProportion(dfHistCur_wAvg, inFieldFieldNowCast, refDF_NonForest, inFieldFieldNowCast, "PercNonForest", "PropFiresNonForest", "NonForest")
-        if outVal[0] != "Success function":
-            print("WARNING - Function define_IgnitionProportion failed - for 'Historic/Current - NonForest Fire Season' - Exiting Script")
-            exit()
-        else:
-            print("Success - Function define_IgnitionProportion - for 'Historic/Current - NonForest Fire Season'")
-
-            #Data Frame with the Ignition Potential Calculation
-            dfwIgnitionGrass = outVal[1]
-            dfwIgnitionGrass.reset_index(drop=True, inplace=True)
+        #Data Frame with the Ignition Potential Calculations both Forest and Grassland
+        dfwIgnition = ignition.define_IgnitionProportion(dfwIgnition, field14Average, refSorted_NonForest, "PercNonForest", "PropFiresNonForest", "NonForest")
+        print("Success - Function define_IgnitionProportion - for 'Historic/Current - NonForest Fire Season'")
 
 
         ############################################
@@ -197,7 +219,7 @@ def main():
         #Loop For NonForest
         for year in rangeList:
             #Run for Singular Years Start Year Thru End Year
-            outFun = summarizeFireDangerRating(dfwIgnitionGrass, 'SiteName', siteName, 'PercNonForest', year, year, 'Non-Forest', 'Mean', 'Year', 'na', 'DATE', 'no')
+            outFun = summarizeFireDangerRating(dfwIgnition, 'SiteName', siteName, 'PercNonForest', year, year, 'Non-Forest', 'Mean', 'Year', 'na', 'DATE', 'no')
             if outFun[0] != "Success Function":
                 print("WARNING - Function summarizeFireDangerRating failed - Exiting Script")
                 exit()
@@ -250,7 +272,7 @@ def main():
             appendDfList.append(outFun[1])
 
         'Now Cast NonForest'
-        outFun = subsetToNowCast(dfwIgnitionGrass)
+        outFun = subsetToNowCast(dfwIgnition)
         if outFun[0] != "Success Function":
             print("WARNING - Function 'subsetToNowCast' Non Forest failed - Exiting Script")
             exit()
@@ -291,6 +313,27 @@ def main():
 
 
         # Export output final dataframe
+        outFun = exportNowCast(dfallFiles, messageTime)
+        if outFun[0] != "Success function":
+            print("WARNING - Function exportNowCast failed - Exiting Script")
+            exit()
+
+
+    except:
+        messageTime = timeFun()
+        scriptMsg = "Exiting Error - FireIgnitionPotentialScript - " + messageTime
+        print (scriptMsg)
+        logFile = open(logFileName, "a")
+        logFile.write(scriptMsg + "\n")
+
+        traceback.print_exc(file=sys.stdout)
+        logFile.close()
+
+#Function exports the final data frame (last 25 year summaries and Now Cast) to the output .csv file
+def exportNowCast(dfallFiles, messageTime):
+
+    try:
+
         currentDate = datetime.date.today()
         strCurrentDate = str(currentDate)
 
@@ -309,16 +352,36 @@ def main():
         logFile = open(logFileName, "a")
         logFile.write(scriptMsg + "\n")
 
-
+        return "Success function", outFull
     except:
+
         messageTime = timeFun()
-        scriptMsg = "Exiting Error - FireIgnitionPotentialScript - " + messageTime
-        print (scriptMsg)
-        logFile = open(logFileName, "a")
-        logFile.write(scriptMsg + "\n")
+        print("Error on exportNowCast Function ")
+        traceback.print_exc(file=sys.stdout)
+        return "Failed function - 'exportNowCast'"
+
+#Function runs the Now Cast with the persisted station state (see 'fire_ignition/state.py') - output matches the full processing
+#Output - Data Frame with the last 25 year summaries and Now Cast, and the run information (mode 'full'|'incremental'|'unchanged', records evaluated)
+def processNowCastIncremental(dfPlus60):
+
+    try:
+        from fire_ignition.pipeline import FireIgnitionPipeline
+        from fire_ignition.state import define_NowCastIncremental
 
+        indexFolder = referenceIndexFolder if useReferenceIndex.lower() == "yes" else None
+        pipeline = FireIgnitionPipeline(siteName, inFieldFieldNowCast, "DATE", movingWindowsDay, refYearStartDate, refYearEndDate, indexFolder, logFileName,
+                                        forestStartDOY=forest_start_DOY, forestEndDOY=forest_end_DOY, nonForestStartDOY=nonforest_start_DOY,
+                                        nonForestEndDOY=nonforest_end_DOY)
+
+        dfallFiles, runInfo = define_NowCastIncremental(pipeline, dfPlus60, nowCastStateFolder, 25, 60)
+
+        return "Success function", dfallFiles, runInfo
+    except:
+
+        messageTime = timeFun()
+        print("Error on processNowCastIncremental Function ")
         traceback.print_exc(file=sys.stdout)
-        logFile.close()
+        return "Failed function - 'processNowCastIncremental'"
 
 #Get count of Now Cast with Data
 def numberNowCastDays3(inDf):
@@ -623,13 +686,41 @@ def select_columns(data_frame, column_names):
 def processNowCast(serviceURL,siteName):
     try:
 
-        # Import the data from climate analyzer
-        workCSVFile = workspace + "\\gridmetData_wWB.csv"
-        # Export Rest pull to .csv
-        urlretrieve(serviceURL, workCSVFile)
+        if useStationStore.lower() == "yes":
+            # Station table from the station store - pulled (fetch client or work .csv file) only if the store is not current
+            from fire_ignition.station_store import fetchStationBytes, refreshStationStore
+            workCSVFile = workspace + "\\gridmetData_wWB.csv"
+            fetchFunction = fetchStationBytes if useFetchClient.lower() == "yes" else lambda url: urlretrieve(url, workCSVFile)[0]
+            dfPlus60, storeReport = refreshStationStore(stationStoreFolder, siteName, serviceURL, stationStoreMaxAgeHours, datetime.date.today() + datetime.timedelta(days=60), fetchFunction=fetchFunction,
+                                                        deltaFetch=stationStoreDeltaFetch.lower() == "yes", fullRefreshDays=stationStoreFullRefreshDays)
+            if len(storeReport["replacedYears"]) > 0:
+                print("WARNING - Closed years revised in Climate Analyzer (replaced in the station store) - " + ", ".join(str(year) for year in storeReport["replacedYears"]))
+            print("Station store - " + ("pulled from Climate Analyzer (" + storeReport["mode"] + ", " + str(storeReport["fetchedRecords"]) + " daily records)" if storeReport["fetched"] else "current, not pulled") + " - " + siteName)
+            return "Success function", dfPlus60
+
+        if useFetchClient.lower() == "yes":
+            # Stream the climate analyzer table straight into the parser - keep-alive connection, gzip transfer encoding, no work .csv file
+            from fire_ignition.http_client import getSharedClient
+            with getSharedClient().open(serviceURL) as response:
+                stationData = io.BytesIO(response.read())
+            print("Climate Analyzer download - " + str(response.stats["bytesTransferred"]) + " bytes transferred - time to first byte " +
+                  str(round(response.stats["ttfbSeconds"], 3)) + " seconds")
+        else:
+            # Import the data from climate analyzer
+            workCSVFile = workspace + "\\gridmetData_wWB.csv"
+            # Export Rest pull to .csv
+            urlretrieve(serviceURL, workCSVFile)
+            stationData = workCSVFile
+
+        if fastCSVParser.lower() == "yes":
+            # Daily table only - C engine with explicit data types and the fixed 'mm/dd/YYYY' date format through the current date plus 60 days, monthly summaries not included
+            from fire_ignition.climate_analyzer import read_ClimateAnalyzerCSV
+            dfPlus60 = read_ClimateAnalyzerCSV(stationData, siteName, endDate=datetime.date.today() + datetime.timedelta(days=60))
+            return "Success function", dfPlus60
+
         # Import work CSV file to dataframe  - Skipping first 5 head rows, and skipping footer rows - this should be dynamic
         # stop import at the first 'Text Line?'
-        nowCastDf = pd.read_csv(workCSVFile, skiprows=5, engine='python')
+        nowCastDf = pd.read_csv(stationData, skiprows=5, engine='python')
 
         # Clean-up Dataframe
         # Trim white space from Field Names:
@@ -681,110 +772,6 @@ def processNowCast(serviceURL,siteName):
 
 
 
-###############################################################################################################
-#Function 1. Routine to Derive the Historical 1984-2015 Fire Period Water Deficit full list for the Fire Period
-###############################################################################################################
-# startDate - First date of fire period across the 1984-2015 fire period
-# enddate - Last date of fire period across the 1984-2015 fire period
-# stationData - station data being processed
-# inFileField - Parameter being evaluated (e.g. Deficit)
-# inFileTime - Parameter defining the time field
-
-# Output - pandas data series (i.e. 1D) with the input variable (e.g. Deficit) trimmed to the defined fire year range
-def define_ReferenceList(startDate, endDate, refYearStartDate, refYearEndDate, stationData, inFileField, inFileTime):
-    try:
-
-        'Make data frame from Input List'
-        #df = pd.read_csv(stationData)
-        df = stationData
-        selected_columns = []
-        selected_columns.append(inFileTime)
-        selected_columns.append(inFileField)
-
-        # Function to take the defined Columns and Export the Columns to a new Pandas Data Frame
-        df2 = select_columns(df, selected_columns)  # Creating new data frome with only the date and time series field being processed
-
-        # Create 'timeDate' field as datetime filed
-        df2["timeDate"] = pd.to_datetime(df2[inFileTime])
-        # Create the Day of Year Field
-        df2["DOY"] = df2['timeDate'].dt.dayofyear
-
-        #Select where Day of Year >=Start Date and <= End Date
-        outDfFireYear1 = df2[(df2['DOY'] >= startDate) & (df2['DOY'] < endDate)]
-
-        #Select Second subset fire years of interest Year >= refYearStart Date and <= refYearEnd
-        #Convert Inputs to DateTime parameters
-        refYearStartDT = pd.to_datetime(refYearStartDate, format='%m/%d/%Y')
-        refYearEndDT = pd.to_datetime(refYearEndDate, format='%m/%d/%Y')
-
-        outDfFireYear = outDfFireYear1[(outDfFireYear1['timeDate'] >= refYearStartDT) & (outDfFireYear1['timeDate'] <= refYearEndDT)]
-
-
-        #Reset Index to 0
-        outDfFireYear.reset_index(drop=True, inplace = True)
-
-        del outDfFireYear1
-        return "Success function", outDfFireYear
-    except:
-
-        messageTime = timeFun()
-        print("Error on define_ReferenceList Function ")
-        traceback.print_exc(file=sys.stdout)
-        return "Failed function - 'define_ReferenceList'"
-
-
-#####################################################################
-#Function 2. Define the 14 Day Moving Average Values by input Dataset
-#####################################################################
-# Input:
-# - inDataSet: Dataset which is being evaluated (e.g. Historical/Current/NowCast/Future Projects)
-# - movingWindowDays: Moving window number of days prior to the date to be derived (Default will be 14 day prior)
-# - fieldToAverage: Field in the 'inDateSet' being averaged
-# Output - New Field -'MovingAverage_{movingWindowDays}' in output dataframe with the moving window Average
-
-# Note in Rolling/Moving window average min_periods is set to 1 (i.e. only 1 day of data needed)
-def define_MovingWindowAverage(inDataSet, movingWindowDays, fieldToAverage):
-    try:
-
-        # Make data frame from Input
-        #df = pd.read_csv(inDataSet)
-
-        outField = fieldToAverage + "_" + str(movingWindowDays)
-        # Use Rolling in dataframe to calculate the Moving Window Average
-        #df[outField] = df[fieldToAverage].rolling(movingWindowDays, min_periods=1, win_type=None).mean()
-        inDataSet[outField] = inDataSet[fieldToAverage].rolling(movingWindowDays, min_periods=1, win_type=None).mean()
-
-        #Reset Index to Zero
-        inDataSet.reset_index(drop=True, inplace = True)
-
-        return "Success function", inDataSet
-    except:
-
-        messageTime = timeFun()
-        print("Error on define_MovingWindowAverage Function ")
-        traceback.print_exc(file=sys.stdout)
-        return "Failed function - 'define_MovingWindowAverage'"
-
-#####################################################################
-#Function 3. Routine to Derive the Fire Ignition Potential Proportion
-#Referenced against the trimmed dataframe (i.e. Forest and Non Forest Fire Season 1984-2015
-# Applying the Fire Ignition Potential Relationship in Thoma et. al. 2020 Global Ecology Conservation
-#####################################################################
-#Non-Forest Equation where percentile is the percentile and f is the percent of historic fires (1984-2015) middle rockies
-#that has ignited under the percentile dryness conditions
-def nonforest_equation(percentile):
-    # f = 0.047 * np.e**(0.075*percentile)  #Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
-    f = 0.0119265 * np.e ** (4.192916 * percentile)  # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
-    return f
-
-#Forest Equation where percentile is the percentile and f is the percent of historic fires (1984-2015) middle rockies
-#that has ignited under the percentile dryness conditions
-def forest_equation(percentile):
-    # f = 0.368 * np.e**(0.055*percentile)  #Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
-    f = 0.0095308 * np.e ** (4.4556479 * percentile)  # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
-    return f
-
-
 #Subset to only NowCast Data - passing data frames that already have fire ignition potential calculated
 def subsetToNowCast(inDf):
 
@@ -838,82 +825,6 @@ def subsetToNowCast(inDf):
         return "Failed function - 'subsetToNowCast'"
 
 
-# Input:
-# 1. processDF - Data frame being processed with 14 Day Moving Averages
-# 2. field14Average - Field in 'processDF' with the 14 Day Moving Averages
-# 3. refDF - Reference DataFrame that has been trimmed to the fire year only values
-# 4. refDFField - Field in 'refDF' being checked (e.g. 'inFileField' or 'inFileFieldProj')
-# 5. percentileField - output Percentile field in the 'processDF' (e.g. 'PercentileForest','PercentileNonForest')
-# 6. ignitionProportionField - output Fire Ignition Proportion field in the 'processDF' (i.e. the Proportion of Fires for either Forest or Non-Forest)
-# 7. equationType - defines if Forest or Non-Forest Equations (i.e. function - 'forest_equation' or 'Non-Forest' will be used to
-#               derive the Fire Ignition Proportion Value
-
-# Fire Iginition Proportion Equation is derived from Thoma et. al. 2020 Global Ecology Conservation.
-# Output - 'processDF' Data Frame with percentile fields and Fire Ignition Proportion field
-
-def define_IgnitionProportion(processDF, field14Average, refDF, refDFField, percentileField, ignitionPropField, equationType):
-    try:
-
-        # Field with Averages
-        processField = field14Average + "_" + str(movingWindowsDay)
-
-        # Add Percentile Field
-        lastColumn = processDF.shape[1]
-        processDF.insert(lastColumn, percentileField, "")
-        # Change 'PercentileField' Data Type to Float
-        processDF[percentileField] = pd.to_numeric(processDF[percentileField], errors='coerce')
-
-        # Add 'ignitionPropField' (i.e. Ignition Potential Field)
-        lastColumn = processDF.shape[1]
-        processDF.insert(lastColumn, ignitionPropField, "")
-        # Change 'PercentileField' Data Type to Float
-        processDF[ignitionPropField] = pd.to_numeric(processDF[ignitionPropField], errors='coerce')
-
-        #Converting the reference dataframe deficit field to numeric
-        refDF[refDFField] = pd.to_numeric(refDF[refDFField], errors='coerce')
-
-        # Number of records in the reference dataset - (i.e denominator) - Only interesting if count for the Respective Fire Season
-        # By Type Forest or Grassland(i.e. 1984-2015)
-        totalRecordsFireSeason = refDF.shape[0]
-
-        # Records to iterate through in processDF
-        totalRecordsProcess = processDF.shape[0]
-
-        rowRange = range(0, totalRecordsProcess)
-        # Loop thru the processDF dataframe and assign a percentile per record
-        for row in rowRange:
-
-            rowSeries = processDF.iloc[row]
-            checkValue = rowSeries.get(processField)
-
-            # Get Count of records in the 'refDF' (i.e. Reference DF) and Field that are greater than the input value in the 'processDF'
-            n = np.sum(refDF[refDFField] < checkValue)
-
-            # Calculate Percentile
-            percentile = (n / totalRecordsFireSeason) * 100
-
-            # Assign the percentile value to the processDf and 'percentileField'
-            processDF.at[row, percentileField] = percentile
-
-            # Calculation the Proportion of Fire Ignition
-            if equationType == "Forest":
-                outIgnitionPerc = forest_equation(percentile)
-
-            if equationType == "NonForest":
-                outIgnitionPerc = nonforest_equation(percentile)
-
-            # Assign IgnitionPercentage to the 'processDF' dataframe
-            processDF.at[row, ignitionPropField] = outIgnitionPerc
-
-        return "Success function", processDF
-    except:
-
-        messageTime = timeFun()
-        print("Error on define_IgnitionProportion Function ")
-        traceback.print_exc(file=sys.stdout)
-        return "Failed function - 'define_IgnitionProportion'"
-
-
 if __name__ == '__main__':
 
     # Analyses routine ---------------------------------------------------------
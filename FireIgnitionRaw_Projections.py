@@ -10,12 +10,23 @@
 #Updates:
 #20230519 - Updated Fire Ignition Model to Steve Huysman Version 2.0 Southern Rockies first order https://huysman.net/research/fire/southern_rockies.html
 # Fire Ignition Model vesion 2.0 included used Monitoring Trends Burn Severity data from 1984-1-1 through 2021-12-31 (Note Version FI model 1.0 used MTBS data through 2015-12-31.
+#20261018 - define_IgnitionProportion vectorized - reference values are sorted once and all percentiles derived via one binary search (np.searchsorted) pass. Output is unchanged.
+#20261018 - Added Reference Index (variables 'useReferenceIndex' and 'referenceIndexFolder') - Forest and Non-Forest reference values are persisted as a sorted .npy file and loaded as a memory map on subsequent runs.
+#20261018 - Added 'processingMode' variable - 'Batch' processes all projections in 'ProjectionLoop' in one pass as a 2-D array (function 'define_IgnitionProportionBatch').
+#20261018 - 'inFileProjections' is loaded once (function 'load_ProjectionsInput') with 'projectionsDtype' projection fields and a parsed time index, and shared by all functions.
+#20261018 - Added processingMode 'Parallel' and variable 'workerCount' - projections are processed in a process pool with the projection values in shared memory (fire_ignition/parallel.py).
+# Output is identical to 'Batch', run time per projection is logged, and a failed projection is logged as a WARNING without stopping the remaining projections.
+#20261018 - 'inFileProjections' can be a partitioned Parquet dataset folder (GCM_wb_thredds_point_extractor_v3.py outputFormat 'Parquet'|'Both') - only the
+# 'ProjectionLoop' fields of site 'projectionsSiteName' are read (fire_ignition/columnar.py, requires pyarrow).
+#20261018 - Reference List/Index, Moving Window Average, Fire Ignition Proportion and the 'Batch' routines are imported from the fire_ignition package (fire_ignition/reference.py and
+# fire_ignition/ignition.py), the script copies were removed.
+#20261018 - 'processingMode' default is 'Loop' (the reference index is only used by 'Loop') - a WARNING is printed when 'Batch' or 'Parallel' is run with useReferenceIndex = 'Yes'.
 
 #Dependicies:
 # Futures/Projections Water Balance Data is pulled from the NPS Water Balance Data (version 1.5) on the
 # http://www.yellowstone.solutions/thredds threads server via the  GCM_wb_thredds_point_extractor_v3.py script.
 
-#Python Version 3.9, Numpy. Pandas
+#Python Version 3.9, Numpy. Pandas, fire_ignition package (folder 'fire_ignition' next to this script)
 #Created by Kirk Sherrill - Data Manager Rock Mountian Network - I&M National Park Service
 #Date - October 1st, 2021
 
@@ -31,18 +42,29 @@ import pandas as pd, traceback, sys, os
 import numpy as np
 import datetime
 from datetime import date
+from fire_ignition import ignition, reference
 
 #Projections/Future Variables
-inFileProjections = r"C:\ROMN\GIS\FLFO\LandscapeAnalysis\WaterBalance\Projections\SingleForestGrassland\MergedAll\FLFO_SingleForestGrassland_WB_Daily_Deficit_AllPRJ_2220_2099v2b_wEnsmbAvgGrassOnly.csv"   #File with Futures Projections data Water Balance Data
+inFileProjections = r"C:\ROMN\GIS\FLFO\LandscapeAnalysis\WaterBalance\Projections\SingleForestGrassland\MergedAll\FLFO_SingleForestGrassland_WB_Daily_Deficit_AllPRJ_2220_2099v2b_wEnsmbAvgGrassOnly.csv"   #File with Futures Projections data Water Balance Data (.csv file or Parquet dataset folder)
+projectionsSiteName = None   #Site ('SiteName') to read when 'inFileProjections' is a Parquet dataset folder, None reads all sites in the dataset
 inFileTimeProj = "time"    #Time Field in 'in projection data file
 uniqueInFileProj = "SiteName"   #Field with the unique identifier in projection data file
 movingWindowsDay = 7  #Number of days in the moving window average (default use 14)
+processingMode = 'Loop'  #'Loop'|'Batch'|'Parallel' - 'Loop' processes one projection at a time, 'Batch' processes all 'ProjectionLoop' fields in one pass as a 2-D array (days x projections),
+                         # 'Parallel' processes the projections in a process pool (requires the 'fire_ignition' package folder next to this script). Only 'Loop' uses the reference index ('useReferenceIndex').
+workerCount = 8  #Number of worker processes when processingMode = 'Parallel' (capped at the number of projections)
+projectionsDtype = 'float64'  #'float64'|'float32' - Data type of the 'ProjectionLoop' fields when 'inFileProjections' is loaded. 'float32' halves memory but moving averages tied with
+                              # reference values (data is 0.1 mm) can fall on either side of the tie, shifting percentiles - use 'float64' to match previous outputs.
 
 
 #Define the Historic/Current reference parameters:
 refYearStartDate= '1/1/1984'   #Start Year/Date for which Fire Ignition Model was evaluated (Jan 1 of Start Year)
 refYearEndDate = '12/31/2021'       #End Year/Date for which Fire Ignition Model was evaluated (Dec 31 of End Year
 
+#Reference Index - sorted Forest and Non-Forest reference values are persisted (.npy with .json metadata) by projection file, field and fire season
+useReferenceIndex = 'Yes'   #'Yes'|'No' - 'Yes' loads the reference from the reference index (created on the first run or when 'inFileProjections' changes), 'No' derives the reference each run. processingMode 'Loop' only.
+referenceIndexFolder = r"C:\ROMN\GIS\FLFO\LandscapeAnalysis\FireIgnition\Python\ReferenceIndex"   #Folder with the reference index files
+
 ProjectionLoop = ['deficit_CanESM2_rcp45', 'deficit_CanESM2_rcp85', 'deficit_CCSM4_rcp45', 'deficit_CCSM4_rcp85', 'deficit_CNRM-CM5_rcp45', 'deficit_CNRM-CM5_rcp85', 'deficit_CSIRO-Mk3-6-0_rcp45',
                   'deficit_CSIRO-Mk3-6-0_rcp85', 'deficit_GFDL-ESM2G_rcp45', 'deficit_GFDL-ESM2G_rcp85', 'deficit_HadGEM2-CC365_rcp45', 'deficit_HadGEM2-CC365_rcp85', 'deficit_inmcm4_rcp45', 
                   'deficit_inmcm4_rcp85', 'deficit_IPSL-CM5A-LR_rcp45', 'deficit_IPSL-CM5A-LR_rcp85', 'deficit_MIROC5_rcp45', 'deficit_MIROC5_rcp85', 'deficit_MRI-CGCM3_rcp45',
@@ -102,69 +124,114 @@ def main():
         #Run Functions for the Futures Projections GCM and RCPs Scenarios
         #################################################################
 
+        # Load the Projections input file once - table is shared by all functions below
+        outVal = load_ProjectionsInput(inFileProjections, inFileTimeProj, ProjectionLoop, projectionsDtype)
+        if outVal[0] != "Success function":
+            print("WARNING - Function load_ProjectionsInput failed - Exiting Script")
+            exit()
+        else:
+            print("Success - Function load_ProjectionsInput - " + inFileProjections)
+            dfProjections = outVal[1]
+
+        #Reference index is only used by processingMode 'Loop' - 'Batch' and 'Parallel' derive the reference each run
+        if useReferenceIndex.lower() == "yes" and processingMode.lower() in ("batch", "parallel"):
+            messageTime = timeFun()
+            scriptMsg = "WARNING - useReferenceIndex 'Yes' is not used with processingMode '" + processingMode + "' - the reference is derived each run (use processingMode 'Loop' for the reference index) - " + messageTime
+            print(scriptMsg)
+            logFile = open(logFileName, "a")
+            logFile.write(scriptMsg + "\n")
+            logFile.close()
+
+        if processingMode.lower() == "batch":
+            #Process all GCM and RCP fields in 'ProjectionLoop' in one pass as a 2-D array (days x projections) - fire seasons from the script's Fire Year Parameters (end day of year included)
+            outPrevProj = ignition.define_IgnitionProportionBatch(dfProjections, ProjectionLoop, movingWindowsDay, dfProjections.index.dayofyear.to_numpy(), True, forest_start_DOY,
+                                                                  forest_end_DOY, nonforest_start_DOY, nonforest_end_DOY)
+
+            messageTime = timeFun()
+            scriptMsg = "Successfully processed Projections (Batch) - " + str(len(ProjectionLoop)) + " Projections - " + messageTime
+            print(scriptMsg)
+            logFile = open(logFileName, "a")
+            logFile.write(scriptMsg + "\n")
+
+            # Projections have been processed - no projections are processed in the per projection loop below
+            loopProjections = []
+
+        elif processingMode.lower() == "parallel":
+            #Process the GCM and RCP fields in 'ProjectionLoop' in a process pool - one task per projection
+            from fire_ignition.parallel import define_IgnitionProportionParallel
+
+            # Fire seasons from the script's Fire Year Parameters (end day of year included - same as processingMode 'Batch'/'Loop')
+            outPrevProj, workerReport = define_IgnitionProportionParallel(dfProjections, ProjectionLoop, movingWindowsDay, dfProjections.index.dayofyear.to_numpy(), workerCount,
+                                                                          True, forest_start_DOY, forest_end_DOY, nonforest_start_DOY, nonforest_end_DOY)
+
+            logFile = open(logFileName, "a")
+            failedList = []
+            for report in workerReport:
+                messageTime = timeFun()
+                if report["status"] == "Success":
+                    scriptMsg = "Successfully processed Projection - " + report["field"] + " - worker " + str(report["pid"]) + " - " + str(round(report["seconds"], 3)) + " seconds - " + messageTime
+                else:
+                    failedList.append(report["field"])
+                    scriptMsg = "WARNING - Projection failed - " + report["field"] + " - " + messageTime + "\n" + str(report["error"])
+                print(scriptMsg)
+                logFile.write(scriptMsg + "\n")
+
+            messageTime = timeFun()
+            scriptMsg = "Processed Projections (Parallel) - " + str(len(ProjectionLoop) - len(failedList)) + " of " + str(len(ProjectionLoop)) + " Projections - " + str(workerCount) + " workers - " + messageTime
+            if len(failedList) > 0:
+                scriptMsg = scriptMsg + " - WARNING failed Projections not included in output: " + ", ".join(failedList)
+            print(scriptMsg)
+            logFile.write(scriptMsg + "\n")
+            logFile.close()
+
+            # Projections have been processed - no projections are processed in the per projection loop below
+            loopProjections = []
+
+        else:
+            loopProjections = ProjectionLoop
+
+        #Reference Index folder and source (i.e. 'inFileProjections') - None derives the reference each run
+        if useReferenceIndex.lower() == "yes" and len(loopProjections) > 0:
+            indexFolder = referenceIndexFolder
+            station, sourceMetadata = define_ReferenceIndexSource(inFileProjections)
+        else:
+            indexFolder = None
+            station, sourceMetadata = None, None
+
         loopCount = 1
-        for val in ProjectionLoop:
+        for val in loopProjections:
             #Define the GCM being processed
             GCM_RCP_Field = str(val)
 
-            #Create Reference List for Forested Vegetation Type
-            outVal = define_ReferenceList(forest_start_DOY, forest_end_DOY, refYearStartDate, refYearEndDate, inFileProjections, GCM_RCP_Field, inFileTimeProj, 'yes')
-            if outVal[0] != "Success function":
-                print("WARNING - Function define_ReferenceList failed - Exiting Script")
-                exit()
-            else:
-                print("Success - Function define_ReferenceList - Forested Vegetation")
-                # Assign the reference Data Frame
-                refDF_ForestProject = outVal[1]
+            #Create Reference List for Forested Vegetation Type - Futures reference is not trimmed to the reference years (fire_ignition/reference.py)
+            refSorted_ForestProject = reference.define_ReferenceIndex(dfProjections, GCM_RCP_Field, inFileTimeProj, forest_start_DOY, forest_end_DOY, None, None, station, indexFolder,
+                                                                      endDOYInclusive=True, extraMetadata=sourceMetadata)
+            print("Success - Function define_ReferenceIndex - Forested Vegetation")
 
             # Create Reference List for NonForest - Grassland Vegetation Type
-            outVal = define_ReferenceList(nonforest_start_DOY, nonforest_end_DOY, refYearStartDate, refYearEndDate, inFileProjections, GCM_RCP_Field, inFileTimeProj, 'yes')
-            if outVal[0] != "Success function":
-                print("WARNING - Function define_ReferenceList failed - Exiting Script")
-            else:
-                print("Success - Function define_ReferenceList - Non Forest Vegetation")
-                # Assign the reference Data Frame
-                refDF_NonForestProject = outVal[1]
-
-            # Define Moving Averages Futures/Projections
-            outVal = define_MovingWindowAverage(inFileProjections, movingWindowsDay, GCM_RCP_Field)
-            if outVal[0] != "Success function":
-                print("WARNING - Function define_MovingWindowAverage failed - Exiting Script")
-            else:
-                print("Success - Function define_MovingWindowAverage - for " + inFileProjections)
-                # Assign output to DF
-                dfProject_wAvg = outVal[1]
-
-            # Define Percentiles - for Projections, and using Forest Fire Season
-            outVal = define_IgnitionProportion(dfProject_wAvg, GCM_RCP_Field, refDF_ForestProject, GCM_RCP_Field, "PercForest" + GCM_RCP_Field, "PropFiresForest" + GCM_RCP_Field, "Forest")
-            if outVal[0] != "Success function":
-                print("WARNING - Function define_IgnitionProportion failed - for 'Projections - " + GCM_RCP_Field + " - Exiting Script")
-            else:
-                print("Success - Function define_IgnitionProportion - for 'Projections - " + GCM_RCP_Field + " - Forest")
-                if loopCount == 1:
-                    print("Success - Function define_IgnitionProportion - for 'Projections - " + GCM_RCP_Field + " - Forest")
-                else:
-                     # Append the Percent and Proportion Fire Fields to the Master Data Frame 'outPrevProj'
-                    outPrevProj["PercForest" + GCM_RCP_Field] = outVal[1]["PercForest" + GCM_RCP_Field]
-                    outPrevProj["PropFiresForest" + GCM_RCP_Field] = outVal[1]["PropFiresForest" + GCM_RCP_Field]
+            refSorted_NonForestProject = reference.define_ReferenceIndex(dfProjections, GCM_RCP_Field, inFileTimeProj, nonforest_start_DOY, nonforest_end_DOY, None, None, station,
+                                                                         indexFolder, endDOYInclusive=True, extraMetadata=sourceMetadata)
+            print("Success - Function define_ReferenceIndex - Non Forest Vegetation")
+
+            # Define Moving Averages Futures/Projections (fire_ignition/ignition.py)
+            dfProject_wAvg = ignition.define_MovingWindowAverage(dfProjections, movingWindowsDay, GCM_RCP_Field)
+            print("Success - Function define_MovingWindowAverage - for " + inFileProjections)
+
+            # Define Percentiles - for Projections, and using Forest and NonForest Fire Season
+            field7Average = GCM_RCP_Field + "_" + str(movingWindowsDay)
+            dfProject_wIgnition = ignition.define_IgnitionProportion(dfProject_wAvg, field7Average, refSorted_ForestProject, "PercForest" + GCM_RCP_Field, "PropFiresForest" + GCM_RCP_Field, "Forest")
+            print("Success - Function define_IgnitionProportion - for 'Projections - " + GCM_RCP_Field + " - Forest")
+            dfProject_wIgnition = ignition.define_IgnitionProportion(dfProject_wIgnition, field7Average, refSorted_NonForestProject, "PercNonForest" + GCM_RCP_Field, "PropFiresNonForest" + GCM_RCP_Field, "NonForest")
+            print("Success - Function define_IgnitionProportion - for 'Projections - " + GCM_RCP_Field + " - NonForest")
 
-            # Define Percentiles - for Projections, and using NonForest Fire Season
             if loopCount == 1:
-                outVal = define_IgnitionProportion(dfProject_wAvg, GCM_RCP_Field, refDF_NonForestProject, GCM_RCP_Field, "PercNonForest" + GCM_RCP_Field, "PropFiresNonForest" + GCM_RCP_Field, "NonForest")
+                #Assign dataframe which will be appended to on subsequent RCP iterations
+                outPrevProj = dfProject_wIgnition
             else:
-                outVal = define_IgnitionProportion(dfProject_wAvg, GCM_RCP_Field, refDF_NonForestProject, GCM_RCP_Field, "PercNonForest" + GCM_RCP_Field, "PropFiresNonForest" + GCM_RCP_Field, "NonForest")
+                # Append the Percent and Proportion Fire Fields to the Master Data Frame 'outPrevProj'
+                for field in ["PercForest", "PropFiresForest", "PercNonForest", "PropFiresNonForest"]:
+                    outPrevProj[field + GCM_RCP_Field] = dfProject_wIgnition[field + GCM_RCP_Field]
 
-            if outVal[0] != "Success function":
-                print("WARNING - Function define_IgnitionProportion failed - for 'Projections - " + GCM_RCP_Field + " - Exiting Script")
-            else:
-                print("Success - Function define_IgnitionProportion - for 'Projections - " + GCM_RCP_Field + " - NonForest")
-                if loopCount == 1:
-                    #Assign dataframe which will be appended to on subsequent RCP iterations
-                    outPrevProj = outVal[1]
-                else:
-                    # Append the Percent and Proportion Fire Fields to the Master Data Frame 'outPrevProj'
-                    outPrevProj["PercNonForest" + GCM_RCP_Field] = outVal[1]["PercNonForest" + GCM_RCP_Field]
-                    outPrevProj["PropFiresNonForest" + GCM_RCP_Field] = outVal[1]["PropFiresNonForest" + GCM_RCP_Field]
             messageTime = timeFun()
             scriptMsg = "Successfully processed Projection - " + GCM_RCP_Field + " + " + messageTime
             print (scriptMsg)
@@ -175,8 +242,8 @@ def main():
 
         #Export Dataframe: outPrevProj
         outputFull2 = outputFolder + "\\" + outName + "_" + strDate + ".csv"
-        # Export Output to csv
-        outPrevProj.to_csv(outputFull2, ",")
+        # Export Output to csv - time index (i.e. parsed 'inFileTimeProj' field) is replaced with the record number index
+        outPrevProj.reset_index(drop=True).to_csv(outputFull2, ",")
         messageTime = timeFun()
         print("Successfully finished Processing - " + messageTime)
 
@@ -203,184 +270,61 @@ def select_columns(data_frame, column_names):
     new_frame = data_frame.loc[:, column_names]
     return new_frame
 
-###############################################################################################################
-#Function 1. Routine to Derive the Historical 1984-2015 Fire Period Water Deficit full list for the Fire Period
-###############################################################################################################
-# startDate - First date of fire period across the 1984-2015 fire period
-# enddate - Last date of fire period across the 1984-2015 fire period
-# inputVariableList - List of the climatic variable being evaluated (e.g. Water Balance - Deficit)
-# inFileField - Parameter being evaluated (e.g. Deficit)
-# inFileTime - Parameter defined the time field
-
-# Output - pandas data series (i.e. 1D) with the input variable (e.g. Deficit) trimmed to the defined fire year range
-def define_ReferenceList(startDate, endDate, refYearStartDate, refYearEndDate, inputVariableList, inFileField, inFileTime, futures):
-    try:
-
-        'Make data frame from Input List'
-        df = pd.read_csv(inputVariableList)
-
-        selected_columns = []
-        selected_columns.append(inFileTime)
-        selected_columns.append(inFileField)
-
-        # Function to take the defined Columns and Export the Columns to a new Pandas Data Frame
-        df2 = select_columns(df, selected_columns)  # Creating new data frome with only the date and time series field being processed
-
-        #Create 'timeDate' field as datetime filed
-        df2["timeDate"] = pd.to_datetime(df2[inFileTime])
-
-        # Create the Day of Year Field
-        df2["DOY"] = df2['timeDate'].dt.dayofyear
-
-        # Select where >=Start Date and <= End Date
-        outDfFireYear1 = df2[(df2['DOY'] >= startDate) & (df2['DOY'] <= endDate)]
-
-        # Create 'timeDate' field as datetime filed
-        #outDfFireYear1["timeDate"] = pd.to_datetime(outDfFireYear1["timeDate"])
-
-        if futures.lower() == "yes":
-            outDfFireYear = outDfFireYear1
-
-        else: #not processing futures add year subset for 1984-2005
-            # Select Second subset fire years of interest Year >= refYearStart Date and <= refYearEnd  0- Added 20220627
-            # Convert Inputs to DateTime parameters
-            refYearStartDT = pd.to_datetime(refYearStartDate, format='%m/%d/%Y')
-            refYearEndDT = pd.to_datetime(refYearEndDate, format='%m/%d/%Y')
-
-            outDfFireYear = outDfFireYear1[(outDfFireYear1['timeDate'] >= refYearStartDT) & (outDfFireYear1['timeDate'] < refYearEndDT)]
-
-        # Reset Index to 0
-        outDfFireYear.reset_index(drop=True, inplace=True)
-
-        del outDfFireYear1
-
-        return "Success function", outDfFireYear
-    except:
-
-        messageTime = timeFun()
-        print("Error on define_ReferenceList Function ")
-        traceback.print_exc(file=sys.stdout)
-        return "Failed function - 'define_ReferenceList'"
-
-
-#####################################################################
-#Function 2. Define the 14 Day Moving Average Values by input Dataset
-#####################################################################
-# Input:
-# - inDataSet: Dataset which is being evaluated (e.g. Historical/Current, Future Projects)
-# - movingWindowDays: Moving window number of days prior to the date to be derived (Default will be 14 day prior)
-# - fieldToAverage: Field in the 'inDateSet' being averaged
-# Output - New Field -'MovingAverage_{movingWindowDays}' in output dataframe with the moving window Average
-
-# Note in Rolling/Moving window average min_periods is set to 1 (i.e. only 1 day of data needed)
-def define_MovingWindowAverage(inDataSet, movingWindowDays, fieldToAverage):
-    try:
-
-        # Make data frame from Input
-        df = pd.read_csv(inDataSet)
-
-        outField = fieldToAverage + "_" + str(movingWindowDays)
-        # Use Rolling in dataframe to calculate the Moving Window Average
-        df[outField] = df[fieldToAverage].rolling(movingWindowDays, min_periods=1, win_type=None).mean()
-
-        return "Success function", df
-    except:
-
-        messageTime = timeFun()
-        print("Error on define_MovingWindowAverage Function ")
-        traceback.print_exc(file=sys.stdout)
-        return "Failed function - 'define_MovingWindowAverage'"
-
-#####################################################################
-#Function 3. Routine to Derive the Fire Ignition Potential Proportion
-#Referenced against the trimmed dataframe (i.e. Forest and Non Forest Fire Season 1984-2015
-# Applying the Fire Ignition Potential Relationship in Thoma et. al. 2020 Global Ecology Conservation
-#####################################################################
-#Non-Forest Equation where percentile is the percentile and f is the percent of historic fires (1984-2015) middle rockies
-#that has ignited under the percentile dryness conditions
-def nonforest_equation(percentile):
-    # f = 0.047 * np.e**(0.075*percentile)  #Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
-    f = 0.0119265 * np.e ** (4.192916 * percentile)  # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
-    return f
-
-#Forest Equation where percentile is the percentile and f is the percent of historic fires (1984-2015) middle rockies
-#that has ignited under the percentile dryness conditions
-def forest_equation(percentile):
-    # f = 0.368 * np.e**(0.055*percentile)  #Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
-    f = 0.0095308 * np.e ** (4.4556479 * percentile)  # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
-    return f
-
+# Function loads the Projections input file once.  Projection fields are loaded with an explicit data type and the time field is parsed to a
+# DatetimeIndex (the time field is retained as loaded). The output Data Frame is shared (not copied) by the functions processing the projections.
 # Input:
-# 1. processDF - Data frame being processed with xx Day Moving Averages
-# 2. field14Average - Field in 'processDF' with the xx Day Moving Averages
-# 3. refDF - Reference DataFrame that has been trimmed to the fire year only values
-# 4. refDFField - Field in 'refDF' being checked (e.g. 'inFileField' or 'inFileFieldProj')
-# 5. percentileField - output Percentile field in the 'processDF' (e.g. 'PercentileForest','PercentileNonForest')
-# 6. ignitionProportionField - output Fire Ignition Proportion field in the 'processDF' (i.e. the Proportion of Fires for either Forest or Non-Forest)
-# 7. equationType - defines if Forest or Non-Forest Equations (i.e. function - 'forest_equation' or 'Non-Forest' will be used to
-#               derive the Fire Ignition Proportion Value
-
-# Fire Iginition Proportion Equation is derived from Thoma et. al. 2020 Global Ecology Conservation.
-# Output - 'processDF' Data Frame with percentile fields and Fire Ignition Proportion field
-
-def define_IgnitionProportion(processDF, field14Average, refDF, refDFField, percentileField, ignitionPropField, equationType):
+# - inDataSet: Projections data file (i.e. 'inFileProjections') - .csv file or partitioned Parquet dataset folder (only the 'fieldList' fields of
+# 'projectionsSiteName' are read, see fire_ignition/columnar.py)
+# - inFileTime: Time field in the 'inDataSet'
+# - fieldList: List of projection fields to be processed (i.e. 'ProjectionLoop')
+# - valueDtype: Data type of the projection fields (e.g. 'float32')
+# Output - Data Frame with a DatetimeIndex
+def load_ProjectionsInput(inDataSet, inFileTime, fieldList, valueDtype):
     try:
 
-        # Field with Averages
-        processField = field14Average + "_" + str(movingWindowsDay)
-
-        # Add Percentile Field
-        lastColumn = processDF.shape[1]
-        processDF.insert(lastColumn, percentileField, "")
-        # Change 'PercentileField' Data Type to Float
-        processDF[percentileField] = pd.to_numeric(processDF[percentileField], errors='coerce')
+        dtypeDict = {}
+        for field in fieldList:
+            dtypeDict[field] = valueDtype
 
-        # Add 'ignitionPropField' (i.e. Ignition Potential Field)
-        lastColumn = processDF.shape[1]
-        processDF.insert(lastColumn, ignitionPropField, "")
-        # Change 'PercentileField' Data Type to Float
-        processDF[ignitionPropField] = pd.to_numeric(processDF[ignitionPropField], errors='coerce')
+        if os.path.isdir(inDataSet):
+            from fire_ignition.columnar import read_ProjectionsParquet
 
-        # Number of records in the reference dataset - (i.e denominator) - Only interesting if count for the Respective Fire Season
-        # By Type Forest or Grassland(i.e. 1984-2015)
-        totalRecordsFireSeason = refDF.shape[0]
+            siteNames = [projectionsSiteName] if projectionsSiteName is not None else None
+            df = read_ProjectionsParquet(inDataSet, fieldList, siteNames, valueDtype)
+        else:
+            df = pd.read_csv(inDataSet, dtype=dtypeDict, engine='c')
 
-        # Records to iterate through in processDF
-        totalRecordsProcess = processDF.shape[0]
+        # Parse the time field once to the Data Frame index
+        df.index = pd.DatetimeIndex(pd.to_datetime(df[inFileTime]), name=None)
 
-        rowRange = range(0, totalRecordsProcess)
-        # Loop thru the processDF dataframe and assign a percentile per record
-        for row in rowRange:
-
-            rowSeries = processDF.iloc[row]
-            checkValue = rowSeries.get(processField)
-
-            # Get Count of records in the 'refDF' (i.e. Reference DF) and Field that are greater than the input value in the 'processDF'
-            n = np.sum(refDF[refDFField] < checkValue)
-
-            # Calculate Percentile
-            percentile = (n / totalRecordsFireSeason) * 100
-
-            # Assign the percentile value to the processDf and 'percentileField'
-            processDF.at[row, percentileField] = percentile
-
-            # Calculation the Proportion of Fire Ignition
-            if equationType == "Forest":
-                outIgnitionPerc = forest_equation(percentile)
-
-            if equationType == "NonForest":
-                outIgnitionPerc = nonforest_equation(percentile)
-
-            # Assign IgnitionPercentage to the 'processDF' dataframe
-            processDF.at[row, ignitionPropField] = outIgnitionPerc
-
-        return "Success function", processDF
+        return "Success function", df
     except:
 
         messageTime = timeFun()
-        print("Error on define_IgnitionProportion Function ")
+        print("Error on load_ProjectionsInput Function ")
         traceback.print_exc(file=sys.stdout)
-        return "Failed function - 'define_IgnitionProportion'"
+        return "Failed function - 'load_ProjectionsInput'"
+
+# Function defines the reference index station and source metadata for the projections input - the reference index is loaded only if it was built
+# from the current 'inputVariableList' (i.e. same file size and modified time, Parquet dataset - same partition files)
+# Input: inputVariableList - Projections data file (i.e. 'inFileProjections') - .csv file or partitioned Parquet dataset folder
+# Output - station name used in the reference index key (input file name, Parquet dataset - dataset folder name and site) and the source metadata dictionary
+def define_ReferenceIndexSource(inputVariableList):
+
+    if os.path.isdir(inputVariableList):
+        from fire_ignition.columnar import define_DatasetSignature
+
+        siteNames = [projectionsSiteName] if projectionsSiteName is not None else None
+        station = os.path.basename(os.path.normpath(inputVariableList))
+        if projectionsSiteName is not None:
+            station = station + "_" + str(projectionsSiteName)
+        sourceSize, sourceModified = define_DatasetSignature(inputVariableList, siteNames)
+    else:
+        station = os.path.splitext(os.path.basename(inputVariableList))[0]
+        sourceSize = os.path.getsize(inputVariableList)
+        sourceModified = os.path.getmtime(inputVariableList)
+
+    return station, {"sourceSize": sourceSize, "sourceModified": sourceModified}
 
 
 if __name__ == '__main__':
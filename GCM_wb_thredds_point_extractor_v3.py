@@ -18,13 +18,43 @@
 #Script Name - 'GCM_wb_thredds_point_extractor_v3.py
 #Apply correction factor to take data from the mm * 10 multiplier (for integer storge) by dividing by 10 to remove the integer corretion variable.
 
+#Modified 20261018
+#Added 'fetchMode' - 'Concurrent' downloads all (place, year) requests in a thread pool (fire_ignition/fetch.py) with a per host concurrency cap
+#('perHostLimit'), a timeout per request ('requestTimeout') and retries with exponential backoff and jitter ('maxRetries').  'Sequential' is the
+#previous one year at a time download (function 'get_one').
+#'Concurrent' requests reuse keep-alive connections, request gzip transfer encoding and parse the response as it streams in (fire_ignition/http_client.py).
+#Added 'dedupeGridCells' - sites in the same Water Balance grid cell (snapped with the dataset's lat/lon axes, fire_ignition/grid.py) are downloaded
+#once per parameter, model, scenario and year and the year file is copied to each site in the cell.
+#Added 'useDownloadCache' - responses are kept in a persistent download cache ('downloadCacheFolder', fire_ignition/cache.py) keyed by the request url,
+#so a rerun only downloads the requests not yet cached.  The skip check for places already merged now looks in 'MergeYearFiles' (was the working
+#directory) and the merged year file is only renamed into place when complete.
+#Added 'mergeMode' - 'InMemory' parses each response once into typed arrays and assembles the final table in memory (fire_ignition/extract.py), i.e.
+#without the 'SiteMonthlyDailyFiles', 'MergeYearFiles' and 'MergedParameter' .csv files.  Optional binary (.npz) year files ('intermediateFiles').
+#'mergeFinalparameterList' aligns all parameter tables on 'SiteName'/'time' in one pass (fire_ignition/extract.py 'define_WideTable') in place of the
+#successive left merges, and reports the array and output sizes of the assembly (peak memory with 'reportPeakMemory' = 'Yes').
+#Added 'outputFormat' - 'Parquet' exports the final table as a Parquet dataset partitioned by site, parameter and scenario (float32 values, dictionary
+#encoded SiteName, fire_ignition/columnar.py) so readers load only the fields needed (e.g. the deficit fields of one station).
+#Added 'responseFormat' - 'NetCDF' requests the NCSS point subset as NetCDF ('accept=netcdf') in place of .csv text - the packed int16 values are read
+#straight into numpy arrays and unpacked in one vectorized step with the fill values (below -30000, see 'unit_fix') masked (fire_ignition/netcdf.py).
+#Added 'fetchPlan' - 'Consumers' only requests the parameters and days of year used downstream ('consumerNeeds', e.g. the daily deficit fire seasons
+#of FireIgnitionRaw_Projections.py) with 'time_start'/'time_end' set to the season (fire_ignition/plan.py).  The estimated requests and bytes are
+#printed before the download.
+#Added 'useJobManifest' and 'resumeMode' - every (place, year) task is recorded in a job manifest ('jobManifestFile', fire_ignition/manifest.py) with
+#its state, bytes and sha256; 'resumeMode' = 'Yes' reschedules only the failed and missing tasks of the previous run.  A place with a failed year is
+#reported and skipped (was a crash in 'merge_years'), and the throughput and failed tasks are summarized at the end.  With 'mergeMode' = 'InMemory' a
+#resume reads the completed years from the .npz year arrays ('intermediateFiles' = 'Yes') or the download cache, otherwise they are requested again.
+#Added 'parseWorkers' - 'Concurrent' downloads and parsing are pipelined (fire_ignition/fetch.py 'runFetchPipeline') - download workers queue the
+#response bodies on a bounded queue ('parseQueueSize') consumed by the parse workers, and the 'InMemory' place tables are built as each place completes.
+#Added 'threddsServerURL' - requests can be sent to another NCSS server, e.g. the local stand-in server (fire_ignition/ncss_server.py) started by
+#ThreddsFetchBenchmark.py 'runMode' = 'Serve', to test the extractor offline.
+
 
 # mypointsFile - variable defines the path and file Name to the .csv file defining the sites, lat/lon and water balance variables to be processed. (ie. the 'mypoints.csv' file)
 #outFileName - variable defines the output name for the final .csv file with the compiled site, parameters and years of data.
 
 # Software/Libraries: Python Version 3.x, Pandas Library
 
-import csv, urllib, os, time, pandas as pd, glob, traceback, sys, socket, time, shutil
+import csv, urllib, os, time, pandas as pd, glob, traceback, sys, socket, time, shutil, io
 import urllib.request
 
 def tryfloat(v):
@@ -72,14 +102,9 @@ def read_point_file(mypointsFile):
     infile.close()
     return out_d
 
-def get_one(d,place, paraModelScenarioList):
-    global first_year, last_year, param_dict, daily_url, monthly_url
+def get_one(d,place, paraModelScenarioList, cellPlaceList=None):
+    global first_year, last_year, param_dict, daily_url, monthly_url, downloadCache, jobManifest, resumeMode
     print('Getting data for : ', place)
-    lat = d[place]['lat']
-    lon = d[place]['lon']
-    param = d[place]['param']
-    if param in param_dict: fparam = param_dict[param]
-    else: fparam = param
 
     # KRS Added 20200609
     filepath = os.path.dirname(os.path.abspath(__file__))
@@ -92,9 +117,6 @@ def get_one(d,place, paraModelScenarioList):
         os.makedirs(filepathSiteMonthly)
 
     # KRS Added 20200609
-    d_or_m = d[place]['d_or_m']
-    model = d[place]['model']
-    scenario = d[place]['scenario']
     param_model_scenario = d[place]['para_model_scenario']  #KRS Added 20210323
 
     if param_model_scenario not in paraModelScenarioList:
@@ -104,24 +126,41 @@ def get_one(d,place, paraModelScenarioList):
     #print('~',place)
     check_name = place +  '_all_years.csv'
     #print(check_name)
-    fl = os.listdir('.')
+    fl = list_merged_years()
     if check_name in fl: return False
+    taskPlaceList = cellPlaceList if cellPlaceList is not None else [place]
     for year in range(first_year,last_year + 1):
         print(year)
-        next_year = year + 1
-        if d_or_m == 'daily' : this_url = daily_url.format(scenario = scenario, model = model, year = year, param = fparam, lon = lon, lat = lat, next_year = next_year)
-        else: this_url = monthly_url.format(scenario = scenario, model = model, year = year, param = fparam, lon = lon, lat = lat, next_year = next_year, param_lower = fparam.lower())
+        this_url = define_year_url(d, place, year)
 
         fullSiteMonthly = filepathSiteMonthly + "\\" + place + '_' + str(year) + '.csv'  # KRS Added 20200609
 
+        #Year completed in the previous run ('resumeMode') - Added 20261018
+        if jobManifest is not None and resumeMode.lower() == 'yes':
+            if all(jobManifest.isComplete(define_TaskKey(taskPlace, year)) and os.path.exists(filepathSiteMonthly + "\\" + taskPlace + '_' + str(year) + '.csv')
+                   for taskPlace in taskPlaceList):
+                print('Resumed, year completed: ', place, year)
+                continue
+
+        #Cached response - Added 20261018
+        cachedFile = downloadCache.get(this_url) if downloadCache is not None else None
+        if cachedFile is not None:
+            shutil.copyfile(cachedFile, fullSiteMonthly)
+            downloadCache.release(this_url)
+            remaining_download_tries = 0
+            success = True
+        else:
+            remaining_download_tries = 5
+            success = False
+
         #print(this_url)
-        remaining_download_tries = 5
-        success = False
         while remaining_download_tries > 0:
             try:
                 #print(this_url)
                 #urllib.request.urlretrieve(this_url, place + '_' + str(year) + '.csv')
                 urllib.request.urlretrieve(this_url, fullSiteMonthly)
+                if downloadCache is not None:
+                    downloadCache.putFile(this_url, fullSiteMonthly)
                 remaining_download_tries = 0
                 success = True
             except:
@@ -131,25 +170,341 @@ def get_one(d,place, paraModelScenarioList):
 
 
         if success == True:    #Import the created file and rename the parameter field with the 'model_scenario' value - KRS
+            #Record the task (response bytes and sha256) in the job manifest - Added 20261018
+            if jobManifest is not None:
+                byteCount, sha256 = define_FileDigest(fullSiteMonthly)
+                for taskPlace in taskPlaceList:
+                    jobManifest.recordSuccess(define_TaskKey(taskPlace, year), d[taskPlace]['para_model_scenario'], this_url, byteCount, sha256,
+                                              source='cache' if cachedFile is not None else 'download')
+            fix_year_file(fullSiteMonthly, param_model_scenario)
+            #Copy the year file to the other places in the same grid cell - Added 20261018
+            if cellPlaceList is not None:
+                for cellPlace in cellPlaceList:
+                    if cellPlace != place:
+                        shutil.copyfile(fullSiteMonthly, filepathSiteMonthly + "\\" + cellPlace + '_' + str(year) + '.csv')
+
+        if success == False:
+            #Year failed after all attempts - place is not merged - Modified 20261018 (was a break and a crash in 'merge_years')
+            print('WARNING - Download failed after 5 attempts: ', place, year)
+            if jobManifest is not None:
+                for taskPlace in taskPlaceList:
+                    jobManifest.recordFailure(define_TaskKey(taskPlace, year), d[taskPlace]['para_model_scenario'], this_url, 'Download failed', attempts=5)
+            return None
 
-            #Rename output field with Model and RCP info: {param_model_scenario}
-            df = pd.read_csv(fullSiteMonthly)
-            shapeOutput = df.shape
-            lastColumn = int(shapeOutput[1]) - 1
-            lastColumnName = df.columns[lastColumn]
-            df.rename(columns = {lastColumnName:param_model_scenario},inplace=True)
-            # Remove * 10 correction for integer   - Added by KRS 20211012
-            df[param_model_scenario] = df[param_model_scenario] / 10.0
 
-            fullSiteMonthly = filepathSiteMonthly + "\\" + place + '_' + str(year) + '.csv'
-            os.remove(fullSiteMonthly) #Delete Initial File
-            df.to_csv(fullSiteMonthly, ",") #Save modified .csv with para_model_scenario field
+    return True
 
-        if success == False: break
+#Function lists the merged year files (places already processed) in the 'MergeYearFiles' directory - Added 20261018
+def list_merged_years():
+    filepathMergedYears = os.path.dirname(os.path.abspath(__file__)) + "\\MergeYearFiles"
+    if os.path.exists(filepathMergedYears) == False:
+        return []
+    return os.listdir(filepathMergedYears)
 
+#Function defines the NCSS url for the place and year - Added 20261018 (moved from get_one)
+def define_year_url(d, place, year):
+    global param_dict, daily_url, monthly_url, fetchWindows
+    lat = d[place]['lat']
+    lon = d[place]['lon']
+    param = d[place]['param']
+    if param in param_dict: fparam = param_dict[param]
+    else: fparam = param
+    d_or_m = d[place]['d_or_m']
+    model = d[place]['model']
+    scenario = d[place]['scenario']
 
-    return True
+    next_year = year + 1
+    if d_or_m == 'daily' : this_url = daily_url.format(scenario = scenario, model = model, year = year, param = fparam, lon = lon, lat = lat, next_year = next_year)
+    else: this_url = monthly_url.format(scenario = scenario, model = model, year = year, param = fparam, lon = lon, lat = lat, next_year = next_year, param_lower = fparam.lower())
+    #Restrict the time range to the planned window ('fetchPlan' = 'Consumers')
+    if fetchWindows is not None:
+        from fire_ignition.plan import define_WindowURL
+        this_url = define_WindowURL(this_url, year, fetchWindows.get((param, d_or_m)))
+    return this_url
+
+#Function renames the parameter field with the 'model_scenario' value and removes the * 10 integer correction - Added 20261018 (moved from get_one)
+def fix_year_df(df, param_model_scenario):
+
+    #Rename output field with Model and RCP info: {param_model_scenario}
+    shapeOutput = df.shape
+    lastColumn = int(shapeOutput[1]) - 1
+    lastColumnName = df.columns[lastColumn]
+    df.rename(columns = {lastColumnName:param_model_scenario},inplace=True)
+    #Fill values (below -30000, see 'unit_fix') set to NaN as in the 'InMemory' merge - Added 20261018
+    df[param_model_scenario] = df[param_model_scenario].mask(df[param_model_scenario] < -30000)
+    # Remove * 10 correction for integer   - Added by KRS 20211012
+    df[param_model_scenario] = df[param_model_scenario] / 10.0
+    return df
+
+#Function applies 'fix_year_df' to the downloaded year file - Added 20261018 (moved from get_one)
+def fix_year_file(fullSiteMonthly, param_model_scenario):
+
+    df = fix_year_df(pd.read_csv(fullSiteMonthly), param_model_scenario)
+
+    os.remove(fullSiteMonthly) #Delete Initial File
+    df.to_csv(fullSiteMonthly, ",") #Save modified .csv with para_model_scenario field
+
+#Function groups the places by Water Balance grid cell (see fire_ignition/grid.py) - Added 20261018
+#Places with the same parameter, daily/monthly, model and scenario whose lat/lon snap to the same grid cell (nearest cell of the dataset's lat/lon axes)
+#return identical data - one request is made per cell.  The axes are read once per daily/monthly dataset ('dataset.xml' of the first year).
+#Returns dictionary by cell place (first place in the cell) of the list of places in the cell
+def define_cell_groups(d, placeList):
+    global first_year, requestTimeout
+    from fire_ignition.grid import define_DatasetURL, fetchGridAxes, define_CellGroups
+
+    axesByType = {}
+    pointsByType = {}
+    for place in placeList:
+        d_or_m = d[place]['d_or_m']
+        if d_or_m not in axesByType:
+            datasetURL = define_DatasetURL(define_year_url(d, place, first_year))
+            try:
+                axesByType[d_or_m] = fetchGridAxes(datasetURL, timeout=requestTimeout)
+            except:
+                print('WARNING - Grid axes not read, grid cell dedupe skipped for ' + d_or_m + ' - ' + datasetURL)
+                traceback.print_exc(file=sys.stdout)
+                axesByType[d_or_m] = None
+            pointsByType[d_or_m] = {}
+        pointsByType[d_or_m][place] = (d[place]['lat'], d[place]['lon'], (d_or_m, d[place]['param'], d[place]['model'], d[place]['scenario']))
+
+    cellGroups = {}
+    for d_or_m in pointsByType:
+        cellGroups.update(define_CellGroups(pointsByType[d_or_m], axesByType[d_or_m]))
+
+    print('Grid cell dedupe - ' + str(len(placeList)) + ' places in ' + str(len(cellGroups)) + ' grid cell requests - ' + timeFun())
+    return cellGroups
+
+#Function downloads all places and years concurrently (see fire_ignition/fetch.py) - Added 20261018
+#Requests run in a thread pool ('maxWorkers'), at most 'perHostLimit' concurrent requests to the THREDDS server, 'requestTimeout' seconds per request,
+#and up to 'maxRetries' attempts per request with exponential backoff and jitter.
+#Requests share keep-alive connections per host with gzip transfer encoding, and the response is parsed as it streams in (no download temp file).
+#With 'dedupeGridCells' = 'Yes' one request is made per grid cell and the year file is written for each place in the cell.
+#With a download cache ('useDownloadCache') cached requests are read from the cache and only the remaining requests are downloaded (and cached).
+#With an 'assembler' (fire_ignition.extract.ExtractionAssembler) each response is parsed once to typed arrays added to the assembler (no year files).
+#With responseFormat 'NetCDF' (assembler only) the NetCDF response is decoded to the typed arrays (fire_ignition/netcdf.py) in place of the .csv parse.
+#With a job manifest ('useJobManifest') each task is recorded as it completes; with 'resumeMode' = 'Yes' tasks completed in the previous run (year file,
+#or .npz year arrays for the assembler, still present) are not requested again.
+#With 'parseWorkers' > 0 the responses are parsed by parse worker threads fed through a bounded queue (fire_ignition/fetch.py 'runFetchPipeline') rather
+#than in the download threads, so downloads continue while responses are parsed (a full queue pauses the downloads).
+#Returns the list of places with all years downloaded
+def get_all_concurrent(d, paraModelScenarioList, assembler=None):
+    global first_year, last_year, maxWorkers, perHostLimit, requestTimeout, maxRetries, dedupeGridCells, downloadCache, responseFormat, jobManifest, resumeMode
+    global parseWorkers, parseQueueSize
+    from fire_ignition.fetch import runFetchJobs, runFetchPipeline
+    from fire_ignition.http_client import FetchClient
+    from fire_ignition.extract import parse_NCSSPoint, load_YearArrays
+    from fire_ignition.netcdf import parse_NCSSPointNetCDF
+    from fire_ignition.manifest import DigestReader
+
+    filepath = os.path.dirname(os.path.abspath(__file__))
+    filepathSiteMonthly = filepath + "\\SiteMonthlyDailyFiles"
+    if assembler is not None:
+        pass
+    elif os.path.exists(filepathSiteMonthly) == True:
+        print("Directory - " + filepathSiteMonthly + " Exists")
+    else:
+        os.makedirs(filepathSiteMonthly)
+
+    jobs = []
+    placeList = []
+    fl = list_merged_years() if assembler is None else []
+    for place in d:
+        param_model_scenario = d[place]['para_model_scenario']
+        if param_model_scenario not in paraModelScenarioList:
+            paraModelScenarioList.append(param_model_scenario)
+
+        check_name = place +  '_all_years.csv'
+        if check_name in fl:
+            print('Skipping, duplicate: ', place)
+            continue
+
+        placeList.append(place)
+
+    if dedupeGridCells.lower() == 'yes':
+        cellGroups = define_cell_groups(d, placeList)
+    else:
+        cellGroups = {place: [place] for place in placeList}
+
+    #Task completed in the previous run - recorded in the job manifest and its output still present ('resumeMode')
+    def define_task_complete(place, year):
+        if jobManifest is None or resumeMode.lower() != 'yes' or not jobManifest.isComplete(define_TaskKey(place, year)):
+            return False
+        if assembler is None:
+            return os.path.exists(filepathSiteMonthly + "\\" + place + '_' + str(year) + '.csv')
+        return assembler.intermediateFolder is not None and os.path.exists(os.path.join(assembler.intermediateFolder, place + '_' + str(year) + '.npz'))
+
+    jobCellFiles = {}
+    jobKeys = {}
+    resumedCount = 0
+    for cellPlace in cellGroups:
+        for year in range(first_year,last_year + 1):
+            if all(define_task_complete(place, year) for place in cellGroups[cellPlace]):
+                resumedCount += 1
+                if assembler is not None:
+                    for place in cellGroups[cellPlace]:
+                        assembler.addYear(place, define_site_name(place), d[place]['para_model_scenario'], d[place]['d_or_m'], year,
+                                          load_YearArrays(os.path.join(assembler.intermediateFolder, place + '_' + str(year) + '.npz')))
+                continue
+            fullSiteMonthly = filepathSiteMonthly + "\\" + cellPlace + '_' + str(year) + '.csv'
+            jobs.append({"key": (cellPlace, year), "url": define_year_url(d, cellPlace, year), "outFile": fullSiteMonthly})
+            jobCellFiles[fullSiteMonthly] = [filepathSiteMonthly + "\\" + place + '_' + str(year) + '.csv' for place in cellGroups[cellPlace]]
+            jobKeys[fullSiteMonthly] = (cellPlace, year)
+    jobParameter = {job["outFile"]: d[job["key"][0]]['para_model_scenario'] for job in jobs}
+    if jobManifest is not None and resumeMode.lower() == 'yes':
+        print('Resume - ' + str(resumedCount) + ' requests completed in the previous run - ' + str(len(jobs)) + ' requests remaining - ' + timeFun())
+
+    #Record the completed task of each place in the grid cell in the job manifest
+    def record_year(url, fullSiteMonthly, byteCount, sha256, seconds, source):
+        if jobManifest is None:
+            return
+        cellPlace, year = jobKeys[fullSiteMonthly]
+        for place in cellGroups[cellPlace]:
+            jobManifest.recordSuccess(define_TaskKey(place, year), d[place]['para_model_scenario'], url, byteCount, sha256, seconds, source=source)
+
+    #Parse the response - Data Frame, or typed arrays for the assembler
+    def read_year(inFile):
+        if assembler is None:
+            return pd.read_csv(inFile)
+        if responseFormat.lower() == 'netcdf':
+            return parse_NCSSPointNetCDF(inFile)
+        return parse_NCSSPoint(inFile)
+
+    #Apply the year fix and save the year file for each place in the grid cell (or add the year arrays to the assembler)
+    def save_year(yearData, fullSiteMonthly):
+        if assembler is not None:
+            cellPlace, year = jobKeys[fullSiteMonthly]
+            for place in cellGroups[cellPlace]:
+                assembler.addYear(place, define_site_name(place), d[place]['para_model_scenario'], d[place]['d_or_m'], year, yearData)
+            return
+        fix_year_df(yearData, jobParameter[fullSiteMonthly]).to_csv(fullSiteMonthly, ",")
+        for cellSiteMonthly in jobCellFiles[fullSiteMonthly][1:]:
+            shutil.copyfile(fullSiteMonthly, cellSiteMonthly)
+
+    #Stream the response into the parser (and the download cache)
+    fetchClient = FetchClient(requestTimeout)
+    def fetch_year(url, fullSiteMonthly, timeout):
+        startTime = time.perf_counter()
+        with fetchClient.open(url) as response:
+            digestStream = DigestReader(response)
+            if downloadCache is None:
+                yearData = read_year(digestStream)
+                byteCount, sha256 = digestStream.finish()
+            else:
+                with downloadCache.writer(url, digestStream) as cacheStream:
+                    yearData = read_year(cacheStream)
+                    cacheStream.commit()
+                    byteCount, sha256 = digestStream.finish()
+        save_year(yearData, fullSiteMonthly)
+        record_year(url, fullSiteMonthly, byteCount, sha256, time.perf_counter() - startTime, 'download')
+        return response.stats
+
+    #Parse a downloaded response body (parse worker of 'runFetchPipeline')
+    def consume_year(job, body):
+        digestStream = DigestReader(io.BytesIO(body))
+        if downloadCache is None:
+            yearData = read_year(digestStream)
+            byteCount, sha256 = digestStream.finish()
+        else:
+            with downloadCache.writer(job["url"], digestStream) as cacheStream:
+                yearData = read_year(cacheStream)
+                cacheStream.commit()
+                byteCount, sha256 = digestStream.finish()
+        save_year(yearData, job["outFile"])
+        record_year(job["url"], job["outFile"], byteCount, sha256, None, 'download')
+
+    #Cached requests
+    fetchJobs = []
+    for job in jobs:
+        cachedFile = downloadCache.get(job["url"]) if downloadCache is not None else None
+        if cachedFile is None:
+            fetchJobs.append(job)
+        else:
+            save_year(read_year(cachedFile), job["outFile"])
+            if jobManifest is not None:
+                byteCount, sha256 = define_FileDigest(cachedFile)
+                record_year(job["url"], job["outFile"], byteCount, sha256, None, 'cache')
+            downloadCache.release(job["url"])
+    if downloadCache is not None:
+        print('Download cache - ' + str(len(jobs) - len(fetchJobs)) + ' of ' + str(len(jobs)) + ' requests cached - ' + timeFun())
+
+    print('Getting data for : ' + str(len(placeList)) + ' places - ' + str(len(fetchJobs)) + ' requests - ' + timeFun())
+    startTime = time.perf_counter()
+    if parseWorkers > 0:
+        reports, pipelineStats = runFetchPipeline(fetchJobs, consume_year, maxWorkers, perHostLimit, requestTimeout, maxRetries, parseWorkers, parseQueueSize,
+                                                  fetchClient=fetchClient)
+        print('Parse pipeline - ' + str(parseWorkers) + ' parse workers - parse ' + str(round(pipelineStats["consumerSeconds"], 1)) + ' seconds - downloads waited ' +
+              str(round(pipelineStats["producerWaitSeconds"], 1)) + ' seconds on a full queue - queue high water ' + str(pipelineStats["queueHighWater"]) +
+              ' of ' + str(parseQueueSize))
+    else:
+        reports = runFetchJobs(fetchJobs, maxWorkers, perHostLimit, requestTimeout, maxRetries, downloadFunction=fetch_year)
+
+    failedPlaces = []
+    bytesTotal = 0
+    for report in reports:
+        cellPlace, year = report["key"]
+        if report["status"] == "Success":
+            bytesTotal += report["bytes"]
+        else:
+            print('WARNING - Download failed after ' + str(report["attempts"]) + ' attempts: ', cellPlace, year, report["error"])
+            for place in cellGroups[cellPlace]:
+                if place not in failedPlaces:
+                    failedPlaces.append(place)
+                if jobManifest is not None:
+                    jobManifest.recordFailure(define_TaskKey(place, year), d[place]['para_model_scenario'], report["url"], report["error"], report["seconds"],
+                                              report["attempts"])
+
+    print('Downloaded ' + str(len(reports) - sum(report["status"] != "Success" for report in reports)) + ' of ' + str(len(reports)) + ' requests - ' +
+          str(round(bytesTotal / 1048576.0, 1)) + ' MB - ' + str(round(time.perf_counter() - startTime, 1)) + ' seconds - ' + timeFun())
+    clientSummary = fetchClient.summary()
+    if clientSummary["requests"] > 0:
+        print('Connections opened ' + str(clientSummary["connectionsOpened"]) + ' - reused ' + str(clientSummary["reusedConnections"]) +
+              ' - median time to first byte ' + str(round(clientSummary["ttfbMedianSeconds"], 3)) + ' seconds')
+    for place in failedPlaces:
+        print('WARNING - Skipping merge, download failed: ', place)
+
+    return [place for place in placeList if place not in failedPlaces]
         
+#Function defines the 'SiteName' of a place (same as 'merge_years') - Added 20261018
+def define_site_name(place):
+    global siteNameUnderscore
+    fileNameSplit = place.split("_")
+    if siteNameUnderscore == 'Yes':
+        return fileNameSplit[0] + "_" + fileNameSplit[1]
+    return fileNameSplit[0]
+
+#Function defines the memory message of the final table assembly ('define_WideTable' stats) - peak memory only with 'reportPeakMemory' = 'Yes'
+#Added 20261018
+def define_MemoryMessage(assembleStats):
+    memoryMessage = " - array " + str(round(assembleStats["arrayBytes"] / 1048576.0, 1)) + " MB - output " + str(round(assembleStats["outputBytes"] / 1048576.0, 1)) + " MB"
+    if assembleStats["peakBytes"] is not None:
+        memoryMessage = " - peak memory " + str(round(assembleStats["peakBytes"] / 1048576.0, 1)) + " MB" + memoryMessage
+    return memoryMessage
+
+#Function assembles the final table from the in memory year arrays (fire_ignition/extract.py), calculates the Ensemble Means and exports the final
+#.csv to the 'MergedAll' directory - 'mergeMode' = 'InMemory' equivalent of 'merge_years', 'mergeMonthly_sites' and 'mergeFinalparameterList'
+#Added 20261018
+def mergeInMemory(assembler, placeList, paraModelScenarioList, outFileName):
+    filepath = os.path.dirname(os.path.abspath(__file__))
+    filepathFinalMerged = filepath + "\\MergedAll"
+    if os.path.exists(filepathFinalMerged) == True:
+        print("Directory - " + filepathFinalMerged + " - Exists")
+    else:
+        os.makedirs(filepathFinalMerged)
+
+    mergeCurrent, assembleStats = assembler.assemble(placeList, paraModelScenarioList, reportPeakMemory.lower() == "yes")
+    print("Successfully Assembled - " + str(len(placeList)) + " places - " + str(assembleStats["records"]) + " records" + define_MemoryMessage(assembleStats))
+
+    #Calculate the Ensemble Mean per parameter
+    outVal = define_EnsembleMean(mergeCurrent, parameterList, calEnsembleAvg)
+    if outVal[0] != "Success function":
+        print("WARNING - Function define_EnsembleMean failed - Exiting Script")
+        exit()
+    else:
+        print("Success - Function define_EnsembleMean")
+        mergeCurrent = outVal[1]
+
+    export_final(mergeCurrent, filepathFinalMerged, outFileName)
+
 def fix_monthly_lines(line,year):
      #line = line.replace('1980-',str(year) + '-')
      pl = line.split(',')
@@ -174,7 +529,7 @@ def merge_years(d, place):
 
     # outfilename = place + '_all_years.csv'
     outfilename = filepathMergedYears + "\\" + place + '_all_years.csv'
-    outfile = open(outfilename, 'w')
+    outfile = open(outfilename + '.tmp', 'w')  #Renamed when all years are merged - Modified 20261018
     filepathSiteMonthly = filepath + "\\SiteMonthlyDailyFiles"  # Site Monthly File Directory
     for year in range(first_year, last_year + 1):
         infilename = place + '_' + str(year) + '.csv'
@@ -209,6 +564,7 @@ def merge_years(d, place):
         infile.close
 
     outfile.close()
+    os.replace(outfilename + '.tmp', outfilename)
 
 # Function Merges Monthly Files For All Sites by Parameter - KRS Added 20200609
 def mergeMonthly_sites(parameterList, paraModelScenarioList):
@@ -303,49 +659,36 @@ def mergeFinalparameterList(paraModelScenarioList, outFileName):
     else:
         os.makedirs(filepathFinalMerged)
 
-    #Loop thru the parameters that have been collected for the respective Parameter, GCP Model and RCP Scenario as defined in paraMdelScenarioList
-    parameterCount = 1
+    #Define the table of the parameters that have been collected for the respective Parameter, GCP Model and RCP Scenario as defined in paraMdelScenarioList
+    filepathFinalMergedParameter = filepath + "\\MergedParameter"
+    parameterTableList = []
     for parameter in paraModelScenarioList:
 
-        filepathFinalMergedParameter = filepath + "\\MergedParameter"
         filesList = glob.glob(filepathFinalMergedParameter + "\\*" + parameter + "*.csv")
 
         if len(filesList)> 1:
             print ('More than One File for defined parameter - ' + parameter + ' - Exiting Script')
             sys.exit()
 
-        inTable = filesList[0] #Table to be processed
-
-        if parameterCount == 1: #Create initial data frame to which all variables will be pushed to
-            df = pd.read_csv(inTable)
-            parameterCount += 1
-            os.remove(inTable)
-            continue
+        parameterTableList.append(filesList[0])
 
-        else:   #Merge the next parameter variable via key fields 'SiteName','time'
+    #Create initial data frame from the first parameter - defines the records
+    df = pd.read_csv(parameterTableList[0])
+    os.remove(parameterTableList[0])
 
-            df2 = pd.read_csv(inTable) #Load the next parameter file to dataframe 2
-            # Get list of columns in the dataframe
-            columnList = list(df2)
-            latColumn = 'latitude[unit="degrees_north"]' #Column three should be Lat
-            lonColumn = 'longitude[unit="degrees_east"]' #Column four should be Lon
-            df2.drop([latColumn, lonColumn], axis=1, inplace=True)  #Drop the lat and lon columns prior to merging
-            print(list(df2))
-
-            if parameterCount == 2:
-                mergeCurrent = df.merge(df2, on=['SiteName', 'time'], how='left')
-            else:
-                mergePrevious = mergeCurrent
-                del mergeCurrent
-                mergeCurrent = mergePrevious.merge(df2, on=['SiteName', 'time'], how='left')
-
-            print(list(mergeCurrent))
-
-            print("Successfully Merged Parameter - " + parameter + " to compiled dataframe")
-            del df2
-
-        parameterCount += 1
+    #Read the next parameter tables one at a time (lat and lon columns dropped)
+    def read_parameter_tables():
+        latColumn = 'latitude[unit="degrees_north"]' #Column three should be Lat
+        lonColumn = 'longitude[unit="degrees_east"]' #Column four should be Lon
+        for inTable in parameterTableList[1:]:
+            df2 = pd.read_csv(inTable)
+            df2.drop([latColumn, lonColumn], axis=1, inplace=True)
+            yield df2
 
+    #Align all the parameters on the key fields 'SiteName','time' in one pass (Modified 20261018 - was a merge per parameter)
+    from fire_ignition.extract import define_WideTable
+    mergeCurrent, assembleStats = define_WideTable(df, paraModelScenarioList[1:], read_parameter_tables(), trackMemory=reportPeakMemory.lower() == "yes")
+    print("Successfully Merged " + str(len(paraModelScenarioList)) + " Parameters - " + str(assembleStats["records"]) + " records" + define_MemoryMessage(assembleStats))
 
     #Calculate the Ensemble Mean per parameter
     outVal = define_EnsembleMean(mergeCurrent, parameterList, calEnsembleAvg)
@@ -359,11 +702,25 @@ def mergeFinalparameterList(paraModelScenarioList, outFileName):
 
 
 
-    mergeCurrent.to_csv(filepathFinalMerged + "\\" + outFileName + ".csv", ",", index = False)
+    export_final(mergeCurrent, filepathFinalMerged, outFileName)
     del df
     del mergeCurrent
-    messageTime = timeFun()
-    print("Exported Final Merged .csv file to - " + filepathFinalMerged + "\\" + outFileName + ".csv - " + messageTime)
+
+#Function exports the final table to the 'MergedAll' directory as .csv and/or a Parquet dataset partitioned by site, parameter and scenario with
+#float32 values ('outputFormat', fire_ignition/columnar.py) - Added 20261018
+def export_final(mergeCurrent, filepathFinalMerged, outFileName):
+    global outputFormat
+
+    if outputFormat.lower() in ('csv', 'both'):
+        mergeCurrent.to_csv(filepathFinalMerged + "\\" + outFileName + ".csv", ",", index = False)
+        messageTime = timeFun()
+        print("Exported Final Merged .csv file to - " + filepathFinalMerged + "\\" + outFileName + ".csv - " + messageTime)
+
+    if outputFormat.lower() in ('parquet', 'both'):
+        from fire_ignition.columnar import write_ProjectionsParquet
+        fileList = write_ProjectionsParquet(mergeCurrent, filepathFinalMerged + "\\" + outFileName)
+        messageTime = timeFun()
+        print("Exported Final Merged Parquet dataset (" + str(len(fileList)) + " partitions) to - " + filepathFinalMerged + "\\" + outFileName + " - " + messageTime)
 
 def timeFun():          #Function to Grab Time
     from datetime import datetime
@@ -411,6 +768,31 @@ if __name__ == '__main__':
 
     deleteDirectories = "Yes"  # If set to yes the 'SiteMonthlyDailyFiles','MergeYearFiles', and 'MergeParameter' directories will be deleted at the start of processing- To avoid processing previous data.
 
+    #Download settings - Added 20261018
+    fetchMode = 'Concurrent'  # 'Concurrent'|'Sequential' - 'Concurrent' downloads all places and years in a thread pool (requires the 'fire_ignition' package folder next to this script), 'Sequential' one year at a time
+    maxWorkers = 16       # Maximum number of concurrent downloads ('Concurrent')
+    perHostLimit = 8      # Maximum number of concurrent requests to the THREDDS server ('Concurrent')
+    requestTimeout = 120  # Timeout per request (seconds) ('Concurrent')
+    maxRetries = 5        # Maximum number of attempts per request, retries use exponential backoff with jitter ('Concurrent')
+    parseWorkers = 2      # Number of parse worker threads fed by the downloads through a bounded queue ('Concurrent'), 0 parses in the download threads
+    parseQueueSize = 32   # Maximum number of downloaded responses waiting to be parsed ('parseWorkers' > 0) - downloads pause while the queue is full
+    dedupeGridCells = 'Yes'  # 'Yes'|'No' - 'Yes' sites in the same Water Balance grid cell are downloaded once per parameter/model/scenario/year and copied to each site (requires the 'fire_ignition' package folder next to this script)
+    useDownloadCache = 'Yes'  # 'Yes'|'No' - 'Yes' responses are kept in the download cache and reused by later runs (requires the 'fire_ignition' package folder next to this script)
+    downloadCacheFolder = os.path.dirname(os.path.abspath(__file__)) + "\\DownloadCache"  # Download cache directory - not deleted by 'deleteDirectories'
+    downloadCacheMaxGB = 20   # Maximum download cache size (GB), least recently used responses are removed above it
+    mergeMode = 'InMemory'   # 'InMemory'|'Files' - 'InMemory' parses each response once and assembles the final table in memory ('Concurrent' only), 'Files' merges via the year, site and parameter .csv files
+    reportPeakMemory = 'No'  # 'Yes'|'No' - 'Yes' traces the peak memory of the final table assembly (tracemalloc, slows the assembly), 'No' reports the array and output sizes only
+    intermediateFiles = 'No'  # 'Yes'|'No' - 'InMemory' - 'Yes' writes the parsed year arrays as binary .npz files to the 'SiteYearArrays' directory ('resumeMode' skips the completed years, 'No' a resume reads them from the download cache)
+    outputFormat = 'CSV'  # 'CSV'|'Parquet'|'Both' - 'Parquet' exports the final table as a Parquet dataset ('MergedAll\\{outFileName}' folder partitioned by site, parameter and scenario, requires pyarrow)
+    responseFormat = 'CSV'  # 'CSV'|'NetCDF' - 'NetCDF' requests binary NetCDF point subsets (packed int16 values, fill values masked) in place of .csv text ('InMemory' only)
+    fetchPlan = 'All'  # 'All'|'Consumers' - 'Consumers' only requests the parameters and days of year in 'consumerNeeds' (records outside the needs are not in the output, requires the 'fire_ignition' package folder next to this script)
+    useJobManifest = 'Yes'  # 'Yes'|'No' - 'Yes' records every (place, year) task (state, bytes, sha256) in 'jobManifestFile' and summarizes the run (requires the 'fire_ignition' package folder next to this script)
+    jobManifestFile = os.path.dirname(os.path.abspath(__file__)) + "\\ExtractionJobs.jsonl"  # Job manifest (JSON lines) - not deleted by 'deleteDirectories'
+    resumeMode = 'No'  # 'Yes'|'No' - 'Yes' resumes the previous run - directories are not deleted and only the failed and missing tasks in the job manifest are downloaded
+    consumerNeeds = [{'param': 'deficit', 'd_or_m': 'daily', 'startDOY': 7, 'endDOY': 301, 'leadDays': 6},   # FireIgnitionRaw_Projections.py - Forest fire season, 'leadDays' = movingWindowsDay - 1
+                     {'param': 'deficit', 'd_or_m': 'daily', 'startDOY': 79, 'endDOY': 303, 'leadDays': 6}]  # FireIgnitionRaw_Projections.py - Non-Forest fire season
+    threddsServerURL = None  # None the NPS Water Balance THREDDS server, else the base url of an NCSS server with the same datasets (e.g. 'http://127.0.0.1:8080' - the local stand-in server of ThreddsFetchBenchmark.py, runMode 'Serve')
+
 
     ######################
     # Hard Coded Below
@@ -419,14 +801,20 @@ if __name__ == '__main__':
 
     monthly_url = 'http://www.yellowstone.solutions/thredds/ncss/daily_or_monthly/gcm/{scenario}/{model}/V_1_5_{year}_{model}_{scenario}_{param}_monthly.nc4?var={param_lower}&latitude={lat}&longitude={lon}&time_start={year}-01-16T05%3A14%3A31.916Z&time_end={next_year}-12-17T00%3A34%3A14.059Z&accept=csv_file'
     daily_url = 'http://www.yellowstone.solutions/thredds/ncss/daily_or_monthly/gcm/{scenario}/{model}/V_1_5_{year}_{model}_{scenario}_{param}.nc4?var={param}&latitude={lat}&longitude={lon}&time_start={year}-01-01T00%3A00%3A00Z&time_end={next_year}-01-01T00%3A00%3A00Z&accept=csv_file'
+    if threddsServerURL is not None:
+        # Alternate NCSS server (e.g. the local stand-in server, fire_ignition/ncss_server.py) - Added 20261018
+        daily_url = daily_url.replace('http://www.yellowstone.solutions', threddsServerURL.rstrip('/'))
+        monthly_url = monthly_url.replace('http://www.yellowstone.solutions', threddsServerURL.rstrip('/'))
 
     # KRS Added 20210319
     model_scenario_List = []  # As model and scenario list are processed this list will be populated
     filepath = os.path.dirname(os.path.abspath(__file__))
     # Delete Existing Directories that might have files from previous processing.
-    if deleteDirectories.lower() == "yes":
+    if deleteDirectories.lower() == "yes" and resumeMode.lower() == "yes" and useJobManifest.lower() == "yes":
+        print("resumeMode 'Yes' - directories from the previous run are not deleted")
+    elif deleteDirectories.lower() == "yes":
 
-        dirList = ["SiteMonthlyDailyFiles", "MergeYearFiles", "MergedParameter"]
+        dirList = ["SiteMonthlyDailyFiles", "MergeYearFiles", "MergedParameter", "SiteYearArrays"]
         for directory in dirList:
             fullPath = filepath + "\\" + directory
             if os.path.exists(fullPath):
@@ -435,23 +823,102 @@ if __name__ == '__main__':
 
     #############
 
+    # Job manifest - Added 20261018
+    jobManifest = None
+    if useJobManifest.lower() == 'yes':
+        from fire_ignition.manifest import JobManifest, define_TaskKey, define_FileDigest
+        jobManifest = JobManifest(jobManifestFile, resume=resumeMode.lower() == 'yes')
+
+    # Download cache - Added 20261018
+    downloadCache = None
+    if useDownloadCache.lower() == 'yes':
+        from fire_ignition.cache import DownloadCache
+        downloadCache = DownloadCache(downloadCacheFolder, int(downloadCacheMaxGB * 1024 ** 3))
+
     paraModelScenarioList = []  #List to hold all Parameter, Model, Rcp scenario's used in the 'mergeMonthly_sites' function
     d = read_point_file(mypointsFile)
-    for place in d:
-        new = get_one(d, place, paraModelScenarioList)
-        if new == True:
-            try:
-                merge_years(d, place)
-            except:
-                continue
-        else:
-            print('Skipping, duplicate: ', place)
 
-    ##Function to Merged the files in 'MergeYearFiles (One Compiled CSV files by Across All Sites and Years for all Parameter, Model, and RCP Scenarios processed
-    # OutputFolder: MergedParameter
-    outMerge_sites = mergeMonthly_sites(parameterList, paraModelScenarioList)
+    # Fetch plan - parameters and days of year requested, estimated requests and bytes - Added 20261018
+    fetchWindows = None
+    if fetchPlan.lower() == 'consumers':
+        from fire_ignition.plan import define_FetchPlan
+        plan = define_FetchPlan({place: (d[place]['param'], d[place]['d_or_m']) for place in d}, range(first_year, last_year + 1), consumerNeeds,
+                                responseFormat)
+        fetchWindows = plan["windows"]
+        for place in plan["dropped"]:
+            print('Skipping, not in consumerNeeds: ', place)
+            del d[place]
+        for (param, d_or_m), window in fetchWindows.items():
+            print('Fetch window - ' + param + ' ' + d_or_m + ' - DOY ' + str(window[0]) + ' to ' + str(window[1]))
+        print('Fetch plan - ' + str(plan["requests"]) + ' requests - estimated ' + str(round(plan["bytes"] / 1048576.0, 1)) + ' MB (all parameters, full years: ' +
+              str(plan["fullRequests"]) + ' requests - ' + str(round(plan["fullBytes"] / 1048576.0, 1)) + ' MB) - before grid cell dedupe and download cache - ' + timeFun())
+    if mergeMode.lower() == 'inmemory' and fetchMode.lower() != 'concurrent':
+        print("mergeMode 'InMemory' requires fetchMode 'Concurrent' - merging via the year files")
+        mergeMode = 'Files'
+    if responseFormat.lower() == 'netcdf' and mergeMode.lower() != 'inmemory':
+        print("responseFormat 'NetCDF' requires mergeMode 'InMemory' - requesting .csv responses")
+        responseFormat = 'CSV'
+    if responseFormat.lower() == 'netcdf':
+        # NetCDF point subsets - Added 20261018
+        daily_url = daily_url.replace('accept=csv_file', 'accept=netcdf')
+        monthly_url = monthly_url.replace('accept=csv_file', 'accept=netcdf')
+
+    if mergeMode.lower() == 'inmemory':
+        # Parse each response once and assemble the final table in memory - Added 20261018
+        from fire_ignition.extract import ExtractionAssembler
+        intermediateFolder = filepath + "\\SiteYearArrays" if intermediateFiles.lower() == 'yes' else None
+        if intermediateFolder is None and useJobManifest.lower() == 'yes' and resumeMode.lower() == 'yes':
+            # Completed years are resumed from the .npz year arrays - without them the completed years are read from the download cache or requested again
+            if useDownloadCache.lower() == 'yes':
+                print("resumeMode 'Yes' with intermediateFiles 'No' - completed years are read from the download cache")
+            else:
+                print("WARNING - resumeMode 'Yes' with intermediateFiles 'No' and useDownloadCache 'No' - completed years are requested again")
+        assembler = ExtractionAssembler(intermediateFolder=intermediateFolder, expectedYears=last_year - first_year + 1)
+        placeList = get_all_concurrent(d, paraModelScenarioList, assembler)
+        mergeInMemory(assembler, placeList, paraModelScenarioList, outFileName)
 
-    # Function to Merged the files in 'MergedParameter (i.e. the Compiled CSV files by Parameter ') into one fully compiled (All Sites/Years/Parameters)
-    # OutputFolder: MergedAll
-    outmergedFinal = mergeFinalparameterList(paraModelScenarioList, outFileName)
-        
\ No newline at end of file
+    else:
+        if fetchMode.lower() == 'concurrent':
+            for place in get_all_concurrent(d, paraModelScenarioList):
+                try:
+                    merge_years(d, place)
+                except:
+                    continue
+        else:
+            if dedupeGridCells.lower() == 'yes':
+                cellGroups = define_cell_groups(d, list(d))
+            else:
+                cellGroups = {place: [place] for place in d}
+            for cellPlace in cellGroups:
+                new = get_one(d, cellPlace, paraModelScenarioList, cellGroups[cellPlace])
+                if new == True:
+                    for place in cellGroups[cellPlace]:
+                        try:
+                            merge_years(d, place)
+                        except:
+                            continue
+                elif new is None:
+                    for place in cellGroups[cellPlace]:
+                        print('WARNING - Skipping merge, download failed: ', place)
+                else:
+                    print('Skipping, duplicate: ', cellPlace)
+
+        ##Function to Merged the files in 'MergeYearFiles (One Compiled CSV files by Across All Sites and Years for all Parameter, Model, and RCP Scenarios processed
+        # OutputFolder: MergedParameter
+        outMerge_sites = mergeMonthly_sites(parameterList, paraModelScenarioList)
+
+        # Function to Merged the files in 'MergedParameter (i.e. the Compiled CSV files by Parameter ') into one fully compiled (All Sites/Years/Parameters)
+        # OutputFolder: MergedAll
+        outmergedFinal = mergeFinalparameterList(paraModelScenarioList, outFileName)
+
+    # Job summary - Added 20261018
+    if jobManifest is not None:
+        jobSummary = jobManifest.summary()
+        print('Job summary - ' + str(jobSummary["success"]) + ' of ' + str(jobSummary["tasks"]) + ' tasks completed - ' + str(jobSummary["failed"]) + ' failed - this run ' +
+              str(jobSummary["runDownloaded"]) + ' downloaded, ' + str(jobSummary["runCached"]) + ' from the download cache, ' + str(jobSummary["runFailed"]) + ' failed - ' +
+              str(round(jobSummary["runBytes"] / 1048576.0, 1)) + ' MB in ' + str(round(jobSummary["runSeconds"], 1)) + ' seconds (' +
+              str(round(jobSummary["runMBPerSecond"], 2)) + ' MB/s) - ' + timeFun())
+        for task, error in jobSummary["failedTasks"]:
+            print('WARNING - Failed task: ' + task + ' - ' + str(error))
+        if jobSummary["failed"] > 0:
+            print("Rerun with resumeMode = 'Yes' to download only the failed and missing tasks - job manifest " + jobManifestFile)
@@ -0,0 +1,166 @@
+# ---------------------------------------------------------------------------
+# ThreddsFetchBenchmark.py
+# Script benchmarks the THREDDS (NCSS) downloads of GCM_wb_thredds_point_extractor_v3.py offline against a local stand-in of the NPS Water Balance
+# THREDDS server (fire_ignition/ncss_server.py) serving synthetic daily and monthly point subsets as .csv or NetCDF - no network is required.
+# The stand-in server's latency, failure rate and bandwidth are set below, so the concurrency, pipelining, response format, retry and download cache
+# settings can be measured reproducibly (scenarios, see fire_ignition/fetch_benchmark.py).
+# Output is a .json report with the seconds per scenario and repeat, and the requests, retries, cache hits, throughput and most concurrent requests
+# of each scenario.  If 'baselineReport' is defined the scenario median seconds are compared to the baseline report and scenarios slower than
+# 'regressionThreshold' are logged as WARNING.
+# With 'runMode' = 'Serve' the stand-in server is started on 'serverPort' and runs until the script is stopped (Ctrl+C) - set 'threddsServerURL' in
+# GCM_wb_thredds_point_extractor_v3.py to 'http://127.0.0.1:{serverPort}' to run the extractor against it.
+
+#Updates:
+# 20261018 - Initial version.
+
+#Dependicies:
+#Python Version 3.10, Pandas, Numpy, fire_ignition package (folder 'fire_ignition' in the same folder as this script)
+
+#Script Name: ThreddsFetchBenchmark.py
+
+##Import Libraries
+import traceback, sys, os, time
+import datetime
+from datetime import date
+
+from fire_ignition.benchmark import compareBenchmarkReports
+from fire_ignition.fetch_benchmark import runFetchBenchmark, defaultScenarios
+from fire_ignition.ncss_server import NCSSServer
+
+###################################################
+# Start of Parameters requiring set up.
+###################################################
+
+#Get Current Date
+today = date.today()
+strDate = today.strftime("%Y%m%d")
+
+runMode = 'Benchmark'        #'Benchmark'|'Serve' - 'Benchmark' runs the scenarios, 'Serve' only runs the stand-in server (e.g. for the extractor)
+serverPort = 8080            #Stand-in server port ('Serve', 'Benchmark' uses any free port)
+
+siteCount = 4                #Number of sites (separate grid cells)
+models = ['CCSM4', 'MIROC5']         #GCMs requested per site
+scenarios = ['rcp45', 'rcp85']       #RCPs requested per site
+firstYear = 2030             #First year requested
+lastYear = 2039              #Last year requested (one daily request per site, GCM, RCP and year)
+benchmarkScenarios = defaultScenarios  #Scenarios - download settings per scenario (see fire_ignition/fetch_benchmark.py)
+
+serverLatency = 0.05         #Stand-in server seconds before each response
+serverFailureRate = 0.0      #Stand-in server fraction of the requests answered 503 ('Serve', 'Benchmark' per scenario)
+serverBandwidth = None       #Stand-in server bytes per second per response, None unlimited
+gzipResponses = True         #True|False - Stand-in server gzips the responses of clients accepting gzip
+repeats = 3                  #Number of times each scenario is run
+requestTimeout = 30          #Timeout per request (seconds)
+maxRetries = 5               #Maximum number of attempts per request
+backoffBase = 0.05           #Backoff base delay (seconds) between attempts - short so retries do not dominate the benchmark
+
+baselineReport = None        #Baseline .json report to compare to, None no comparison
+regressionThreshold = 1.10   #Scenario median seconds / baseline median seconds above which a scenario is logged as a regression
+
+outputFolder = r"C:\ROMN\Climate\ClimateAnalyzer\Dashboards\Benchmark"  #Folder for the .json report
+workspace = outputFolder + "\\workspace"   #Folder for the scenario download caches
+outName = 'ThreddsFetchBenchmark'   #Output .json filename
+logFileName = workspace + "\\" + outName + ".LogFile.txt"
+
+#######################################
+## Below are paths which are hard coded
+#######################################
+
+#################################
+# Checking for directories and Log File
+##################################
+if os.path.exists(outputFolder):
+    pass
+else:
+    os.makedirs(outputFolder)
+
+if os.path.exists(workspace):
+    pass
+else:
+    os.makedirs(workspace)
+
+# Check if logFile exists
+if os.path.exists(logFileName):
+    pass
+else:
+    logFile = open(logFileName, "w")  # Creating index file if it doesn't exist
+    logFile.close()
+
+def main():
+
+    try:
+
+        if runMode.lower() == 'serve':
+            serveStandIn()
+            return
+
+        outFull = outputFolder + "\\" + outName + "_" + strDate + ".json"
+        report = runFetchBenchmark(workspace, siteCount, models, scenarios, range(firstYear, lastYear + 1), benchmarkScenarios, serverLatency,
+                                   serverBandwidth, gzipResponses, repeats, requestTimeout, maxRetries, backoffBase, outFile=outFull)
+
+        logFile = open(logFileName, "a")
+        for scenarioName, stageReport in report["stages"].items():
+            messageTime = timeFun()
+            lastRun = stageReport["lastRun"]
+            scriptMsg = "Benchmark scenario - " + scenarioName + " - median " + str(round(stageReport["median"], 3)) + " seconds - min " + \
+                        str(round(stageReport["min"], 3)) + " seconds - " + str(lastRun["jobs"]) + " requests (" + str(lastRun["cacheHits"]) + \
+                        " cached, " + str(lastRun["retries"]) + " retries, " + str(lastRun["failed"]) + " failed) - " + \
+                        str(round(lastRun["requestsPerSecond"], 1)) + " requests/second - " + str(round(lastRun["megabytesPerSecond"], 2)) + \
+                        " MB/second - most concurrent requests " + str(lastRun["server"]["maxActiveRequests"]) + " - " + messageTime
+            print(scriptMsg)
+            logFile.write(scriptMsg + "\n")
+
+        if baselineReport is not None:
+            comparison = compareBenchmarkReports(baselineReport, report, regressionThreshold)
+            for scenarioName, stageComparison in comparison.items():
+                messageTime = timeFun()
+                scriptMsg = "Benchmark scenario - " + scenarioName + " - " + str(round(stageComparison["ratio"], 2)) + " x baseline - " + messageTime
+                if stageComparison["regression"]:
+                    scriptMsg = "WARNING - Regression - " + scriptMsg
+                print(scriptMsg)
+                logFile.write(scriptMsg + "\n")
+
+        messageTime = timeFun()
+        scriptMsg = "Successfully processed Benchmark: " + outFull + " - " + messageTime
+        print(scriptMsg)
+        logFile.write(scriptMsg + "\n")
+        logFile.close()
+
+    except:
+        messageTime = timeFun()
+        scriptMsg = "Exiting Error - ThreddsFetchBenchmark - " + messageTime
+        print (scriptMsg)
+        logFile = open(logFileName, "a")
+        logFile.write(scriptMsg + "\n")
+
+        traceback.print_exc(file=sys.stdout)
+        logFile.close()
+
+#Functions Below
+# Function runs the stand-in server on 'serverPort' until the script is stopped, printing the request counts every minute
+def serveStandIn():
+
+    server = NCSSServer(port=serverPort, latency=serverLatency, failureRate=serverFailureRate, bandwidth=serverBandwidth, gzipResponses=gzipResponses)
+    baseURL = server.start()
+    print("Stand-in THREDDS server - " + baseURL + " - set threddsServerURL = '" + baseURL + "' in GCM_wb_thredds_point_extractor_v3.py - " + timeFun())
+    try:
+        while True:
+            time.sleep(60)
+            print("Stand-in THREDDS server - " + str(server.summary()) + " - " + timeFun())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+# Function to Get the Date/Time
+def timeFun():
+    from datetime import datetime
+    b = datetime.now()
+    messageTime = b.isoformat()
+    return messageTime
+
+
+if __name__ == '__main__':
+
+    # Analyses routine ---------------------------------------------------------
+    main()
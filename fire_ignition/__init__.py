@@ -0,0 +1,19 @@
+# ---------------------------------------------------------------------------
+# fire_ignition
+# Importable Water Balance Fire Ignition Model routines shared by the Fire Ignition scripts and an in-memory pipeline running the Historic,
+# Projections, Summarize Normals, Now Cast and Scatter Plot stages in one process.  Importing the package has no side effects (no folders, log
+# files or downloads).
+#
+#Dependencies:
+#Python Version 3.x, Pandas, Numpy, matplotlib (Scatter Plot stage only)
+
+from .ignition import (forest_equation, nonforest_equation, define_PercentileSorted, define_IgnitionFromPercentile, define_MovingWindowAverage,
+                       define_IgnitionProportion, define_IgnitionProportionBatch)
+from .reference import (define_ReferenceList, define_ReferenceSorted, define_ReferenceIndex, define_ReferenceIndexKey, load_ReferenceIndex,
+                        save_ReferenceIndex)
+from .summarize import (fireDangerCategories, defineFireDangerClasses, resampleSummarize, summarizeFireDangerRating, defineFireDangerRating,
+                        subsetToNowCast, numberNowCastDays, calculateEnsembleAvg, appendFiles)
+from .climate_analyzer import define_ServiceURL, read_ClimateAnalyzerCSV, subsetToPlus60
+from .pipeline import FireIgnitionPipeline
+from .streaming import StreamingIgnitionEvaluator
+from .state import define_NowCastIncremental, load_NowCastState, save_NowCastState
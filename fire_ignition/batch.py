@@ -0,0 +1,130 @@
+# ---------------------------------------------------------------------------
+# batch.py
+# Multi-station Now Cast batch processing (see 'FireIgnitionPotentialNowCastBatch.py').  Climate Analyzer station tables are downloaded
+# concurrently (bounded by 'maxDownloads'), and as each download completes the station Now Cast is processed in a process pool.  Output is one
+# Now Cast summary file per station and one combined summary for all stations.
+#
+# Each station is processed independently - a failed download or Now Cast is reported (status 'Failed' with the stage and traceback) and does
+# not stop the remaining stations.
+
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import date
+
+import pandas as pd
+
+from .climate_analyzer import define_ServiceURL
+from .http_client import getSharedClient
+from .pipeline import FireIgnitionPipeline
+from .station_store import read_StationStore, updateStationStore
+from .summarize import appendFiles
+
+
+# Function downloads the service URL to 'outFile' with the shared fetch client (keep-alive connections, gzip - see 'http_client.getSharedClient') - the
+# table is written to a temporary file and renamed when complete
+# Output - outFile
+def fetchStationCSV(serviceURL, outFile, timeout=300):
+
+    getSharedClient(timeout).download(serviceURL, outFile)
+
+    return outFile
+
+
+# Worker task - Now Cast for one station from the downloaded Climate Analyzer table (or the station store if 'storeFolder' is defined)
+# Output - Now Cast summary Data Frame (see 'FireIgnitionPipeline.nowcast')
+def processNowCastStation(siteName, inFile, pipelineOptions, stateFolder=None, storeFolder=None):
+
+    pipeline = FireIgnitionPipeline(siteName, **pipelineOptions)
+    if storeFolder is None:
+        pipeline.loadStation(inFile)
+    else:
+        pipeline.frames['station'] = read_StationStore(storeFolder, siteName)
+    return pipeline.nowcast(stateFolder=stateFolder)
+
+
+# Function runs the Now Cast for a list of stations
+# Input:
+# stationList - list of Gridmet station names (e.g. ['bearlake_from_grid', 'eastinlet_from_grid'])
+# workspace - folder for the downloaded Climate Analyzer tables
+# outputFolder - folder for the output tables - per station '{outputFolder}/{siteName}/{outName}_{date}.csv' and combined
+# '{outputFolder}/{outName}_AllStations_{date}.csv'.  None output tables are not written.
+# outName - output .csv file name prefix
+# year1 - first year of the Climate Analyzer table
+# maxDownloads - maximum number of concurrent downloads
+# workerCount - number of Now Cast worker processes, None the number of processors
+# pipelineOptions - dictionary of 'FireIgnitionPipeline' arguments (e.g. 'referenceIndexFolder', 'movingWindowDays', 'today')
+# fetchFunction - function(serviceURL, outFile) downloading a station table, default 'fetchStationCSV'
+# stateFolder - folder with the per station Now Cast state files (see 'state.py'), None the full series is evaluated each run
+# storeFolder - station store folder (see 'station_store.py') - station tables are read from the store and only pulled if the store is not current,
+# None the tables are pulled to 'workspace' each run
+# storeMaxAgeHours - store refreshed within 'storeMaxAgeHours' is not pulled again (through today plus 60 days)
+# deltaFetch, fullRefreshDays - store refreshed with a delta pull from the last closed year, and the full table every 'fullRefreshDays' days (see
+# 'station_store.updateStationStore')
+# Output - tuple (combined Data Frame, stationReport).  stationReport is the list of per station reports in 'stationList' order with the 'siteName',
+# 'status' ('Success'|'Failed'), 'stage' ('fetch'|'nowcast'), 'fetchSeconds', 'processSeconds', 'outFile', 'error' (traceback when failed) and with
+# a store 'storeReport' (see 'station_store.refreshStationStore')
+def runNowCastBatch(stationList, workspace, outputFolder=None, outName='FireIgnitionNowCastwSummary', year1=1980, maxDownloads=4, workerCount=None,
+                    pipelineOptions=None, fetchFunction=fetchStationCSV, stateFolder=None, storeFolder=None, storeMaxAgeHours=12, deltaFetch=False,
+                    fullRefreshDays=None):
+
+    pipelineOptions = dict(pipelineOptions or {})
+    today = pipelineOptions.setdefault('today', date.today())
+    strCurrentDate = str(today)
+    os.makedirs(workspace, exist_ok=True)
+
+    reports = {siteName: {"siteName": siteName, "status": "Failed", "stage": "fetch", "fetchSeconds": None, "processSeconds": None, "outFile": None,
+                          "error": None} for siteName in stationList}
+    results = {}
+
+    def fetchTask(siteName):
+        startTime = time.perf_counter()
+        inFile = os.path.join(workspace, siteName + "_gridmetData_wWB.csv")
+        if storeFolder is None:
+            fetchFunction(define_ServiceURL(siteName, year1, today.year), inFile)
+        else:
+            # Pulled only if the store is not current - the worker reads the store
+            reports[siteName]["storeReport"] = updateStationStore(storeFolder, siteName, define_ServiceURL(siteName, year1, today.year), storeMaxAgeHours,
+                                                                  pd.Timestamp(today) + pd.Timedelta(days=60), lambda url: fetchFunction(url, inFile), today,
+                                                                  deltaFetch, fullRefreshDays)
+        return inFile, time.perf_counter() - startTime
+
+    with ThreadPoolExecutor(max_workers=max(1, maxDownloads)) as fetchExecutor, ProcessPoolExecutor(max_workers=workerCount) as processExecutor:
+
+        pending = {fetchExecutor.submit(fetchTask, siteName): ("fetch", siteName, None) for siteName in stationList}
+        while pending:
+            done, notDone = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, siteName, startTime = pending.pop(future)
+                report = reports[siteName]
+                try:
+                    if stage == "fetch":
+                        inFile, report["fetchSeconds"] = future.result()
+                        report["stage"] = "nowcast"
+                        pending[processExecutor.submit(processNowCastStation, siteName, inFile, pipelineOptions, stateFolder, storeFolder)] = ("nowcast", siteName, time.perf_counter())
+                    else:
+                        results[siteName] = future.result()
+                        report["processSeconds"] = time.perf_counter() - startTime
+                        report["status"] = "Success"
+                except Exception:
+                    report["error"] = traceback.format_exc()
+
+    stationReport = [reports[siteName] for siteName in stationList]
+    successList = [siteName for siteName in stationList if siteName in results]
+    if len(successList) == 0:
+        return None, stationReport
+
+    dfCombined = appendFiles([results[siteName] for siteName in successList])
+
+    if outputFolder is not None:
+        for siteName in successList:
+            stationFolder = os.path.join(outputFolder, siteName)
+            os.makedirs(stationFolder, exist_ok=True)
+            outFile = os.path.join(stationFolder, outName + "_" + strCurrentDate + ".csv")
+            results[siteName].to_csv(outFile, index=False)
+            reports[siteName]["outFile"] = outFile
+
+        dfCombined.to_csv(os.path.join(outputFolder, outName + "_AllStations_" + strCurrentDate + ".csv"), index=False)
+
+    return dfCombined, stationReport
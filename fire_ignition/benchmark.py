@@ -0,0 +1,237 @@
+# ---------------------------------------------------------------------------
+# benchmark.py
+# Offline benchmark of the Fire Ignition stages on synthetic data (see 'synthetic.py') - no Climate Analyzer or THREDDS download is required.
+#
+# Stages timed per repeat (seconds summed across stations):
+# - ingest: read the Climate Analyzer station .csv and the merged projections .csv
+# - reference: sorted Forest and Non-Forest reference values for the station
+# - movingAverage: Moving Window Average of the station and of each projection
+# - ignitionProportion: Percentiles and Fire Ignition Proportion for the station and all projections (projection references included)
+# - summarize: Historic daily ratings, last 25 year and Now Cast summaries, and the historic and projection normals
+# - plot: High Fire Danger Scatter Plot, Forest and Non-Forest (skipped if matplotlib is not installed)
+# Results are written to a .json report - compare a report to a baseline report with 'compareBenchmarkReports'.
+
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from . import ignition, reference, summarize, synthetic
+from .climate_analyzer import read_ClimateAnalyzerCSV, subsetToPlus60
+
+benchmarkStages = ['ingest', 'reference', 'movingAverage', 'ignitionProportion', 'summarize', 'plot']
+
+
+# Function runs 'function' adding the elapsed seconds to 'stageTimes[stage]'
+# Output - return value of 'function'
+def timeStage(stageTimes, stage, function, *args, **kwargs):
+
+    startTime = time.perf_counter()
+    result = function(*args, **kwargs)
+    stageTimes[stage] = stageTimes.get(stage, 0.0) + (time.perf_counter() - startTime)
+
+    return result
+
+
+# Function summarizes the per repeat seconds of a stage
+def define_StageStatistics(secondsList):
+
+    return {"seconds": secondsList, "min": min(secondsList), "median": statistics.median(secondsList), "mean": statistics.mean(secondsList)}
+
+
+# Function defines the Python, platform and library versions for the report
+def define_Environment():
+
+    try:
+        import matplotlib
+        matplotlibVersion = matplotlib.__version__
+    except ImportError:
+        matplotlibVersion = None
+
+    return {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor(), "cpuCount": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__, "matplotlib": matplotlibVersion}
+
+
+# Function loads a merged projections .csv
+def read_ProjectionsCSV(inFile, fieldList):
+
+    return pd.read_csv(inFile, dtype={field: 'float64' for field in fieldList}, engine='c')
+
+
+# Function scores the station - Moving Window Average, Percentiles and Fire Ignition Proportion (see 'FireIgnitionPipeline.scoreStation')
+def scoreStation(stationData, stageTimes, references, movingWindowDays, inFileField='D (MM)'):
+
+    processField = inFileField + "_" + str(movingWindowDays)
+    df = timeStage(stageTimes, 'movingAverage', ignition.define_MovingWindowAverage, stationData, movingWindowDays, inFileField)
+    df = timeStage(stageTimes, 'ignitionProportion', ignition.define_IgnitionProportion, df, processField, references["Forest"], "PercForest",
+                   "PropFiresForest", "Forest")
+    df = timeStage(stageTimes, 'ignitionProportion', ignition.define_IgnitionProportion, df, processField, references["NonForest"], "PercNonForest",
+                   "PropFiresNonForest", "NonForest")
+
+    return df.reset_index(drop=True)
+
+
+# Function scores the projections - Moving Window Average per projection, and Percentiles and Fire Ignition Proportion of all projections
+def scoreProjections(dfProjections, fieldList, stageTimes, movingWindowDays):
+
+    for field in fieldList:
+        timeStage(stageTimes, 'movingAverage', ignition.define_MovingWindowAverage, dfProjections, movingWindowDays, field)
+
+    dayOfYear = pd.to_datetime(dfProjections['time']).dt.dayofyear.to_numpy()
+    return timeStage(stageTimes, 'ignitionProportion', ignition.define_IgnitionProportionBatch, dfProjections, fieldList, movingWindowDays, dayOfYear)
+
+
+# Function summarizes the station and projections - Historic daily ratings, last 25 years and Now Cast, and the normals
+# Output - tuple (normals Data Frame, Now Cast Data Frame)
+def summarizeStation(siteName, dfScored, dfProjScored, fieldList, today, nowCastDays=60, yearsBack=25):
+
+    summarize.appendFiles([summarize.defineFireDangerRating(dfScored, 'PercNonForest', 'Non-Forest', 'DATE', today),
+                           summarize.defineFireDangerRating(dfScored, 'PercForest', 'Forest', 'DATE', today)])
+
+    appendDfList = []
+    for inFieldPerc, coverType in (('PercNonForest', 'Non-Forest'), ('PercForest', 'Forest')):
+        for year in range(today.year - yearsBack, today.year):
+            appendDfList.append(summarize.summarizeFireDangerRating(dfScored, 'SiteName', siteName, inFieldPerc, year, year, coverType, 'Mean', 'Year',
+                                                                    'na', 'DATE'))
+    dfNowCast = summarize.subsetToNowCast(dfScored, today, nowCastDays, 'D (MM)', 'DATE')
+    for inFieldPerc, coverType in (('PercForest', 'Forest'), ('PercNonForest', 'Non-Forest')):
+        appendDfList.append(summarize.summarizeFireDangerRating(dfNowCast, 'SiteName', siteName, inFieldPerc, 'NowCast', 'NowCast', coverType, 'Mean',
+                                                                'Year', 'na', 'DATE', nowCast=True))
+    dfNowCastSummary = summarize.appendFiles(appendDfList)
+
+    normalsList = []
+    for inFieldPerc, coverType in (('PercNonForest', 'Non-Forest'), ('PercForest', 'Forest')):
+        normalsList.append(summarize.summarizeFireDangerRating(dfScored, 'SiteName', siteName, inFieldPerc, 1991, 2020, coverType, 'Mean', 'Normal',
+                                                               'na', 'DATE'))
+        for field in fieldList:
+            for startYear, endYear in ((2031, 2060), (2061, 2090)):
+                normalsList.append(summarize.summarizeFireDangerRating(dfProjScored, 'SiteName', siteName, inFieldPerc + field, startYear, endYear,
+                                                                       coverType, 'Mean', 'Normal', field.split("_")[-1], 'time'))
+
+    return summarize.appendFiles(normalsList), dfNowCastSummary
+
+
+# Function runs the benchmark
+# Input:
+# workspace - folder for the synthetic inputs and plots
+# stationCount - number of stations (one projections table per station)
+# gcms, rcps - GCM and RCP lists (default 'synthetic.gcmList' and 'synthetic.rcpList')
+# stationStartYear - first year of the station tables (station tables end at the current date plus 60 days)
+# projectionStartYear, projectionEndYear - first and last year of the projections (must include 2031-2090)
+# movingWindowDays, projectionMovingWindowDays - Moving Window days for the station and the projections
+# repeats - number of times each stage is run
+# plot - True the plot stage is run
+# outFile - .json report file, None the report is not written
+# today - current date, default the current date
+# seed - random seed of the synthetic data
+# Output - report dictionary ('created', 'environment', 'parameters', 'records', 'stages')
+def runBenchmark(workspace, stationCount=2, gcms=None, rcps=None, stationStartYear=1980, projectionStartYear=2006, projectionEndYear=2099,
+                 movingWindowDays=14, projectionMovingWindowDays=7, repeats=3, plot=True, outFile=None, today=None, seed=0):
+
+    today = today if today is not None else date.today()
+    gcms = synthetic.gcmList if gcms is None else gcms
+    rcps = synthetic.rcpList if rcps is None else rcps
+    os.makedirs(workspace, exist_ok=True)
+
+    # Synthetic inputs
+    startTime = time.perf_counter()
+    stationList = []
+    stationDays = 0
+    projectionDays = 0
+    for count in range(stationCount):
+        siteName = "synthetic" + str(count + 1).zfill(2) + "_from_grid"
+        stationFile = os.path.join(workspace, siteName + "_gridmetData_wWB.csv")
+        projectionsFile = os.path.join(workspace, siteName + "_futures.csv")
+        stationDays += synthetic.write_ClimateAnalyzerCSV(stationFile, siteName, str(stationStartYear) + "-01-01", today + timedelta(days=60),
+                                                          seed + count)
+        fieldList = synthetic.write_ProjectionsCSV(projectionsFile, siteName, projectionStartYear, projectionEndYear, gcms, rcps, seed=seed + count)
+        projectionDays += len(pd.date_range(str(projectionStartYear) + '-01-01', str(projectionEndYear) + '-12-31', freq='D'))
+        stationList.append((siteName, stationFile, projectionsFile, fieldList))
+    generateSeconds = time.perf_counter() - startTime
+
+    plotSkipped = None
+    if not plot:
+        plotSkipped = "plot disabled"
+    else:
+        try:
+            import matplotlib
+        except ImportError:
+            plotSkipped = "matplotlib is not installed"
+
+    stageSeconds = {stage: [] for stage in benchmarkStages}
+    for repeat in range(repeats):
+        stageTimes = {stage: 0.0 for stage in benchmarkStages}
+        for siteName, stationFile, projectionsFile, fieldList in stationList:
+
+            stationData = timeStage(stageTimes, 'ingest', read_ClimateAnalyzerCSV, stationFile, siteName)
+            dfProjections = timeStage(stageTimes, 'ingest', read_ProjectionsCSV, projectionsFile, fieldList)
+            dfPlus60 = subsetToPlus60(stationData, today)
+
+            references = {}
+            for equationType, startDOY, endDOY in (("Forest", ignition.forest_start_DOY, ignition.forest_end_DOY),
+                                                   ("NonForest", ignition.nonforest_start_DOY, ignition.nonforest_end_DOY)):
+                references[equationType] = timeStage(stageTimes, 'reference', reference.define_ReferenceSorted, dfPlus60, 'D (MM)', 'DATE', startDOY,
+                                                     endDOY, '1/1/1984', '12/31/2021')
+
+            dfScored = scoreStation(dfPlus60, stageTimes, references, movingWindowDays)
+            dfProjScored = scoreProjections(dfProjections, fieldList, stageTimes, projectionMovingWindowDays)
+
+            dfNormals, dfNowCastSummary = timeStage(stageTimes, 'summarize', summarizeStation, siteName, dfScored, dfProjScored, fieldList, today)
+
+            if plotSkipped is None:
+                from .plot import plotFireDangerHigh
+                for coverType in ('Forest', 'Non-Forest'):
+                    timeStage(stageTimes, 'plot', plotFireDangerHigh, dfNormals, dfNowCastSummary, coverType,
+                              os.path.join(workspace, siteName + "_FireDangerHigh_" + coverType + ".jpg"), 'upper center', today, seed)
+
+        for stage in benchmarkStages:
+            stageSeconds[stage].append(stageTimes[stage])
+
+    stages = {"generate": {"seconds": [generateSeconds]}}
+    for stage in benchmarkStages:
+        if stage == 'plot' and plotSkipped is not None:
+            stages[stage] = {"skipped": plotSkipped}
+        else:
+            stages[stage] = define_StageStatistics(stageSeconds[stage])
+
+    report = {"created": datetime.now().isoformat(), "environment": define_Environment(),
+              "parameters": {"stationCount": stationCount, "gcms": list(gcms), "rcps": list(rcps), "stationStartYear": stationStartYear,
+                             "projectionStartYear": projectionStartYear, "projectionEndYear": projectionEndYear, "movingWindowDays": movingWindowDays,
+                             "projectionMovingWindowDays": projectionMovingWindowDays, "repeats": repeats, "today": str(today), "seed": seed},
+              "records": {"stationDays": stationDays, "projectionDays": projectionDays, "projections": len(stationList[0][3]) * stationCount},
+              "stages": stages}
+
+    if outFile is not None:
+        with open(outFile, "w") as outJSON:
+            json.dump(report, outJSON, indent=2)
+
+    return report
+
+
+# Function compares the stage median seconds of a report to a baseline report (report dictionaries or .json files, e.g. 'fetch_benchmark' reports)
+# Output - dictionary by stage with the 'baseline' and 'current' median seconds, the 'ratio' (current / baseline) and 'regression' (True if the
+# ratio is greater than 'threshold')
+def compareBenchmarkReports(baselineReport, report, threshold=1.10):
+
+    if not isinstance(baselineReport, dict):
+        with open(baselineReport, "r") as inJSON:
+            baselineReport = json.load(inJSON)
+    if not isinstance(report, dict):
+        with open(report, "r") as inJSON:
+            report = json.load(inJSON)
+
+    comparison = {}
+    for stage in report["stages"]:
+        baselineStage = baselineReport["stages"].get(stage, {})
+        currentStage = report["stages"].get(stage, {})
+        if "median" not in baselineStage or "median" not in currentStage:
+            continue
+        ratio = currentStage["median"] / baselineStage["median"] if baselineStage["median"] > 0 else float("nan")
+        comparison[stage] = {"baseline": baselineStage["median"], "current": currentStage["median"], "ratio": ratio, "regression": ratio > threshold}
+
+    return comparison
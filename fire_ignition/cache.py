@@ -0,0 +1,320 @@
+# ---------------------------------------------------------------------------
+# cache.py
+# Persistent on disk download cache for the THREDDS (NCSS) requests (see 'GCM_wb_thredds_point_extractor_v3.py').  NPS Water Balance version 1.5
+# projections do not change, so a response downloaded once is reused by every later run - a rerun after a crash or a configuration change only
+# downloads the requests not yet in the cache.
+#
+# Entries are keyed by the normalized request URL (scheme/host lower case, query parameters sorted) and stored as '{cacheFolder}/objects/{key[:2]}/
+# {key}'.  Files are written to a temporary file and renamed when complete (a partial download is never cached).  The manifest
+# ('{cacheFolder}/manifest.jsonl') is an append only journal of entries (url, bytes, sha256) and accesses - entries are checked against their size and
+# sha256 when first read by a process, and the least recently used entries are evicted when the cache is larger than 'maxBytes' (entries handed out by
+# 'get' are kept until 'release').
+#
+# Example:
+#   cache = DownloadCache(r"C:\ROMN\Climate\DownloadCache", maxBytes=20 * 1024 ** 3)
+#   inFile = cache.get(url)
+#   if inFile is None:
+#       with cache.writer(url, fetchClient.open(url)) as stream:
+#           df = pd.read_csv(stream)
+#           stream.commit()
+#   else:
+#       df = pd.read_csv(inFile)
+#       cache.release(url)
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import urllib.parse
+import uuid
+
+
+# Function normalizes an NCSS request URL - scheme and host lower case, query parameters sorted (same request same key)
+def define_NormalizedURL(url):
+
+    parts = urllib.parse.urlsplit(url.strip())
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+
+# Function defines the cache key (sha256 of the normalized URL)
+def define_CacheKey(url):
+
+    return hashlib.sha256(define_NormalizedURL(url).encode("utf-8")).hexdigest()
+
+
+class CacheWriter(io.RawIOBase):
+
+    # Readable stream passing the 'source' stream through to the reader while writing it to a temporary cache file - 'commit' adds the file to the
+    # cache (after the reader has checked the content, e.g. parsed it), closing without 'commit' discards it.
+    def __init__(self, cache, url, source):
+
+        super().__init__()
+        self.cache = cache
+        self.url = url
+        self.source = source
+        self.tmpFile = cache.define_TmpFile()
+        self.outStream = open(self.tmpFile, "wb")
+        self.digest = hashlib.sha256()
+        self.byteCount = 0
+        self.finished = False
+
+    def readable(self):
+
+        return True
+
+    def readinto(self, buffer):
+
+        count = self.source.readinto(buffer)
+        if count:
+            block = bytes(memoryview(buffer)[:count])
+            self.outStream.write(block)
+            self.digest.update(block)
+            self.byteCount += count
+        else:
+            self.finished = True
+        return count
+
+    # Add the streamed content to the cache - the rest of the source is read if the reader stopped before the end
+    def commit(self):
+
+        if not self.finished:
+            while self.read(1024 * 1024):
+                pass
+        self.outStream.close()
+        self.cache.addFile(self.url, self.tmpFile, self.byteCount, self.digest.hexdigest())
+        self.tmpFile = None
+
+    def close(self):
+
+        if not self.closed:
+            self.outStream.close()
+            if self.tmpFile is not None and os.path.exists(self.tmpFile):
+                os.remove(self.tmpFile)
+            self.source.close()
+        super().close()
+
+
+class DownloadCache:
+
+    # Input:
+    # cacheFolder - cache folder (created if it does not exist)
+    # maxBytes - maximum cache size (bytes), least recently used entries are evicted above it, None no limit
+    # verify - True check the size and sha256 of an entry when it is first read by this process (entries failing the check are removed)
+    # staleTmpSeconds - temporary files not modified for 'staleTmpSeconds' are removed when the cache is opened (left by an interrupted run)
+    def __init__(self, cacheFolder, maxBytes=None, verify=True, staleTmpSeconds=3600):
+
+        self.cacheFolder = cacheFolder
+        self.maxBytes = maxBytes
+        self.verify = verify
+        self.staleTmpSeconds = staleTmpSeconds
+        self.manifestFile = os.path.join(cacheFolder, "manifest.jsonl")
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.verified = set()
+        self.pinned = {}
+        self.journalLines = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.join(cacheFolder, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(cacheFolder, "tmp"), exist_ok=True)
+        self.loadManifest()
+
+    # Replay the manifest journal - a partially written last line (crash) is ignored, entries without their file are dropped
+    def loadManifest(self):
+
+        if os.path.exists(self.manifestFile):
+            with open(self.manifestFile, "r") as inFile:
+                for line in inFile:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.journalLines += 1
+                    key = record.get("key")
+                    if record.get("op") == "put":
+                        self.entries[key] = {"url": record["url"], "bytes": record["bytes"], "sha256": record["sha256"],
+                                             "lastAccess": record["time"]}
+                    elif record.get("op") == "touch" and key in self.entries:
+                        self.entries[key]["lastAccess"] = record["time"]
+                    elif record.get("op") == "remove":
+                        self.entries.pop(key, None)
+
+        for key in [key for key in self.entries if not os.path.exists(self.define_ObjectFile(key))]:
+            del self.entries[key]
+
+        # Remove temporary files left by an interrupted run - recently modified files are kept (another process writing to the cache)
+        tmpFolder = os.path.join(self.cacheFolder, "tmp")
+        staleTime = time.time() - self.staleTmpSeconds
+        for tmpName in os.listdir(tmpFolder):
+            tmpFile = os.path.join(tmpFolder, tmpName)
+            try:
+                if os.path.getmtime(tmpFile) < staleTime:
+                    os.remove(tmpFile)
+            except FileNotFoundError:
+                pass
+
+        if self.journalLines > 2 * len(self.entries) + 1000:
+            self.compactManifest()
+
+    # Rewrite the manifest journal with one 'put' record per entry
+    def compactManifest(self):
+
+        with self.lock:
+            tmpFile = self.manifestFile + ".tmp"
+            with open(tmpFile, "w") as outFile:
+                for key, entry in self.entries.items():
+                    outFile.write(json.dumps({"op": "put", "key": key, "url": entry["url"], "bytes": entry["bytes"], "sha256": entry["sha256"],
+                                              "time": entry["lastAccess"]}) + "\n")
+            os.replace(tmpFile, self.manifestFile)
+            self.journalLines = len(self.entries)
+
+    def appendManifest(self, record):
+
+        with open(self.manifestFile, "a") as outFile:
+            outFile.write(json.dumps(record) + "\n")
+        self.journalLines += 1
+
+    def define_ObjectFile(self, key):
+
+        return os.path.join(self.cacheFolder, "objects", key[:2], key)
+
+    def define_TmpFile(self):
+
+        return os.path.join(self.cacheFolder, "tmp", uuid.uuid4().hex)
+
+    # Function checks the size and sha256 of an entry's file ('entry' record of the key) - called without the cache lock
+    def checkEntry(self, key, entry):
+
+        objectFile = self.define_ObjectFile(key)
+        if not os.path.exists(objectFile) or os.path.getsize(objectFile) != entry["bytes"]:
+            return False
+        if not self.verify or key in self.verified:
+            return True
+
+        digest = hashlib.sha256()
+        with open(objectFile, "rb") as inFile:
+            for block in iter(lambda: inFile.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest() == entry["sha256"]
+
+    def contains(self, url):
+
+        with self.lock:
+            return define_CacheKey(url) in self.entries
+
+    # Cached file of 'url' - Output - file path, None if 'url' is not cached (or the cached file failed the integrity check and was removed).  The
+    # returned file is not evicted until 'release(url)' (the entry is pinned while the caller reads it); the sha256 is checked outside the cache lock
+    # (other threads are not blocked) and once per entry and process.
+    def get(self, url):
+
+        key = define_CacheKey(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.pinned[key] = self.pinned.get(key, 0) + 1
+
+        entryValid = self.checkEntry(key, entry)
+
+        with self.lock:
+            # Failed the check, or the entry was replaced or removed while it was checked (reported as not cached)
+            if not entryValid or self.entries.get(key) is not entry:
+                self.unpin(key)
+                if self.entries.get(key) is entry:
+                    self.removeEntry(key)
+                self.misses += 1
+                return None
+
+            self.verified.add(key)
+            accessTime = time.time()
+            self.entries[key]["lastAccess"] = accessTime
+            self.appendManifest({"op": "touch", "key": key, "time": accessTime})
+            self.hits += 1
+            return self.define_ObjectFile(key)
+
+    # Release a file returned by 'get' (it may be evicted again)
+    def release(self, url):
+
+        with self.lock:
+            self.unpin(define_CacheKey(url))
+
+    def unpin(self, key):
+
+        count = self.pinned.get(key, 0) - 1
+        if count > 0:
+            self.pinned[key] = count
+        else:
+            self.pinned.pop(key, None)
+
+    # Add a completed temporary file to the cache (renamed into place) and evict the least recently used entries above 'maxBytes'
+    def addFile(self, url, tmpFile, byteCount, sha256):
+
+        key = define_CacheKey(url)
+        objectFile = self.define_ObjectFile(key)
+        os.makedirs(os.path.dirname(objectFile), exist_ok=True)
+        with self.lock:
+            os.replace(tmpFile, objectFile)
+            accessTime = time.time()
+            self.entries[key] = {"url": define_NormalizedURL(url), "bytes": byteCount, "sha256": sha256, "lastAccess": accessTime}
+            self.verified.discard(key)
+            self.appendManifest({"op": "put", "key": key, "url": define_NormalizedURL(url), "bytes": byteCount, "sha256": sha256, "time": accessTime})
+            self.evict(keepKey=key)
+
+        return objectFile
+
+    # Add the content of 'inFile' (e.g. a downloaded file) to the cache - Output - cached file path
+    def putFile(self, url, inFile):
+
+        tmpFile = self.define_TmpFile()
+        digest = hashlib.sha256()
+        with open(inFile, "rb") as inStream, open(tmpFile, "wb") as outStream:
+            for block in iter(lambda: inStream.read(1024 * 1024), b""):
+                digest.update(block)
+                outStream.write(block)
+            byteCount = outStream.tell()
+
+        return self.addFile(url, tmpFile, byteCount, digest.hexdigest())
+
+    # Readable stream of 'source' (e.g. 'http_client.FetchResponse') which is written to the cache on 'commit' (see 'CacheWriter')
+    def writer(self, url, source):
+
+        return CacheWriter(self, url, source)
+
+    def removeEntry(self, key):
+
+        with self.lock:
+            self.entries.pop(key, None)
+            self.verified.discard(key)
+            objectFile = self.define_ObjectFile(key)
+            if os.path.exists(objectFile):
+                os.remove(objectFile)
+            self.appendManifest({"op": "remove", "key": key, "time": time.time()})
+
+    # Evict the least recently used entries until the cache is not larger than 'maxBytes' ('keepKey' the entry just added and the entries handed out
+    # by 'get' and not released are kept)
+    def evict(self, keepKey=None):
+
+        if self.maxBytes is None:
+            return
+
+        with self.lock:
+            totalBytes = sum(entry["bytes"] for entry in self.entries.values())
+            for key in sorted(self.entries, key=lambda key: self.entries[key]["lastAccess"]):
+                if totalBytes <= self.maxBytes:
+                    break
+                if key == keepKey or key in self.pinned:
+                    continue
+                totalBytes -= self.entries[key]["bytes"]
+                self.removeEntry(key)
+
+    # Summary - entries, bytes, hits and misses
+    def summary(self):
+
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": sum(entry["bytes"] for entry in self.entries.values()), "hits": self.hits,
+                    "misses": self.misses}
@@ -0,0 +1,166 @@
+# ---------------------------------------------------------------------------
+# climate_analyzer.py
+# Climate Analyzer (http://www.climateanalyzer.science) Gridmet station daily Water Balance tables - service URL and parsing of the .csv output.
+#
+# The .csv output is a preamble, the daily table (header line 'INDEX, DATE, ...' then one record per day, first field the record number) and a
+# monthly summary footer.  The daily block and the footer are found in one scan of the raw bytes and only the daily block is parsed - with the C
+# (or pyarrow) engine, explicit data types and the fixed 'mm/dd/YYYY' date format, i.e. no python engine read, field name/date string trimming or
+# date format inference.
+#
+# Example:
+#   dfDaily = read_ClimateAnalyzerDaily(response, endDate=date.today() + timedelta(days=60))   #DatetimeIndex, float32 fields
+
+import io
+import os
+import re
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Daily table header line (first field 'INDEX') and the first line after it which is not a daily record (first field not a record number, e.g. the
+# 'Monthly Summary' footer) - blank lines are neither
+dailyHeaderPattern = re.compile(rb"^[ \t]*INDEX[ \t]*,", re.M)
+dailyFooterPattern = re.compile(rb"^[ \t]*[^0-9\s]", re.M)
+
+dateFormat = "%m/%d/%Y"
+
+
+# Function defines the Climate Analyzer daily Water Balance service URL for a Gridmet station
+# Input: siteName - Gridmet station name (e.g. 'bearlake_from_grid'), year1 - first year, year2 - last year
+def define_ServiceURL(siteName, year1, year2):
+
+    siteNameNoFromGrid = siteName.replace("_from_grid", "")
+    serviceURL = "http://www.climateanalyzer.science/python/wb2.py?csv_output=true&station=" + siteName + "&title=" + siteNameNoFromGrid + \
+                 "&pet_type=hamon&max_soil_water=250&graph_table=table&table_type=daily&forgiving=very&year1=" + str(year1) + "&year2=" + str(year2) + \
+                 "&station_type=GHCN&sim_snow=true&force=true?"
+
+    return serviceURL
+
+
+# Function finds the daily block of the Climate Analyzer .csv output in one scan
+# Input: data - bytes of the .csv output
+# Output - tuple (header line start, first daily record start, footer start (end of the data if there is no footer)) byte offsets
+def define_DailyBlock(data):
+
+    headerMatch = dailyHeaderPattern.search(data)
+    if headerMatch is None:
+        raise ValueError("Daily table header ('INDEX') not found in the Climate Analyzer output")
+
+    headerEnd = data.find(b"\n", headerMatch.start())
+    dataStart = len(data) if headerEnd == -1 else headerEnd + 1
+    footerMatch = dailyFooterPattern.search(data, dataStart)
+
+    return headerMatch.start(), dataStart, footerMatch.start() if footerMatch is not None else len(data)
+
+
+# Function converts fixed width 'mm/dd/YYYY' date strings to datetime64[ns] with integer arithmetic on the bytes - dates not in the format (or not
+# valid) are converted with 'pd.to_datetime' (invalid dates NaT)
+def define_DailyDates(dateStrings):
+
+    dateStrings = np.asarray(dateStrings, dtype=object)
+    dateBytes = None
+    if len(dateStrings) > 0:
+        dateText = dateStrings.astype(str)
+        # Every entry must be 10 characters - 'S10' would silently truncate longer entries (e.g. '01/02/2020 12:00')
+        if (np.char.str_len(dateText) == 10).all():
+            try:
+                dateBytes = dateText.astype("S10")
+            except UnicodeEncodeError:
+                dateBytes = None
+
+    if dateBytes is not None:
+        digits = dateBytes.view(np.uint8).reshape(-1, 10).astype(np.int64) - 48
+        separators = (digits[:, 2] == -1) & (digits[:, 5] == -1)   #'/'
+        numbers = digits[:, [0, 1, 3, 4, 6, 7, 8, 9]]
+        if separators.all() and ((numbers >= 0) & (numbers <= 9)).all():
+            months = digits[:, 0] * 10 + digits[:, 1]
+            days = digits[:, 3] * 10 + digits[:, 4]
+            years = digits[:, 6] * 1000 + digits[:, 7] * 100 + digits[:, 8] * 10 + digits[:, 9]
+            monthStart = ((years - 1970) * 12 + (months - 1)).astype("datetime64[M]")
+            dates = monthStart.astype("datetime64[D]") + (days - 1)
+            # Valid if the day is within the month (e.g. not 02/30)
+            if ((months >= 1) & (months <= 12) & (days >= 1)).all() and (dates.astype("datetime64[M]") == monthStart).all():
+                return dates.astype("datetime64[ns]")
+
+    return pd.to_datetime(pd.Series(dateStrings).astype(str).str.strip(), format=dateFormat, errors='coerce').to_numpy()
+
+
+# Function reads the daily table of the Climate Analyzer daily Water Balance .csv output (preamble and monthly summary footer skipped)
+# Input:
+# inFile - .csv file path, bytes or readable stream (e.g. 'http_client.FetchResponse')
+# valueDtype - data type of the value fields (e.g. 'PET (MM)', 'D (MM)'), 'INDEX' is int64
+# endDate - last date returned (e.g. the current date plus the 60 Now Cast days), None all daily records
+# engine - pandas .csv engine, 'c' or 'pyarrow'
+# Output - Data Frame indexed by the DatetimeIndex 'DATE' with the 'INDEX' field and the value fields
+def read_ClimateAnalyzerDaily(inFile, valueDtype='float32', endDate=None, engine='c'):
+
+    if isinstance(inFile, (bytes, bytearray)):
+        data = bytes(inFile)
+    elif isinstance(inFile, (str, os.PathLike)):
+        with open(inFile, "rb") as inStream:
+            data = inStream.read()
+    else:
+        data = inFile.read()
+
+    headerStart, dataStart, footerStart = define_DailyBlock(data)
+
+    # Field names from the header line (trimmed) - the trailing comma's empty field is read and dropped
+    fieldNames = [field.strip() for field in data[headerStart:dataStart].decode("utf-8", errors="replace").split(",")]
+    readNames = [field if field != "" else "_empty" + str(count) for count, field in enumerate(fieldNames)]
+    if "DATE" not in readNames:
+        raise ValueError("Field 'DATE' not found in the Climate Analyzer daily table header")
+    dtypes = {field: (str if field == "DATE" else "int64" if field == "INDEX" else valueDtype) for field in readNames}
+
+    # Padding removed in one pass (no value contains spaces), no 'skipinitialspace'/trimming needed
+    block = io.BytesIO(data[dataStart:footerStart].translate(None, b" \t\r"))
+    try:
+        df = pd.read_csv(block, header=None, names=readNames, dtype=dtypes, engine=engine)
+    except ValueError:
+        # Non numeric values (e.g. a missing value flag) - read as text and converted, non numeric values are NaN
+        block.seek(0)
+        df = pd.read_csv(block, header=None, names=readNames, dtype=str, engine=engine)
+        for field in readNames:
+            if field != "DATE":
+                df[field] = pd.to_numeric(df[field], errors='coerce').astype(dtypes[field] if field != "INDEX" else "float64")
+
+    dates = define_DailyDates(df['DATE'].to_numpy())
+    df = df.drop(columns=['DATE'] + [field for field in readNames if field.startswith("_empty")])
+    df.index = pd.DatetimeIndex(dates, name='DATE')
+
+    if endDate is not None:
+        matchEnd = (df.index == pd.Timestamp(endDate))
+        if not matchEnd.any():
+            raise ValueError("End date - " + pd.Timestamp(endDate).strftime('%m/%d/%Y') + " - is not in the station data")
+        df = df.iloc[0:matchEnd.argmax() + 1]
+
+    return df
+
+
+# Function reads the Climate Analyzer daily Water Balance .csv output to a Data Frame (see 'read_ClimateAnalyzerDaily')
+# Input: inFile - .csv file path, bytes or buffer, siteName - Gridmet station name added as field 'SiteName', endDate - last date returned (None all
+# daily records), valueDtype - data type of the value fields (float64 - the Fire Ignition results are the same as the .csv text values)
+# Output - Data Frame with the daily records (monthly summary footer not included) - 'INDEX', 'SiteName', 'DATE' (datetime) and the value fields
+def read_ClimateAnalyzerCSV(inFile, siteName, endDate=None, valueDtype='float64', engine='c'):
+
+    df = read_ClimateAnalyzerDaily(inFile, valueDtype, endDate, engine).reset_index()
+    df = df[['INDEX', 'DATE'] + [field for field in df.columns if field not in ('INDEX', 'DATE')]]
+    df.insert(1, "SiteName", siteName, True)
+
+    return df
+
+
+# Function subsets the station data to the records through the current date plus 'nowCastDays' (i.e. removes the monthly summary footer)
+# Output - Data Frame with the records from the first record through the current date plus 'nowCastDays'
+def subsetToPlus60(inDf, today=None, nowCastDays=60):
+
+    if today is None:
+        today = date.today()
+
+    currentDatePlus60 = pd.to_datetime(today) + pd.Timedelta(days=nowCastDays)
+
+    matchPlus60 = (inDf['DATE'] == currentDatePlus60).to_numpy()
+    if not matchPlus60.any():
+        raise ValueError("Now Cast end date - " + currentDatePlus60.strftime('%m/%d/%Y') + " - is not in the station data")
+
+    return inDf.iloc[0:matchPlus60.argmax() + 1].copy()
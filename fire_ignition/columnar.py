@@ -0,0 +1,202 @@
+# ---------------------------------------------------------------------------
+# columnar.py
+# Partitioned Parquet output of the projections table (the merged output of 'GCM_wb_thredds_point_extractor_v3.py' - 'SiteName', 'time', latitude,
+# longitude and one '{parameter}_{GCM}_{RCP}' field per projection).  The table is written as one Parquet file per site, parameter and scenario
+#
+#   {datasetFolder}/SiteName={site}/parameter={parameter}/scenario={RCP}/part-0.parquet
+#
+# each with the 'SiteName' (dictionary encoded), 'time', latitude and longitude fields and the projection fields of the parameter and scenario (e.g.
+# 'deficit_CCSM4_rcp45' ... 'deficit_Ensemble_rcp45') as float32.  A reader only opens the partitions (and fields) it needs - e.g. the deficit fields
+# of one station.
+#
+#Dependencies:
+#pyarrow
+
+import os
+import shutil
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+from .extract import define_WideTable
+
+partitionFile = "part-0.parquet"
+
+
+# Function splits a projection field '{parameter}_{GCM}_{RCP}' (parameter may include '_', e.g. 'soil_water') - Output - tuple (parameter, GCM, RCP),
+# None if the field is not a projection field
+def define_FieldParts(field):
+
+    parts = field.rsplit("_", 2)
+    if len(parts) != 3 or "" in parts:
+        return None
+
+    return parts[0], parts[1], parts[2]
+
+
+# Function defines the partition folder of a site, parameter and scenario (values are URL quoted so any site name is a valid folder name)
+def define_PartitionFolder(datasetFolder, siteName, parameter, scenario):
+
+    return os.path.join(datasetFolder, "SiteName=" + urllib.parse.quote(str(siteName), safe=""), "parameter=" + urllib.parse.quote(parameter, safe=""),
+                        "scenario=" + urllib.parse.quote(scenario, safe=""))
+
+
+# Function converts float32 values to float64 via their shortest decimal representation, i.e. a float32 0.1 mm value (e.g. 1.2) is returned as the
+# float64 parsed from the same decimal as the .csv output (1.2) rather than the float32 binary value (1.2000000476837158)
+def define_Float64FromFloat32(values):
+
+    values32 = np.asarray(values, dtype=np.float32)
+    values64 = values32.astype(np.float64)
+    unresolved = np.abs(values32) < 1e7   #Integer values below 1e7 are exact in float32
+
+    # Fewest decimals which round trip to the float32 value (integer / 10 ** decimals is the float64 of the decimal)
+    for decimals in range(10):
+        if not unresolved.any():
+            break
+        records = np.flatnonzero(unresolved)
+        candidate = np.round(values64[records], decimals)
+        match = candidate.astype(np.float32) == values32[records]
+        values64[records[match]] = candidate[match]
+        unresolved[records[match]] = False
+
+    # Remaining values (e.g. very large or small magnitudes) via the decimal string
+    unresolved = unresolved | ((np.abs(values32) >= 1e7) & np.isfinite(values32))
+    if unresolved.any():
+        values64[unresolved] = values32[unresolved].astype(str).astype(np.float64)
+
+    return values64
+
+
+# Function writes the projections table as a partitioned Parquet dataset (an existing dataset in 'datasetFolder' is replaced)
+# Input:
+# df - projections Data Frame
+# datasetFolder - dataset folder
+# siteField, timeField - site and time fields
+# valueDtype - data type of the projection fields ('float32'|'float64')
+# Output - list of the Parquet files written
+def write_ProjectionsParquet(df, datasetFolder, siteField='SiteName', timeField='time', valueDtype='float32'):
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Projection fields by parameter and scenario, remaining fields (e.g. latitude, longitude) are written to each partition
+    partitionFields = {}
+    otherFields = []
+    for field in df.columns:
+        if field in (siteField, timeField):
+            continue
+        fieldParts = define_FieldParts(field)
+        if fieldParts is None or not pd.api.types.is_numeric_dtype(df[field]):
+            otherFields.append(field)
+        else:
+            partitionFields.setdefault((fieldParts[0], fieldParts[2]), []).append(field)
+
+    if os.path.exists(datasetFolder):
+        shutil.rmtree(datasetFolder)
+
+    fileList = []
+    siteCodes, siteNames = pd.factorize(df[siteField])
+    for siteCount, siteName in enumerate(siteNames):
+        siteRecords = np.flatnonzero(siteCodes == siteCount)
+        siteTable = df.iloc[siteRecords]
+        columns = {siteField: pa.array(siteTable[siteField].to_numpy(dtype=object), type=pa.string()).dictionary_encode(),
+                   timeField: pa.array(siteTable[timeField].astype(str).to_numpy(dtype=object), type=pa.string())}
+        for field in otherFields:
+            columns[field] = pa.array(siteTable[field].to_numpy())
+
+        for (parameter, scenario), fieldList in partitionFields.items():
+            partitionColumns = dict(columns)
+            for field in fieldList:
+                partitionColumns[field] = pa.array(siteTable[field].to_numpy(dtype=valueDtype))
+
+            outFolder = define_PartitionFolder(datasetFolder, siteName, parameter, scenario)
+            os.makedirs(outFolder, exist_ok=True)
+            outFile = os.path.join(outFolder, partitionFile)
+            pq.write_table(pa.table(partitionColumns), outFile + ".tmp")
+            os.replace(outFile + ".tmp", outFile)
+            fileList.append(outFile)
+
+    return fileList
+
+
+# Function lists the sites of a partitioned Parquet dataset
+def define_DatasetSites(datasetFolder):
+
+    return [urllib.parse.unquote(folder.split("=", 1)[1]) for folder in sorted(os.listdir(datasetFolder)) if folder.startswith("SiteName=")]
+
+
+# Function defines the size (bytes) and latest modified time of the dataset partition files of the sites (e.g. to detect a changed dataset)
+# Output - tuple (bytes, modified)
+def define_DatasetSignature(datasetFolder, siteNames=None):
+
+    siteNames = define_DatasetSites(datasetFolder) if siteNames is None else siteNames
+    totalBytes = 0
+    modified = 0.0
+    for siteName in siteNames:
+        siteFolder = os.path.join(datasetFolder, "SiteName=" + urllib.parse.quote(str(siteName), safe=""))
+        for folder, subFolders, files in os.walk(siteFolder):
+            for fileName in files:
+                if fileName.endswith(".parquet"):
+                    totalBytes += os.path.getsize(os.path.join(folder, fileName))
+                    modified = max(modified, os.path.getmtime(os.path.join(folder, fileName)))
+
+    return totalBytes, modified
+
+
+# Function reads projection fields from a partitioned Parquet dataset - only the partitions and fields needed are read
+# Input:
+# datasetFolder - dataset folder (see 'write_ProjectionsParquet')
+# fieldList - projection fields to read (e.g. ['deficit_CCSM4_rcp45', 'deficit_Ensemble_rcp85'])
+# siteNames - list of sites, None all sites
+# valueDtype - data type of the projection fields - 'float64' values are converted via their shortest decimal (see 'define_Float64FromFloat32')
+# siteField, timeField - site and time fields
+# Output - Data Frame with the site, time, latitude, longitude and 'fieldList' fields (records by site in 'siteNames' order)
+def read_ProjectionsParquet(datasetFolder, fieldList, siteNames=None, valueDtype='float64', siteField='SiteName', timeField='time'):
+
+    import pyarrow.parquet as pq
+
+    siteNames = define_DatasetSites(datasetFolder) if siteNames is None else siteNames
+
+    partitionFields = {}
+    for field in fieldList:
+        fieldParts = define_FieldParts(field)
+        if fieldParts is None:
+            raise ValueError("Not a projection field - " + field)
+        partitionFields.setdefault((fieldParts[0], fieldParts[2]), []).append(field)
+
+    siteTables = []
+    for siteName in siteNames:
+        partitionTables = []
+        for (parameter, scenario), partitionFieldList in partitionFields.items():
+            inFile = os.path.join(define_PartitionFolder(datasetFolder, siteName, parameter, scenario), partitionFile)
+            if not os.path.exists(inFile):
+                raise ValueError("Partition not found - " + inFile)
+
+            schemaFields = pq.read_schema(inFile).names
+            missingFields = [field for field in partitionFieldList if field not in schemaFields]
+            if len(missingFields) > 0:
+                raise ValueError("Fields not found - " + ", ".join(missingFields) + " - " + inFile)
+
+            # Site, time, latitude and longitude fields from the first partition
+            if len(partitionTables) == 0:
+                readFields = [field for field in schemaFields if define_FieldParts(field) is None] + partitionFieldList
+            else:
+                readFields = [siteField, timeField] + partitionFieldList
+            table = pq.read_table(inFile, columns=readFields).to_pandas()
+            table[siteField] = table[siteField].astype(str)
+
+            for field in partitionFieldList:
+                if valueDtype == 'float64' and table[field].dtype == np.float32:
+                    table[field] = define_Float64FromFloat32(table[field].to_numpy())
+                else:
+                    table[field] = table[field].astype(valueDtype)
+            partitionTables.append(table)
+
+        siteTable, stats = define_WideTable(partitionTables[0], [field for table in partitionTables[1:] for field in table.columns[2:]],
+                                            iter(partitionTables[1:]), (siteField, timeField))
+        siteTables.append(siteTable)
+
+    df = pd.concat(siteTables, ignore_index=True)
+    leadingFields = [field for field in df.columns if field not in fieldList]
+    return df[leadingFields + list(fieldList)]
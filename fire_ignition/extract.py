@@ -0,0 +1,208 @@
+# ---------------------------------------------------------------------------
+# extract.py
+# In memory assembly of the THREDDS (NCSS) point extractions (see 'GCM_wb_thredds_point_extractor_v3.py') - each year response is parsed once into
+# typed arrays (time datetime64, latitude/longitude/value float64) and the final table (one record per site and date, one field per parameter/model/
+# scenario) is assembled directly from the arrays, i.e. without the per year, per site and per parameter .csv files.  Per year intermediate files
+# are optional (numpy .npz).
+#
+# Example:
+#   assembler = ExtractionAssembler()
+#   assembler.addYear('bear_lake_daily_deficit_CCSM4_rcp45', 'bear_lake', 'deficit_CCSM4_rcp45', 'daily', 2030, parse_NCSSPoint(response))
+#   df = assembler.assemble(placeList, fieldList)
+
+import os
+import threading
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Packed values (mm * 10) below this are fill values (NaN) - see the extractor's 'unit_fix', same mask as the NetCDF responses ('netcdf.py')
+fillThreshold = -30000
+
+# Output time format of the daily and monthly requests (monthly dates are the year and month)
+dailyTimeFormat = "%Y-%m-%dT%H:%M:%SZ"
+monthlyTimeFormat = "%Y-%m"
+
+
+# Function parses an NCSS point .csv response (time, latitude, longitude, value fields) into typed arrays
+# Input: inFile - .csv file path or readable stream (e.g. 'http_client.FetchResponse'), fillBelow - values below are fill values (NaN), None no mask
+# Output - dictionary with 'time' (datetime64[s]), 'latitude', 'longitude', 'value' (float64, fill values NaN) arrays and 'fields' (the response
+# field names)
+def parse_NCSSPoint(inFile, fillBelow=fillThreshold):
+
+    df = pd.read_csv(inFile)
+    fields = list(df.columns)
+    value = df[fields[-1]].to_numpy(dtype=np.float64)
+    if fillBelow is not None:
+        value = np.where(value < fillBelow, np.nan, value)
+
+    return {"time": pd.to_datetime(df[fields[0]].str.slice(0, 19), format="%Y-%m-%dT%H:%M:%S").to_numpy(dtype="datetime64[s]"),
+            "latitude": df[fields[1]].to_numpy(dtype=np.float64), "longitude": df[fields[2]].to_numpy(dtype=np.float64),
+            "value": value, "fields": fields}
+
+
+# Function assembles the wide table - the 'baseTable' records (e.g. the first parameter/model/scenario table) with one field per 'fieldNames' aligned on
+# the key fields in one pass, i.e. a preallocated 2-D array filled one field table at a time (same records and values as successive left merges on the
+# key fields, without copying the growing table per field)
+# Input:
+# baseTable - Data Frame with the key fields, defines the output records and leading fields
+# fieldNames - fields to add (in order)
+# fieldTables - iterable of Data Frames (e.g. a generator reading one table at a time) with the key fields and one or more of 'fieldNames' - a key
+# repeated in a field table uses the first record
+# keyFields - key fields
+# trackMemory - True traces the peak memory allocated during the assembly (tracemalloc, slows the assembly).  Not traced if tracemalloc was already
+# started by the caller (the caller's peak is not reset)
+# Output - tuple (Data Frame, dictionary with the 'records', 'fields', 'arrayBytes' (filled 2-D array), 'outputBytes' and 'peakBytes' (peak memory
+# allocated during the assembly, None not traced))
+def define_WideTable(baseTable, fieldNames, fieldTables, keyFields=('SiteName', 'time'), trackMemory=False):
+
+    tracing = trackMemory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+        startBytes = tracemalloc.get_traced_memory()[0]
+
+    # Key fields as integer codes (one code per combination of the base table key values)
+    keyUniques = []
+    baseCodes = np.zeros(len(baseTable), dtype=np.int64)
+    for keyField in keyFields:
+        codes, uniques = pd.factorize(baseTable[keyField])
+        keyUniques.append(pd.Index(uniques))
+        baseCodes = baseCodes * len(uniques) + codes
+        baseCodes[codes < 0] = -1
+    codeCount = int(np.prod([len(uniques) for uniques in keyUniques]))
+    baseFound = baseCodes >= 0
+
+    fieldColumns = {fieldName: count for count, fieldName in enumerate(fieldNames)}
+    values = np.full((len(baseTable), len(fieldNames)), np.nan, order='F')   #Column major - each field is a contiguous column
+
+    for fieldTable in fieldTables:
+        tableCodes = np.zeros(len(fieldTable), dtype=np.int64)
+        for keyField, uniques in zip(keyFields, keyUniques):
+            codes = uniques.get_indexer(fieldTable[keyField])
+            tableCodes = tableCodes * len(uniques) + codes
+            tableCodes[codes < 0] = -1
+
+        # Record of each key code in the field table (first record of a repeated key), -1 not in the field table
+        tableFound = np.flatnonzero(tableCodes >= 0)[::-1]
+        recordByCode = np.full(codeCount, -1, dtype=np.int64)
+        recordByCode[tableCodes[tableFound]] = tableFound
+
+        positions = np.full(len(baseTable), -1, dtype=np.int64)
+        positions[baseFound] = recordByCode[baseCodes[baseFound]]
+        found = positions >= 0
+        for fieldName in fieldTable.columns:
+            if fieldName in fieldColumns:
+                values[found, fieldColumns[fieldName]] = fieldTable[fieldName].to_numpy(dtype=np.float64)[positions[found]]
+        del fieldTable, tableCodes, recordByCode, positions
+
+    # Output fields reference the filled array (no copy of the values)
+    baseTable = baseTable.reset_index(drop=True)
+    columns = {field: baseTable[field].to_numpy() for field in baseTable.columns}
+    columns.update({fieldName: values[:, count] for fieldName, count in fieldColumns.items()})
+    wideTable = pd.DataFrame(columns, copy=False)
+
+    peakBytes = None
+    if tracing:
+        peakBytes = int(tracemalloc.get_traced_memory()[1] - startBytes)
+        tracemalloc.stop()
+
+    stats = {"records": len(wideTable), "fields": len(fieldNames), "arrayBytes": int(values.nbytes),
+             "outputBytes": int(wideTable.memory_usage(index=False).sum()), "peakBytes": peakBytes}
+    return wideTable, stats
+
+
+# Function writes the year arrays to a numpy .npz file (written to a temporary file and renamed when complete)
+def save_YearArrays(outFile, arrays):
+
+    with open(outFile + ".tmp", "wb") as outStream:
+        np.savez(outStream, time=arrays["time"], latitude=arrays["latitude"], longitude=arrays["longitude"], value=arrays["value"],
+                 fields=np.array(arrays["fields"]))
+    os.replace(outFile + ".tmp", outFile)
+
+
+# Function reads the year arrays written by 'save_YearArrays'
+def load_YearArrays(inFile):
+
+    with np.load(inFile) as npz:
+        return {"time": npz["time"], "latitude": npz["latitude"], "longitude": npz["longitude"], "value": npz["value"],
+                "fields": [str(field) for field in npz["fields"]]}
+
+
+class ExtractionAssembler:
+
+    # Input:
+    # scale - divisor of the response values (NPS Water Balance values are stored as mm * 10)
+    # intermediateFolder - folder for the per year .npz files ('{place}_{year}.npz'), None no intermediate files
+    # expectedYears - number of years per place - the place table is built (and the year arrays released) as soon as a place has all its years,
+    # i.e. incrementally while the remaining places download, None the place tables are built by 'assemble'
+    def __init__(self, scale=10.0, intermediateFolder=None, expectedYears=None):
+
+        self.scale = scale
+        self.intermediateFolder = intermediateFolder
+        self.expectedYears = expectedYears
+        self.years = {}   #Year arrays by place and year
+        self.places = {}  #Site name, field name and daily/monthly by place
+        self.placeTables = {}  #Completed place tables by place ('expectedYears')
+        self.lock = threading.Lock()
+
+        if intermediateFolder is not None:
+            os.makedirs(intermediateFolder, exist_ok=True)
+
+    # Add the year arrays of a place (thread safe)
+    # Input: place - extraction name, siteName - output 'SiteName', fieldName - output field (e.g. 'deficit_CCSM4_rcp45'), d_or_m - 'daily'|'monthly',
+    # year - year, arrays - 'parse_NCSSPoint' output
+    def addYear(self, place, siteName, fieldName, d_or_m, year, arrays):
+
+        if self.intermediateFolder is not None:
+            save_YearArrays(os.path.join(self.intermediateFolder, place + "_" + str(year) + ".npz"), arrays)
+
+        with self.lock:
+            self.places[place] = {"siteName": siteName, "fieldName": fieldName, "d_or_m": d_or_m}
+            self.years.setdefault(place, {})[year] = arrays
+            complete = self.expectedYears is not None and len(self.years[place]) == self.expectedYears
+
+        # Place has all its years - build the place table now (in the calling thread) and release the year arrays
+        if complete:
+            placeTable = self.define_PlaceTable(place)
+            with self.lock:
+                self.placeTables[place] = placeTable
+                del self.years[place]
+
+    # Function defines the table of a place - 'SiteName', 'time', latitude, longitude and the place's field, years in order
+    def define_PlaceTable(self, place):
+
+        if place in self.placeTables:
+            return self.placeTables[place]
+
+        placeInfo = self.places[place]
+        yearArrays = [self.years[place][year] for year in sorted(self.years[place])]
+        fields = yearArrays[0]["fields"]
+        time = np.concatenate([arrays["time"] for arrays in yearArrays])
+        timeFormat = dailyTimeFormat if placeInfo["d_or_m"] == "daily" else monthlyTimeFormat
+
+        return pd.DataFrame({"SiteName": placeInfo["siteName"],
+                             "time": pd.DatetimeIndex(time).strftime(timeFormat),
+                             fields[1]: np.concatenate([arrays["latitude"] for arrays in yearArrays]),
+                             fields[2]: np.concatenate([arrays["longitude"] for arrays in yearArrays]),
+                             placeInfo["fieldName"]: np.concatenate([arrays["value"] for arrays in yearArrays]) / self.scale})
+
+    # Function assembles the final table - one record per site and date of the first field, one field per parameter/model/scenario (latitude and
+    # longitude from the first field, remaining fields aligned on 'SiteName' and 'time', see 'define_WideTable')
+    # Input: placeList - places to include (order of the records), fieldList - field order (e.g. the extractor 'paraModelScenarioList')
+    # trackMemory - True traces the peak memory of the assembly (see 'define_WideTable')
+    # Output - tuple (Data Frame, 'define_WideTable' stats)
+    def assemble(self, placeList, fieldList, trackMemory=False):
+
+        fieldList = [fieldName for fieldName in fieldList if any(place in self.places and self.places[place]["fieldName"] == fieldName
+                                                                 for place in placeList)]
+        if len(fieldList) == 0:
+            raise ValueError("No places extracted")
+
+        # Field table of the places (one field table at a time)
+        def define_FieldTable(fieldName):
+            placeTables = [self.define_PlaceTable(place) for place in placeList if place in self.places and self.places[place]["fieldName"] == fieldName]
+            return pd.concat(placeTables, ignore_index=True)
+
+        baseTable = define_FieldTable(fieldList[0])
+        return define_WideTable(baseTable, fieldList[1:], (define_FieldTable(fieldName) for fieldName in fieldList[1:]), trackMemory=trackMemory)
@@ -0,0 +1,221 @@
+# ---------------------------------------------------------------------------
+# fetch.py
+# Concurrent download engine - runs many (url, outFile) download jobs in a thread pool with a cap on the number of concurrent requests per host,
+# a timeout per request, and retries with exponential backoff and jitter (see 'GCM_wb_thredds_point_extractor_v3.py').
+#
+# Each job is independent - a job which fails after all retries is reported (status 'Failed' with the last error) and does not stop the
+# remaining jobs.  Files are written to a temporary file and renamed when complete so a partial download is never left at 'outFile'.
+
+import http.client
+import os
+import queue
+import random
+import shutil
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from .http_client import FetchClient
+
+# HTTP status codes which are retried - all other HTTP errors (e.g. 404 Not Found) fail without a retry
+retryStatusCodes = (408, 429, 500, 502, 503, 504)
+
+
+# Function downloads 'url' to 'outFile' with urllib (i.e. a new connection per request, see 'http_client.FetchClient' for keep-alive connections)
+# Output - dictionary with the 'bytesTransferred' and 'ttfbSeconds' (time to the response headers)
+def downloadURL(url, outFile, timeout=120):
+
+    startTime = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response, open(outFile + ".tmp", "wb") as outStream:
+            ttfbSeconds = time.perf_counter() - startTime
+            shutil.copyfileobj(response, outStream, 1024 * 1024)
+            byteCount = outStream.tell()
+        os.replace(outFile + ".tmp", outFile)
+    finally:
+        # Failed download - the partial temporary file is removed
+        if os.path.exists(outFile + ".tmp"):
+            os.remove(outFile + ".tmp")
+
+    return {"bytesTransferred": byteCount, "ttfbSeconds": ttfbSeconds}
+
+
+# Function defines the delay prior to retry 'attempt' (0 first retry) - exponential backoff with full jitter, i.e. a random delay between 0 and
+# min(backoffMax, backoffBase * 2 ** attempt) seconds so retries from concurrent requests are spread out
+def define_BackoffSeconds(attempt, backoffBase=1.0, backoffMax=60.0, randomGenerator=random):
+
+    return randomGenerator.uniform(0, min(backoffMax, backoffBase * (2 ** attempt)))
+
+
+# Function defines if a download error is retried (timeouts, connection, socket and protocol errors, and the 'retryStatusCodes' HTTP errors) - other
+# errors (e.g. PermissionError, FileNotFoundError writing 'outFile', or an invalid url) fail without a retry
+def define_IsRetryable(error):
+
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in retryStatusCodes
+    if isinstance(error, urllib.error.ContentTooShortError):
+        return True
+    if isinstance(error, urllib.error.URLError):
+        return isinstance(error.reason, BaseException) and define_IsRetryable(error.reason)
+
+    return isinstance(error, (ConnectionError, TimeoutError, socket.timeout, socket.gaierror, http.client.HTTPException))
+
+
+class HostLimiter:
+
+    # Per host concurrency cap - a semaphore of 'perHostLimit' slots per host (e.g. 'www.yellowstone.solutions')
+    def __init__(self, perHostLimit):
+
+        self.perHostLimit = perHostLimit
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    # Semaphore for the host of 'url'
+    def semaphore(self, url):
+
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.perHostLimit)
+            return self.semaphores[host]
+
+
+# Function runs one download job with retries - the host slot is only held while a request is active (i.e. not during the backoff delay or
+# 'completeFunction')
+# Output - job report dictionary
+def fetchJob(job, hostLimiter, timeout, retries, backoffBase, backoffMax, downloadFunction, randomGenerator, sleepFunction, completeFunction=None):
+
+    report = {"key": job.get("key"), "url": job["url"], "outFile": job["outFile"], "status": "Failed", "attempts": 0, "seconds": None, "bytes": None,
+              "ttfbSeconds": None, "error": None}
+    startTime = time.perf_counter()
+
+    for attempt in range(retries):
+        report["attempts"] = attempt + 1
+        try:
+            with hostLimiter.semaphore(job["url"]):
+                stats = downloadFunction(job["url"], job["outFile"], timeout)
+            report["bytes"] = stats["bytesTransferred"]
+            report["ttfbSeconds"] = stats["ttfbSeconds"]
+            report["status"] = "Success"
+            report["error"] = None
+            break
+        except Exception as error:
+            report["error"] = type(error).__name__ + ": " + str(error)
+            if not define_IsRetryable(error) or attempt == retries - 1:
+                break
+            sleepFunction(define_BackoffSeconds(attempt, backoffBase, backoffMax, randomGenerator))
+
+    # Host slot released - e.g. a blocking hand off of the response body does not hold a request slot
+    if report["status"] == "Success" and completeFunction is not None:
+        completeFunction(job, stats)
+
+    report["seconds"] = time.perf_counter() - startTime
+    return report
+
+
+# Function runs the download jobs concurrently
+# Input:
+# jobs - list of dictionaries with the 'url' and 'outFile' (and optional 'key' returned in the report, e.g. (place, year))
+# maxWorkers - maximum number of concurrent jobs
+# perHostLimit - maximum number of concurrent requests per host
+# timeout - per request timeout (seconds)
+# retries - maximum number of attempts per job
+# backoffBase, backoffMax - exponential backoff base and maximum delay (seconds) between attempts (see 'define_BackoffSeconds')
+# downloadFunction - function(url, outFile, timeout) returning a dictionary with the 'bytesTransferred' and 'ttfbSeconds' (e.g. 'downloadURL', or a
+# function streaming the response into a parser), default None downloads with 'fetchClient'
+# fetchClient - 'http_client.FetchClient' (keep-alive connections, gzip) used when 'downloadFunction' is None, None a new client
+# seed - random seed of the backoff jitter, None varies by run
+# completeFunction - function(job, result) called with the 'downloadFunction' result of a successful job after the host slot is released, None no call
+# Output - list of job reports in 'jobs' order with the 'key', 'url', 'outFile', 'status' ('Success'|'Failed'), 'attempts', 'seconds', 'bytes'
+# (bytes transferred), 'ttfbSeconds' (time to first byte) and 'error' (last error when failed)
+def runFetchJobs(jobs, maxWorkers=16, perHostLimit=4, timeout=120, retries=5, backoffBase=1.0, backoffMax=60.0, downloadFunction=None, seed=None,
+                 sleepFunction=time.sleep, fetchClient=None, completeFunction=None):
+
+    if downloadFunction is None:
+        fetchClient = fetchClient if fetchClient is not None else FetchClient(timeout)
+        downloadFunction = lambda url, outFile, requestTimeout: fetchClient.download(url, outFile)
+
+    hostLimiter = HostLimiter(perHostLimit)
+    randomGenerator = random.Random(seed)
+
+    with ThreadPoolExecutor(max_workers=max(1, maxWorkers)) as fetchExecutor:
+        futures = [fetchExecutor.submit(fetchJob, job, hostLimiter, timeout, retries, backoffBase, backoffMax, downloadFunction, randomGenerator,
+                                        sleepFunction, completeFunction) for job in jobs]
+        return [future.result() for future in futures]
+
+
+# Function runs the download jobs concurrently with the parsing of the responses overlapped (producer/consumer) - download workers read each response
+# body and put it on a bounded queue consumed by 'parseWorkers' threads, so the network is kept busy while responses are parsed and the parsers
+# work while requests wait on the network.  A full queue blocks the download workers (backpressure), so at most 'queueSize' bodies wait in memory.
+# Input:
+# jobs, maxWorkers, perHostLimit, timeout, retries, backoffBase, backoffMax, seed, sleepFunction - see 'runFetchJobs'
+# consumeFunction - function(job, body) parsing the response body (bytes) of a job (e.g. parse and add to an 'extract.ExtractionAssembler')
+# parseWorkers - number of consumer threads
+# queueSize - maximum number of response bodies waiting on the queue
+# fetchClient - 'http_client.FetchClient', None a new client
+# Output - tuple (list of job reports (see 'runFetchJobs') - a job whose consumer failed has status 'Failed' and the consumer error, dictionary with
+# the pipeline stats - 'queueHighWater' (most bodies waiting), 'producerWaitSeconds' (download workers blocked on a full queue), 'consumerSeconds'
+# (consumer busy time), 'seconds' (wall time))
+def runFetchPipeline(jobs, consumeFunction, maxWorkers=16, perHostLimit=4, timeout=120, retries=5, parseWorkers=2, queueSize=32, backoffBase=1.0,
+                     backoffMax=60.0, seed=None, sleepFunction=time.sleep, fetchClient=None):
+
+    fetchClient = fetchClient if fetchClient is not None else FetchClient(timeout)
+    workQueue = queue.Queue(maxsize=max(1, queueSize))
+    statsLock = threading.Lock()
+    stats = {"queueHighWater": 0, "producerWaitSeconds": 0.0, "consumerSeconds": 0.0, "seconds": None}
+    consumeErrors = {}
+    startTime = time.perf_counter()
+
+    # Producer - read the response body (within the host slot)
+    def downloadFunction(url, outFile, requestTimeout):
+        with fetchClient.open(url) as response:
+            body = response.read()
+        return dict(response.stats, body=body)
+
+    # Producer - queue the body after the host slot is released (blocks while the queue is full)
+    def queueFunction(job, result):
+        waitStart = time.perf_counter()
+        workQueue.put((job, result.pop("body")))
+        with statsLock:
+            stats["producerWaitSeconds"] += time.perf_counter() - waitStart
+            stats["queueHighWater"] = max(stats["queueHighWater"], workQueue.qsize())
+
+    # Consumer - parse the queued bodies until the end marker (None)
+    def consumeWorker():
+        while True:
+            item = workQueue.get()
+            if item is None:
+                break
+            job, body = item
+            consumeStart = time.perf_counter()
+            try:
+                consumeFunction(job, body)
+            except Exception as error:
+                with statsLock:
+                    consumeErrors[job["outFile"]] = type(error).__name__ + ": " + str(error)
+            with statsLock:
+                stats["consumerSeconds"] += time.perf_counter() - consumeStart
+
+    consumers = [threading.Thread(target=consumeWorker, daemon=True) for workerCount in range(max(1, parseWorkers))]
+    for consumer in consumers:
+        consumer.start()
+    try:
+        reports = runFetchJobs(jobs, maxWorkers, perHostLimit, timeout, retries, backoffBase, backoffMax, downloadFunction, seed, sleepFunction,
+                               completeFunction=queueFunction)
+    finally:
+        for consumer in consumers:
+            workQueue.put(None)
+        for consumer in consumers:
+            consumer.join()
+
+    for report in reports:
+        if report["status"] == "Success" and report["outFile"] in consumeErrors:
+            report["status"] = "Failed"
+            report["error"] = consumeErrors[report["outFile"]]
+
+    stats["seconds"] = time.perf_counter() - startTime
+    return reports, stats
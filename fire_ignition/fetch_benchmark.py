@@ -0,0 +1,210 @@
+# ---------------------------------------------------------------------------
+# fetch_benchmark.py
+# Offline benchmark of the THREDDS (NCSS) download engine of 'GCM_wb_thredds_point_extractor_v3.py' against the local stand-in server
+# ('ncss_server.py') - no network is required, and the server latency, failure rate and bandwidth are the same on every run, so the throughput of
+# the concurrency, retry, response format and caching settings can be measured and compared between versions.
+#
+# Each scenario downloads and parses the same daily point requests (sites x models x scenarios x years) with its settings:
+# - maxWorkers, perHostLimit - concurrent downloads (see 'fetch.runFetchJobs')
+# - parseWorkers - 0 parse each response as it streams in (download worker), > 0 pipelined parse workers (see 'fetch.runFetchPipeline')
+# - responseFormat - 'CSV'|'NetCDF'
+# - failureRate, failFirstAttempts - server outages (503), retried with backoff
+# - cache - None no download cache, 'Cold' an empty cache each repeat, 'Warm' a cache filled before the timed repeats (see 'cache.DownloadCache')
+# - latency, bandwidth - override the benchmark's server latency/bandwidth
+# Results are written to a .json report (same layout as 'benchmark.runBenchmark' - one stage per scenario) - compare a report to a baseline report
+# with 'benchmark.compareBenchmarkReports'.
+#
+# Example:
+#   report = runFetchBenchmark(r"C:\ROMN\Climate\Benchmark\workspace", siteCount=4, years=range(2030, 2040), latency=0.05)
+
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from .benchmark import define_Environment, define_StageStatistics
+from .cache import DownloadCache
+from .extract import parse_NCSSPoint
+from .fetch import runFetchJobs, runFetchPipeline
+from .http_client import FetchClient
+from .ncss_server import NCSSServer, define_LocalURL
+from .netcdf import parse_NCSSPointNetCDF
+
+# NCSS daily point request of the extractor ('daily_url')
+ncssDailyURL = 'http://www.yellowstone.solutions/thredds/ncss/daily_or_monthly/gcm/{scenario}/{model}/V_1_5_{year}_{model}_{scenario}_{param}.nc4?var={param}&latitude={lat}&longitude={lon}&time_start={year}-01-01T00%3A00%3A00Z&time_end={next_year}-01-01T00%3A00%3A00Z&accept=csv_file'
+
+# Default scenarios - one download at a time, concurrent, pipelined, NetCDF, retries of a failing server, and cold/warm download cache
+defaultScenarios = [{"name": "sequential", "maxWorkers": 1, "perHostLimit": 1},
+                    {"name": "concurrent", "maxWorkers": 16, "perHostLimit": 8},
+                    {"name": "pipelined", "maxWorkers": 16, "perHostLimit": 8, "parseWorkers": 2},
+                    {"name": "netcdf", "maxWorkers": 16, "perHostLimit": 8, "parseWorkers": 2, "responseFormat": "NetCDF"},
+                    {"name": "retry", "maxWorkers": 16, "perHostLimit": 8, "failureRate": 0.1},
+                    {"name": "cacheCold", "maxWorkers": 16, "perHostLimit": 8, "cache": "Cold"},
+                    {"name": "cacheWarm", "maxWorkers": 16, "perHostLimit": 8, "cache": "Warm"}]
+
+# Default sites - points 0.25 degrees apart (separate grid cells) from Rocky Mountain National Park
+defaultLatitude = 40.3
+defaultLongitude = -105.6
+
+
+# Function defines the benchmark download jobs - one daily request per site, model, scenario and year
+# Input: baseURL - stand-in server url, sites - list of (lat, lon), models, scenarios, years, param - request parameter, responseFormat - 'CSV'|'NetCDF'
+# Output - list of jobs (see 'fetch.runFetchJobs') - 'outFile' is a unique job name (responses are parsed, not written)
+def define_BenchmarkJobs(baseURL, sites, models, scenarios, years, param='Deficit', responseFormat='CSV', urlTemplate=ncssDailyURL):
+
+    jobs = []
+    for siteCount, (lat, lon) in enumerate(sites):
+        for model in models:
+            for scenario in scenarios:
+                for year in years:
+                    url = define_LocalURL(urlTemplate.format(scenario=scenario, model=model, year=year, param=param, lat=lat, lon=lon,
+                                                             next_year=year + 1), baseURL)
+                    if responseFormat.lower() == 'netcdf':
+                        url = url.replace('accept=csv_file', 'accept=netcdf')
+                    jobs.append({"key": (siteCount, model, scenario, year), "url": url,
+                                 "outFile": "site" + str(siteCount) + "_" + model + "_" + scenario + "_" + str(year)})
+
+    return jobs
+
+
+# Function runs the jobs of one scenario once
+# Input:
+# jobs - download jobs (see 'define_BenchmarkJobs')
+# scenario - scenario dictionary (see above)
+# downloadCache - 'cache.DownloadCache' of the scenario, None no cache
+# timeout, retries, backoffBase, backoffMax, seed - see 'fetch.runFetchJobs'
+# Output - dictionary with the 'seconds', 'jobs', 'downloaded', 'failed', 'cacheHits', 'attempts', 'retries', 'records' (parsed records),
+# 'requestsPerSecond', 'megabytesPerSecond' (bytes transferred per second), the fetch client summary ('client') and the pipeline stats ('pipeline')
+def runFetchScenario(jobs, scenario, downloadCache=None, timeout=120, retries=5, backoffBase=0.05, backoffMax=1.0, seed=0):
+
+    parseFunction = parse_NCSSPointNetCDF if scenario.get("responseFormat", "CSV").lower() == 'netcdf' else parse_NCSSPoint
+    fetchClient = FetchClient(timeout)
+    jobsByOutFile = {job["outFile"]: job for job in jobs}
+    countLock = threading.Lock()
+    counts = {"records": 0}
+
+    # Parse a response stream (written to the download cache while parsed)
+    def consume(job, source):
+        if downloadCache is None:
+            arrays = parseFunction(source)
+        else:
+            with downloadCache.writer(job["url"], source) as cacheStream:
+                arrays = parseFunction(cacheStream)
+                cacheStream.commit()
+        with countLock:
+            counts["records"] += len(arrays["time"])
+
+    startTime = time.perf_counter()
+
+    # Cached requests are parsed from the cache
+    fetchJobs = []
+    for job in jobs:
+        cachedFile = downloadCache.get(job["url"]) if downloadCache is not None else None
+        if cachedFile is None:
+            fetchJobs.append(job)
+        else:
+            with open(cachedFile, "rb") as cachedStream:
+                consume(job, cachedStream)
+            downloadCache.release(job["url"])
+
+    pipelineStats = None
+    if scenario.get("parseWorkers", 0) > 0:
+        reports, pipelineStats = runFetchPipeline(fetchJobs, lambda job, body: consume(job, io.BytesIO(body)), scenario.get("maxWorkers", 16),
+                                                  scenario.get("perHostLimit", 4), timeout, retries, scenario["parseWorkers"],
+                                                  scenario.get("parseQueueSize", 32), backoffBase, backoffMax, seed, fetchClient=fetchClient)
+    else:
+        # Parse each response as it streams in
+        def downloadFunction(url, outFile, requestTimeout):
+            with fetchClient.open(url) as response:
+                consume(jobsByOutFile[outFile], response)
+            return response.stats
+
+        reports = runFetchJobs(fetchJobs, scenario.get("maxWorkers", 16), scenario.get("perHostLimit", 4), timeout, retries, backoffBase, backoffMax,
+                               downloadFunction, seed)
+
+    seconds = time.perf_counter() - startTime
+    fetchClient.close()
+    clientSummary = fetchClient.summary()
+    downloaded = sum(1 for report in reports if report["status"] == "Success")
+    attempts = sum(report["attempts"] for report in reports)
+
+    return {"seconds": seconds, "jobs": len(jobs), "downloaded": downloaded, "failed": len(reports) - downloaded, "cacheHits": len(jobs) - len(fetchJobs),
+            "attempts": attempts, "retries": attempts - len(reports), "records": counts["records"],
+            "requestsPerSecond": len(reports) / seconds if seconds > 0 else 0.0,
+            "megabytesPerSecond": clientSummary["bytesTransferred"] / 1048576.0 / seconds if seconds > 0 else 0.0, "client": clientSummary,
+            "pipeline": pipelineStats}
+
+
+# Function runs the fetch benchmark - starts the stand-in server, runs each scenario 'repeats' times and writes the report
+# Input:
+# workspace - folder for the scenario download caches
+# siteCount - number of sites (0.25 degrees apart from 'defaultLatitude'/'defaultLongitude')
+# models, scenarios, years - requests per site (one per model, scenario and year)
+# benchmarkScenarios - list of scenario dictionaries (see above), None 'defaultScenarios'
+# latency, bandwidth - server seconds before each response and bytes per second per response (None unlimited), unless set by a scenario
+# gzipResponses - True the server gzips the responses
+# repeats - number of times each scenario is run
+# timeout, retries, backoffBase, backoffMax - see 'fetch.runFetchJobs'
+# outFile - .json report file, None no file
+# seed - random seed of the server failures and the backoff jitter
+# Output - report dictionary ('created', 'environment', 'parameters', 'records', 'stages' - per scenario the seconds statistics (see
+# 'benchmark.define_StageStatistics') and the results of the last repeat (see 'runFetchScenario') with the server summary ('server'))
+def runFetchBenchmark(workspace, siteCount=4, models=('CCSM4', 'MIROC5'), scenarios=('rcp45', 'rcp85'), years=range(2030, 2035), benchmarkScenarios=None,
+                      latency=0.02, bandwidth=None, gzipResponses=True, repeats=3, timeout=30, retries=5, backoffBase=0.05, backoffMax=1.0, outFile=None,
+                      seed=0):
+
+    benchmarkScenarios = defaultScenarios if benchmarkScenarios is None else benchmarkScenarios
+    os.makedirs(workspace, exist_ok=True)
+    sites = [(round(defaultLatitude + 0.25 * (count // 4), 4), round(defaultLongitude + 0.25 * (count % 4), 4)) for count in range(siteCount)]
+
+    server = NCSSServer(latency=latency, bandwidth=bandwidth, gzipResponses=gzipResponses, seed=seed)
+    baseURL = server.start()
+    stages = {}
+    try:
+        for scenario in benchmarkScenarios:
+            jobs = define_BenchmarkJobs(baseURL, sites, models, scenarios, years, responseFormat=scenario.get("responseFormat", "CSV"))
+            cacheFolder = os.path.join(workspace, "DownloadCache_" + scenario["name"])
+            if os.path.exists(cacheFolder):
+                shutil.rmtree(cacheFolder)
+
+            def configureServer():
+                server.configure(scenario.get("latency", latency), scenario.get("failureRate", 0.0), scenario.get("failFirstAttempts", 0),
+                                 scenario.get("bandwidth", bandwidth), gzipResponses, seed)
+
+            # Warm cache - filled by an untimed run
+            if scenario.get("cache") == "Warm":
+                configureServer()
+                runFetchScenario(jobs, scenario, DownloadCache(cacheFolder), timeout, retries, backoffBase, backoffMax, seed)
+
+            secondsList = []
+            for repeat in range(repeats):
+                if scenario.get("cache") == "Cold" and os.path.exists(cacheFolder):
+                    shutil.rmtree(cacheFolder)
+                downloadCache = DownloadCache(cacheFolder) if scenario.get("cache") in ("Cold", "Warm") else None
+                configureServer()
+                result = runFetchScenario(jobs, scenario, downloadCache, timeout, retries, backoffBase, backoffMax, seed)
+                result["server"] = server.summary()
+                secondsList.append(result["seconds"])
+
+            stage = define_StageStatistics(secondsList)
+            stage["scenario"] = dict(scenario)
+            stage["lastRun"] = result
+            stages[scenario["name"]] = stage
+    finally:
+        server.stop()
+
+    report = {"created": datetime.now().isoformat(), "environment": define_Environment(),
+              "parameters": {"siteCount": siteCount, "models": list(models), "scenarios": list(scenarios), "years": [min(years), max(years)],
+                             "latency": latency, "bandwidth": bandwidth, "gzipResponses": gzipResponses, "repeats": repeats, "timeout": timeout,
+                             "retries": retries, "backoffBase": backoffBase, "backoffMax": backoffMax, "seed": seed},
+              "records": {"requests": siteCount * len(models) * len(scenarios) * len(years)},
+              "stages": stages}
+
+    if outFile is not None:
+        with open(outFile, "w") as outJSON:
+            json.dump(report, outJSON, indent=2)
+
+    return report
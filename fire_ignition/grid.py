@@ -0,0 +1,124 @@
+# ---------------------------------------------------------------------------
+# grid.py
+# Water Balance grid cell lookup for the THREDDS point requests (see 'GCM_wb_thredds_point_extractor_v3.py').  The NCSS point request returns the
+# grid cell nearest the requested latitude/longitude, so sites in the same (~4 km) cell return identical data.  Points are snapped to their cell
+# with the dataset's latitude and longitude axes (NCSS 'dataset.xml') and grouped so one request per cell is made and fanned out to each site.
+
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from .http_client import FetchClient
+
+
+# Function defines the NCSS dataset description URL ('dataset.xml') of an NCSS request URL
+def define_DatasetURL(requestURL):
+
+    parts = urllib.parse.urlsplit(requestURL)
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip("/") + "/dataset.xml", "", ""))
+
+
+# Function defines the coordinate values of an NCSS 'dataset.xml' axis element - regular axes ('start', 'increment', 'npts' attributes) or a
+# list of values
+def define_AxisValues(axisElement):
+
+    valuesElement = axisElement.find("values")
+    if valuesElement is None:
+        raise ValueError("Axis without values - " + str(axisElement.get("name")))
+
+    if valuesElement.get("start") is not None and valuesElement.get("increment") is not None:
+        npts = int(valuesElement.get("npts") or axisElement.get("shape"))
+        return float(valuesElement.get("start")) + float(valuesElement.get("increment")) * np.arange(npts)
+
+    return np.array([float(value) for value in (valuesElement.text or "").split()])
+
+
+# Function parses the latitude and longitude axes from an NCSS 'dataset.xml'
+# Output - dictionary with the 'lat' and 'lon' numpy coordinate arrays
+def parse_GridAxes(xmlText):
+
+    root = ET.fromstring(xmlText)
+    axes = {}
+    for axisElement in root.iter("axis"):
+        axisType = (axisElement.get("axisType") or "").lower()
+        if axisType in ("lat", "lon") and axisType not in axes:
+            axes[axisType] = define_AxisValues(axisElement)
+
+    if "lat" not in axes or "lon" not in axes:
+        raise ValueError("Latitude/Longitude axes not found in the dataset description")
+
+    return axes
+
+
+# Function downloads and parses the latitude and longitude axes of an NCSS dataset
+# Input: datasetURL - 'dataset.xml' URL (see 'define_DatasetURL'), fetchClient - 'http_client.FetchClient', None a new client
+# Output - dictionary with the 'lat' and 'lon' numpy coordinate arrays
+def fetchGridAxes(datasetURL, fetchClient=None, timeout=120):
+
+    fetchClient = fetchClient if fetchClient is not None else FetchClient(timeout)
+    body, stats = fetchClient.get(datasetURL)
+    return parse_GridAxes(body)
+
+
+# Function defines the index of the axis coordinate nearest 'value'
+# Output - index, None if 'value' is outside the axis (more than half a cell beyond the first/last coordinate) or not a number
+def define_AxisIndex(values, value):
+
+    if value is None or value != value or len(values) == 0:
+        return None
+
+    index = int(np.abs(values - value).argmin())
+    halfCell = abs(values[1] - values[0]) / 2.0 if len(values) > 1 else 0.0
+    if abs(values[index] - value) > halfCell + 1e-9:
+        return None
+
+    return index
+
+
+# Function defines the grid cell (latitude index, longitude index) of a point, None if the point is outside the grid
+def define_GridCell(lat, lon, axes):
+
+    lonValues = axes["lon"]
+    try:
+        lon = float(lon)
+        lat = float(lat)
+    except (TypeError, ValueError):
+        return None
+
+    # Longitude axis 0 to 360
+    if len(lonValues) > 0 and lonValues.max() > 180 and lon < 0:
+        lon = lon + 360.0
+
+    latIndex = define_AxisIndex(axes["lat"], lat)
+    lonIndex = define_AxisIndex(lonValues, lon)
+    if latIndex is None or lonIndex is None:
+        return None
+
+    return latIndex, lonIndex
+
+
+# Function groups points requesting the same data from the same grid cell
+# Input:
+# points - dictionary by point name of tuples (lat, lon, requestKey) - 'requestKey' identifies the dataset (e.g. (d_or_m, param, model, scenario))
+# axes - dictionary with the 'lat' and 'lon' coordinate arrays (see 'fetchGridAxes'), None no grouping
+# Output - dictionary by representative point name (first point of the cell in 'points' order) of the list of point names in the cell (representative
+# first).  Points outside the grid are their own group.
+def define_CellGroups(points, axes):
+
+    groups = {}
+    representativeByCell = {}
+    for name, (lat, lon, requestKey) in points.items():
+        cell = define_GridCell(lat, lon, axes) if axes is not None else None
+        if cell is None:
+            groups[name] = [name]
+            continue
+
+        cellKey = (cell, requestKey)
+        if cellKey in representativeByCell:
+            groups[representativeByCell[cellKey]].append(name)
+        else:
+            representativeByCell[cellKey] = name
+            groups[name] = [name]
+
+    return groups
@@ -0,0 +1,296 @@
+# ---------------------------------------------------------------------------
+# http_client.py
+# Shared HTTP fetch client for the THREDDS (NCSS) and Climate Analyzer requests - reuses keep-alive connections per host, requests gzip transfer
+# encoding, and streams the response body (decompressed on the fly) straight into the parser (e.g. 'pd.read_csv(response)') without a temporary
+# file.  Bytes transferred and time to first byte are recorded per request.
+#
+# Connections are held per thread (i.e. one keep-alive connection per host per thread), so one client can be shared by a thread pool (see
+# 'fetch.runFetchJobs').
+#
+# Example:
+#   client = FetchClient()
+#   with client.open(url) as response:
+#       df = pd.read_csv(response)
+#   print(response.stats, client.summary())
+
+import http.client
+import io
+import os
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+
+# Errors raised when a kept-alive connection was closed by the server - the request is retried once on a new connection
+staleConnectionErrors = (http.client.RemoteDisconnected, http.client.CannotSendRequest, http.client.BadStatusLine, BrokenPipeError,
+                         ConnectionResetError, ConnectionAbortedError)
+
+redirectStatusCodes = (301, 302, 303, 307, 308)
+
+
+class FetchResponse(io.RawIOBase):
+
+    # Readable binary stream of the response body - gzip content is decompressed as it is read.  'stats' is completed when the body has been read
+    # or the stream is closed.
+    def __init__(self, client, connectionKey, connection, response, stats, startTime):
+
+        super().__init__()
+        self.client = client
+        self.connectionKey = connectionKey
+        self.connection = connection
+        self.response = response
+        self.stats = stats
+        self.startTime = startTime
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if stats["contentEncoding"] == "gzip" else None
+        self.pending = b""
+        self.pendingOffset = 0   #Bytes of 'pending' already returned (i.e. the block is not copied per read)
+        self.finished = False
+
+    def readable(self):
+
+        return True
+
+    # Read the next block of the (decompressed) body
+    def readBlock(self):
+
+        while not self.finished:
+            data = self.response.read(self.client.blockSize)
+            if not data:
+                # Connection closed before the Content-Length bytes (a truncated body is not returned as complete)
+                if self.response.length:
+                    raise http.client.IncompleteRead(b"", self.response.length)
+                if self.decompressor is not None:
+                    tail = self.decompressor.flush()
+                    self.stats["bytesDecoded"] += len(tail)
+                    self.finishResponse()
+                    if tail:
+                        return tail
+                else:
+                    self.finishResponse()
+                return b""
+
+            self.stats["bytesTransferred"] += len(data)
+            if self.decompressor is not None:
+                data = self.decompressor.decompress(data)
+            self.stats["bytesDecoded"] += len(data)
+            if data:
+                return data
+
+        return b""
+
+    def readinto(self, buffer):
+
+        if self.pendingOffset >= len(self.pending):
+            self.pending = self.readBlock()
+            self.pendingOffset = 0
+            if not self.pending:
+                return 0
+
+        count = min(len(buffer), len(self.pending) - self.pendingOffset)
+        buffer[:count] = memoryview(self.pending)[self.pendingOffset:self.pendingOffset + count]
+        self.pendingOffset += count
+        return count
+
+    # Read the rest of the body - the remaining blocks are joined once
+    def readall(self):
+
+        blocks = [self.pending[self.pendingOffset:]]
+        self.pending = b""
+        self.pendingOffset = 0
+        while True:
+            block = self.readBlock()
+            if not block:
+                return b"".join(blocks)
+            blocks.append(block)
+
+    # Body read to the end - the connection is kept for the next request to the host
+    def finishResponse(self):
+
+        if self.finished:
+            return
+        self.finished = True
+        self.stats["seconds"] = time.perf_counter() - self.startTime
+        self.stats["complete"] = True
+        self.client.releaseConnection(self.connectionKey, self.connection, self.response.will_close)
+        self.client.recordStats(self.stats)
+
+    def close(self):
+
+        if not self.finished:
+            # Body not read to the end - the connection cannot be reused
+            self.finished = True
+            self.stats["seconds"] = time.perf_counter() - self.startTime
+            self.connection.close()
+            self.client.recordStats(self.stats)
+        super().close()
+
+
+class FetchClient:
+
+    # Input:
+    # timeout - socket timeout (seconds) per request
+    # userAgent - User-Agent request header
+    # blockSize - bytes read from the connection per block
+    # maxRedirects - maximum number of redirects followed
+    def __init__(self, timeout=120, userAgent="fire_ignition", blockSize=256 * 1024, maxRedirects=5):
+
+        self.timeout = timeout
+        self.userAgent = userAgent
+        self.blockSize = blockSize
+        self.maxRedirects = maxRedirects
+
+        self.local = threading.local()   #Keep-alive connections by (scheme, host) for the current thread
+        self.lock = threading.Lock()
+        self.requestStats = []           #Stats of the completed requests
+        self.connectionsOpened = 0
+
+    # Keep-alive connections of the current thread
+    def connections(self):
+
+        if not hasattr(self.local, "connections"):
+            self.local.connections = {}
+        return self.local.connections
+
+    # Connection for (scheme, host) - existing keep-alive connection or a new connection.  Output - tuple (connection, reused)
+    def acquireConnection(self, connectionKey):
+
+        connection = self.connections().pop(connectionKey, None)
+        if connection is not None and connection.sock is not None:
+            return connection, True
+
+        scheme, host = connectionKey
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(host, timeout=self.timeout)
+        else:
+            connection = http.client.HTTPConnection(host, timeout=self.timeout)
+        with self.lock:
+            self.connectionsOpened += 1
+        return connection, False
+
+    # Return the connection to the current thread's pool (closed if the server will close it)
+    def releaseConnection(self, connectionKey, connection, willClose):
+
+        if willClose:
+            connection.close()
+        else:
+            self.connections()[connectionKey] = connection
+
+    def recordStats(self, stats):
+
+        with self.lock:
+            self.requestStats.append(stats)
+
+    # Send the GET request - a stale keep-alive connection is retried once on a new connection
+    # Output - tuple (connection, response, reused, ttfbSeconds)
+    def sendRequest(self, connectionKey, path):
+
+        headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive", "User-Agent": self.userAgent}
+        for attempt in range(2):
+            connection, reused = self.acquireConnection(connectionKey)
+            requestStart = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                return connection, response, reused, time.perf_counter() - requestStart
+            except staleConnectionErrors:
+                connection.close()
+                if not reused or attempt == 1:
+                    raise
+            except Exception:
+                connection.close()
+                raise
+
+    # Open 'url' - Output - FetchResponse (readable binary stream of the decompressed body, see 'FetchResponse.stats')
+    # HTTP errors raise 'urllib.error.HTTPError' (see 'fetch.define_IsRetryable')
+    def open(self, url):
+
+        startTime = time.perf_counter()
+        for redirect in range(self.maxRedirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            connectionKey = (parts.scheme.lower(), parts.netloc.lower())
+            path = parts.path or "/"
+            if parts.query:
+                path = path + "?" + parts.query
+
+            connection, response, reused, ttfbSeconds = self.sendRequest(connectionKey, path)
+
+            if response.status in redirectStatusCodes and response.getheader("Location"):
+                response.read()
+                self.releaseConnection(connectionKey, connection, response.will_close)
+                url = urllib.parse.urljoin(url, response.getheader("Location"))
+                continue
+
+            if response.status >= 400:
+                body = response.read()
+                self.releaseConnection(connectionKey, connection, response.will_close)
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+
+            stats = {"url": url, "status": response.status, "reusedConnection": reused, "redirects": redirect, "ttfbSeconds": ttfbSeconds,
+                     "seconds": None, "bytesTransferred": 0, "bytesDecoded": 0, "contentEncoding": (response.getheader("Content-Encoding") or "").lower(),
+                     "complete": False}
+            return FetchResponse(self, connectionKey, connection, response, stats, startTime)
+
+        raise urllib.error.URLError("Too many redirects - " + url)
+
+    # Read the full (decompressed) body of 'url'.  Output - tuple (bytes, stats)
+    def get(self, url):
+
+        with self.open(url) as response:
+            body = response.read()
+        return body, response.stats
+
+    # Download 'url' to 'outFile' (written to a temporary file and renamed when complete).  Output - stats
+    def download(self, url, outFile):
+
+        try:
+            with self.open(url) as response, open(outFile + ".tmp", "wb") as outStream:
+                while True:
+                    block = response.read(self.blockSize)
+                    if not block:
+                        break
+                    outStream.write(block)
+            os.replace(outFile + ".tmp", outFile)
+        finally:
+            # Failed download - the partial temporary file is removed
+            if os.path.exists(outFile + ".tmp"):
+                os.remove(outFile + ".tmp")
+        return response.stats
+
+    # Close the keep-alive connections of the current thread
+    def close(self):
+
+        for connection in self.connections().values():
+            connection.close()
+        self.connections().clear()
+
+    # Summary of the completed requests - requests, connections opened, reused connections, bytes transferred and decoded, and time to first byte
+    def summary(self):
+
+        with self.lock:
+            statsList = list(self.requestStats)
+            connectionsOpened = self.connectionsOpened
+
+        ttfbList = [stats["ttfbSeconds"] for stats in statsList]
+        return {"requests": len(statsList), "connectionsOpened": connectionsOpened,
+                "reusedConnections": sum(1 for stats in statsList if stats["reusedConnection"]),
+                "bytesTransferred": sum(stats["bytesTransferred"] for stats in statsList),
+                "bytesDecoded": sum(stats["bytesDecoded"] for stats in statsList),
+                "ttfbMeanSeconds": statistics.mean(ttfbList) if ttfbList else None,
+                "ttfbMedianSeconds": statistics.median(ttfbList) if ttfbList else None,
+                "ttfbMaxSeconds": max(ttfbList) if ttfbList else None}
+
+
+sharedClient = None
+sharedClientLock = threading.Lock()
+
+
+# Function returns the process wide shared FetchClient (created on first use)
+def getSharedClient(timeout=120):
+
+    global sharedClient
+    with sharedClientLock:
+        if sharedClient is None:
+            sharedClient = FetchClient(timeout)
+        return sharedClient
@@ -0,0 +1,185 @@
+# ---------------------------------------------------------------------------
+# ignition.py
+# Fire Ignition Potential model routines - Moving Window Average, Percentile against the fire season reference and the Fire Ignition Proportion
+# as defined in Thoma et. al. 2020 Global Ecology Conservation (equations are the Steve Huysman 2023 Fire Ignition Model Version 2.0).
+#
+# Functions are pure - inputs are not modified, no files are read or written, and errors are raised (i.e. not returned as a status string).
+
+import numpy as np
+import pandas as pd
+
+#Fire Year Parameters by Vegetation Type
+nonforest_start_DOY = 79  #Non-Forested Start of Fire Year Day Number
+nonforest_end_DOY = 303   #Non-Forested End of Fire Year Day Number
+forest_start_DOY = 7      #Forest Start of Fire year Day Number
+forest_end_DOY = 301      #Forest End of Fire year Day Number
+
+
+#Non-Forest Equation where percentile is the percentile and f is the percent of historic fires that has ignited under the percentile dryness conditions
+def nonforest_equation(percentile):
+    # f = 0.047 * np.e**(0.075*percentile)  #Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
+    f = 0.0119265 * np.e ** (4.192916 * percentile)  # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
+    return f
+
+#Forest Equation where percentile is the percentile and f is the percent of historic fires that has ignited under the percentile dryness conditions
+def forest_equation(percentile):
+    # f = 0.368 * np.e**(0.055*percentile)  #Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
+    f = 0.0095308 * np.e ** (4.4556479 * percentile)  # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
+    return f
+
+
+# Function derives the Percentile for an array of values against a sorted reference array.
+# Percentile is the count of reference records less than the value divided by the number of reference records.
+# Input:
+# 1. refSorted - numpy array with the reference values sorted ascending (NaN values at the end)
+# 2. totalRecords - Number of records in the reference dataset (i.e. denominator)
+# 3. checkValues - numpy array of values to be evaluated (e.g. Moving Window Averages)
+# Output - numpy array with the Percentile per value, values of NaN are assigned a Percentile of 0
+def define_PercentileSorted(refSorted, totalRecords, checkValues):
+
+    checkValues = np.asarray(checkValues, dtype=float)
+
+    # Count of reference records less than the value via binary search of the sorted reference
+    countLess = np.searchsorted(refSorted, checkValues, side='left')
+
+    # No reference records are less than a NaN value
+    countLess[np.isnan(checkValues)] = 0
+
+    return (countLess / totalRecords) * 100
+
+
+# Function applies the Forest or Non-Forest Fire Ignition equation to an array of percentiles.  The equation is evaluated once per unique
+# percentile on numpy float64 scalars so output matches the record by record evaluation in the scripts exactly.
+# Input:
+# 1. percentile - numpy array (1-D or 2-D) with the Percentile per record
+# 2. equationType - 'Forest' or 'NonForest'
+# Output - numpy array with the Fire Ignition Proportion per record
+def define_IgnitionFromPercentile(percentile, equationType):
+
+    if equationType == "Forest":
+        equationFunction = forest_equation
+    elif equationType == "NonForest":
+        equationFunction = nonforest_equation
+    else:
+        raise ValueError("'equationType' variable - " + str(equationType) + " - is not defined as 'Forest' or 'NonForest'")
+
+    uniquePercentile, uniqueInverse = np.unique(percentile, return_inverse=True)
+    uniqueIgnition = np.array([equationFunction(value) for value in uniquePercentile], dtype=float)
+
+    return uniqueIgnition[uniqueInverse].reshape(np.shape(percentile))
+
+
+# Function to derive the Moving Window Average - min_periods is set to 1 (i.e. only 1 day of data needed)
+# Input:
+# - inDataSet: Data Frame being evaluated (e.g. Historical/Current/NowCast/Future Projections)
+# - movingWindowDays: Moving window number of days prior to the date to be derived
+# - fieldToAverage: Field in the 'inDataSet' being averaged
+# Output - Data Frame (shallow copy of 'inDataSet') with the new field '{fieldToAverage}_{movingWindowDays}'
+def define_MovingWindowAverage(inDataSet, movingWindowDays, fieldToAverage):
+
+    df = inDataSet.copy(deep=False)
+    outField = fieldToAverage + "_" + str(movingWindowDays)
+    df[outField] = df[fieldToAverage].rolling(movingWindowDays, min_periods=1, win_type=None).mean()
+
+    return df
+
+
+# Function to derive the Percentile and Fire Ignition Proportion for all records
+# Input:
+# 1. processDF - Data Frame being processed with the Moving Window Averages
+# 2. processField - Field in 'processDF' with the Moving Window Averages
+# 3. refSorted - Sorted reference values (see 'reference.define_ReferenceSorted' and 'reference.define_ReferenceIndex')
+# 4. percentileField - output Percentile field (e.g. 'PercForest', 'PercNonForest')
+# 5. ignitionPropField - output Fire Ignition Proportion field (e.g. 'PropFiresForest', 'PropFiresNonForest')
+# 6. equationType - 'Forest' or 'NonForest'
+# Output - Data Frame (shallow copy of 'processDF') with the percentile and Fire Ignition Proportion fields
+def define_IgnitionProportion(processDF, processField, refSorted, percentileField, ignitionPropField, equationType):
+
+    percentile = define_PercentileSorted(refSorted, refSorted.shape[0], processDF[processField].to_numpy(dtype=float))
+    outIgnitionPerc = define_IgnitionFromPercentile(percentile, equationType)
+
+    df = processDF.copy(deep=False)
+    df[percentileField] = percentile
+    df[ignitionPropField] = outIgnitionPerc
+
+    return df
+
+
+# Function defines the Forest and Non-Forest fire season records (boolean arrays) from the Day of Year per record
+# endDOYInclusive: True the fire season end day of year is included in the reference (Projections), False excluded (Gridmet station scripts)
+# forestStartDOY, forestEndDOY, nonForestStartDOY, nonForestEndDOY: fire season days of year (default the package fire season definitions)
+def define_FireSeasons(dayOfYear, endDOYInclusive=True, forestStartDOY=forest_start_DOY, forestEndDOY=forest_end_DOY, nonForestStartDOY=nonforest_start_DOY,
+                       nonForestEndDOY=nonforest_end_DOY):
+
+    dayOfYear = np.asarray(dayOfYear)
+    if endDOYInclusive:
+        forestSeason = (dayOfYear >= forestStartDOY) & (dayOfYear <= forestEndDOY)
+        nonForestSeason = (dayOfYear >= nonForestStartDOY) & (dayOfYear <= nonForestEndDOY)
+    else:
+        forestSeason = (dayOfYear >= forestStartDOY) & (dayOfYear < forestEndDOY)
+        nonForestSeason = (dayOfYear >= nonForestStartDOY) & (dayOfYear < nonForestEndDOY)
+
+    return forestSeason, nonForestSeason
+
+
+# Function derives the Moving Window Average, Percentiles and Fire Ignition Proportion for one series (e.g. a GCM and RCP projection) with the
+# series values as the reference
+# Input:
+# - values: numpy array with the daily values
+# - movingWindowDays: Moving window number of days prior to the date to be derived
+# - forestSeason, nonForestSeason: Forest and Non-Forest fire season records (see function 'define_FireSeasons')
+# Output - tuple of numpy arrays (movingAverage, percForest, propForest, percNonForest, propNonForest)
+def define_IgnitionProportionSeries(values, movingWindowDays, forestSeason, nonForestSeason):
+
+    values = np.asarray(values, dtype=float)
+    movingAverage = pd.Series(values).rolling(movingWindowDays, min_periods=1, win_type=None).mean().to_numpy(dtype=float)
+
+    refForestSorted = np.sort(values[forestSeason])
+    refNonForestSorted = np.sort(values[nonForestSeason])
+
+    percForest = define_PercentileSorted(refForestSorted, refForestSorted.shape[0], movingAverage)
+    percNonForest = define_PercentileSorted(refNonForestSorted, refNonForestSorted.shape[0], movingAverage)
+
+    return movingAverage, percForest, define_IgnitionFromPercentile(percForest, "Forest"), percNonForest, define_IgnitionFromPercentile(percNonForest, "NonForest")
+
+
+# Function derives the Moving Window Average, Percentiles and Fire Ignition Proportion for many series in one pass (days x series 2-D array)
+# Input:
+# - inDataSet: Data Frame with the series fields (e.g. GCM and RCP projection fields)
+# - fieldList: List of series fields to be processed
+# - movingWindowDays: Moving window number of days prior to the date to be derived
+# - dayOfYear: numpy array with the Day of Year per record
+# - endDOYInclusive: True the fire season end day of year is included in the reference (Projections), False excluded (Gridmet station scripts)
+# - forestStartDOY, forestEndDOY, nonForestStartDOY, nonForestEndDOY: fire season days of year (see function 'define_FireSeasons')
+# Output - Data Frame with the fields: input fields, Moving Average of the first series and the 'PercForest', 'PropFiresForest', 'PercNonForest',
+# 'PropFiresNonForest' fields per series (i.e. same fields as 'FireIgnitionRaw_Projections.py')
+def define_IgnitionProportionBatch(inDataSet, fieldList, movingWindowDays, dayOfYear, endDOYInclusive=True, forestStartDOY=forest_start_DOY,
+                                   forestEndDOY=forest_end_DOY, nonForestStartDOY=nonforest_start_DOY, nonForestEndDOY=nonforest_end_DOY):
+
+    values = inDataSet[fieldList].to_numpy(dtype=float)
+
+    forestSeason, nonForestSeason = define_FireSeasons(dayOfYear, endDOYInclusive, forestStartDOY, forestEndDOY, nonForestStartDOY, nonForestEndDOY)
+
+    movingAverage = inDataSet[fieldList].rolling(movingWindowDays, min_periods=1, win_type=None).mean().to_numpy(dtype=float)
+
+    refForestSorted = np.sort(values[forestSeason, :], axis=0)
+    refNonForestSorted = np.sort(values[nonForestSeason, :], axis=0)
+
+    percForest = np.empty(values.shape, dtype=float)
+    percNonForest = np.empty(values.shape, dtype=float)
+    for column in range(len(fieldList)):
+        percForest[:, column] = define_PercentileSorted(refForestSorted[:, column], refForestSorted.shape[0], movingAverage[:, column])
+        percNonForest[:, column] = define_PercentileSorted(refNonForestSorted[:, column], refNonForestSorted.shape[0], movingAverage[:, column])
+
+    propForest = define_IgnitionFromPercentile(percForest, "Forest")
+    propNonForest = define_IgnitionFromPercentile(percNonForest, "NonForest")
+
+    outFields = {}
+    outFields[fieldList[0] + "_" + str(movingWindowDays)] = movingAverage[:, 0]
+    for column, field in enumerate(fieldList):
+        outFields["PercForest" + field] = percForest[:, column]
+        outFields["PropFiresForest" + field] = propForest[:, column]
+        outFields["PercNonForest" + field] = percNonForest[:, column]
+        outFields["PropFiresNonForest" + field] = propNonForest[:, column]
+
+    return pd.concat([inDataSet, pd.DataFrame(outFields, index=inDataSet.index)], axis=1)
@@ -0,0 +1,158 @@
+# ---------------------------------------------------------------------------
+# manifest.py
+# Persistent job manifest of the THREDDS (NCSS) extraction tasks (see 'GCM_wb_thredds_point_extractor_v3.py' 'resumeMode').  Every (place, year)
+# task - the place defines the parameter, model and scenario - is recorded with its state ('success'|'failed'), bytes, sha256 of the response,
+# attempts and error, so a run which stopped (e.g. a THREDDS outage during a multi hour pull) is resumed by rescheduling only the failed and missing
+# tasks, and the throughput and failures of the run are summarized at the end.
+#
+# The manifest is an append only JSON lines journal (one record per task state change, the last record of a task wins) - a record is written as
+# soon as the task completes, so a crash loses at most the tasks in flight.
+#
+# Example:
+#   manifest = JobManifest(r"C:\ROMN\Climate\Extract\ExtractionJobs.jsonl")
+#   if not manifest.isComplete(task):
+#       ...
+#       manifest.recordSuccess(task, 'deficit_CCSM4_rcp45', url, byteCount, sha256, seconds)
+#   print(manifest.summary())
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+
+# Function defines the task key of a place and year (same as the year file name '{place}_{year}')
+def define_TaskKey(place, year):
+
+    return place + "_" + str(year)
+
+
+# Function defines the size and sha256 of a file - Output - tuple (bytes, sha256)
+def define_FileDigest(inFile):
+
+    digest = hashlib.sha256()
+    byteCount = 0
+    with open(inFile, "rb") as inStream:
+        for block in iter(lambda: inStream.read(1024 * 1024), b""):
+            digest.update(block)
+            byteCount += len(block)
+
+    return byteCount, digest.hexdigest()
+
+
+class DigestReader(io.RawIOBase):
+
+    # Readable stream passing the 'source' stream through to the reader while counting the bytes and computing the sha256 of the content
+    def __init__(self, source):
+
+        super().__init__()
+        self.source = source
+        self.digest = hashlib.sha256()
+        self.byteCount = 0
+
+    def readable(self):
+
+        return True
+
+    def readinto(self, buffer):
+
+        count = self.source.readinto(buffer)
+        if count:
+            self.digest.update(memoryview(buffer)[:count])
+            self.byteCount += count
+        return count
+
+    # Size and sha256 of the content - the rest of the source is read if the reader stopped before the end.  Output - tuple (bytes, sha256)
+    def finish(self):
+
+        while self.read(1024 * 1024):
+            pass
+        return self.byteCount, self.digest.hexdigest()
+
+
+class JobManifest:
+
+    # Input:
+    # manifestFile - JSON lines manifest file (created if it does not exist)
+    # resume - True load the tasks of an existing manifest, False start a new manifest (an existing manifest is removed)
+    def __init__(self, manifestFile, resume=True):
+
+        self.manifestFile = manifestFile
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.runStart = time.time()
+        self.runTasks = {"download": 0, "cache": 0, "failed": 0}
+        self.runBytes = 0
+
+        manifestFolder = os.path.dirname(manifestFile)
+        if manifestFolder != "" and not os.path.exists(manifestFolder):
+            os.makedirs(manifestFolder)
+        if not resume and os.path.exists(manifestFile):
+            os.remove(manifestFile)
+        self.loadManifest()
+
+    # Replay the manifest journal - a partially written last line (crash) is ignored
+    def loadManifest(self):
+
+        if not os.path.exists(self.manifestFile):
+            return
+
+        with open(self.manifestFile, "r") as inFile:
+            for line in inFile:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.tasks[record["task"]] = record
+
+    def appendManifest(self, record):
+
+        with self.lock:
+            self.tasks[record["task"]] = record
+            with open(self.manifestFile, "a") as outFile:
+                outFile.write(json.dumps(record) + "\n")
+
+    # Record a completed task - 'source' 'download' or 'cache' (download cache)
+    def recordSuccess(self, task, variable, url, byteCount, sha256, seconds=None, attempts=1, source="download"):
+
+        self.appendManifest({"task": task, "variable": variable, "state": "success", "url": url, "bytes": byteCount, "sha256": sha256,
+                             "seconds": seconds, "attempts": attempts, "source": source, "error": None, "time": time.time()})
+        with self.lock:
+            self.runTasks[source] = self.runTasks.get(source, 0) + 1
+            if source == "download":
+                self.runBytes += byteCount
+
+    # Record a task which failed after all attempts
+    def recordFailure(self, task, variable, url, error, seconds=None, attempts=None):
+
+        self.appendManifest({"task": task, "variable": variable, "state": "failed", "url": url, "bytes": None, "sha256": None, "seconds": seconds,
+                             "attempts": attempts, "source": None, "error": str(error), "time": time.time()})
+        with self.lock:
+            self.runTasks["failed"] += 1
+
+    def state(self, task):
+
+        with self.lock:
+            record = self.tasks.get(task)
+            return record["state"] if record is not None else None
+
+    # Task completed in a previous run (the caller checks the task's output still exists, e.g. the year file)
+    def isComplete(self, task):
+
+        return self.state(task) == "success"
+
+    # Summary - tasks by state, failed tasks with their error, and this run's tasks, bytes downloaded, seconds and throughput (MB per second)
+    def summary(self):
+
+        with self.lock:
+            records = list(self.tasks.values())
+            runSeconds = time.time() - self.runStart
+            return {"tasks": len(records), "success": sum(record["state"] == "success" for record in records),
+                    "failed": sum(record["state"] == "failed" for record in records),
+                    "bytes": sum(record["bytes"] or 0 for record in records if record["state"] == "success"),
+                    "failedTasks": [(record["task"], record["error"]) for record in records if record["state"] == "failed"],
+                    "runDownloaded": self.runTasks["download"], "runCached": self.runTasks["cache"], "runFailed": self.runTasks["failed"],
+                    "runBytes": self.runBytes, "runSeconds": runSeconds,
+                    "runMBPerSecond": self.runBytes / 1048576.0 / runSeconds if runSeconds > 0 else 0.0}
@@ -0,0 +1,380 @@
+# ---------------------------------------------------------------------------
+# ncss_server.py
+# Local stand-in of the NPS Water Balance THREDDS server (http://www.yellowstone.solutions/thredds) for offline testing and benchmarking of
+# 'GCM_wb_thredds_point_extractor_v3.py' (see 'threddsServerURL') and the fetch engine (see 'fetch_benchmark.py') - no network is required.
+#
+# Implements the subset of the NCSS grid as point API used by the extractor:
+# - '{dataset}.nc4/dataset.xml' - dataset description with the Water Balance (gridMET 1/24 degree) latitude/longitude axes (see 'grid.py')
+# - '{dataset}.nc4?var=&latitude=&longitude=&time_start=&time_end=&accept=csv_file|netcdf' - the point subset of the grid cell nearest the point,
+#   as NCSS .csv text or NetCDF-3 (int16 values, see 'netcdf.write_NetCDF3')
+# Values are synthetic (see 'synthetic.define_SyntheticDeficit', mm * 10 as the Water Balance files) and reproducible - the same dataset, variable,
+# grid cell and day always return the same value, whatever the time range or response format requested.  Daily datasets return the days of the
+# dataset year (year in the file name, e.g. 'V_1_5_2030_CCSM4_rcp45_Deficit.nc4') within 'time_start'/'time_end', monthly datasets
+# ('..._monthly.nc4') the monthly totals dated the 16th of the month at 12:00.
+#
+# Server behavior is configurable (and can be changed between runs with 'configure') - 'latency' (seconds before each response), 'failureRate'
+# (fraction of the point requests answered 503 Service Unavailable), 'failFirstAttempts' (the first attempts of each url answered 503), 'bandwidth'
+# (bytes per second per response) and 'gzipResponses' (gzip when the client accepts it).  The requests, status codes, connections, most concurrent
+# requests and bytes sent are counted ('summary').
+#
+# Example:
+#   server = NCSSServer(latency=0.05, failureRate=0.05, bandwidth=2 * 1024 ** 2)
+#   baseURL = server.start()
+#   url = define_LocalURL(daily_url.format(...), baseURL)
+#   ...
+#   print(server.summary())
+#   server.stop()
+
+import gzip
+import http.server
+import random
+import re
+import socketserver
+import threading
+import time
+import urllib.parse
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .grid import define_GridCell
+from .netcdf import write_NetCDF3
+from .synthetic import define_SyntheticDeficit
+
+# Water Balance grid (gridMET 1/24 degree) - axis start, increment and number of points
+waterBalanceLatitude = (49.4, -1.0 / 24.0, 585)
+waterBalanceLongitude = (-124.76666666666667, 1.0 / 24.0, 1386)
+
+# Response content types by 'accept' value
+acceptTypes = {"csv_file": "text/csv", "csv": "text/csv", "netcdf": "application/x-netcdf", "netcdf3": "application/x-netcdf"}
+
+# Packed fill value of the responses and the fraction of the days with the fill value
+fillValue = -32768
+missingFraction = 0.005
+
+# Bytes written per chunk of a bandwidth limited response
+writeChunkBytes = 16 * 1024
+
+
+# Function defines the Water Balance grid axes - Output - dictionary with the 'lat' and 'lon' coordinate arrays (see 'grid.parse_GridAxes')
+def define_WaterBalanceAxes():
+
+    return {axis: start + increment * np.arange(npts) for axis, (start, increment, npts) in (("lat", waterBalanceLatitude),
+                                                                                          ("lon", waterBalanceLongitude))}
+
+
+# Function defines the NCSS 'dataset.xml' of the grid axes
+def define_DatasetXML(datasetPath, axes):
+
+    axisElements = []
+    for axis, units in (("lat", "degrees_north"), ("lon", "degrees_east")):
+        values = axes[axis]
+        axisElements.append('<axis name="' + axis + '" shape="' + str(len(values)) + '" type="double" axisType="' + axis.capitalize() + '">' +
+                            '<attribute name="units" value="' + units + '"/><values spacing="regular" start="' + repr(float(values[0])) +
+                            '" increment="' + repr(float(values[1] - values[0])) + '" npts="' + str(len(values)) + '"/></axis>')
+
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<gridDataset location="' + datasetPath + '">' + "".join(axisElements) +
+            '</gridDataset>\n').encode("utf-8")
+
+
+# Function replaces the scheme and host of a THREDDS url with the stand-in server's (e.g. 'http://127.0.0.1:8080')
+def define_LocalURL(url, baseURL):
+
+    parts = urllib.parse.urlsplit(url)
+    baseParts = urllib.parse.urlsplit(baseURL)
+    return urllib.parse.urlunsplit((baseParts.scheme, baseParts.netloc, parts.path, parts.query, parts.fragment))
+
+
+# Function parses an NCSS time parameter (e.g. '2030-01-01T00:00:00Z') - Output - datetime64[s], None if not defined
+def define_RequestTime(value):
+
+    if value is None or value == "":
+        return None
+    return pd.Timestamp(value.replace("Z", "")).tz_localize(None).to_datetime64().astype("datetime64[s]")
+
+
+# Function defines the dates of a point request - the days (daily) or mid month dates (monthly) of the dataset year within the time range
+# Input: datasetPath - dataset path (year in the file name), monthly - True monthly dataset, timeStart/timeEnd - datetime64[s] or None
+# Output - tuple (dataset year dates (DatetimeIndex, one per day), record dates (datetime64[s] array, monthly the 16th at 12:00), record index into
+# the year values)
+def define_RequestDates(datasetPath, monthly, timeStart, timeEnd):
+
+    yearMatch = re.search(r"_(\d{4})_", datasetPath.rsplit("/", 1)[-1])
+    if yearMatch is not None:
+        year = int(yearMatch.group(1))
+    elif timeStart is not None:
+        year = int(str(timeStart)[:4])
+    else:
+        raise ValueError("Dataset year not defined - no year in the file name and no 'time_start'")
+
+    days = pd.date_range(str(year) + "-01-01", str(year) + "-12-31", freq="D")
+    if monthly:
+        recordDates = (days[days.day == 16] + pd.Timedelta(hours=12)).to_numpy(dtype="datetime64[s]")
+    else:
+        recordDates = days.to_numpy(dtype="datetime64[s]")
+
+    select = np.ones(len(recordDates), dtype=bool)
+    if timeStart is not None:
+        select &= recordDates >= timeStart
+    if timeEnd is not None:
+        select &= recordDates <= timeEnd
+
+    return days, recordDates[select], np.flatnonzero(select)
+
+
+# Function defines the synthetic packed values (mm * 10, int16) of a dataset variable and grid cell for the dataset year - daily values, or the
+# monthly totals of the daily values for a monthly dataset, with 'missingFraction' of the values the fill value
+def define_CellValues(datasetPath, varName, cell, days, monthly):
+
+    datasetKey = datasetPath.rsplit("/", 1)[-1].replace("_monthly", "")
+    seed = zlib.crc32((datasetKey + "|" + varName.lower() + "|" + str(cell[0]) + "|" + str(cell[1])).encode("utf-8"))
+    values = define_SyntheticDeficit(days, seed)
+    if monthly:
+        values = np.add.reduceat(values, np.flatnonzero(days.day == 1))
+
+    values = np.clip(np.round(values * 10), 0, 32767).astype(np.int16)
+
+    # Missing days (about 1 in 200 per grid cell) - the packed fill value in both the .csv and NetCDF responses
+    values[np.random.default_rng(seed).random(len(values)) < missingFraction] = fillValue
+
+    return values
+
+
+# Function formats a point subset as NCSS .csv text
+def define_PointCSV(varName, recordDates, latitude, longitude, values, units="mm"):
+
+    lines = ['time,latitude[unit="degrees_north"],longitude[unit="degrees_east"],' + varName + '[unit="' + units + '"]\n']
+    pointText = "," + str(np.float32(latitude)) + "," + str(np.float32(longitude)) + ","
+    timeText = np.datetime_as_string(recordDates, unit="s")
+    lines.extend(timeText[count] + "Z" + pointText + str(int(values[count])) + "\n" for count in range(len(recordDates)))
+
+    return "".join(lines).encode("utf-8")
+
+
+# Function formats a point subset as NetCDF-3 (station and observation dimensions, time in days since 1970-01-01)
+def define_PointNetCDF(varName, recordDates, latitude, longitude, values, units="mm"):
+
+    timeValues = (recordDates - np.datetime64("1970-01-01T00:00:00", "s")).astype(np.float64) / 86400.0
+    return write_NetCDF3([("station", 1), ("obs", len(recordDates))],
+                         [("latitude", ["station"], np.array([latitude], dtype=np.float32), {"units": "degrees_north", "standard_name": "latitude"}),
+                          ("longitude", ["station"], np.array([longitude], dtype=np.float32), {"units": "degrees_east", "standard_name": "longitude"}),
+                          ("time", ["obs"], timeValues, {"units": "days since 1970-01-01T00:00:00Z", "standard_name": "time", "calendar": "standard"}),
+                          (varName, ["obs"], np.asarray(values, dtype=np.int16), {"units": units, "_FillValue": np.int16(fillValue)})],
+                         {"Conventions": "CF-1.6", "featureType": "timeSeries", "title": "NCSS stand-in (synthetic values)"})
+
+
+class NCSSRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   #Headers and body are separate writes - no delayed ACK stall per keep-alive request
+
+    def log_message(self, format, *args):
+
+        pass
+
+    def setup(self):
+
+        super().setup()
+        self.server.recordConnection()
+
+    def do_GET(self):
+
+        self.server.beginRequest()
+        self.requestActive = True
+        try:
+            status, contentType, body = self.server.define_Response(self.path)
+            if self.server.latency > 0:
+                time.sleep(self.server.latency)
+
+            encoding = None
+            if status == 200 and self.server.gzipResponses and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                body = gzip.compress(body, compresslevel=6)
+                encoding = "gzip"
+
+            self.server.recordResponse(status, len(body))
+            self.send_response(status)
+            self.send_header("Content-Type", contentType)
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.writeBody(body)
+        finally:
+            self.endRequest()
+
+    # The request ends before the last write of the body, i.e. before the client can have the whole response and send its next request
+    def endRequest(self):
+
+        if self.requestActive:
+            self.requestActive = False
+            self.server.endRequest()
+
+    # Write the body - in chunks paced to 'bandwidth' bytes per second if the bandwidth is limited
+    def writeBody(self, body):
+
+        bandwidth = self.server.bandwidth
+        if not bandwidth:
+            self.endRequest()
+            self.wfile.write(body)
+            return
+
+        startTime = time.perf_counter()
+        for position in range(0, len(body), writeChunkBytes):
+            chunk = body[position:position + writeChunkBytes]
+            if position + writeChunkBytes >= len(body):
+                self.endRequest()
+            self.wfile.write(chunk)
+            delay = (position + len(chunk)) / float(bandwidth) - (time.perf_counter() - startTime)
+            if delay > 0:
+                time.sleep(delay)
+
+
+class NCSSServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+
+    daemon_threads = True
+
+    # Input:
+    # host, port - address to listen on (port 0 any free port)
+    # latency - seconds before each response
+    # failureRate - fraction (0 to 1) of the point requests answered 503 Service Unavailable
+    # failFirstAttempts - number of first requests of each url answered 503 (e.g. 2 - each url succeeds on the third attempt)
+    # bandwidth - bytes per second per response, None unlimited
+    # gzipResponses - True gzip the responses of clients accepting gzip
+    # axes - latitude/longitude axes (see 'define_WaterBalanceAxes'), None the Water Balance grid
+    # seed - random seed of the failures
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, failureRate=0.0, failFirstAttempts=0, bandwidth=None, gzipResponses=True, axes=None,
+                 seed=0):
+
+        super().__init__((host, port), NCSSRequestHandler)
+        self.axes = axes if axes is not None else define_WaterBalanceAxes()
+        self.lock = threading.Lock()
+        self.serverThread = None
+        self.activeRequests = 0
+        self.configure(latency, failureRate, failFirstAttempts, bandwidth, gzipResponses, seed)
+
+    # Change the server behavior (e.g. between benchmark scenarios) - the request counts and attempts per url are reset (requests in flight are
+    # still counted as active)
+    def configure(self, latency=0.0, failureRate=0.0, failFirstAttempts=0, bandwidth=None, gzipResponses=True, seed=0):
+
+        with self.lock:
+            self.latency = latency
+            self.failureRate = failureRate
+            self.failFirstAttempts = failFirstAttempts
+            self.bandwidth = bandwidth
+            self.gzipResponses = gzipResponses
+            self.randomGenerator = random.Random(seed)
+        self.resetStats()
+
+    def resetStats(self):
+
+        with self.lock:
+            self.urlAttempts = {}
+            self.stats = {"requests": 0, "pointRequests": 0, "datasetRequests": 0, "statusCodes": {}, "connections": 0, "maxActiveRequests": 0,
+                          "bytesSent": 0, "records": 0}
+
+    @property
+    def baseURL(self):
+
+        return "http://" + self.server_address[0] + ":" + str(self.server_address[1])
+
+    # Serve in a background thread - Output - base url of the server (e.g. 'http://127.0.0.1:53124')
+    def start(self):
+
+        self.serverThread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.serverThread.start()
+        return self.baseURL
+
+    def stop(self):
+
+        self.shutdown()
+        self.server_close()
+        if self.serverThread is not None:
+            self.serverThread.join()
+
+    def recordConnection(self):
+
+        with self.lock:
+            self.stats["connections"] += 1
+
+    def beginRequest(self):
+
+        with self.lock:
+            self.stats["requests"] += 1
+            self.activeRequests += 1
+            self.stats["maxActiveRequests"] = max(self.stats["maxActiveRequests"], self.activeRequests)
+
+    # Count a response (before it is sent, so a client never sees a response which is not counted yet)
+    def recordResponse(self, status, byteCount):
+
+        with self.lock:
+            self.stats["bytesSent"] += byteCount
+            self.stats["statusCodes"][str(status)] = self.stats["statusCodes"].get(str(status), 0) + 1
+
+    def endRequest(self):
+
+        with self.lock:
+            self.activeRequests -= 1
+
+    # Requests served, point and dataset.xml requests, responses by status code, connections accepted, most concurrent requests, bytes sent (after
+    # gzip) and point records returned
+    def summary(self):
+
+        with self.lock:
+            summary = dict(self.stats)
+            summary["statusCodes"] = dict(self.stats["statusCodes"])
+        return summary
+
+    # Function defines the response of a request path - Output - tuple (status code, content type, body bytes)
+    def define_Response(self, requestPath):
+
+        parts = urllib.parse.urlsplit(requestPath)
+        path = urllib.parse.unquote(parts.path)
+
+        if path.endswith("/dataset.xml"):
+            with self.lock:
+                self.stats["datasetRequests"] += 1
+            return 200, "application/xml", define_DatasetXML(path[:-len("/dataset.xml")], self.axes)
+
+        if not path.endswith(".nc4") and not path.endswith(".nc"):
+            return 404, "text/plain", b"Not Found - " + path.encode("utf-8")
+
+        # Simulated outages - the first attempts of each url and a random fraction of the requests
+        with self.lock:
+            self.stats["pointRequests"] += 1
+            attempt = self.urlAttempts.get(requestPath, 0) + 1
+            self.urlAttempts[requestPath] = attempt
+            failed = attempt <= self.failFirstAttempts or (self.failureRate > 0 and self.randomGenerator.random() < self.failureRate)
+        if failed:
+            return 503, "text/plain", b"Service Unavailable (NCSS stand-in)"
+
+        query = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+        for name in ("var", "latitude", "longitude"):
+            if query.get(name, "") == "":
+                return 400, "text/plain", ("Missing parameter - " + name).encode("utf-8")
+        accept = query.get("accept", "csv_file").lower()
+        if accept not in acceptTypes:
+            return 400, "text/plain", ("Unsupported accept - " + accept).encode("utf-8")
+
+        cell = define_GridCell(query["latitude"], query["longitude"], self.axes)
+        if cell is None:
+            return 400, "text/plain", b"Point is outside the grid"
+
+        try:
+            timeStart = define_RequestTime(query.get("time_start"))
+            timeEnd = define_RequestTime(query.get("time_end"))
+            monthly = path.endswith("_monthly.nc4")
+            days, recordDates, recordIndex = define_RequestDates(path, monthly, timeStart, timeEnd)
+        except ValueError as error:
+            return 400, "text/plain", str(error).encode("utf-8")
+
+        values = define_CellValues(path, query["var"], cell, days, monthly)[recordIndex]
+        latitude = float(self.axes["lat"][cell[0]])
+        longitude = float(self.axes["lon"][cell[1]])
+        with self.lock:
+            self.stats["records"] += len(recordDates)
+
+        if acceptTypes[accept] == "text/csv":
+            return 200, acceptTypes[accept], define_PointCSV(query["var"], recordDates, latitude, longitude, values)
+        return 200, acceptTypes[accept], define_PointNetCDF(query["var"], recordDates, latitude, longitude, values)
+
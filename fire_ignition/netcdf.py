@@ -0,0 +1,348 @@
+# ---------------------------------------------------------------------------
+# netcdf.py
+# Binary NetCDF ingestion of the THREDDS (NCSS) point requests (see 'GCM_wb_thredds_point_extractor_v3.py' 'responseFormat').  The NCSS point subset
+# is requested as NetCDF ('accept=netcdf', NetCDF-3 classic or 64-bit offset format) in place of the .csv text - the packed int16 values (mm * 10)
+# and the time coordinate are read straight into numpy arrays (no text parsing) and unpacked with the variable's scale factor/offset in one
+# vectorized step, with the fill values masked (NaN).
+#
+# The NetCDF-3 format is read (and written, 'write_NetCDF3') with numpy only (no netCDF4/scipy dependency) - see https://docs.unidata.ucar.edu/netcdf-c/current/file_format_specifications.html
+#
+# Example:
+#   with fetchClient.open(url.replace('accept=csv_file', 'accept=netcdf')) as response:
+#       arrays = parse_NCSSPointNetCDF(response)
+
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from .columnar import define_Float64FromFloat32
+from .extract import fillThreshold   #Packed values below are fill values (same mask as the .csv responses)
+
+# NetCDF-3 data types (big endian)
+netcdfTypes = {1: np.dtype(">i1"), 2: np.dtype("S1"), 3: np.dtype(">i2"), 4: np.dtype(">i4"), 5: np.dtype(">f4"), 6: np.dtype(">f8")}
+netcdfCodes = {dtype: ncType for ncType, dtype in netcdfTypes.items() if ncType != 2}
+
+# Header tags
+tagDimension = 10
+tagVariable = 11
+tagAttribute = 12
+
+
+# Seconds per CF time unit
+timeUnitSeconds = {"seconds": 1, "second": 1, "secs": 1, "sec": 1, "s": 1, "minutes": 60, "minute": 60, "mins": 60, "min": 60, "hours": 3600,
+                   "hour": 3600, "hrs": 3600, "hr": 3600, "h": 3600, "days": 86400, "day": 86400, "d": 86400}
+
+# CF calendars equal to numpy datetime64 (proleptic Gregorian) for the Water Balance years
+standardCalendars = ("standard", "gregorian", "proleptic_gregorian")
+
+
+class NetCDFHeaderReader:
+
+    # Sequential reader of the NetCDF-3 header fields
+    def __init__(self, data, offsetSize):
+
+        self.data = data
+        self.offsetSize = offsetSize
+        self.position = 4
+
+    def readInt(self):
+
+        value = struct.unpack_from(">i", self.data, self.position)[0]
+        self.position += 4
+        return value
+
+    def readOffset(self):
+
+        value = struct.unpack_from(">q" if self.offsetSize == 8 else ">i", self.data, self.position)[0]
+        self.position += self.offsetSize
+        return value
+
+    def readName(self):
+
+        length = self.readInt()
+        name = bytes(self.data[self.position:self.position + length]).decode("utf-8")
+        self.position += length + (-length % 4)
+        return name
+
+    def readValues(self, ncType, count):
+
+        dtype = netcdfTypes[ncType]
+        byteCount = count * dtype.itemsize
+        values = np.frombuffer(self.data, dtype=dtype, count=count, offset=self.position)
+        self.position += byteCount + (-byteCount % 4)
+        if ncType == 2:
+            return b"".join(values).decode("utf-8", errors="replace").rstrip("\x00")
+        return values[0].item() if count == 1 else values.astype(dtype.newbyteorder("="))
+
+    def readAttributes(self):
+
+        tag = self.readInt()
+        count = self.readInt()
+        if tag not in (0, tagAttribute):
+            raise ValueError("Invalid NetCDF attribute list")
+
+        attributes = {}
+        for attributeCount in range(count):
+            name = self.readName()
+            ncType = self.readInt()
+            attributes[name] = self.readValues(ncType, self.readInt())
+        return attributes
+
+
+# Function reads a NetCDF-3 (classic or 64-bit offset) file
+# Input: inData - bytes of the file
+# Output - dictionary with 'dimensions' (name: length), 'attributes' (global attributes) and 'variables' (name: dictionary with 'dimensions',
+# 'attributes' and 'values' - numpy array in native byte order, char variables as strings)
+def read_NetCDF3(inData):
+
+    data = memoryview(inData)
+    magic = bytes(data[:4])
+    if magic[:3] != b"CDF" or magic[3] not in (1, 2):
+        if magic[:4] == b"\x89HDF":
+            raise ValueError("NetCDF-4 (HDF5) response - request the NetCDF-3 format ('accept=netcdf')")
+        raise ValueError("Not a NetCDF-3 file")
+
+    header = NetCDFHeaderReader(data, 8 if magic[3] == 2 else 4)
+    recordCount = header.readInt()
+
+    # Dimensions (length 0 is the record dimension)
+    tag = header.readInt()
+    count = header.readInt()
+    if tag not in (0, tagDimension):
+        raise ValueError("Invalid NetCDF dimension list")
+    dimensions = []
+    for dimensionCount in range(count):
+        dimensions.append((header.readName(), header.readInt()))
+
+    globalAttributes = header.readAttributes()
+
+    tag = header.readInt()
+    count = header.readInt()
+    if tag not in (0, tagVariable):
+        raise ValueError("Invalid NetCDF variable list")
+    variableHeaders = []
+    for variableCount in range(count):
+        name = header.readName()
+        dimensionIds = [header.readInt() for dimensionCount in range(header.readInt())]
+        attributes = header.readAttributes()
+        ncType = header.readInt()
+        variableSize = header.readInt()
+        begin = header.readOffset()
+        variableHeaders.append({"name": name, "dimensionIds": dimensionIds, "attributes": attributes, "ncType": ncType, "vsize": variableSize,
+                                "begin": begin, "record": len(dimensionIds) > 0 and dimensions[dimensionIds[0]][1] == 0})
+
+    # Record size - the record variables' per record sizes (a single record variable is not padded)
+    recordVariables = [variable for variable in variableHeaders if variable["record"]]
+    if len(recordVariables) == 1:
+        variable = recordVariables[0]
+        recordSize = netcdfTypes[variable["ncType"]].itemsize * int(np.prod([dimensions[dimensionId][1] for dimensionId in variable["dimensionIds"][1:]]))
+    else:
+        recordSize = sum(variable["vsize"] for variable in recordVariables)
+
+    # Streaming file (record count not written) - records in the file
+    if recordCount == -1:
+        recordCount = 0
+        if len(recordVariables) > 0 and recordSize > 0:
+            recordCount = (len(data) - min(variable["begin"] for variable in recordVariables)) // recordSize
+
+    variables = {}
+    for variable in variableHeaders:
+        dtype = netcdfTypes[variable["ncType"]]
+        shape = [recordCount if dimensions[dimensionId][1] == 0 else dimensions[dimensionId][1] for dimensionId in variable["dimensionIds"]]
+        if variable["record"]:
+            recordShape = shape[1:]
+            recordItems = int(np.prod(recordShape))
+            # Variable's bytes of each record (records are 'recordSize' bytes apart)
+            records = np.ndarray((recordCount, recordItems * dtype.itemsize), dtype=np.uint8, buffer=data, offset=variable["begin"],
+                                 strides=(recordSize, 1)) if recordCount > 0 else np.zeros((0, recordItems * dtype.itemsize), dtype=np.uint8)
+            values = records.copy().view(dtype).reshape([recordCount] + recordShape)
+        else:
+            values = np.frombuffer(data, dtype=dtype, count=int(np.prod(shape)), offset=variable["begin"]).reshape(shape)
+
+        if variable["ncType"] == 2:
+            values = np.array([b"".join(row).decode("utf-8", errors="replace").rstrip("\x00") for row in values.reshape(-1, shape[-1] if shape else 1)]) \
+                if len(shape) > 0 else values
+        else:
+            values = values.astype(dtype.newbyteorder("="))
+
+        variables[variable["name"]] = {"dimensions": [dimensions[dimensionId][0] for dimensionId in variable["dimensionIds"]],
+                                       "attributes": variable["attributes"], "values": values}
+
+    return {"dimensions": dict(dimensions), "attributes": globalAttributes, "variables": variables}
+
+
+# Function packs a NetCDF-3 name (length, bytes padded to 4 bytes)
+def define_PackedName(name):
+
+    nameBytes = name.encode("utf-8")
+    return struct.pack(">i", len(nameBytes)) + nameBytes + b"\x00" * (-len(nameBytes) % 4)
+
+
+# Function packs a NetCDF-3 attribute list - string values are char attributes, numeric values keep their numpy data type (64-bit integers are
+# written as int32, e.g. np.int16(-32768) for an int16 '_FillValue')
+def define_PackedAttributes(attributes):
+
+    if not attributes:
+        return struct.pack(">ii", 0, 0)
+
+    packed = [struct.pack(">ii", tagAttribute, len(attributes))]
+    for name, value in attributes.items():
+        if isinstance(value, str):
+            ncType = 2
+            valueBytes = value.encode("utf-8")
+            count = len(valueBytes)
+        else:
+            values = np.atleast_1d(np.asarray(value))
+            if values.dtype == np.int64:
+                values = values.astype(np.int32)
+            ncType = netcdfCodes[values.dtype.newbyteorder(">")]
+            valueBytes = values.astype(netcdfTypes[ncType]).tobytes()
+            count = values.size
+        packed.append(define_PackedName(name) + struct.pack(">ii", ncType, count) + valueBytes + b"\x00" * (-len(valueBytes) % 4))
+
+    return b"".join(packed)
+
+
+# Function writes a NetCDF-3 classic file (fixed size dimensions only, e.g. an NCSS point subset - see 'ncss_server.py')
+# Input:
+# dimensions - list of tuples (name, length)
+# variables - list of tuples (name, list of dimension names, numpy values (data type int8/int16/int32/float32/float64), attributes dictionary)
+# attributes - global attributes dictionary
+# Output - bytes of the file
+def write_NetCDF3(dimensions, variables, attributes=None):
+
+    dimensionIds = {name: dimensionId for dimensionId, (name, length) in enumerate(dimensions)}
+    dimensionList = struct.pack(">ii", tagDimension if dimensions else 0, len(dimensions)) + \
+        b"".join(define_PackedName(name) + struct.pack(">i", length) for name, length in dimensions)
+
+    dataList = []
+    for name, dimensionNames, values, variableAttributes in variables:
+        values = np.asarray(values)
+        ncType = netcdfCodes[values.dtype.newbyteorder(">")]
+        valueBytes = values.astype(netcdfTypes[ncType]).tobytes()
+        dataList.append((name, dimensionNames, variableAttributes, ncType, valueBytes + b"\x00" * (-len(valueBytes) % 4)))
+
+    # Variable headers - the header size does not depend on the offsets ('begin'), so the headers are packed once to define the data offsets
+    def define_VariableList(begins):
+        return struct.pack(">ii", tagVariable if dataList else 0, len(dataList)) + \
+            b"".join(define_PackedName(name) + struct.pack(">i", len(dimensionNames)) +
+                     b"".join(struct.pack(">i", dimensionIds[dimensionName]) for dimensionName in dimensionNames) +
+                     define_PackedAttributes(variableAttributes) + struct.pack(">iii", ncType, len(valueBytes), begin)
+                     for (name, dimensionNames, variableAttributes, ncType, valueBytes), begin in zip(dataList, begins))
+
+    header = b"CDF\x01" + struct.pack(">i", 0) + dimensionList + define_PackedAttributes(attributes)
+    begins = []
+    begin = len(header) + len(define_VariableList([0] * len(dataList)))
+    for name, dimensionNames, variableAttributes, ncType, valueBytes in dataList:
+        begins.append(begin)
+        begin += len(valueBytes)
+
+    return header + define_VariableList(begins) + b"".join(valueBytes for name, dimensionNames, variableAttributes, ncType, valueBytes in dataList)
+
+
+# Function decodes CF time values ('{units} since {origin}') to datetime64[s]
+# Input: values - numeric time values, units - units attribute (e.g. 'days since 1900-01-01 00:00:00'), calendar - calendar attribute (None standard)
+# Output - numpy datetime64[s] array
+def define_CFTime(values, units, calendar=None):
+
+    if calendar is not None and str(calendar).lower() not in standardCalendars:
+        raise ValueError("Unsupported time calendar - " + str(calendar))
+
+    parts = str(units).strip().split(" since ")
+    if len(parts) != 2 or parts[0].strip().lower() not in timeUnitSeconds:
+        raise ValueError("Unsupported time units - " + str(units))
+
+    origin = pd.Timestamp(parts[1].strip().replace("UTC", "").strip()).tz_localize(None).to_datetime64().astype("datetime64[s]")
+    seconds = np.round(np.asarray(values, dtype=np.float64) * timeUnitSeconds[parts[0].strip().lower()]).astype(np.int64)
+
+    return origin + seconds.astype("timedelta64[s]")
+
+
+# Function unpacks a packed variable - values * 'scale_factor' + 'add_offset' (one vectorized step), fill values ('_FillValue', 'missing_value' and
+# values below 'fillBelow') are NaN
+# Output - float64 numpy array
+def define_UnpackedValues(values, attributes, fillBelow=fillThreshold):
+
+    values = np.asarray(values)
+    mask = np.zeros(values.shape, dtype=bool)
+    for fillAttribute in ("_FillValue", "missing_value"):
+        if fillAttribute in attributes:
+            mask |= np.isin(values, np.atleast_1d(attributes[fillAttribute]))
+    if fillBelow is not None:
+        mask |= values < fillBelow
+
+    scale = float(attributes.get("scale_factor", 1.0))
+    offset = float(attributes.get("add_offset", 0.0))
+
+    return np.where(mask, np.nan, values * scale + offset)
+
+
+# Function defines the .csv field name of a variable ('{name}[unit="{units}"]' as the NCSS .csv header)
+def define_FieldName(name, attributes):
+
+    units = attributes.get("units")
+    return name + '[unit="' + str(units) + '"]' if units else name
+
+
+# Function parses an NCSS point NetCDF response into typed arrays (same output as 'extract.parse_NCSSPoint')
+# Input:
+# inFile - NetCDF file path, bytes or readable stream (e.g. 'http_client.FetchResponse')
+# varName - requested variable, None the first data variable (variable along the time dimension which is not a coordinate)
+# fillBelow - packed values below are fill values (NaN), None only the fill value attributes
+# Output - dictionary with 'time' (datetime64[s]), 'latitude', 'longitude', 'value' (float64 - unpacked, fill values NaN) arrays and 'fields' (the
+# .csv field names)
+def parse_NCSSPointNetCDF(inFile, varName=None, fillBelow=fillThreshold):
+
+    if isinstance(inFile, (bytes, bytearray)):
+        inData = inFile
+    elif isinstance(inFile, (str, os.PathLike)):
+        with open(inFile, "rb") as inStream:
+            inData = inStream.read()
+    else:
+        inData = inFile.read()
+
+    dataset = read_NetCDF3(inData)
+    variables = dataset["variables"]
+
+    # Coordinate variables by standard name, axis or name
+    def define_Coordinate(names, standardName):
+        for name, variable in variables.items():
+            if variable["attributes"].get("standard_name") == standardName:
+                return name
+        for name in names:
+            if name in variables:
+                return name
+        raise ValueError("Coordinate not found in the NetCDF response - " + standardName)
+
+    timeName = define_Coordinate(("time",), "time")
+    latName = define_Coordinate(("latitude", "lat"), "latitude")
+    lonName = define_Coordinate(("longitude", "lon"), "longitude")
+
+    timeVariable = variables[timeName]
+    time = define_CFTime(timeVariable["values"].reshape(-1), timeVariable["attributes"].get("units", ""), timeVariable["attributes"].get("calendar"))
+
+    if varName is None:
+        coordinateNames = (timeName, latName, lonName)
+        for name, variable in variables.items():
+            if name not in coordinateNames and variable["values"].dtype.kind in "if" and timeVariable["dimensions"][-1:] == variable["dimensions"][-1:]:
+                varName = name
+                break
+        if varName is None:
+            raise ValueError("Data variable not found in the NetCDF response")
+    dataVariable = variables[varName]
+
+    # Point latitude/longitude (one value per station or per time)
+    def define_PerTime(values):
+        values = np.asarray(values).reshape(-1)
+        values = define_Float64FromFloat32(values) if values.dtype == np.float32 else values.astype(np.float64)   #float32 as the .csv decimal
+        return np.full(len(time), values[0]) if len(values) == 1 else values
+
+    value = define_UnpackedValues(dataVariable["values"].reshape(-1), dataVariable["attributes"], fillBelow)
+    if len(value) != len(time):
+        raise ValueError("Data variable is not one value per time - " + varName)
+
+    return {"time": time, "latitude": define_PerTime(variables[latName]["values"]), "longitude": define_PerTime(variables[lonName]["values"]),
+            "value": value, "fields": [timeName, define_FieldName(latName, variables[latName]["attributes"]),
+                                       define_FieldName(lonName, variables[lonName]["attributes"]), define_FieldName(varName, dataVariable["attributes"])]}
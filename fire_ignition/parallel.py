@@ -0,0 +1,125 @@
+# ---------------------------------------------------------------------------
+# parallel.py
+# Process pool execution of the GCM/RCP projections (see 'FireIgnitionRaw_Projections.py' processingMode 'Parallel').  The parsed projection
+# values are placed in shared memory once and attached by each worker (i.e. not pickled per projection), each worker writes its Moving Window
+# Average, Percentiles and Fire Ignition Proportions to a shared output block, and the output fields are merged in 'fieldList' order so output
+# is identical to processingMode 'Batch' regardless of worker count or completion order.
+#
+# Each projection runs in its own task - a failed projection is reported (status 'Failed' with the traceback) and does not stop the remaining
+# projections.
+
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .ignition import (define_FireSeasons, define_IgnitionProportionSeries, forest_end_DOY, forest_start_DOY, nonforest_end_DOY,
+                       nonforest_start_DOY)
+
+# Output arrays per projection in the shared output block
+outputArrays = ['movingAverage', 'percForest', 'propForest', 'percNonForest', 'propNonForest']
+
+# Worker process state - attached shared memory and fire season arrays (set by 'initWorker')
+workerState = {}
+
+
+def initWorker(valuesName, outputName, shape, forestSeason, nonForestSeason, movingWindowDays):
+
+    valuesMemory = shared_memory.SharedMemory(name=valuesName)
+    outputMemory = shared_memory.SharedMemory(name=outputName)
+    workerState['memory'] = (valuesMemory, outputMemory)  #Retain references so the buffers stay attached
+    workerState['values'] = np.ndarray(shape, dtype=np.float64, buffer=valuesMemory.buf)
+    workerState['output'] = np.ndarray((shape[0], len(outputArrays), shape[1]), dtype=np.float64, buffer=outputMemory.buf)
+    workerState['forestSeason'] = forestSeason
+    workerState['nonForestSeason'] = nonForestSeason
+    workerState['movingWindowDays'] = movingWindowDays
+
+
+# Worker task - processes one projection (row 'column' of the shared values), output is written to the shared output block
+# Output - dictionary with the 'field', 'status' ('Success'|'Failed'), 'seconds', 'pid' and 'error' (traceback when failed)
+def processProjection(column, field):
+
+    startTime = time.perf_counter()
+    try:
+        outArrays = define_IgnitionProportionSeries(workerState['values'][column], workerState['movingWindowDays'], workerState['forestSeason'],
+                                                    workerState['nonForestSeason'])
+        for count, outArray in enumerate(outArrays):
+            workerState['output'][column, count, :] = outArray
+
+        return {"field": field, "status": "Success", "seconds": time.perf_counter() - startTime, "pid": os.getpid(), "error": None}
+
+    except Exception:
+        return {"field": field, "status": "Failed", "seconds": time.perf_counter() - startTime, "pid": os.getpid(), "error": traceback.format_exc()}
+
+
+# Function derives the Moving Window Average, Percentiles and Fire Ignition Proportion for the projections in a process pool
+# Input:
+# - inDataSet: Data Frame with the projection fields
+# - fieldList: List of projection fields to be processed
+# - movingWindowDays: Moving window number of days prior to the date to be derived
+# - dayOfYear: numpy array with the Day of Year per record
+# - workerCount: Number of worker processes, None the number of processors
+# - endDOYInclusive: see function 'ignition.define_FireSeasons'
+# - forestStartDOY, forestEndDOY, nonForestStartDOY, nonForestEndDOY: fire season days of year (see function 'ignition.define_FireSeasons') - the
+#   fire season records are passed to the worker initializer
+# Output - tuple (Data Frame, workerReport).  Data Frame has the same fields as 'ignition.define_IgnitionProportionBatch' - fields of failed
+# projections are not included.  workerReport is the list of task reports (see 'processProjection') in 'fieldList' order.
+def define_IgnitionProportionParallel(inDataSet, fieldList, movingWindowDays, dayOfYear, workerCount=None, endDOYInclusive=True,
+                                      forestStartDOY=forest_start_DOY, forestEndDOY=forest_end_DOY, nonForestStartDOY=nonforest_start_DOY,
+                                      nonForestEndDOY=nonforest_end_DOY):
+
+    if workerCount is None:
+        workerCount = os.cpu_count()
+    workerCount = max(1, min(workerCount, len(fieldList)))
+
+    forestSeason, nonForestSeason = define_FireSeasons(dayOfYear, endDOYInclusive, forestStartDOY, forestEndDOY, nonForestStartDOY, nonForestEndDOY)
+    shape = (len(fieldList), inDataSet.shape[0])
+
+    valuesMemory = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 8))
+    outputMemory = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * len(outputArrays) * shape[1] * 8))
+    try:
+        # Projection values - one row per projection
+        values = np.ndarray(shape, dtype=np.float64, buffer=valuesMemory.buf)
+        values[:] = inDataSet[fieldList].to_numpy(dtype=float).T
+        output = np.ndarray((shape[0], len(outputArrays), shape[1]), dtype=np.float64, buffer=outputMemory.buf)
+
+        reports = {}
+        with ProcessPoolExecutor(max_workers=workerCount, initializer=initWorker,
+                                 initargs=(valuesMemory.name, outputMemory.name, shape, forestSeason, nonForestSeason, movingWindowDays)) as executor:
+
+            futures = {executor.submit(processProjection, column, field): (column, field) for column, field in enumerate(fieldList)}
+            for future in as_completed(futures):
+                column, field = futures[future]
+                try:
+                    reports[column] = future.result()
+                except Exception:  #Worker process failure (e.g. worker terminated) - the remaining projections are still reported
+                    reports[column] = {"field": field, "status": "Failed", "seconds": None, "pid": None, "error": traceback.format_exc()}
+
+        workerReport = [reports[column] for column in range(len(fieldList))]
+
+        # Merge the output fields in 'fieldList' order
+        outFields = {}
+        if workerReport[0]["status"] == "Success":
+            outFields[fieldList[0] + "_" + str(movingWindowDays)] = output[0, 0, :].copy()
+        for column, field in enumerate(fieldList):
+            if workerReport[column]["status"] != "Success":
+                continue
+            outFields["PercForest" + field] = output[column, 1, :].copy()
+            outFields["PropFiresForest" + field] = output[column, 2, :].copy()
+            outFields["PercNonForest" + field] = output[column, 3, :].copy()
+            outFields["PropFiresNonForest" + field] = output[column, 4, :].copy()
+
+        del values, output
+        dfOut = pd.concat([inDataSet, pd.DataFrame(outFields, index=inDataSet.index)], axis=1)
+
+    finally:
+        valuesMemory.close()
+        valuesMemory.unlink()
+        outputMemory.close()
+        outputMemory.unlink()
+
+    return dfOut, workerReport
@@ -0,0 +1,246 @@
+# ---------------------------------------------------------------------------
+# pipeline.py
+# Fire Ignition Pipeline - runs the Historic, Projections, Summarize Normals, Now Cast and Scatter Plot stages in one process.  Stage outputs are
+# held in memory in 'FireIgnitionPipeline.frames' and passed to the following stages as Data Frames (i.e. not exported to .csv and re-imported).
+#
+# Example - Historic -> Normals -> Plot and Now Cast -> Plot:
+#   pipeline = FireIgnitionPipeline('bearlake_from_grid', referenceIndexFolder=r"C:\...\ReferenceIndex", logFileName=r"C:\...\FireIgnition.LogFile.txt")
+#   pipeline.loadStation(r"C:\...\gridmetData_wWB.csv")   #or pipeline.loadStationStore(r"C:\...\StationStore", serviceURL, maxAgeHours=12)
+#   pipeline.historic()
+#   pipeline.projections(r"C:\...\FLFO_SingleForestGrassland_WB_Daily_Deficit_AllPRJ.csv", ProjectionLoop)
+#   pipeline.normals(processList)   #Rows of the 'HistoricCurrentProcessingList' table - 'inFile' may be a stage name (e.g. 'historic', 'projections')
+#   pipeline.nowcast()
+#   pipeline.plot('Forest', r"C:\...\FireDangerHigh_Forest.jpg")
+
+import os
+from datetime import date, datetime
+
+import pandas as pd
+
+from . import ignition, reference, summarize
+from .climate_analyzer import read_ClimateAnalyzerCSV, subsetToPlus60
+from .state import define_NowCastIncremental
+
+# Field order of the 'HistoricCurrentProcessingList' table used by the Summarize Normals stage
+processListFields = ['inFile', 'inFileFieldAOA', 'inAOAWildcard', 'inFieldPerc', 'startYear', 'endYear', 'coverType', 'statistic', 'timeStep', 'rcp',
+                     'timeField']
+
+# Default Ensemble from normals definitions (RCP, DateTime)
+ensembleList = [('rcp45', '2031_2060'), ('rcp85', '2031_2060'), ('rcp45', '2061_2090'), ('rcp85', '2061_2090')]
+
+
+class FireIgnitionPipeline:
+
+    # Input:
+    # siteName - Gridmet station name (e.g. 'bearlake_from_grid')
+    # inFileField - Field in the station data being used in the fire ignition potential model (the deficit field)
+    # inFileTime - Time field in the station data
+    # movingWindowDays - Number of days in the moving window average
+    # refYearStartDate, refYearEndDate - reference years for which the Fire Ignition Model was evaluated
+    # referenceIndexFolder - Folder with the reference index files, None the reference is derived each run
+    # logFileName - Log file, None messages are only printed
+    # today - current date, default the current date
+    # forestStartDOY, forestEndDOY, nonForestStartDOY, nonForestEndDOY - fire season days of year, default the package fire season definitions
+    def __init__(self, siteName, inFileField='D (MM)', inFileTime='DATE', movingWindowDays=14, refYearStartDate='1/1/1984', refYearEndDate='12/31/2021',
+                 referenceIndexFolder=None, logFileName=None, today=None, forestStartDOY=ignition.forest_start_DOY, forestEndDOY=ignition.forest_end_DOY,
+                 nonForestStartDOY=ignition.nonforest_start_DOY, nonForestEndDOY=ignition.nonforest_end_DOY):
+
+        self.siteName = siteName
+        self.inFileField = inFileField
+        self.inFileTime = inFileTime
+        self.movingWindowDays = movingWindowDays
+        self.refYearStartDate = refYearStartDate
+        self.refYearEndDate = refYearEndDate
+        self.referenceIndexFolder = referenceIndexFolder
+        self.logFileName = logFileName
+        self.today = today if today is not None else date.today()
+        self.forestStartDOY = forestStartDOY
+        self.forestEndDOY = forestEndDOY
+        self.nonForestStartDOY = nonForestStartDOY
+        self.nonForestEndDOY = nonForestEndDOY
+
+        self.frames = {}      #Stage outputs by stage name
+        self.references = {}  #Sorted reference values by Fire Ignition equation type ('Forest'|'NonForest')
+
+    # Print and log a message with the time stamp
+    def log(self, message):
+
+        scriptMsg = message + " - " + datetime.now().isoformat()
+        print(scriptMsg)
+        if self.logFileName is not None:
+            with open(self.logFileName, "a") as logFile:
+                logFile.write(scriptMsg + "\n")
+
+    # Return the Data Frame for a stage name, Data Frame or .csv/.xlsx file path
+    def resolveInput(self, inFile):
+
+        if isinstance(inFile, pd.DataFrame):
+            return inFile
+        if inFile in self.frames:
+            return self.frames[inFile]
+        if str(inFile).lower().endswith(".csv"):
+            return pd.read_csv(inFile)
+        if os.path.exists(str(inFile)):
+            return pd.read_excel(inFile)
+
+        raise KeyError("Input - " + str(inFile) + " - is not a pipeline stage or file")
+
+    # Stage - Load the Climate Analyzer daily Water Balance .csv for the station
+    # Output - frames['station']
+    def loadStation(self, inFile):
+
+        self.frames['station'] = read_ClimateAnalyzerCSV(inFile, self.siteName)
+        self.log("Success - Loaded Gridmet Station - " + self.siteName)
+        return self.frames['station']
+
+    # Stage - Load the station daily table from the station store, pulled from the service URL if the store is not current (see
+    # 'station_store.refreshStationStore' - 'deltaFetch' pulls from the last closed year, the full table every 'fullRefreshDays' days)
+    # Output - frames['station']
+    def loadStationStore(self, storeFolder, serviceURL, maxAgeHours=None, endDate=None, fetchFunction=None, deltaFetch=False, fullRefreshDays=None):
+
+        from .station_store import fetchStationBytes, refreshStationStore
+
+        self.frames['station'], storeReport = refreshStationStore(storeFolder, self.siteName, serviceURL, maxAgeHours, endDate,
+                                                                  fetchStationBytes if fetchFunction is None else fetchFunction, self.today,
+                                                                  deltaFetch=deltaFetch, fullRefreshDays=fullRefreshDays)
+        if len(storeReport["replacedYears"]) > 0:
+            self.log("WARNING - Closed years revised in Climate Analyzer (replaced in the station store) - " + ", ".join(str(year) for year in storeReport["replacedYears"]))
+        self.log("Success - Loaded Gridmet Station from the station store (" + (storeReport["mode"] + " pull" if storeReport["fetched"] else "current") + ") - " + self.siteName)
+        return self.frames['station']
+
+    # Sorted Forest and Non-Forest reference values - derived once per pipeline and shared by the Historic and Now Cast stages
+    def defineReferences(self, stationData):
+
+        for equationType, startDOY, endDOY in (("Forest", self.forestStartDOY, self.forestEndDOY),
+                                               ("NonForest", self.nonForestStartDOY, self.nonForestEndDOY)):
+            if equationType not in self.references:
+                self.references[equationType] = reference.define_ReferenceIndex(stationData, self.inFileField, self.inFileTime, startDOY, endDOY,
+                                                                                self.refYearStartDate, self.refYearEndDate, self.siteName,
+                                                                                self.referenceIndexFolder)
+                self.log("Success - Reference - " + equationType)
+
+        return self.references
+
+    # Derive the Moving Window Average, Percentiles and Fire Ignition Proportion (Forest and Non-Forest) for the station data
+    # Output - Data Frame with the 'PercForest', 'PropFiresForest', 'PercNonForest', 'PropFiresNonForest' fields
+    def scoreStation(self, stationData=None):
+
+        if stationData is None:
+            stationData = self.frames['station']
+
+        references = self.defineReferences(stationData)
+        processField = self.inFileField + "_" + str(self.movingWindowDays)
+
+        df = ignition.define_MovingWindowAverage(stationData, self.movingWindowDays, self.inFileField)
+        df = ignition.define_IgnitionProportion(df, processField, references["Forest"], "PercForest", "PropFiresForest", "Forest")
+        df = ignition.define_IgnitionProportion(df, processField, references["NonForest"], "PercNonForest", "PropFiresNonForest", "NonForest")
+
+        return df.reset_index(drop=True)
+
+    # Stage - Historic 1991-2020 daily Fire Danger Ratings (see 'FireIgnitionRaw_GridMet_Historic.py')
+    # Output - frames['historic']
+    def historic(self, stationData=None):
+
+        dfScored = self.scoreStation(stationData)
+
+        dfNonForest = summarize.defineFireDangerRating(dfScored, 'PercNonForest', 'Non-Forest', self.inFileTime, self.today)
+        dfForest = summarize.defineFireDangerRating(dfScored, 'PercForest', 'Forest', self.inFileTime, self.today)
+
+        self.frames['historic'] = summarize.appendFiles([dfNonForest, dfForest])
+        self.log("Success - Historic Fire Danger Ratings 1991-2020 - " + self.siteName)
+        return self.frames['historic']
+
+    # Stage - Futures Fire Ignition Potential for the projections (see 'FireIgnitionRaw_Projections.py')
+    # Input: inDataSet - projections Data Frame or .csv file, fieldList - projection fields, inFileTime - time field, movingWindowDays - moving window days
+    # Output - frames['projections']
+    def projections(self, inDataSet, fieldList, inFileTime='time', movingWindowDays=7):
+
+        df = self.resolveInput(inDataSet)
+        dayOfYear = pd.to_datetime(df[inFileTime]).dt.dayofyear.to_numpy()
+
+        self.frames['projections'] = ignition.define_IgnitionProportionBatch(df, fieldList, movingWindowDays, dayOfYear, True, self.forestStartDOY,
+                                                                            self.forestEndDOY, self.nonForestStartDOY, self.nonForestEndDOY)
+        self.log("Success - Projections Fire Ignition Potential - " + str(len(fieldList)) + " projections")
+        return self.frames['projections']
+
+    # Stage - Summarize Normals (see 'FireIgnition_SummarizeNormals.py')
+    # Input:
+    # processList - Data Frame, list of lists or list of dictionaries with the 'processListFields' ('HistoricCurrentProcessingList' table),
+    # 'inFile' may be a stage name (e.g. 'historic', 'projections'), a Data Frame or a .csv/.xlsx file
+    # ensembleSiteName, ensembleCoverType - Site and Cover Type for the Ensemble from normals, None no Ensemble
+    # Output - frames['normals']
+    def normals(self, processList, ensembleSiteName=None, ensembleCoverType=None):
+
+        if isinstance(processList, pd.DataFrame):
+            rows = [dict(zip(processListFields, row)) for row in processList.itertuples(index=False)]
+        else:
+            rows = [row if isinstance(row, dict) else dict(zip(processListFields, row)) for row in processList]
+
+        inputs = {}
+        appendDfList = []
+        for count, row in enumerate(rows):
+
+            inFileKey = row['inFile'] if not isinstance(row['inFile'], pd.DataFrame) else id(row['inFile'])
+            if inFileKey not in inputs:
+                inputs[inFileKey] = self.resolveInput(row['inFile'])
+
+            appendDfList.append(summarize.summarizeFireDangerRating(inputs[inFileKey], row['inFileFieldAOA'], row['inAOAWildcard'], row['inFieldPerc'],
+                                                                    row['startYear'], row['endYear'], row['coverType'], row['statistic'],
+                                                                    row['timeStep'], row['rcp'], row['timeField']))
+            self.log("Successfully processed row: " + str(count))
+
+        dfallFiles = summarize.appendFiles(appendDfList)
+
+        if ensembleSiteName is not None:
+            appendDfList2 = [dfallFiles]
+            for rcpLU, dateTimeLU in ensembleList:
+                dfSubset = dfallFiles[(dfallFiles["CoverType"] == ensembleCoverType) & (dfallFiles["RCP"] == rcpLU) & (dfallFiles["DateTime"] == dateTimeLU)]
+                appendDfList2.append(summarize.calculateEnsembleAvg(dfSubset, ensembleSiteName, ensembleCoverType, rcpLU, dateTimeLU))
+            dfallFiles = summarize.appendFiles(appendDfList2)
+
+        self.frames['normals'] = dfallFiles
+        self.log("Success - Summarize Normals")
+        return self.frames['normals']
+
+    # Stage - Now Cast, last 'yearsBack' single year summaries and the Now Cast summary (see 'FireIgnitionPotentialNowCastSummarize.py')
+    # Output - frames['nowcast']
+    # stateFolder - folder with the per station Now Cast state files (see 'state.py'), None the full series is evaluated each run
+    def nowcast(self, stationData=None, yearsBack=25, nowCastDays=60, stateFolder=None):
+
+        if stationData is None:
+            stationData = self.frames['station']
+
+        dfPlus60 = subsetToPlus60(stationData, self.today, nowCastDays)
+
+        if stateFolder is not None:
+            self.frames['nowcast'], runInfo = define_NowCastIncremental(self, dfPlus60, stateFolder, yearsBack, nowCastDays)
+            self.log("Success - Processing appended last " + str(yearsBack) + " Year Summaries and Now Cast - " + self.siteName + " - State "
+                     + runInfo['mode'] + " - " + str(runInfo['recordsEvaluated']) + " records evaluated")
+            return self.frames['nowcast']
+
+        dfScored = self.scoreStation(dfPlus60)
+
+        strYearNow = self.today.year
+        appendDfList = []
+        for inFieldPerc, coverType in (('PercNonForest', 'Non-Forest'), ('PercForest', 'Forest')):
+            for year in range(strYearNow - yearsBack, strYearNow):
+                appendDfList.append(summarize.summarizeFireDangerRating(dfScored, 'SiteName', self.siteName, inFieldPerc, year, year, coverType, 'Mean',
+                                                                        'Year', 'na', self.inFileTime, inFileField=self.inFileField))
+
+        dfNowCast = summarize.subsetToNowCast(dfScored, self.today, nowCastDays, self.inFileField, self.inFileTime)
+        for inFieldPerc, coverType in (('PercForest', 'Forest'), ('PercNonForest', 'Non-Forest')):
+            appendDfList.append(summarize.summarizeFireDangerRating(dfNowCast, 'SiteName', self.siteName, inFieldPerc, 'NowCast', 'NowCast', coverType,
+                                                                    'Mean', 'Year', 'na', self.inFileTime, nowCast=True, inFileField=self.inFileField))
+
+        self.frames['nowcast'] = summarize.appendFiles(appendDfList)
+        self.log("Success - Processing appended last " + str(yearsBack) + " Year Summaries and Now Cast - " + self.siteName)
+        return self.frames['nowcast']
+
+    # Stage - High Fire Danger Scatter Plot from the Summarize Normals and Now Cast stages (see 'FireIgnition_ScatterPlot_MultipleProjections.py')
+    def plot(self, coverType, outFile, plotLegLoc='upper center', summaries='normals', nowCastSummary='nowcast', randomSeed=None):
+
+        from .plot import plotFireDangerHigh
+
+        plotFireDangerHigh(self.resolveInput(summaries), self.resolveInput(nowCastSummary), coverType, outFile, plotLegLoc, self.today, randomSeed)
+        self.log("Successfully processed Fire Ignition Scatter Plot: " + str(outFile))
+        return outFile
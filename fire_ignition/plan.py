@@ -0,0 +1,119 @@
+# ---------------------------------------------------------------------------
+# plan.py
+# Fetch planning for the THREDDS (NCSS) point requests (see 'GCM_wb_thredds_point_extractor_v3.py' 'fetchPlan').  The requests are worked out from
+# what the downstream scripts use ('consumer needs') rather than every parameter and the full calendar year - e.g. the Fire Ignition Projections
+# script only uses the daily deficit within the Forest (DOY 7-301) and Non-Forest (DOY 79-303) fire seasons, plus the moving window days before
+# the season start.
+#
+# Each need is a dictionary - 'param', 'd_or_m', optional 'startDOY'/'endDOY' (fire season, None the full year) and 'leadDays' (days needed before
+# 'startDOY', e.g. moving window days - 1).  Needs of the same parameter are merged into one day of year window per parameter and year - the
+# NPS Water Balance files hold one parameter per year, so one request per parameter and year is the minimum (parameters can not be combined in one
+# request).  Monthly requests are restricted by parameter only (full year).
+#
+# Example:
+#   plan = define_FetchPlan(points, range(2020, 2100), [{'param': 'deficit', 'd_or_m': 'daily', 'startDOY': 7, 'endDOY': 303, 'leadDays': 6}])
+#   url = define_WindowURL(url, 2030, plan['windows'][('deficit', 'daily')])
+
+import datetime
+import urllib.parse
+
+# Estimated response bytes per record and per request (header) by response format - NCSS .csv lines
+# ('2030-01-01T00:00:00Z,40.3125,-105.6042,123') and NetCDF (float64 time and int16 value per record)
+responseRecordBytes = {"csv": 45, "netcdf": 10}
+responseHeaderBytes = {"csv": 90, "netcdf": 1500}
+
+fullYearWindow = (1, 366)
+
+
+# Function defines the day of year window (first DOY, last DOY) of a need - the full year if the need has no 'startDOY'/'endDOY'
+def define_NeedWindow(need):
+
+    if need.get("startDOY") is None or need.get("endDOY") is None or need.get("d_or_m", "daily") != "daily":
+        return fullYearWindow
+
+    return max(1, int(need["startDOY"]) - int(need.get("leadDays", 0))), min(366, int(need["endDOY"]))
+
+
+# Function defines the window per parameter - the span of the needs' windows of each ('param', 'd_or_m')
+# Output - dictionary by ('param', 'd_or_m') of the (first DOY, last DOY) window
+def define_VariableWindows(needs):
+
+    windows = {}
+    for need in needs:
+        key = (need["param"].lower(), need.get("d_or_m", "daily").lower())
+        window = define_NeedWindow(need)
+        if key in windows:
+            window = (min(windows[key][0], window[0]), max(windows[key][1], window[1]))
+        windows[key] = window
+
+    return windows
+
+
+# Function defines the dates (first date, last date) of a day of year window in 'year' (DOY 366 is the last day of a non leap year)
+def define_WindowDates(year, window):
+
+    yearStart = datetime.date(year, 1, 1)
+    yearEnd = datetime.date(year, 12, 31)
+    return yearStart + datetime.timedelta(days=window[0] - 1), min(yearEnd, yearStart + datetime.timedelta(days=window[1] - 1))
+
+
+# Function sets the NCSS 'time_start'/'time_end' of a request url to the day of year window in 'year' - the url is unchanged for the full year window
+def define_WindowURL(url, year, window):
+
+    if window is None or tuple(window) == fullYearWindow:
+        return url
+
+    firstDate, lastDate = define_WindowDates(year, window)
+    parts = urllib.parse.urlsplit(url)
+    query = []
+    for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True):
+        if name == "time_start":
+            value = firstDate.isoformat() + "T00:00:00Z"
+        elif name == "time_end":
+            value = lastDate.isoformat() + "T23:59:59Z"
+        query.append((name, value))
+
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, urllib.parse.urlencode(query), parts.fragment))
+
+
+# Function estimates the records of one request (days in the window, 12 per monthly request)
+def define_RequestRecords(d_or_m, year, window):
+
+    if d_or_m != "daily":
+        return 12
+
+    firstDate, lastDate = define_WindowDates(year, window if window is not None else fullYearWindow)
+    return (lastDate - firstDate).days + 1
+
+
+# Function plans the requests of the points from the consumer needs
+# Input:
+# points - dictionary by place of tuples ('param', 'd_or_m')
+# years - years to request
+# needs - list of consumer needs (see above), None all parameters for the full year
+# responseFormat - 'CSV'|'NetCDF' (estimated bytes per record)
+# Output - dictionary with 'places' (places requested), 'dropped' (places not needed), 'windows' (see 'define_VariableWindows', None all full year),
+# 'requests', 'bytes' (estimated) and 'fullRequests', 'fullBytes' (every place for the full year)
+def define_FetchPlan(points, years, needs=None, responseFormat="CSV"):
+
+    recordBytes = responseRecordBytes[responseFormat.lower()]
+    headerBytes = responseHeaderBytes[responseFormat.lower()]
+    windows = define_VariableWindows(needs) if needs is not None else None
+
+    plan = {"places": [], "dropped": [], "windows": windows, "requests": 0, "bytes": 0, "fullRequests": 0, "fullBytes": 0}
+    for place, (param, d_or_m) in points.items():
+        key = (param.lower(), d_or_m.lower())
+        needed = windows is None or key in windows
+        if needed:
+            plan["places"].append(place)
+        else:
+            plan["dropped"].append(place)
+
+        for year in years:
+            plan["fullRequests"] += 1
+            plan["fullBytes"] += headerBytes + recordBytes * define_RequestRecords(key[1], year, None)
+            if needed:
+                plan["requests"] += 1
+                plan["bytes"] += headerBytes + recordBytes * define_RequestRecords(key[1], year, windows[key] if windows is not None else None)
+
+    return plan
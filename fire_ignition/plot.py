@@ -0,0 +1,130 @@
+# ---------------------------------------------------------------------------
+# plot.py
+# Scatter Plot of the number of days with a High Fire Danger rating by Forest or Non-Forest cover - highest annual count last 25 years, historic
+# normal (1991-2020), last four years, Now Cast and future projections and ensemble means by RCP 4.5 & 8.5 (see
+# 'FireIgnition_ScatterPlot_MultipleProjections.py').
+#
+# Figures are created with 'matplotlib.figure.Figure' (i.e. not pyplot) so plots can be created repeatedly in one process without a display.
+
+import random
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Cover Type specific plot labels
+plotLabels = {
+    'forest': {'coverType': 'Forest', 'title': "High Fire Danger - Forest", 'pastYears': 'Annual Count in Past Years',
+               'landcover': "forested landcover"},
+    'non-forest': {'coverType': 'Non-Forest', 'title': "High Fire Danger - Grassland and Shrub", 'pastYears': 'Annual Count Past Years',
+                   'landcover': "grassland and shrub landcover"},
+}
+
+
+# Function creates the High Fire Danger Scatter Plot
+# Input:
+# dfSummaries - Summary of Normals (i.e. Historic Normals, and Projections) - output of 'FireIgnitionPipeline.normals'
+# dfGridMetNowCast - Gridmet station Now Cast and single year summaries - output of 'FireIgnitionPipeline.nowcast'
+# coverType - 'Forest'|'Non-Forest'
+# outFile - output figure path (e.g. .jpg)
+# plotLegLoc - legend placement ('upper right'|'upper left'|'upper center'|'etc')
+# today - current date, default the current date
+# randomSeed - seed for the projection jitter, default None (i.e. varies by run)
+# Output - outFile
+def plotFireDangerHigh(dfSummaries, dfGridMetNowCast, coverType, outFile, plotLegLoc='upper center', today=None, randomSeed=None):
+
+    from matplotlib.figure import Figure
+
+    if coverType.lower() not in plotLabels:
+        raise ValueError("'coverType' variable - " + str(coverType) + " - is not defined as 'Forest' or 'Non-Forest'")
+    labels = plotLabels[coverType.lower()]
+    coverTypeLU = labels['coverType']
+
+    if today is None:
+        today = date.today()
+    strDate = today.strftime("%Y/%m/%d")
+    strYearNow = int(today.strftime("%Y"))
+    startYear = strYearNow - 4
+    endYear = strYearNow - 1
+    startYearMinusOne = startYear - 1
+
+    # Define the plotYear field value to be used in the plot
+    plotYearNowCast = endYear + 1
+    plotYear2031_2060 = endYear + 2
+    plotYear2061_2090 = endYear + 3
+
+    dfGridMetNowCast = dfGridMetNowCast.copy()
+    dfGridMetNowCast['Year'] = np.where((dfGridMetNowCast['DateTime'] != 'NowCast_NowCast'), dfGridMetNowCast['DateTime'].str[:4], plotYearNowCast)
+    dfGridMetNowCast['Year'] = pd.to_numeric(dfGridMetNowCast['Year'], errors='coerce')
+
+    dfSummaries = dfSummaries.copy()
+    dfSummaries['plotYear'] = np.where((dfSummaries['DateTime'] == '2031_2060'), plotYear2031_2060,
+                                       np.where((dfSummaries['DateTime'] == '2061_2090'), plotYear2061_2090, 999))
+
+    # Max Year - first/oldest year with the most High days
+    dfCoverType = dfGridMetNowCast.loc[(dfGridMetNowCast['CoverType'] == coverTypeLU)]
+    maxYear = int(dfCoverType.loc[dfCoverType['High_Mean'] == dfCoverType['High_Mean'].max()].iloc[0]['Year'])
+
+    # Years to be processed with the expected Syntax for the 'DateTime' field designation of the year range (i.e year_year)
+    rangeList = [maxYear] + [*range(startYear, endYear + 1)]
+    yearList = [str(year) + "_" + str(year) for year in rangeList]
+    xSeriesTics = [startYearMinusOne] + rangeList[1:] + [plotYearNowCast, plotYear2031_2060, plotYear2061_2090]
+    xSeriesLabel = rangeList + [strDate, '2031-2060', '2061-2090']
+
+    dfHistoric = dfCoverType.loc[dfCoverType['DateTime'].isin(yearList)]
+    dfNowCast = dfCoverType.loc[(dfCoverType['NowCastCount'] >= 0)]
+
+    dfCoverSummaries = dfSummaries.loc[(dfSummaries['CoverType'] == coverTypeLU)]
+    dfRCP45 = dfCoverSummaries.loc[(dfCoverSummaries['RCP'] == 'rcp45') & (dfCoverSummaries['GCM'] != 'Ensemble')].copy()
+    dfRCP85 = dfCoverSummaries.loc[(dfCoverSummaries['RCP'] == 'rcp85') & (dfCoverSummaries['GCM'] != 'Ensemble')].copy()
+    dfRCP45_Ensemble = dfCoverSummaries.loc[(dfCoverSummaries['RCP'] == 'rcp45') & (dfCoverSummaries['GCM'] == 'Ensemble')]
+    dfRCP85_Ensemble = dfCoverSummaries.loc[(dfCoverSummaries['RCP'] == 'rcp85') & (dfCoverSummaries['GCM'] == 'Ensemble')]
+    df1991_2020 = dfCoverSummaries.loc[(dfCoverSummaries['RCP'] == 'na')]
+
+    # Jitter fields for Projections
+    randomGenerator = random.Random(randomSeed)
+    dfRCP45['plotYearJitter'] = [x + randomGenerator.uniform(0, .5) - .25 for x in dfRCP45['plotYear']]
+    dfRCP85['plotYearJitter'] = [x + randomGenerator.uniform(0, .5) - .25 for x in dfRCP85['plotYear']]
+
+    nowCastDaysStr = "Short Term Forecast (" + str(int(dfNowCast['NowCastCount'].iloc[0])) + " days)"
+
+    # Max Year plotted at 'startYearMinusOne'
+    dfHistoricMax = dfHistoric.loc[(dfHistoric['Year'] == maxYear)].copy()
+    dfHistoricMax['Year'] = startYearMinusOne
+    dfHistoric = dfHistoric[1:]
+
+    figure = Figure(figsize=(10, 7.5))
+    ax = figure.subplots()
+
+    dfHistoricMax.plot(kind='scatter', x='Year', y='High_Mean', color='Black', marker="^", label='High Annual Count Last 25 Years', ax=ax, zorder=10)
+    dfHistoric.plot(kind='scatter', x='Year', y='High_Mean', color='Black', label=labels['pastYears'], ax=ax, zorder=9)
+    dfNowCast.plot(kind='scatter', x='Year', y='High_Mean', color='Orange', label=nowCastDaysStr, ax=ax, zorder=8)
+
+    # Shading for the Futures area
+    ax.axvspan(xmin=dfRCP45['plotYearJitter'].min() - 0.2, xmax=dfRCP85['plotYearJitter'].max() + 0.2, ymin=0, linewidth=8, color='lightskyblue', zorder=0)
+
+    dfRCP45.plot(kind='scatter', x='plotYearJitter', y='High_Mean', color='Blue', label='Low Emission Model Predictions (RCP4.5)', ax=ax, zorder=7)
+    dfRCP85.plot(kind='scatter', x='plotYearJitter', y='High_Mean', color='Red', label='High Emission Model Predictions (RCP8.5)', ax=ax, zorder=6)
+    dfRCP45_Ensemble.plot(kind='scatter', x='plotYear', y='High_Mean', color='Blue', label='Low Emission Model Mean', s=150, ax=ax, zorder=11)
+    dfRCP85_Ensemble.plot(kind='scatter', x='plotYear', y='High_Mean', color='Red', label='High Emission Model Mean', s=150, ax=ax, zorder=12)
+
+    ax.set_xticks(xSeriesTics)
+    ax.set_xticklabels(xSeriesLabel)
+    ax.set_ylabel("Number of Days")
+    ax.set_xlabel("Year - Current Date - Futures\n\n"
+                  "Number of days annually with a High Fire Danger Ignition Potential rating for " + labels['landcover'] + " at time steps:\n"
+                  "highest annual count last 25 years, historic mean (1991-2020), last four years, short term forecasts (30-60 days future)\n"
+                  "and climate future predictions (2031-2060, and 2061-2090) across 11 Global Circulation Models (GCM) and ensemble means\n"
+                  "across all GCMs by Representative Concentration Pathways (RCP) carbon scenarios 4.5 (low emissions) and 8.5 (high emissions).")
+
+    # 1991-2020 Normal Value - From Grid Met Station
+    normal1991_2020 = float(df1991_2020['High_Mean'].iloc[0])
+    ax.axhline(y=normal1991_2020, color='Black', xmin=0, xmax=0.6, zorder=13)
+    ax.text(dfHistoric['Year'].iat[0] + 0.25, normal1991_2020 + 1, 'Historic Mean 1991-2020', color='Black', rotation=360)
+
+    ax.legend(loc=plotLegLoc.lower(), fontsize='small', borderaxespad=0.2, facecolor="white", framealpha=1.0)
+    ax.set_title(labels['title'])
+
+    figure.savefig(outFile, dpi=100, bbox_inches='tight')
+
+    return outFile
@@ -0,0 +1,147 @@
+# ---------------------------------------------------------------------------
+# reference.py
+# Fire season reference values (i.e. the records a day is ranked against when defining the Percentile) and the Reference Index - persisted
+# sorted reference values loaded as a memory map.
+#
+# Reference index is saved as a .npy file (sorted reference values) with a .json metadata file.  Files are keyed by station, field, fire season
+# day of year start and end, and the reference start and end dates, and are compatible with the indexes created by the Fire Ignition scripts.
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+# Function defines the reference records - records within the fire season day of year range and the reference years
+# Input:
+# 1. stationData - Data Frame with the daily data
+# 2. inFileField - Field with the daily values (e.g. 'D (MM)')
+# 3. inFileTime - Time field (e.g. 'DATE').  If the Data Frame index is a DatetimeIndex it is used in place of the time field
+# 4. startDOY - Start of the fire season Day of Year
+# 5. endDOY - End of the fire season Day of Year
+# 6. refYearStartDate - Start date of the reference years (format '%m/%d/%Y'), None no subset by reference years (e.g. Futures)
+# 7. refYearEndDate - End date of the reference years (format '%m/%d/%Y'), inclusive
+# 8. endDOYInclusive - True records on 'endDOY' are included (Projections), False excluded (Gridmet station scripts)
+# Output - Data Frame with the fields 'inFileTime', 'inFileField', 'timeDate' and 'DOY' for the reference records
+def define_ReferenceList(stationData, inFileField, inFileTime, startDOY, endDOY, refYearStartDate=None, refYearEndDate=None, endDOYInclusive=False):
+
+    if isinstance(stationData.index, pd.DatetimeIndex):
+        timeDate = pd.Series(stationData.index, index=stationData.index)
+    else:
+        timeDate = pd.to_datetime(stationData[inFileTime])
+
+    df = pd.DataFrame({inFileField: stationData[inFileField]})
+    if inFileTime in stationData.columns:
+        df.insert(0, inFileTime, stationData[inFileTime])
+    df["timeDate"] = timeDate
+    df["DOY"] = timeDate.dt.dayofyear
+
+    if endDOYInclusive:
+        fireSeason = (df['DOY'] >= startDOY) & (df['DOY'] <= endDOY)
+    else:
+        fireSeason = (df['DOY'] >= startDOY) & (df['DOY'] < endDOY)
+
+    if refYearStartDate is not None:
+        refYearStartDT = pd.to_datetime(refYearStartDate, format='%m/%d/%Y')
+        refYearEndDT = pd.to_datetime(refYearEndDate, format='%m/%d/%Y')
+        fireSeason = fireSeason & (df['timeDate'] >= refYearStartDT) & (df['timeDate'] <= refYearEndDT)
+
+    return df[fireSeason].reset_index(drop=True)
+
+
+# Function returns the reference values sorted ascending (NaN values at the end).  Values which are not numeric are set to NaN.
+def define_ReferenceSorted(stationData, inFileField, inFileTime, startDOY, endDOY, refYearStartDate=None, refYearEndDate=None, endDOYInclusive=False):
+
+    refDF = define_ReferenceList(stationData, inFileField, inFileTime, startDOY, endDOY, refYearStartDate, refYearEndDate, endDOYInclusive)
+
+    return np.sort(pd.to_numeric(refDF[inFileField], errors='coerce').to_numpy(dtype=float))
+
+
+# Function returns the sorted reference values - loaded from the reference index in 'indexFolder' if it exists, otherwise derived via function
+# 'define_ReferenceSorted' and saved to the reference index.  If 'indexFolder' is None the reference is derived and not saved.
+# Input: see function 'define_ReferenceList', 'station' - station name used in the reference index key, 'extraMetadata' - optional dictionary
+# of additional metadata which must match for an index to be loaded (e.g. source file size and modified time)
+# Output - numpy array with the reference values sorted ascending (NaN values at the end)
+def define_ReferenceIndex(stationData, inFileField, inFileTime, startDOY, endDOY, refYearStartDate, refYearEndDate, station, indexFolder,
+                          endDOYInclusive=False, extraMetadata=None):
+
+    if indexFolder is None:
+        return define_ReferenceSorted(stationData, inFileField, inFileTime, startDOY, endDOY, refYearStartDate, refYearEndDate, endDOYInclusive)
+
+    key = define_ReferenceIndexKey(station, inFileField, startDOY, endDOY, refYearStartDate, refYearEndDate)
+    metadata = {"station": station, "field": inFileField, "startDOY": startDOY, "endDOY": endDOY, "refYearStartDate": refYearStartDate,
+                "refYearEndDate": refYearEndDate}
+    if extraMetadata is not None:
+        metadata.update(extraMetadata)
+
+    refSorted = load_ReferenceIndex(indexFolder, key, metadata)
+    if refSorted is None:
+        refSorted = define_ReferenceSorted(stationData, inFileField, inFileTime, startDOY, endDOY, refYearStartDate, refYearEndDate, endDOYInclusive)
+        save_ReferenceIndex(indexFolder, key, metadata, refSorted)
+
+    return refSorted
+
+
+# Function defines the reference index key (i.e. file name without extension)
+def define_ReferenceIndexKey(station, inFileField, startDOY, endDOY, refYearStartDate, refYearEndDate):
+
+    if refYearStartDate is None:  #Reference is not trimmed to reference years (e.g. Futures)
+        refYearsStr = "AllYears"
+    else:
+        refYearStartStr = pd.to_datetime(refYearStartDate, format='%m/%d/%Y').strftime("%Y%m%d")
+        refYearEndStr = pd.to_datetime(refYearEndDate, format='%m/%d/%Y').strftime("%Y%m%d")
+        refYearsStr = refYearStartStr + "_" + refYearEndStr
+
+    key = str(station) + "_" + str(inFileField) + "_DOY" + str(startDOY) + "_" + str(endDOY) + "_" + refYearsStr
+    # Replace characters which are not file name safe (e.g. 'D (MM)')
+    key = "".join(character if character.isalnum() or character in "-_" else "_" for character in key)
+
+    return key
+
+
+# Function loads the reference index as a memory mapped numpy array if the index and matching metadata exists
+# Output - sorted numpy array or None if there is no valid index
+def load_ReferenceIndex(indexFolder, key, metadata):
+
+    indexFile = os.path.join(indexFolder, key + ".npy")
+    metadataFile = os.path.join(indexFolder, key + ".json")
+
+    if not os.path.exists(indexFile) or not os.path.exists(metadataFile):
+        return None
+
+    with open(metadataFile, "r") as inFile:
+        metadataIndex = json.load(inFile)
+
+    # Check the Index was built with the same definition
+    for field in metadata:
+        if metadataIndex.get(field) != metadata[field]:
+            return None
+
+    refSorted = np.load(indexFile, mmap_mode='r')
+    if refSorted.shape[0] != metadataIndex.get("records"):
+        return None
+
+    return refSorted
+
+
+# Function saves the sorted reference values and metadata to the reference index folder.  Files are written to a temporary file and then
+# renamed so a partially written index is never loaded.
+def save_ReferenceIndex(indexFolder, key, metadata, refSorted):
+
+    os.makedirs(indexFolder, exist_ok=True)
+
+    indexFile = os.path.join(indexFolder, key + ".npy")
+    metadataFile = os.path.join(indexFolder, key + ".json")
+
+    with open(indexFile + ".tmp", "wb") as outFile:
+        np.save(outFile, refSorted)
+    os.replace(indexFile + ".tmp", indexFile)
+
+    metadataOut = dict(metadata)
+    metadataOut["records"] = int(refSorted.shape[0])
+    metadataOut["created"] = datetime.now().isoformat()
+    with open(metadataFile + ".tmp", "w") as outFile:
+        json.dump(metadataOut, outFile, indent=2)
+    os.replace(metadataFile + ".tmp", metadataFile)
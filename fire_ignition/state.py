@@ -0,0 +1,223 @@
+# ---------------------------------------------------------------------------
+# state.py
+# Incremental Now Cast - persisted per station state so a daily run only evaluates the open (current) year and the Now Cast window.
+#
+# Percentiles of closed years against the fixed reference years never change, so the state holds:
+# - annual High, Medium, Low day counts by cover type for the closed years (i.e. years prior to the current year)
+# - the rolling window state (see 'streaming.StreamingIgnitionEvaluator') at December 31 of the last closed year
+# - a hash of the station values through the last closed year - if Climate Analyzer revises a closed year the hash does not match and the state
+#   is rebuilt from the full series
+# - the last processed date, and a hash and summary of the last open year/Now Cast window - an unchanged window reuses the previous summary
+#
+# Output is identical to 'FireIgnitionPipeline.nowcast' without a state.
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .streaming import StreamingIgnitionEvaluator
+from .summarize import appendFiles, defineFireDangerClasses, subsetToNowCast, summarizeFireDangerRating
+
+# Cover Types processed - (Percentile field, Cover Type, Fire Ignition equation type)
+coverTypes = [('PercNonForest', 'Non-Forest', 'NonForest'), ('PercForest', 'Forest', 'Forest')]
+
+stateVersion = 1
+
+
+# Function defines the hash of the station values (float64 bytes) and the first date
+def define_ValuesHash(values, firstDate, extra=""):
+
+    hashObject = hashlib.sha256()
+    hashObject.update((str(firstDate) + "|" + str(extra)).encode("utf-8"))
+    hashObject.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return hashObject.hexdigest()
+
+
+# Function defines the state file for the station
+def define_StateFile(stateFolder, siteName, inFileField, movingWindowDays):
+
+    key = str(siteName) + "_" + str(inFileField) + "_" + str(movingWindowDays) + "_NowCastState"
+    key = "".join(character if character.isalnum() or character in "-_" else "_" for character in key)
+    return os.path.join(stateFolder, key + ".json")
+
+
+# Function loads the state, None if there is no state or the state was created with different parameters
+def load_NowCastState(stateFile, parameters):
+
+    if not os.path.exists(stateFile):
+        return None
+
+    with open(stateFile, "r") as inFile:
+        state = json.load(inFile)
+
+    if state.get("version") != stateVersion:
+        return None
+    for field in parameters:
+        if state.get(field) != parameters[field]:
+            return None
+
+    return state
+
+
+# Function saves the state - written to a temporary file and renamed so a partially written state is never loaded
+def save_NowCastState(stateFile, state):
+
+    os.makedirs(os.path.dirname(stateFile), exist_ok=True)
+    with open(stateFile + ".tmp", "w") as outFile:
+        json.dump(state, outFile)
+    os.replace(stateFile + ".tmp", stateFile)
+
+
+# Function builds the annual summary records (see 'summarize.summarizeFireDangerRating' timeStep 'Year') from the cached annual sums
+def define_AnnualSummaries(state, siteName, startYear, endYear):
+
+    appendDfList = []
+    for inFieldPerc, coverType, equationType in coverTypes:
+        for year in range(startYear, endYear + 1):
+            if str(year) not in state["annualSums"][coverType]:
+                raise ValueError("No records to summarize for - " + str(siteName) + " - " + str(year) + "_" + str(year))
+            highSum, mediumSum, lowSum = state["annualSums"][coverType][str(year)]
+            appendDfList.append(pd.DataFrame({'SiteName': [siteName], 'CoverType': [coverType], 'GCM': ['na'], 'RCP': ['na'],
+                                              'DateTime': [str(year) + "_" + str(year)], 'High_Mean': [float(highSum)],
+                                              'Medium_Mean': [float(mediumSum)], 'Low_Mean': [float(lowSum)]}))
+
+    return appendDfList
+
+
+# Function builds the state from the full station series (vectorized scoring)
+def define_FullState(pipeline, dfPlus60, parameters, closedThroughYear):
+
+    dfScored = pipeline.scoreStation(dfPlus60)
+    timeDate = pd.to_datetime(dfScored[pipeline.inFileTime])
+    values = pd.to_numeric(dfScored[pipeline.inFileField], errors='coerce').to_numpy(dtype=float)
+
+    # Annual High, Medium, Low day counts for the closed years
+    closedRecords = int((timeDate.dt.year <= closedThroughYear).sum())
+    annualSums = {}
+    for inFieldPerc, coverType, equationType in coverTypes:
+        dfClasses = defineFireDangerClasses(dfScored.iloc[0:closedRecords], inFieldPerc, coverType)
+        dfSums = dfClasses.groupby(timeDate.iloc[0:closedRecords].dt.year)[['High', 'Medium', 'Low']].sum()
+        annualSums[coverType] = {str(year): [int(row.High), int(row.Medium), int(row.Low)] for year, row in dfSums.iterrows()}
+
+    # Rolling window state at the end of the last closed year
+    evaluator = StreamingIgnitionEvaluator(pipeline.references["Forest"], "Forest", pipeline.movingWindowDays)
+    evaluator.prime(values[0:closedRecords])
+
+    state = dict(parameters)
+    state.update({"version": stateVersion, "firstDate": timeDate.iloc[0].strftime('%Y-%m-%d'), "closedThroughYear": closedThroughYear,
+                  "closedRecords": closedRecords, "closedHash": define_ValuesHash(values[0:closedRecords], timeDate.iloc[0].strftime('%Y-%m-%d')),
+                  "rollingState": evaluator.getState(), "annualSums": annualSums})
+    return state, dfScored
+
+
+# Function extends the state closed years through 'closedThroughYear' by streaming the newly closed years from the rolling window state
+def extend_ClosedYears(pipeline, state, values, timeDate, closedThroughYear):
+
+    closedRecords = int((timeDate.dt.year <= closedThroughYear).sum())
+    evaluators = {}
+    for inFieldPerc, coverType, equationType in coverTypes:
+        evaluators[coverType] = StreamingIgnitionEvaluator(pipeline.references[equationType], equationType, pipeline.movingWindowDays)
+        evaluators[coverType].setState(state["rollingState"])
+
+    for index in range(state["closedRecords"], closedRecords):
+        year = str(timeDate.iloc[index].year)
+        for inFieldPerc, coverType, equationType in coverTypes:
+            evaluator = evaluators[coverType]
+            fireDangerClass = evaluator.score(evaluator.update(values[index]))[2]
+            sums = state["annualSums"][coverType].setdefault(year, [0, 0, 0])
+            sums[['High', 'Medium', 'Low'].index(fireDangerClass)] += 1
+
+    state["rollingState"] = evaluators['Forest'].getState()
+    state["closedThroughYear"] = closedThroughYear
+    state["closedRecords"] = closedRecords
+    state["closedHash"] = define_ValuesHash(values[0:closedRecords], state["firstDate"])
+    return state
+
+
+# Function scores the open year and Now Cast records from the rolling window state
+# Output - Data Frame with the open year and Now Cast records and the 'PercForest' and 'PercNonForest' fields
+def define_OpenYearScored(pipeline, state, dfPlus60, values):
+
+    dfOpen = dfPlus60.iloc[state["closedRecords"]:].copy()
+    for inFieldPerc, coverType, equationType in coverTypes:
+        evaluator = StreamingIgnitionEvaluator(pipeline.references[equationType], equationType, pipeline.movingWindowDays)
+        evaluator.setState(state["rollingState"])
+        dfOpen[inFieldPerc] = [evaluator.score(evaluator.update(value))[0] for value in values[state["closedRecords"]:]]
+
+    return dfOpen
+
+
+# Function runs the Now Cast with the persisted station state (see 'FireIgnitionPipeline.nowcast')
+# Input:
+# pipeline - FireIgnitionPipeline for the station
+# dfPlus60 - station data through the current date plus 'nowCastDays' (see 'climate_analyzer.subsetToPlus60')
+# stateFolder - folder with the station state files
+# Output - tuple (Now Cast summary Data Frame, runInfo).  runInfo 'mode' is 'full' (state created or rebuilt), 'incremental' (open year and Now
+# Cast evaluated) or 'unchanged' (open year and Now Cast window unchanged since the last run), and 'recordsEvaluated' the number of records scored
+def define_NowCastIncremental(pipeline, dfPlus60, stateFolder, yearsBack=25, nowCastDays=60):
+
+    today = pipeline.today
+    closedThroughYear = today.year - 1
+    parameters = {"siteName": pipeline.siteName, "inFileField": pipeline.inFileField, "inFileTime": pipeline.inFileTime,
+                  "movingWindowDays": pipeline.movingWindowDays, "refYearStartDate": pipeline.refYearStartDate, "refYearEndDate": pipeline.refYearEndDate,
+                  "fireSeasonDOY": [pipeline.forestStartDOY, pipeline.forestEndDOY, pipeline.nonForestStartDOY, pipeline.nonForestEndDOY]}
+
+    stateFile = define_StateFile(stateFolder, pipeline.siteName, pipeline.inFileField, pipeline.movingWindowDays)
+    state = load_NowCastState(stateFile, parameters)
+
+    timeDate = pd.to_datetime(dfPlus60[pipeline.inFileTime]).reset_index(drop=True)
+    values = pd.to_numeric(dfPlus60[pipeline.inFileField], errors='coerce').to_numpy(dtype=float)
+    firstDate = timeDate.iloc[0].strftime('%Y-%m-%d')
+
+    # Closed years must be unchanged (i.e. not revised) since the state was saved
+    if state is not None:
+        if state["firstDate"] != firstDate or state["closedRecords"] > len(values) or state["closedThroughYear"] > closedThroughYear or \
+                define_ValuesHash(values[0:state["closedRecords"]], firstDate) != state["closedHash"]:
+            state = None
+
+    pipeline.defineReferences(dfPlus60)
+
+    if state is None:
+        mode = "full"
+        state, dfScored = define_FullState(pipeline, dfPlus60, parameters, closedThroughYear)
+        recordsEvaluated = len(values)
+    else:
+        mode = "incremental"
+        recordsEvaluated = 0
+        if state["closedThroughYear"] < closedThroughYear:  #New year(s) closed since the last run
+            recordsEvaluated = int((timeDate.dt.year <= closedThroughYear).sum()) - state["closedRecords"]
+            state = extend_ClosedYears(pipeline, state, values, timeDate, closedThroughYear)
+        dfScored = None
+
+    appendDfList = define_AnnualSummaries(state, pipeline.siteName, today.year - yearsBack, closedThroughYear)
+
+    # Open year and Now Cast window
+    nowCastHash = define_ValuesHash(values[state["closedRecords"]:], firstDate, str(today) + "|" + state["closedHash"])
+    if mode == "incremental" and state.get("nowCastHash") == nowCastHash:
+        mode = "unchanged"
+        dfNowCastSummary = pd.DataFrame(state["nowCastSummary"])
+    else:
+        if dfScored is None:
+            dfScored = define_OpenYearScored(pipeline, state, dfPlus60, values)
+            recordsEvaluated += len(values) - state["closedRecords"]
+
+        dfNowCast = subsetToNowCast(dfScored, today, nowCastDays, pipeline.inFileField, pipeline.inFileTime)
+        nowCastList = []
+        for inFieldPerc, coverType in (('PercForest', 'Forest'), ('PercNonForest', 'Non-Forest')):
+            nowCastList.append(summarizeFireDangerRating(dfNowCast, 'SiteName', pipeline.siteName, inFieldPerc, 'NowCast', 'NowCast', coverType, 'Mean',
+                                                         'Year', 'na', pipeline.inFileTime, nowCast=True, inFileField=pipeline.inFileField))
+        dfNowCastSummary = appendFiles(nowCastList)
+
+    state["nowCastHash"] = nowCastHash
+    state["nowCastSummary"] = dfNowCastSummary.to_dict(orient="records")
+    state["lastProcessedDate"] = timeDate.iloc[-1].strftime('%Y-%m-%d')
+    state["lastRunDate"] = str(today)
+    state["updated"] = datetime.now().isoformat()
+    save_NowCastState(stateFile, state)
+
+    appendDfList.extend([dfNowCastSummary.iloc[[count]] for count in range(dfNowCastSummary.shape[0])])
+    return appendFiles(appendDfList), {"mode": mode, "recordsEvaluated": recordsEvaluated}
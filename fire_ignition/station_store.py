@@ -0,0 +1,338 @@
+# ---------------------------------------------------------------------------
+# station_store.py
+# Per station columnar (Parquet) store of the parsed Climate Analyzer daily Water Balance table (see 'climate_analyzer.read_ClimateAnalyzerDaily')
+# shared by the Historic, Now Cast and Now Cast Batch scripts and the pipeline.  The table is pulled and parsed once per refresh rather than by
+# every script, and the 40+ years of history are read back as columns instead of being re-parsed from a work .csv file.
+#
+#   {storeFolder}/{site}/year={YYYY}.parquet   closed years (years prior to the open year) - written once, only rewritten by a full refresh
+#   {storeFolder}/{site}/tail.parquet          open (current) year and the Now Cast days - replaced on each refresh
+#   {storeFolder}/{site}/store.json            fields, closed years (records, first/last date, sha256 of the values), tail and last refresh time
+#
+# Values are parsed and stored as float64 ('INDEX' int64, 'DATE' timestamp), i.e. the same values as the .csv parse.  A full pull replaces closed
+# years which differ from the stored year (e.g. revised in Climate Analyzer) and reports them in 'replacedYears'.
+#
+# Delta fetch ('deltaFetch') - a refresh only pulls the last closed year through the open year (service URL 'year1' set to the last closed year)
+# instead of the full table.  The last closed year is the overlap with the stored history - the pulled year (record numbers shifted to the store)
+# must match the stored year, otherwise Climate Analyzer revised the history (or the pull differs, e.g. the water balance started at 'year1') and
+# the full table is pulled and replaces the store.  The full table is also pulled every 'fullRefreshDays' days so revisions of older years are
+# picked up.
+#
+# Example:
+#   stationData, storeReport = refreshStationStore(r"C:\ROMN\Climate\StationStore", 'bearlake_from_grid', serviceURL, maxAgeHours=12,
+#                                                  deltaFetch=True, fullRefreshDays=30)
+#
+#Dependencies:
+#pyarrow
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import urllib.parse
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from .climate_analyzer import read_ClimateAnalyzerDaily
+
+storeVersion = 2
+metadataFile = "store.json"
+tailFile = "tail.parquet"
+
+
+# Function defines the store folder of a station (site name URL quoted so any site name is a valid folder name)
+def define_StationFolder(storeFolder, siteName):
+
+    return os.path.join(storeFolder, urllib.parse.quote(str(siteName), safe=""))
+
+
+# Function defines the closed year file of a station
+def define_YearFile(stationFolder, year):
+
+    return os.path.join(stationFolder, "year=" + str(year) + ".parquet")
+
+
+# Function defines the sha256 of the dates and values of a block of daily records (NaN values hash the same)
+def define_BlockHash(dfDaily):
+
+    hashObject = hashlib.sha256()
+    hashObject.update(np.ascontiguousarray(dfDaily.index.to_numpy(dtype="datetime64[ns]").view(np.int64)).tobytes())
+    for field in dfDaily.columns:
+        hashObject.update(field.encode("utf-8"))
+        hashObject.update(np.ascontiguousarray(dfDaily[field].to_numpy(dtype=np.float64 if field != "INDEX" else np.int64)).tobytes())
+
+    return hashObject.hexdigest()
+
+
+# Function loads the store metadata of a station, None if there is no store (or a store of another version)
+def load_StoreMetadata(stationFolder):
+
+    inFile = os.path.join(stationFolder, metadataFile)
+    if not os.path.exists(inFile):
+        return None
+
+    with open(inFile, "r") as inJSON:
+        metadata = json.load(inJSON)
+
+    return metadata if metadata.get("version") == storeVersion else None
+
+
+# Function saves the store metadata - written to a temporary file and renamed so a partially written metadata file is never loaded
+def save_StoreMetadata(stationFolder, metadata):
+
+    outFile = os.path.join(stationFolder, metadataFile)
+    with open(outFile + ".tmp", "w") as outJSON:
+        json.dump(metadata, outJSON, indent=1)
+    os.replace(outFile + ".tmp", outFile)
+
+
+# Function writes a block of daily records (DatetimeIndex 'DATE', 'INDEX' and the value fields) as a Parquet file, values as float64
+def write_DailyParquet(dfDaily, outFile):
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = {"DATE": pa.array(dfDaily.index.to_numpy(dtype="datetime64[ns]"))}
+    for field in dfDaily.columns:
+        columns[field] = pa.array(dfDaily[field].to_numpy(dtype=np.int64 if field == "INDEX" else np.float64))
+
+    pq.write_table(pa.table(columns), outFile + ".tmp")
+    os.replace(outFile + ".tmp", outFile)
+
+
+# Function writes the parsed daily table of a station to the store - closed years not in the store are written, the tail is replaced if the table
+# includes the open year
+# Input:
+# storeFolder - store folder
+# siteName - Gridmet station name
+# dfDaily - daily table (see 'climate_analyzer.read_ClimateAnalyzerDaily')
+# today - current date (open year and the refresh date), None today
+# source - source of the table recorded in the metadata (e.g. the service URL)
+# replaceClosed - True closed years differing from the stored year are rewritten (full refresh), False they are only reported
+# fullRefresh - True the table is the full table (the full refresh date is recorded, see 'updateStationStore' 'fullRefreshDays')
+# Output - report dictionary - 'closedWritten', 'revisedYears' (closed years differing from the stored year - not written), 'replacedYears' (closed
+# years differing from the stored year - rewritten), 'tailRecords' (None tail not replaced), 'rebuilt' (True the store was removed and rewritten,
+# e.g. different fields)
+def write_StationStore(storeFolder, siteName, dfDaily, today=None, source=None, replaceClosed=False, fullRefresh=False):
+
+    today = date.today() if today is None else today
+    stationFolder = define_StationFolder(storeFolder, siteName)
+    fields = list(dfDaily.columns)
+    report = {"closedWritten": [], "revisedYears": [], "replacedYears": [], "tailRecords": None, "rebuilt": False}
+
+    metadata = load_StoreMetadata(stationFolder)
+    if metadata is not None and metadata["fields"] != fields:
+        shutil.rmtree(stationFolder)
+        metadata = None
+        report["rebuilt"] = True
+    if metadata is None:
+        if os.path.exists(stationFolder):
+            shutil.rmtree(stationFolder)
+        os.makedirs(stationFolder)
+        metadata = {"version": storeVersion, "siteName": siteName, "fields": fields, "closedYears": {}, "tail": None, "refreshed": None,
+                    "source": None}
+
+    years = dfDaily.index.year.to_numpy()
+    for year in np.unique(years[years < today.year]):
+        dfYear = dfDaily.iloc[np.flatnonzero(years == year)]
+        yearHash = define_BlockHash(dfYear)
+        storedYear = metadata["closedYears"].get(str(year))
+        if storedYear is not None:
+            if storedYear["sha256"] == yearHash:
+                continue
+            if not replaceClosed:
+                report["revisedYears"].append(int(year))
+                continue
+            report["replacedYears"].append(int(year))
+
+        write_DailyParquet(dfYear, define_YearFile(stationFolder, year))
+        metadata["closedYears"][str(year)] = {"records": len(dfYear), "first": str(dfYear.index[0].date()), "last": str(dfYear.index[-1].date()),
+                                             "sha256": yearHash}
+        if storedYear is None:
+            report["closedWritten"].append(int(year))
+
+    dfTail = dfDaily.iloc[np.flatnonzero(years >= today.year)]
+    if len(dfTail) > 0:
+        write_DailyParquet(dfTail, os.path.join(stationFolder, tailFile))
+        metadata["tail"] = {"year": today.year, "records": len(dfTail), "first": str(dfTail.index[0].date()), "last": str(dfTail.index[-1].date())}
+        metadata["refreshed"] = datetime.now().isoformat()
+        metadata["source"] = source
+        if fullRefresh:
+            metadata["fullRefreshed"] = str(today)
+        report["tailRecords"] = len(dfTail)
+    elif metadata["tail"] is not None and str(metadata["tail"]["year"]) in metadata["closedYears"]:
+        # Tail year now closed
+        os.remove(os.path.join(stationFolder, tailFile))
+        metadata["tail"] = None
+
+    metadata["closedYears"] = dict(sorted(metadata["closedYears"].items()))
+    save_StoreMetadata(stationFolder, metadata)
+
+    return report
+
+
+# Function checks the store of a station is current - tail of the open year refreshed within 'maxAgeHours' and (if defined) through 'endDate'
+# Input: storeFolder, siteName, maxAgeHours - hours since the last refresh (None any age), endDate - last date needed (e.g. today plus 60 days),
+# today - current date, None today
+def isStoreCurrent(storeFolder, siteName, maxAgeHours=None, endDate=None, today=None):
+
+    today = date.today() if today is None else today
+    metadata = load_StoreMetadata(define_StationFolder(storeFolder, siteName))
+    if metadata is None or metadata["tail"] is None or metadata["tail"]["year"] != today.year:
+        return False
+    if maxAgeHours is not None and (datetime.now() - datetime.fromisoformat(metadata["refreshed"])).total_seconds() > maxAgeHours * 3600.0:
+        return False
+    if endDate is not None and pd.Timestamp(metadata["tail"]["last"]) < pd.Timestamp(endDate):
+        return False
+
+    return True
+
+
+# Function reads the daily table of a station from the store (closed years and the tail)
+# Input:
+# storeFolder, siteName - store folder and Gridmet station name
+# valueDtype - data type of the value fields (stored as float64, the .csv values)
+# endDate - last date returned (see 'climate_analyzer.read_ClimateAnalyzerDaily'), None all records
+# Output - Data Frame in the 'climate_analyzer.read_ClimateAnalyzerCSV' layout ('INDEX', 'SiteName', 'DATE' and the value fields)
+def read_StationStore(storeFolder, siteName, valueDtype='float64', endDate=None):
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    stationFolder = define_StationFolder(storeFolder, siteName)
+    metadata = load_StoreMetadata(stationFolder)
+    if metadata is None:
+        raise ValueError("Station store not found - " + stationFolder)
+
+    # Closed years must be consecutive - a missing year would shift the moving windows
+    closedYears = [int(year) for year in metadata["closedYears"]]
+    if len(closedYears) > 0 and closedYears != list(range(closedYears[0], closedYears[-1] + 1)):
+        raise ValueError("Station store closed years are not consecutive - " + stationFolder)
+
+    inFiles = [define_YearFile(stationFolder, year) for year in closedYears]
+    if metadata["tail"] is not None:
+        if len(closedYears) > 0 and metadata["tail"]["year"] != closedYears[-1] + 1:
+            raise ValueError("Station store tail does not follow the closed years - " + stationFolder)
+        inFiles.append(os.path.join(stationFolder, tailFile))
+
+    table = pa.concat_tables([pq.read_table(inFile) for inFile in inFiles])
+    df = table.to_pandas()
+
+    for field in metadata["fields"]:
+        if field != "INDEX":
+            df[field] = df[field].astype(valueDtype)
+
+    if endDate is not None:
+        matchEnd = (df['DATE'] == pd.Timestamp(endDate)).to_numpy()
+        if not matchEnd.any():
+            raise ValueError("End date - " + pd.Timestamp(endDate).strftime('%m/%d/%Y') + " - is not in the station store")
+        df = df.iloc[0:matchEnd.argmax() + 1]
+
+    df = df[['INDEX', 'DATE'] + [field for field in metadata["fields"] if field != "INDEX"]]
+    df.insert(1, "SiteName", siteName, True)
+
+    return df
+
+
+# Function downloads the service URL with the shared fetch client - Output - bytes of the table
+def fetchStationBytes(serviceURL, timeout=300):
+
+    from .http_client import getSharedClient
+
+    with getSharedClient(timeout).open(serviceURL) as response:
+        return response.read()
+
+
+# Function defines the service URL of a delta fetch - 'year1' of the service URL set to 'year1'
+def define_DeltaURL(serviceURL, year1):
+
+    if re.search(r"year1=\d+", serviceURL) is None:
+        raise ValueError("Service URL has no 'year1' - " + serviceURL)
+
+    return re.sub(r"year1=\d+", "year1=" + str(year1), serviceURL, count=1)
+
+
+# Function aligns a delta table to the store and validates the overlap year - record numbers ('INDEX') are shifted to continue the stored record
+# numbers, and the overlap year must match the stored year (dates and values)
+# Input: stationFolder, metadata - store folder and metadata of the station, dfDelta - delta daily table, overlapYear - last closed year in the store
+# Output - tuple (True the overlap matches, aligned delta table)
+def define_DeltaOverlap(stationFolder, metadata, dfDelta, overlapYear):
+
+    import pyarrow.parquet as pq
+
+    storedYear = metadata["closedYears"].get(str(overlapYear))
+    overlapRecords = np.flatnonzero(dfDelta.index.year == overlapYear)
+    if storedYear is None or len(overlapRecords) != storedYear["records"]:
+        return False, dfDelta
+
+    dfDelta = dfDelta.copy()
+    if "INDEX" in dfDelta.columns:
+        storedIndex = pq.read_table(define_YearFile(stationFolder, overlapYear), columns=["INDEX"]).column("INDEX")[0].as_py()
+        dfDelta["INDEX"] = dfDelta["INDEX"] + (storedIndex - int(dfDelta["INDEX"].iloc[overlapRecords[0]]))
+
+    return define_BlockHash(dfDelta.iloc[overlapRecords]) == storedYear["sha256"], dfDelta
+
+
+# Function refreshes the store of a station if it is not current
+# Input:
+# storeFolder, siteName - store folder and Gridmet station name
+# serviceURL - Climate Analyzer service URL of the station for the full table (see 'climate_analyzer.define_ServiceURL')
+# maxAgeHours - store refreshed within 'maxAgeHours' is not pulled again (e.g. by another script the same day), None always pulled
+# endDate - last date needed (e.g. today plus 60 days), None any
+# fetchFunction - function(serviceURL) returning the table (bytes, stream or .csv file path), default 'fetchStationBytes'
+# today - current date, None today
+# deltaFetch - True only the last closed year through the open year is pulled (see above), False the full table
+# fullRefreshDays - with 'deltaFetch' the full table is pulled if the last full refresh is 'fullRefreshDays' or more days ago, None only when the
+# overlap does not match
+# Output - report dictionary - 'fetched' (True a table was pulled), 'mode' ('current'|'delta'|'full'), 'fetchedRecords' (daily records pulled, the
+# delta and full table if the overlap did not match), 'overlapYear', 'overlapMatch' (delta - True the overlap year matched) and the
+# 'write_StationStore' report
+def updateStationStore(storeFolder, siteName, serviceURL, maxAgeHours=None, endDate=None, fetchFunction=fetchStationBytes, today=None, deltaFetch=False,
+                       fullRefreshDays=None):
+
+    today = date.today() if today is None else today
+    report = {"fetched": False, "mode": "current", "fetchedRecords": 0, "overlapYear": None, "overlapMatch": None, "closedWritten": [],
+              "revisedYears": [], "replacedYears": [], "tailRecords": None, "rebuilt": False}
+    if maxAgeHours is not None and isStoreCurrent(storeFolder, siteName, maxAgeHours, endDate, today):
+        return report
+
+    report["fetched"] = True
+    stationFolder = define_StationFolder(storeFolder, siteName)
+    metadata = load_StoreMetadata(stationFolder)
+
+    fullFetch = not deltaFetch or metadata is None or len(metadata["closedYears"]) == 0
+    if not fullFetch and fullRefreshDays is not None:
+        fullRefreshed = metadata.get("fullRefreshed")
+        fullFetch = fullRefreshed is None or (today - date.fromisoformat(fullRefreshed)).days >= fullRefreshDays
+
+    if not fullFetch:
+        report["mode"] = "delta"
+        report["overlapYear"] = max(int(year) for year in metadata["closedYears"])
+        deltaURL = define_DeltaURL(serviceURL, report["overlapYear"])
+        dfDelta = read_ClimateAnalyzerDaily(fetchFunction(deltaURL), 'float64')
+        report["fetchedRecords"] += len(dfDelta)
+        report["overlapMatch"], dfDelta = define_DeltaOverlap(stationFolder, metadata, dfDelta, report["overlapYear"])
+        if report["overlapMatch"] and list(dfDelta.columns) == metadata["fields"]:
+            report.update(write_StationStore(storeFolder, siteName, dfDelta, today, deltaURL))
+            return report
+
+    # Full table - replaces closed years which differ from the store
+    report["mode"] = "full"
+    dfDaily = read_ClimateAnalyzerDaily(fetchFunction(serviceURL), 'float64')
+    report["fetchedRecords"] += len(dfDaily)
+    report.update(write_StationStore(storeFolder, siteName, dfDaily, today, serviceURL, replaceClosed=True, fullRefresh=True))
+
+    return report
+
+
+# Function refreshes the store of a station if it is not current (see 'updateStationStore') and reads the daily table from the store (through
+# 'endDate', see 'read_StationStore')
+# Output - tuple (Data Frame, 'updateStationStore' report)
+def refreshStationStore(storeFolder, siteName, serviceURL, maxAgeHours=None, endDate=None, fetchFunction=fetchStationBytes, today=None,
+                        valueDtype='float64', deltaFetch=False, fullRefreshDays=None):
+
+    report = updateStationStore(storeFolder, siteName, serviceURL, maxAgeHours, endDate, fetchFunction, today, deltaFetch, fullRefreshDays)
+
+    return read_StationStore(storeFolder, siteName, valueDtype, endDate), report
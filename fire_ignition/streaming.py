@@ -0,0 +1,172 @@
+# ---------------------------------------------------------------------------
+# streaming.py
+# Streaming (online) Fire Ignition evaluator for daily appends.  The last 'movingWindowDays' values are held in a ring buffer and the Moving Window
+# Average is updated in O(1) per day; each day is scored against the sorted reference (i.e. reference index) with a binary search.
+#
+# The rolling sum replicates the pandas rolling mean (Kahan compensated add/remove, min_periods=1, identical window shortcut) so Moving Window
+# Averages, Percentiles and Fire Ignition Proportions are identical to 'ignition.define_MovingWindowAverage' and 'ignition.define_IgnitionProportion'
+# when the evaluator is fed the same series from its first record (directly or via a saved state - see 'getState' and 'setState').
+#
+# Example - daily Now Cast, only the new or changed records after the last fixed date are evaluated:
+#   evaluator = StreamingIgnitionEvaluator(refSorted, 'Forest', 14)
+#   evaluator.setState(savedState)   #State saved after the last fixed (i.e. not revised) date
+#   for recordDate, percentile, ignitionProportion, fireDangerClass in evaluator.evaluate(zip(dates, values)):
+#       ...
+
+import math
+from collections import deque
+
+import numpy as np
+
+from .ignition import forest_equation, nonforest_equation
+from .summarize import fireDangerCategories
+
+# Fire Ignition equation and Fire Danger Rating cover type by equation type
+equationTypes = {"Forest": (forest_equation, "Forest"), "NonForest": (nonforest_equation, "Non-Forest")}
+
+
+class StreamingIgnitionEvaluator:
+
+    # Input:
+    # refSorted - Sorted reference values (see 'reference.define_ReferenceIndex')
+    # equationType - 'Forest' or 'NonForest'
+    # movingWindowDays - Number of days in the moving window average
+    def __init__(self, refSorted, equationType, movingWindowDays=14):
+
+        if equationType not in equationTypes:
+            raise ValueError("'equationType' variable - " + str(equationType) + " - is not defined as 'Forest' or 'NonForest'")
+
+        self.refSorted = refSorted
+        self.totalRecords = refSorted.shape[0]
+        self.equationType = equationType
+        self.equationFunction, self.coverType = equationTypes[equationType]
+        self.highFireVal, self.mediumFireVal = fireDangerCategories(self.coverType)
+        self.movingWindowDays = movingWindowDays
+        self.reset()
+
+    # Clear the rolling window
+    def reset(self):
+
+        self.window = deque(maxlen=self.movingWindowDays)
+        self.nobs = 0
+        self.sumX = 0.0
+        self.negCount = 0
+        self.compensationAdd = 0.0
+        self.compensationRemove = 0.0
+        self.consecutiveSame = 0
+        self.prevValue = math.nan
+        self.records = 0
+
+    # Add a daily value to the rolling window, returns the Moving Window Average (NaN values are excluded, NaN if the window has no values)
+    def update(self, value):
+
+        value = float(value)
+
+        if self.records == 0 or self.movingWindowDays == 1:
+            self.reset()
+            self.prevValue = value
+        elif len(self.window) == self.movingWindowDays:
+            self.removeValue(self.window[0])
+
+        self.window.append(value)
+        self.addValue(value)
+        self.records += 1
+
+        return self.mean()
+
+    def addValue(self, value):
+
+        if math.isnan(value):
+            return
+        self.nobs += 1
+        y = value - self.compensationAdd
+        t = self.sumX + y
+        self.compensationAdd = t - self.sumX - y
+        self.sumX = t
+        if math.copysign(1.0, value) < 0:
+            self.negCount += 1
+        if value == self.prevValue:
+            self.consecutiveSame += 1
+        else:
+            self.consecutiveSame = 1
+        self.prevValue = value
+
+    def removeValue(self, value):
+
+        if math.isnan(value):
+            return
+        self.nobs -= 1
+        y = -value - self.compensationRemove
+        t = self.sumX + y
+        self.compensationRemove = t - self.sumX - y
+        self.sumX = t
+        if math.copysign(1.0, value) < 0:
+            self.negCount -= 1
+
+    def mean(self):
+
+        if self.nobs <= 0:
+            return math.nan
+        result = self.sumX / self.nobs
+        if self.consecutiveSame >= self.nobs:
+            result = self.prevValue
+        elif self.negCount == 0 and result < 0:
+            result = 0.0
+        elif self.negCount == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    # Score a Moving Window Average - returns (percentile, ignition proportion, fire danger class 'High'|'Medium'|'Low')
+    def score(self, movingAverage):
+
+        if math.isnan(movingAverage):
+            countLess = 0
+        else:
+            countLess = int(np.searchsorted(self.refSorted, movingAverage, side='left'))
+        percentile = (countLess / self.totalRecords) * 100
+        ignitionProportion = float(self.equationFunction(np.float64(percentile)))
+
+        if percentile > self.highFireVal:
+            fireDangerClass = 'High'
+        elif percentile > self.mediumFireVal:
+            fireDangerClass = 'Medium'
+        else:
+            fireDangerClass = 'Low'
+
+        return percentile, ignitionProportion, fireDangerClass
+
+    # Feed values to the rolling window without scoring (e.g. the history prior to the first day to be evaluated)
+    def prime(self, values):
+
+        for value in values:
+            self.update(value)
+
+    # Generator - evaluates the (date, value) records in date order, yielding (date, percentile, ignition proportion, fire danger class) per record
+    def evaluate(self, records):
+
+        for recordDate, value in records:
+            percentile, ignitionProportion, fireDangerClass = self.score(self.update(value))
+            yield recordDate, percentile, ignitionProportion, fireDangerClass
+
+    # Rolling window state as a dictionary of plain Python values (i.e. can be saved as .json)
+    def getState(self):
+
+        return {"movingWindowDays": self.movingWindowDays, "window": list(self.window), "nobs": self.nobs, "sumX": self.sumX,
+                "negCount": self.negCount, "compensationAdd": self.compensationAdd, "compensationRemove": self.compensationRemove,
+                "consecutiveSame": self.consecutiveSame, "prevValue": self.prevValue, "records": self.records}
+
+    # Restore the rolling window state saved with 'getState'
+    def setState(self, state):
+
+        if state["movingWindowDays"] != self.movingWindowDays:
+            raise ValueError("State moving window days - " + str(state["movingWindowDays"]) + " - does not match - " + str(self.movingWindowDays))
+
+        self.window = deque((float(value) for value in state["window"]), maxlen=self.movingWindowDays)
+        self.nobs = state["nobs"]
+        self.sumX = state["sumX"]
+        self.negCount = state["negCount"]
+        self.compensationAdd = state["compensationAdd"]
+        self.compensationRemove = state["compensationRemove"]
+        self.consecutiveSame = state["consecutiveSame"]
+        self.prevValue = state["prevValue"]
+        self.records = state["records"]
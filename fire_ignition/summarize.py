@@ -0,0 +1,237 @@
+# ---------------------------------------------------------------------------
+# summarize.py
+# Fire Danger Rating (High, Medium, Low) classification and summaries - daily ratings for the 1991-2020 normal (Historic), annual and normal
+# period means (Summarize Normals, Now Cast single years) and the Now Cast summary.
+#
+# Functions are pure - input Data Frames are not modified and errors are raised (i.e. not returned as a status string).
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+# Function defines the fire danger percentile breaks for High, Medium and Low by Cover Type Forest or Non-Forest.  See Figure 6 Thoma et. al. 2020
+# Output - tuple (highFire, mediumFire)
+def fireDangerCategories(coverType):
+
+    if coverType.lower() == 'forest':
+        # Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
+        # highFire = 86
+        # mediumFire = 65
+
+        # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
+        highFire = 84
+        mediumFire = 53
+
+    elif coverType.lower() == 'grassland' or coverType.lower() == 'non-forest':
+        # Thoma et. al. 2020 Fire Ignition Model Version 1.0 Southern Rockies Equation.
+        # highFire = 90
+        # mediumFire = 73
+
+        # Steve Huysman 2023 Fire Ignition Model Version 2.0 Fire Order Model for the Southern Rockies.
+        highFire = 84
+        mediumFire = 51
+
+    else:
+        raise ValueError("'coverType' variable - " + str(coverType) + " - is not defined as 'Forest' or 'Non-Forest'")
+
+    return highFire, mediumFire
+
+
+# Function applies the binary Fire Danger Ratings High, Medium, Low as new fields evaluated against the 'inFieldPerc' percentile field
+# Output - Data Frame (copy of 'inDf') with the 'High', 'Medium' and 'Low' fields
+def defineFireDangerClasses(inDf, inFieldPerc, coverType):
+
+    highFireVal, mediumFireVal = fireDangerCategories(coverType)
+
+    df = inDf.copy()
+    df['High'] = np.where((df[inFieldPerc] > highFireVal), 1, 0)
+    df['Medium'] = np.where((df[inFieldPerc] <= highFireVal) & (df[inFieldPerc] > mediumFireVal), 1, 0)
+    df['Low'] = np.where((df[inFieldPerc] <= mediumFireVal), 1, 0)
+
+    return df
+
+
+# Function summarizes the input DataFrame (DatetimeIndex), defined field, for the desired timestep (e.g. Yearly), and defined summary statistic
+# Output - Data Frame with the index and the summary field '{processField}_{sumStat}'
+def resampleSummarize(inDataFrame, processField, timeStep, sumStat):
+
+    if sumStat == 'Sum' and timeStep == 'Annual':
+        outSumSeries = inDataFrame[processField].resample(rule='YS').sum()
+    else:
+        raise ValueError("'Time Step' variable - " + str(timeStep) + " - or Summary Statistic - " + str(sumStat) + " combo is not defined")
+
+    outResampleDf = outSumSeries.to_frame().reset_index()
+    outResampleDf.rename(columns={processField: processField + "_" + sumStat}, inplace=True)
+
+    return outResampleDf
+
+
+# Function defines the number of Now Cast days with a value in the 'inFileField' field
+def numberNowCastDays(inDf, inFileField='D (MM)'):
+
+    return int(pd.to_numeric(inDf[inFileField], errors='coerce').count())
+
+
+# Routine to get the summary statistic Value for the defined time period for the Fire Ignition Potential Fire Danger Rating
+# Input: inDf - Data Frame with the Fire Ignition Potential Data to be summarized
+# inFileFieldAOA - Field in 'inDf' that defines the site/AOA to be summarized
+# inAOAWildcard - Syntax used to filter the 'inFileFieldAOA' records to be processed
+# inFieldPerc - Field in 'inDf' with the derived 'Fire Ignition Potential' percentile rating (i.e. the Fire Ignition Potential Field to be summarized)
+# startYear - first year to be processed ('NowCast' when 'nowCast' is True)
+# endYear - end year to be processed ('NowCast' when 'nowCast' is True)
+# coverType - defined the fire ignition potential relationship type to be applied ('Forest|'Non-Forest') - defines the Percentile values to be used for High, Medium,
+# Low fire Danger Ratings
+# statistic - 'Mean'
+# timeStep - 'Normal'|'Year'
+# rcp - RCP of the 'inFieldPerc' field ('na' for Gridmet station data)
+# timeField - Time field in 'inDf'
+# nowCast - True 'inDf' is the Now Cast subset (see function 'subsetToNowCast') - records are not subset by year, and the field 'NowCastCount' is added
+# inFileField - Daily value field used for the 'NowCastCount'
+# Output - Data Frame with the fields SiteName, CoverType, GCM, RCP, DateTime ('{startYear}_{endYear}'), High_Mean, Medium_Mean, Low_Mean (and NowCastCount)
+def summarizeFireDangerRating(inDf, inFileFieldAOA, inAOAWildcard, inFieldPerc, startYear, endYear, coverType, statistic, timeStep, rcp, timeField,
+                              nowCast=False, inFileField='D (MM)'):
+
+    if not (statistic == 'Mean' and timeStep in ('Normal', 'Year')):
+        raise ValueError("Undefined 'statistic' - " + str(statistic) + " - or 'timeStep' - " + str(timeStep))
+
+    if not nowCast:  #Processing Yearly or Normal
+        # Subset the DF to the desired Records (i.e. Forest or Non-Forest Sites)
+        df2 = inDf[inDf[inFileFieldAOA].str.contains(inAOAWildcard, na=False)].copy()
+        df2['time'] = pd.to_datetime(df2[timeField], utc=True, errors='coerce')
+
+        # Subset to the start and end year records
+        startYearDT = pd.Timestamp(year=int(startYear), month=1, day=1, tz='UTC')
+        endYearDT = pd.Timestamp(year=int(endYear), month=12, day=31, tz='UTC')
+        df3 = df2.loc[(df2['time'] >= startYearDT) & (df2['time'] <= endYearDT)]
+
+    else:  #Processing Now Cast Data Frame
+        df3 = inDf.copy()
+        df3['time'] = pd.to_datetime(df3[timeField], errors='coerce')
+
+    if df3.shape[0] == 0:
+        raise ValueError("No records to summarize for - " + str(inAOAWildcard) + " - " + str(startYear) + "_" + str(endYear))
+
+    # Apply the Ratings creating three fields High, Medium, Low - Binary
+    df3 = defineFireDangerClasses(df3, inFieldPerc, coverType)
+
+    # Resample to Yearly with .sum
+    df3.set_index(df3['time'], inplace=True)
+    annualSums = df3[['High', 'Medium', 'Low']].resample(rule='YS').sum()
+
+    # GCM field
+    if rcp == 'na':
+        gcm = 'na'
+    else:
+        gcm = inFieldPerc.split("_")[1]
+
+    # Calculate the Mean Normal from the previously derived annual sums
+    dfNormals = pd.DataFrame({'SiteName': [df3['SiteName'].values[0]], 'CoverType': [coverType], 'GCM': [gcm], 'RCP': [rcp],
+                              'DateTime': [str(startYear) + "_" + str(endYear)], 'High_Mean': [annualSums['High'].mean()],
+                              'Medium_Mean': [annualSums['Medium'].mean()], 'Low_Mean': [annualSums['Low'].mean()]})
+
+    if nowCast:  #Add the Now Cast Count Field
+        dfNormals['NowCastCount'] = numberNowCastDays(df3, inFileField)
+
+    return dfNormals
+
+
+# Function defines the season from the month number
+def defineSeason(month):
+
+    if month in [12, 1, 2]:
+        return "1-Winter-DJF"
+    elif month in [3, 4, 5]:
+        return "2-Spring-MAM"
+    elif month in [6, 7, 8]:
+        return "3-Summer-JJA"
+    elif month in [9, 10, 11]:
+        return "4-Fall_SON"
+    else:
+        raise ValueError("Month - " + str(month) + " - is not defined")
+
+
+# Function defines the daily Fire Danger Rating (High, Medium, Low) for the 1991-2020 normal period (i.e. the Historic script output)
+# Input:
+# inDf - Data Frame with the Percentile fields (see 'FireIgnitionPipeline.scoreStation')
+# inFieldPerc - Percentile field ('PercForest'|'PercNonForest')
+# coverType - 'Forest'|'Non-Forest'
+# timeField - Time field (datetime) in 'inDf'
+# today - records after 'today' are excluded, default the current date
+# normalStartDate, normalEndDate - normal period (format '%Y%m%d'), 'normalEndDate' is exclusive as in 'FireIgnitionRaw_GridMet_Historic.py'
+# Output - Data Frame with the daily records, 'CoverType', 'timeDate', 'Mon', 'Season', 'Year', 'High', 'Medium', 'Low' fields.  For cover type 'Forest'
+# the 'SiteName' is set to 'Forest' to facilitate WildCard usage in the Summarize Normals routine.
+def defineFireDangerRating(inDf, inFieldPerc, coverType, timeField='DATE', today=None, normalStartDate='19910101', normalEndDate='20201231'):
+
+    if today is None:
+        today = date.today()
+
+    df = inDf[(inDf[timeField] <= pd.to_datetime(today))].copy()
+    df["timeDate"] = pd.to_datetime(df[timeField])
+    df['Mon'] = df['timeDate'].dt.month
+    df['Season'] = df['Mon'].map(defineSeason)
+    df['Year'] = df['timeDate'].dt.year
+
+    df = defineFireDangerClasses(df, inFieldPerc, coverType)
+
+    startYearDT = pd.to_datetime(normalStartDate, format='%Y%m%d')
+    endYearDT = pd.to_datetime(normalEndDate, format='%Y%m%d')
+    dfNormal = df.loc[(df['timeDate'] >= startYearDT) & (df['timeDate'] < endYearDT)].copy()
+
+    dfNormal.insert(loc=0, column='CoverType', value=coverType)
+    if coverType == "Forest":
+        dfNormal['SiteName'] = 'Forest'
+
+    return dfNormal
+
+
+# Function subsets the Gridmet station data to the Now Cast records - current date through current date plus 'nowCastDays' with a value
+# Input:
+# inDf - Data Frame with the daily records through the current date plus 'nowCastDays' (see 'climate_analyzer.subsetToPlus60')
+# today - current date, default the current date
+# Output - Data Frame with the Now Cast records, 'inFileField' is numeric
+def subsetToNowCast(inDf, today=None, nowCastDays=60, inFileField='D (MM)', timeField='DATE'):
+
+    if today is None:
+        today = date.today()
+
+    currentDate = pd.to_datetime(today)
+    currentDatePlus60 = currentDate + pd.Timedelta(days=nowCastDays)
+
+    timeDate = pd.to_datetime(inDf[timeField])
+    if not (timeDate == currentDatePlus60).any():
+        raise ValueError("Now Cast end date - " + currentDatePlus60.strftime('%Y-%m-%d') + " - is not in the station data")
+
+    nowCastDfSubset = inDf[(timeDate >= currentDate) & (timeDate <= currentDatePlus60)].copy()
+    nowCastDfSubset[timeField] = timeDate
+    nowCastDfSubset[inFileField] = pd.to_numeric(nowCastDfSubset[inFileField], errors='coerce')
+
+    return nowCastDfSubset[nowCastDfSubset[inFileField].notnull()]
+
+
+# Calculate the ensemble average of the High, Medium and Low means for passed Data Frame
+# Output - single record Data Frame with the 'GCM' field 'Ensemble_from_Normals'
+def calculateEnsembleAvg(dfSubset, siteNameLU, coverTypeLU, rcpLU, dateTimeLU):
+
+    dfEnsemble = pd.DataFrame(data=None, columns=dfSubset.columns)
+
+    dfEnsemble.at[0, 'SiteName'] = siteNameLU
+    dfEnsemble.at[0, 'CoverType'] = coverTypeLU
+    dfEnsemble.at[0, 'DateTime'] = dateTimeLU
+    dfEnsemble.at[0, 'GCM'] = 'Ensemble_from_Normals'
+    dfEnsemble.at[0, 'RCP'] = rcpLU
+    dfEnsemble.at[0, 'High_Mean'] = dfSubset['High_Mean'].mean()
+    dfEnsemble.at[0, 'Medium_Mean'] = dfSubset['Medium_Mean'].mean()
+    dfEnsemble.at[0, 'Low_Mean'] = dfSubset['Low_Mean'].mean()
+
+    return dfEnsemble
+
+
+# Append Data Frames in list to one Data Frame
+def appendFiles(appendList):
+
+    if len(appendList) == 0:
+        raise ValueError("No Data Frames to append")
+
+    return pd.concat(appendList, axis=0, ignore_index=True, verify_integrity=True)
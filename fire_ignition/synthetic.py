@@ -0,0 +1,133 @@
+# ---------------------------------------------------------------------------
+# synthetic.py
+# Synthetic daily Water Balance deficit series for benchmarking the Fire Ignition routines offline (i.e. no Climate Analyzer or THREDDS download).
+#
+# Daily deficit (mm) follows a seasonal curve (near zero in winter, peak in mid summer) scaled by a per year wetness factor, with autocorrelated
+# day to day noise, clipped at zero and rounded to 0.1 mm.  Station tables use the Climate Analyzer daily Water Balance .csv layout (see
+# 'climate_analyzer.read_ClimateAnalyzerCSV') and projection tables the merged layout of 'GCM_wb_thredds_point_extractor_v3.py' (i.e. 'SiteName',
+# 'time', latitude, longitude and one '{parameter}_{GCM}_{RCP}' field per projection plus the '{parameter}_Ensemble_{RCP}' means).
+
+import numpy as np
+import pandas as pd
+
+# Default GCMs and RCPs (NPS Water Balance version 1.5)
+gcmList = ['CanESM2', 'CCSM4', 'CNRM-CM5', 'CSIRO-Mk3-6-0', 'GFDL-ESM2G', 'HadGEM2-CC365', 'inmcm4', 'IPSL-CM5A-LR', 'MIROC5', 'MRI-CGCM3',
+           'NorESM1-M']
+rcpList = ['rcp45', 'rcp85']
+
+# Climate Analyzer daily Water Balance .csv - preamble lines prior to the header and the fields written
+climateAnalyzerPreamble = ["Climate Analyzer - synthetic daily water balance", "Station: {siteName}", "PET Type: hamon", "Max Soil Water: 250",
+                           ""]
+climateAnalyzerFields = ['INDEX', 'DATE', 'PET (MM)', 'AET (MM)', 'D (MM)']
+
+# Deficit increase per year by RCP (fraction of the seasonal peak) for the projections
+rcpTrend = {'rcp45': 0.003, 'rcp85': 0.006}
+
+
+# Function defines a synthetic daily deficit series
+# Input:
+# dates - DatetimeIndex of the days
+# seed - random seed (same seed same series)
+# peakDeficit - mean daily deficit (mm) at the seasonal peak
+# trend - deficit increase per year as a fraction of 'peakDeficit' (e.g. projections)
+# Output - numpy float64 array, one value per date
+def define_SyntheticDeficit(dates, seed, peakDeficit=4.0, trend=0.0):
+
+    randomGenerator = np.random.default_rng(seed)
+    dayOfYear = dates.dayofyear.to_numpy()
+    years = dates.year.to_numpy()
+
+    # Seasonal curve - zero through winter, peak late July
+    seasonal = np.clip(np.sin((dayOfYear - 100) / 230 * np.pi), 0, None) ** 1.5
+
+    # Wet and dry years, and the per year trend
+    uniqueYears, yearIndex = np.unique(years, return_inverse=True)
+    yearFactor = randomGenerator.lognormal(0, 0.3, len(uniqueYears))[yearIndex] * (1 + trend * (years - years[0]))
+
+    # Autocorrelated (AR1) daily noise
+    shocks = randomGenerator.normal(0, 1, len(dates))
+    noise = np.empty(len(dates))
+    noise[0] = shocks[0]
+    for count in range(1, len(dates)):
+        noise[count] = 0.8 * noise[count - 1] + 0.6 * shocks[count]
+
+    deficit = peakDeficit * seasonal * yearFactor + 0.6 * noise
+    return np.round(np.clip(deficit, 0, None), 1)
+
+
+# Function writes a synthetic Climate Analyzer daily Water Balance .csv for a station
+# Input:
+# outFile - output .csv file path
+# siteName - Gridmet station name
+# startDate, endDate - first and last date
+# seed - random seed
+# blankDays - number of days at the end of the table without a deficit value (i.e. Now Cast days not yet available)
+# Output - number of daily records written
+def write_ClimateAnalyzerCSV(outFile, siteName, startDate, endDate, seed=0, blankDays=5):
+
+    dates = pd.date_range(startDate, endDate, freq='D')
+    deficit = define_SyntheticDeficit(dates, seed)
+    randomGenerator = np.random.default_rng(seed + 1)
+    aet = np.round(np.clip(randomGenerator.normal(1.5, 0.5, len(dates)), 0, None), 1)
+
+    # Blank deficit (no padding) is read as NaN
+    deficitText = np.char.mod('%.1f', deficit).astype(object)
+    if blankDays > 0:
+        deficitText[-blankDays:] = ""
+
+    lines = [line.format(siteName=siteName) for line in climateAnalyzerPreamble]
+    lines.append(",   ".join(climateAnalyzerFields) + ",   ")
+    for count, (dateValue, aetValue, petValue, deficitValue) in enumerate(zip(dates.strftime('%m/%d/%Y'), aet, aet + deficit, deficitText)):
+        lines.append(str(count) + ",  " + dateValue + ",  " + "%.1f" % petValue + ",  " + "%.1f" % aetValue + "," + deficitValue + ",  ")
+
+    # Monthly summary footer included in the Climate Analyzer pull
+    lines.append("Monthly Summary,,,,,  ")
+    lines.append("Jan,  0.0,  0.0,  0.0,  0.0,  ")
+
+    with open(outFile, "w") as outCSV:
+        outCSV.write("\n".join(lines) + "\n")
+
+    return len(dates)
+
+
+# Function defines a synthetic projections Data Frame in the merged extractor layout
+# Input:
+# siteName - site name
+# startYear, endYear - first and last year
+# gcms, rcps - GCM and RCP lists (default 'gcmList' and 'rcpList')
+# parameter - water balance parameter prefix of the projection fields
+# seed - random seed
+# Output - tuple (Data Frame, list of projection fields including the Ensemble fields)
+def define_SyntheticProjections(siteName, startYear, endYear, gcms=None, rcps=None, parameter='deficit', seed=0):
+
+    gcms = gcmList if gcms is None else gcms
+    rcps = rcpList if rcps is None else rcps
+
+    dates = pd.date_range(str(startYear) + '-01-01', str(endYear) + '-12-31', freq='D')
+    columns = {'SiteName': siteName, 'time': dates.strftime('%Y-%m-%dT00:00:00Z'), 'latitude[unit="degrees_north"]': 40.34,
+               'longitude[unit="degrees_east"]': -105.62}
+
+    fieldList = []
+    for count, gcm in enumerate(gcms):
+        for rcpCount, rcp in enumerate(rcps):
+            field = parameter + "_" + gcm + "_" + rcp
+            columns[field] = define_SyntheticDeficit(dates, seed + 1000 * (count + 1) + rcpCount, trend=rcpTrend.get(rcp, 0.0))
+            fieldList.append(field)
+
+    # Ensemble Mean per RCP (see 'define_EnsembleMean' in 'GCM_wb_thredds_point_extractor_v3.py')
+    for rcp in rcps:
+        field = parameter + "_Ensemble_" + rcp
+        columns[field] = np.mean([columns[parameter + "_" + gcm + "_" + rcp] for gcm in gcms], axis=0)
+        fieldList.append(field)
+
+    return pd.DataFrame(columns), fieldList
+
+
+# Function writes a synthetic projections .csv in the merged extractor layout
+# Output - list of projection fields including the Ensemble fields
+def write_ProjectionsCSV(outFile, siteName, startYear, endYear, gcms=None, rcps=None, parameter='deficit', seed=0):
+
+    df, fieldList = define_SyntheticProjections(siteName, startYear, endYear, gcms, rcps, parameter, seed)
+    df.to_csv(outFile, index=False)
+
+    return fieldList
@@ -0,0 +1,50 @@
+# ---------------------------------------------------------------------------
+# conftest.py
+# Shared fixtures of the fire_ignition package tests - small synthetic series (no network, no Climate Analyzer or THREDDS download).
+#
+# Run from the repository folder:
+#   python -m pytest -q
+
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fire_ignition.synthetic import define_SyntheticProjections
+
+
+# Synthetic projections (3 years, 2 GCMs x 2 RCPs plus the Ensemble means) with missing days - tuple (Data Frame, projection fields)
+@pytest.fixture
+def projections():
+
+    df, fieldList = define_SyntheticProjections('bear_lake', 2030, 2032, gcms=['CCSM4', 'MIROC5'], seed=7)
+    df.loc[[40, 41, 200, 900], fieldList[0]] = np.nan
+    return df, fieldList
+
+
+# Synthetic daily deficit series with missing days, negative values and runs of repeated values (the rolling sum edge cases)
+@pytest.fixture
+def deficitSeries():
+
+    values = np.random.default_rng(3).gamma(2.0, 2.0, 400).round(1)
+    values[[5, 6, 150, 151, 152, 153, 154, 155, 156, 157, 158, 159, 160, 161, 162, 399]] = np.nan
+    values[60:80] = 0.0
+    values[100:104] = -0.3
+    values[300:330] = 2.5
+    return pd.Series(values)
+
+
+# Synthetic Climate Analyzer daily Water Balance .csv (1980 through the Now Cast window of 'today') - tuple (.csv file, site name, today)
+@pytest.fixture
+def stationCSV(tmp_path):
+
+    from fire_ignition.synthetic import write_ClimateAnalyzerCSV
+
+    inFile = str(tmp_path / "test_station.csv")
+    write_ClimateAnalyzerCSV(inFile, 'test_station', '1980-01-01', '2026-12-31', seed=11)
+    return inFile, 'test_station', date(2026, 10, 18)
@@ -0,0 +1,45 @@
+# Tests of the multi-station Now Cast batch (batch.py) - station tables from a local fetch function (no Climate Analyzer download)
+
+import os
+from datetime import date
+
+import pandas as pd
+
+from fire_ignition.batch import runNowCastBatch
+from fire_ignition.pipeline import FireIgnitionPipeline
+from fire_ignition.synthetic import write_ClimateAnalyzerCSV
+
+today = date(2026, 10, 18)
+stationSeeds = {'bearlake_from_grid': 1, 'eastinlet_from_grid': 2}
+
+
+# Fetch function writing a synthetic Climate Analyzer table per station - 'failing_station' raises as a failed download
+def fetchSynthetic(serviceURL, outFile):
+
+    if "failing_station" in serviceURL:
+        raise ConnectionError("Download failed - " + serviceURL)
+    siteName = os.path.basename(outFile).split("_gridmetData")[0]
+    write_ClimateAnalyzerCSV(outFile, siteName, '1980-01-01', '2026-12-31', seed=stationSeeds[siteName])
+    return outFile
+
+
+# Stations are processed in worker processes - per station output equals the single process Now Cast, a failed download does not stop the batch
+def test_NowCastBatch(tmp_path):
+
+    stationList = ['bearlake_from_grid', 'failing_station', 'eastinlet_from_grid']
+    dfCombined, stationReport = runNowCastBatch(stationList, str(tmp_path / "workspace"), str(tmp_path / "output"), workerCount=2,
+                                                pipelineOptions={'today': today}, fetchFunction=fetchSynthetic)
+
+    assert [report['siteName'] for report in stationReport] == stationList
+    assert [report['status'] for report in stationReport] == ['Success', 'Failed', 'Success']
+    assert stationReport[1]['stage'] == 'fetch' and 'ConnectionError' in stationReport[1]['error']
+    assert os.path.exists(str(tmp_path / "output" / ("FireIgnitionNowCastwSummary_AllStations_" + str(today) + ".csv")))
+
+    expected = []
+    for report in (stationReport[0], stationReport[2]):
+        pipeline = FireIgnitionPipeline(report['siteName'], today=today)
+        pipeline.loadStation(str(tmp_path / "workspace" / (report['siteName'] + "_gridmetData_wWB.csv")))
+        expected.append(pipeline.nowcast())
+        assert pd.read_csv(report['outFile']).shape == expected[-1].shape
+
+    pd.testing.assert_frame_equal(dfCombined, pd.concat(expected, ignore_index=True))
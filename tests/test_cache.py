@@ -0,0 +1,121 @@
+# Tests of the download cache (cache.py) - round trip, manifest replay, integrity check, eviction and temporary files
+
+import io
+import os
+import time
+
+from fire_ignition.cache import DownloadCache, define_CacheKey
+
+requestURL = "http://www.yellowstone.solutions/thredds/ncss/V_1_5_2030_CCSM4_rcp45_Deficit.nc4?var=Deficit&latitude=40.3&longitude=-105.6"
+
+
+# Stream written through 'writer' and committed is returned by a new cache on the same folder (manifest replayed), with the same bytes
+def test_CacheRoundTrip(tmp_path):
+
+    body = b"time,latitude,longitude,Deficit\n" + b"2030-01-01T00:00:00Z,40.3,-105.6,12\n" * 500
+    cache = DownloadCache(str(tmp_path))
+    with cache.writer(requestURL, io.BytesIO(body)) as stream:
+        assert stream.read(100) == body[:100]
+        stream.commit()
+
+    reopened = DownloadCache(str(tmp_path))
+    with open(reopened.get(requestURL), "rb") as inFile:
+        assert inFile.read() == body
+    assert reopened.summary()["entries"] == 1 and reopened.summary()["hits"] == 1
+
+    # Same request with the query parameters in another order and an upper case host
+    assert define_CacheKey(requestURL.replace("www.yellowstone.solutions", "WWW.Yellowstone.Solutions")) == define_CacheKey(requestURL)
+    assert reopened.contains(requestURL.replace("var=Deficit&latitude=40.3", "latitude=40.3&var=Deficit"))
+
+
+# Stream closed without 'commit' is not cached and leaves no temporary file
+def test_CacheWriterDiscarded(tmp_path):
+
+    cache = DownloadCache(str(tmp_path))
+    with cache.writer(requestURL, io.BytesIO(b"partial")) as stream:
+        stream.read()
+
+    assert cache.get(requestURL) is None
+    assert os.listdir(os.path.join(str(tmp_path), "tmp")) == []
+
+
+# Cached file changed on disk fails the sha256 check and is removed
+def test_CacheIntegrity(tmp_path):
+
+    inFile = tmp_path / "response.csv"
+    inFile.write_bytes(b"a,b\n1,2\n")
+    cache = DownloadCache(str(tmp_path / "cache"))
+    objectFile = cache.putFile(requestURL, str(inFile))
+    with open(objectFile, "r+b") as outFile:
+        outFile.write(b"x")
+
+    assert cache.get(requestURL) is None
+    assert not os.path.exists(objectFile)
+    assert DownloadCache(str(tmp_path / "cache")).summary()["entries"] == 0
+
+
+# Least recently used entries are evicted above 'maxBytes'
+def test_CacheEviction(tmp_path):
+
+    inFile = tmp_path / "response.csv"
+    inFile.write_bytes(b"0" * 100)
+    cache = DownloadCache(str(tmp_path / "cache"), maxBytes=250)
+    urls = [requestURL + "&year=" + str(year) for year in range(3)]
+
+    cache.putFile(urls[0], str(inFile))
+    cache.putFile(urls[1], str(inFile))
+    cache.entries[define_CacheKey(urls[1])]["lastAccess"] -= 10   #urls[1] least recently used
+    cache.putFile(urls[2], str(inFile))
+
+    assert [cache.contains(url) for url in urls] == [True, False, True]
+    assert cache.summary()["bytes"] == 200
+
+
+# Entry handed out by 'get' is not evicted until it is released
+def test_CacheEvictionPinned(tmp_path):
+
+    inFile = tmp_path / "response.csv"
+    inFile.write_bytes(b"0" * 100)
+    cache = DownloadCache(str(tmp_path / "cache"), maxBytes=150)
+    urls = [requestURL + "&year=" + str(year) for year in range(3)]
+
+    cache.putFile(urls[0], str(inFile))
+    objectFile = cache.get(urls[0])
+    cache.entries[define_CacheKey(urls[0])]["lastAccess"] -= 10
+    cache.putFile(urls[1], str(inFile))
+    assert cache.contains(urls[0]) and os.path.exists(objectFile)
+
+    cache.release(urls[0])
+    cache.putFile(urls[2], str(inFile))
+    assert [cache.contains(url) for url in urls] == [False, False, True]
+
+
+# The sha256 is checked once per process - a new cache on the folder checks it again
+def test_CacheVerifiedOnce(tmp_path):
+
+    inFile = tmp_path / "response.csv"
+    inFile.write_bytes(b"a,b\n1,2\n")
+    DownloadCache(str(tmp_path / "cache")).putFile(requestURL, str(inFile))
+    cache = DownloadCache(str(tmp_path / "cache"))
+    objectFile = cache.get(requestURL)
+    cache.release(requestURL)
+    with open(objectFile, "r+b") as outFile:
+        outFile.write(b"x")
+
+    assert cache.get(requestURL) == objectFile
+    assert DownloadCache(str(tmp_path / "cache")).get(requestURL) is None
+
+
+# Only stale temporary files (interrupted run) are removed when the cache is opened, a file another process is writing is kept
+def test_CacheStaleTmpFiles(tmp_path):
+
+    DownloadCache(str(tmp_path))
+    staleFile = tmp_path / "tmp" / "stale"
+    activeFile = tmp_path / "tmp" / "active"
+    staleFile.write_bytes(b"partial")
+    activeFile.write_bytes(b"partial")
+    staleTime = time.time() - 7200
+    os.utime(staleFile, (staleTime, staleTime))
+
+    DownloadCache(str(tmp_path), staleTmpSeconds=3600)
+    assert os.listdir(str(tmp_path / "tmp")) == ["active"]
@@ -0,0 +1,42 @@
+# Tests of the Climate Analyzer daily table parse (climate_analyzer.py)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fire_ignition.climate_analyzer import define_DailyDates, read_ClimateAnalyzerCSV, read_ClimateAnalyzerDaily
+
+
+# Fixed width 'mm/dd/YYYY' dates are parsed from the bytes - an entry not in the format anywhere in the array (not only the first or last entry) is
+# converted by 'pd.to_datetime' (invalid dates NaT)
+@pytest.mark.parametrize("middleDate, expected", [('07/04/2020', '2020-07-04'), ('01/02/20201', None), ('01/02/2020 12:00', None),
+                                                  ('02/30/2020', None), ('1/2/2020', '2020-01-02')])
+def test_DailyDates(middleDate, expected):
+
+    dates = define_DailyDates(['01/01/2020', middleDate, '12/31/2020'])
+
+    np.testing.assert_array_equal(dates, pd.to_datetime(['2020-01-01', expected, '2020-12-31']).to_numpy())
+
+
+# Daily table equals a general .csv read of the same file (python engine, padding trimmed, footer rows dropped) - blank Now Cast days are NaN
+def test_ClimateAnalyzerCSV(stationCSV):
+
+    inFile, siteName, today = stationCSV
+    df = read_ClimateAnalyzerCSV(inFile, siteName)
+
+    dfText = pd.read_csv(inFile, skiprows=5, skipinitialspace=True, engine='python', dtype=str)
+    dfText.columns = [field.strip() for field in dfText.columns]
+    dfText = dfText[dfText['INDEX'].str.strip().str.isdigit()]
+
+    assert list(df.columns) == ['INDEX', 'SiteName', 'DATE', 'PET (MM)', 'AET (MM)', 'D (MM)']
+    assert (df['SiteName'] == siteName).all()
+    np.testing.assert_array_equal(df['INDEX'].to_numpy(), dfText['INDEX'].astype('int64').to_numpy())
+    np.testing.assert_array_equal(df['DATE'].to_numpy(), pd.to_datetime(dfText['DATE'].str.strip(), format='%m/%d/%Y').to_numpy())
+    for field in ('PET (MM)', 'AET (MM)', 'D (MM)'):
+        np.testing.assert_array_equal(df[field].to_numpy(), pd.to_numeric(dfText[field].str.strip(), errors='coerce').to_numpy())
+    assert df['D (MM)'].iloc[-5:].isna().all() and df['D (MM)'].iloc[:-5].notna().all()
+
+    dfEnd = read_ClimateAnalyzerDaily(inFile, endDate=pd.Timestamp(today) + pd.Timedelta(days=60))
+    assert dfEnd.index[-1] == pd.Timestamp('2026-12-17') and dfEnd['D (MM)'].dtype == np.float32
+    with pytest.raises(ValueError):
+        read_ClimateAnalyzerDaily(inFile, endDate='2027-01-01')
@@ -0,0 +1,57 @@
+# Tests of the partitioned Parquet projections dataset (columnar.py)
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from fire_ignition import columnar
+from fire_ignition.synthetic import define_SyntheticProjections
+
+
+# Two sites (one with characters which are not folder name safe), deficit and soil_water parameters
+def define_ProjectionsTable():
+
+    tables = []
+    for count, siteName in enumerate(['bear_lake', 'fern lake/1']):
+        dfDeficit, deficitFields = define_SyntheticProjections(siteName, 2030, 2031, gcms=['CCSM4', 'MIROC5'], seed=count)
+        dfSoil, soilFields = define_SyntheticProjections(siteName, 2030, 2031, gcms=['CCSM4', 'MIROC5'], parameter='soil_water', seed=count + 10)
+        tables.append(pd.concat([dfDeficit, dfSoil[soilFields]], axis=1))
+    df = pd.concat(tables, ignore_index=True)
+    df.loc[[3, 800], 'deficit_CCSM4_rcp45'] = np.nan
+    return df, deficitFields + soilFields
+
+
+# Dataset written as float32 reads back the .csv (0.1 mm) values as float64 - all fields, and a subset of fields and sites
+def test_ProjectionsParquetRoundTrip(tmp_path):
+
+    df, fieldList = define_ProjectionsTable()
+    datasetFolder = str(tmp_path / "dataset")
+
+    fileList = columnar.write_ProjectionsParquet(df, datasetFolder)
+    assert len(fileList) == 2 * 2 * 2
+    assert os.path.exists(os.path.join(columnar.define_PartitionFolder(datasetFolder, 'fern lake/1', 'soil_water', 'rcp85'), columnar.partitionFile))
+    assert columnar.define_DatasetSites(datasetFolder) == ['bear_lake', 'fern lake/1']
+
+    dfRead = columnar.read_ProjectionsParquet(datasetFolder, fieldList, siteNames=['bear_lake', 'fern lake/1'])
+    pd.testing.assert_frame_equal(dfRead, df)
+
+    subsetFields = ['soil_water_MIROC5_rcp85', 'deficit_CCSM4_rcp45']
+    dfSubset = columnar.read_ProjectionsParquet(datasetFolder, subsetFields, siteNames=['fern lake/1'])
+    expected = df[df['SiteName'] == 'fern lake/1'][['SiteName', 'time', 'latitude[unit="degrees_north"]', 'longitude[unit="degrees_east"]'] + subsetFields]
+    pd.testing.assert_frame_equal(dfSubset, expected.reset_index(drop=True))
+
+    with pytest.raises(ValueError):
+        columnar.read_ProjectionsParquet(datasetFolder, ['deficit_CCSM4_rcp26'])
+
+
+# float32 values convert to the float64 of their shortest decimal (i.e. the .csv value)
+def test_Float64FromFloat32():
+
+    values = np.array([1.2, 0.1, -3.3, 12345.6, 0.05, 1e-8, 3.4e12, np.nan, 0.0])
+    np.testing.assert_array_equal(columnar.define_Float64FromFloat32(values.astype(np.float32)), values)
+    assert columnar.define_FieldParts('soil_water_CCSM4_rcp45') == ('soil_water', 'CCSM4', 'rcp45')
+    assert columnar.define_FieldParts('SiteName') is None
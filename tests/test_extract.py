@@ -0,0 +1,72 @@
+# Tests of the in memory extraction (extract.py) - wide table assembly and the NCSS point .csv parse
+
+import functools
+import io
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fire_ignition.extract import define_WideTable, parse_NCSSPoint
+
+
+# Function defines a field table - 'SiteName', 'time' and one field for the sites and dates
+def define_FieldTable(fieldName, sites, dates, seed):
+
+    keys = pd.MultiIndex.from_product([sites, dates.strftime('%Y-%m-%dT00:00:00Z')], names=['SiteName', 'time']).to_frame(index=False)
+    keys[fieldName] = np.random.default_rng(seed).gamma(2.0, 2.0, len(keys)).round(1)
+    return keys
+
+
+# Wide table equals successive left merges on 'SiteName'/'time' - field tables with missing sites/dates, extra records and a repeated key
+def test_WideTableMatchesMerges():
+
+    dates = pd.date_range('2030-01-01', '2030-12-31', freq='D')
+    baseTable = define_FieldTable('deficit_CCSM4_rcp45', ['bear_lake', 'fern_lake'], dates, 0)
+    baseTable.insert(2, 'latitude[unit="degrees_north"]', 40.3)
+    fieldTables = [define_FieldTable('deficit_CCSM4_rcp85', ['bear_lake', 'fern_lake'], dates, 1).iloc[::-1],   #Other record order
+                   define_FieldTable('deficit_MIROC5_rcp45', ['bear_lake'], dates[:200], 2),                     #Missing site and dates
+                   define_FieldTable('deficit_MIROC5_rcp85', ['bear_lake', 'fern_lake', 'cub_lake'], dates, 3)]  #Site not in the base table
+    fieldTables[2] = pd.concat([fieldTables[2], fieldTables[2].iloc[[10]].assign(deficit_MIROC5_rcp85=-1.0)], ignore_index=True)   #Repeated key
+    fieldNames = [fieldTable.columns[-1] for fieldTable in fieldTables]
+
+    wideTable, stats = define_WideTable(baseTable, fieldNames, iter(fieldTables))
+    merged = functools.reduce(lambda left, right: left.merge(right.drop_duplicates(['SiteName', 'time']), on=['SiteName', 'time'], how='left'),
+                              fieldTables, baseTable)
+
+    pd.testing.assert_frame_equal(wideTable, merged)
+    assert stats["records"] == len(baseTable) and stats["fields"] == 3
+
+# Peak memory is only traced with trackMemory, and a tracer started by the caller is left running with its peak
+def test_WideTableTrackMemory():
+
+    dates = pd.date_range('2030-01-01', '2030-12-31', freq='D')
+    baseTable = define_FieldTable('deficit_CCSM4_rcp45', ['bear_lake'], dates, 0)
+    fieldTables = [define_FieldTable('deficit_CCSM4_rcp85', ['bear_lake'], dates, 1)]
+
+    wideTable, stats = define_WideTable(baseTable, ['deficit_CCSM4_rcp85'], iter(fieldTables))
+    assert stats["peakBytes"] is None and stats["arrayBytes"] == len(dates) * 8 and not tracemalloc.is_tracing()
+
+    wideTable, stats = define_WideTable(baseTable, ['deficit_CCSM4_rcp85'], iter(fieldTables), trackMemory=True)
+    assert stats["peakBytes"] >= stats["arrayBytes"] and not tracemalloc.is_tracing()
+
+    tracemalloc.start()
+    try:
+        callerBuffer = bytearray(8 * 1048576)
+        del callerBuffer
+        wideTable, stats = define_WideTable(baseTable, ['deficit_CCSM4_rcp85'], iter(fieldTables), trackMemory=True)
+        assert stats["peakBytes"] is None and tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[1] >= 8 * 1048576
+    finally:
+        tracemalloc.stop()
+
+# NCSS point .csv fill values (packed below -30000) are NaN, as in the NetCDF responses
+def test_ParseNCSSPointFill():
+
+    text = ('time,latitude[unit="degrees_north"],longitude[unit="degrees_east"],Deficit[unit="mm"]\n'
+            '2030-01-01T00:00:00Z,40.3,-105.6,120\n2030-01-02T00:00:00Z,40.3,-105.6,-32768\n2030-01-03T00:00:00Z,40.3,-105.6,0\n')
+    arrays = parse_NCSSPoint(io.StringIO(text))
+
+    np.testing.assert_array_equal(arrays["value"], [120.0, np.nan, 0.0])
+    np.testing.assert_array_equal(arrays["time"], np.array(["2030-01-01", "2030-01-02", "2030-01-03"], dtype="datetime64[s]"))
+    np.testing.assert_array_equal(parse_NCSSPoint(io.StringIO(text), fillBelow=None)["value"], [120.0, -32768.0, 0.0])
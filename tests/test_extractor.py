@@ -0,0 +1,102 @@
+# Tests of 'GCM_wb_thredds_point_extractor_v3.py' against the local stand-in THREDDS server (fire_ignition/ncss_server.py) - the script is copied to
+# a temporary folder with its parameters set and run in a subprocess
+
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fire_ignition.ncss_server import NCSSServer
+
+repositoryFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+scriptName = "GCM_wb_thredds_point_extractor_v3.py"
+outFileName = "bearlake_fromgrid_futures"
+
+
+@pytest.fixture
+def server():
+
+    ncssServer = NCSSServer()
+    ncssServer.start()
+    yield ncssServer
+    ncssServer.stop()
+
+
+# Function copies the extractor to 'runFolder' with the parameters in 'parameters' (name: value source text) and runs it
+# Output - merged output table (the script joins its paths with '\\', i.e. the output is found by name in the parent folder on other platforms),
+# None with 'check' False (the run may fail)
+def run_Extractor(runFolder, parameters, check=True):
+
+    os.makedirs(runFolder, exist_ok=True)
+    with open(os.path.join(repositoryFolder, scriptName)) as inFile:
+        source = inFile.read()
+    for name, value in parameters.items():
+        source, count = re.subn(r"^(    " + name + r" = ).*$", lambda match: match.group(1) + value, source, count=1, flags=re.MULTILINE)
+        assert count == 1, name
+    scriptFile = os.path.join(runFolder, scriptName)
+    with open(scriptFile, "w") as outFile:
+        outFile.write(source)
+
+    environment = dict(os.environ, PYTHONPATH=repositoryFolder)
+    completed = subprocess.run([sys.executable, scriptFile], cwd=runFolder, env=environment, capture_output=True, text=True, timeout=300)
+    if not check:
+        return None
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+
+    outFiles = glob.glob(runFolder + "*MergedAll*" + outFileName + ".csv") + glob.glob(os.path.join(runFolder, "*MergedAll*" + outFileName + ".csv"))
+    assert len(outFiles) == 1, completed.stdout
+    return pd.read_csv(outFiles[0])
+
+
+# Function writes the points file (two daily deficit sites) - Output - parameters of a three year run against the stand-in server
+def define_RunParameters(server, tmp_path):
+
+    pointsFile = str(tmp_path / "points.csv")
+    with open(pointsFile, "w") as outFile:
+        outFile.write("Name,param,d_or_m,lat,lon,model,scenario\nsiteA_1,deficit,daily,40.30,-105.60,CCSM4,rcp45\n"
+                      "siteB_1,deficit,daily,40.50,-105.80,CCSM4,rcp85\n")
+
+    return {"parameterList": "['deficit']", "first_year": "2030", "last_year": "2032", "calEnsembleAvg": "['No']", "mypointsFile": repr(pointsFile),
+            "useDownloadCache": "'No'", "useJobManifest": "'No'", "threddsServerURL": repr(server.baseURL)}
+
+
+# The 'Files' and 'InMemory' merges output the same table - fill values are NaN in both
+def test_ExtractorMergeModes(server, tmp_path):
+
+    parameters = define_RunParameters(server, tmp_path)
+
+    tables = {}
+    for mergeMode in ("Files", "InMemory"):
+        tables[mergeMode] = run_Extractor(str(tmp_path / mergeMode), dict(parameters, mergeMode=repr(mergeMode)))
+
+    fields = [field for field in tables["Files"].columns if field.startswith("deficit_")]
+    assert len(fields) == 2 and tables["InMemory"][fields].isna().to_numpy().sum() > 0
+    pd.testing.assert_frame_equal(tables["Files"][["SiteName", "time"] + fields], tables["InMemory"][["SiteName", "time"] + fields])
+    assert np.nanmin(tables["Files"][fields].to_numpy()) >= 0
+
+
+# A run with failed requests (503 responses, one attempt) is resumed from the job manifest - completed years are read from the .npz year arrays or
+# the download cache, only the failed tasks are requested again and the output equals a run without failures
+@pytest.mark.parametrize("intermediateFiles, useDownloadCache", [("'Yes'", "'No'"), ("'No'", "'Yes'")])
+def test_ExtractorResume(server, tmp_path, intermediateFiles, useDownloadCache):
+
+    parameters = dict(define_RunParameters(server, tmp_path), useJobManifest="'Yes'", maxRetries="1", intermediateFiles=intermediateFiles,
+                      useDownloadCache=useDownloadCache, downloadCacheFolder=repr(str(tmp_path / "DownloadCache")))
+    dfExpected = run_Extractor(str(tmp_path / "expected"), dict(parameters, useDownloadCache="'No'"))
+
+    server.configure(failureRate=0.4, seed=3)
+    runFolder = str(tmp_path / "resume")
+    run_Extractor(runFolder, parameters, check=False)
+    failedRequests = server.summary()["statusCodes"].get("503", 0)
+    assert 0 < failedRequests < 6
+
+    server.configure()
+    dfResumed = run_Extractor(runFolder, dict(parameters, resumeMode="'Yes'"))
+    assert server.summary()["pointRequests"] == failedRequests
+    pd.testing.assert_frame_equal(dfResumed, dfExpected)
@@ -0,0 +1,168 @@
+# Tests of the concurrent download engine (fetch.py) - download functions are local stand-ins, the pipeline runs against the stand-in THREDDS server
+
+import http.client
+import io
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+
+import pytest
+
+from fire_ignition import fetch
+from fire_ignition.extract import parse_NCSSPoint
+from fire_ignition.fetch_benchmark import define_BenchmarkJobs
+from fire_ignition.ncss_server import NCSSServer
+
+
+# Download function stand-in - raises the errors in 'failures' (one per attempt) then succeeds
+class FailingDownload:
+
+    def __init__(self, failures):
+
+        self.failures = list(failures)
+        self.calls = 0
+
+    def __call__(self, url, outFile, timeout):
+
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return {"bytesTransferred": 10, "ttfbSeconds": 0.0}
+
+
+# Run one job with 'retries' attempts - output (job report, backoff delays)
+def define_JobRun(downloadFunction, retries=5):
+
+    delays = []
+    report = fetch.fetchJob({"url": "http://host-a/data.csv", "outFile": "data.csv", "key": ("site", 2030)}, fetch.HostLimiter(2), 10, retries, 1.0, 8.0,
+                            downloadFunction, random.Random(0), delays.append)
+    return report, delays
+
+
+# Connection errors and retry status codes are retried with the exponential backoff and jitter delays
+def test_FetchJobRetry():
+
+    report, delays = define_JobRun(FailingDownload([ConnectionResetError("reset"), urllib.error.HTTPError("http://host-a", 503, "Busy", None, None),
+                                                    TimeoutError("timed out")]))
+
+    assert report["status"] == "Success" and report["attempts"] == 4 and report["error"] is None
+    assert report["key"] == ("site", 2030) and report["bytes"] == 10
+    assert len(delays) == 3
+    assert all(0 <= delay <= min(8.0, 2 ** attempt) for attempt, delay in enumerate(delays))
+
+
+# HTTP errors other than the retry status codes fail without a retry, retries exhausted report the last error
+def test_FetchJobFailure():
+
+    downloadFunction = FailingDownload([urllib.error.HTTPError("http://host-a", 404, "Not Found", None, None)])
+    report, delays = define_JobRun(downloadFunction)
+    assert report["status"] == "Failed" and report["attempts"] == 1 and downloadFunction.calls == 1 and delays == []
+    assert report["error"].startswith("HTTPError")
+
+    report, delays = define_JobRun(FailingDownload([ConnectionResetError("reset")] * 3), retries=3)
+    assert report["status"] == "Failed" and report["attempts"] == 3 and len(delays) == 2
+    assert report["error"] == "ConnectionResetError: reset"
+
+
+# Socket, timeout and connection errors (also wrapped in a URLError) are retried, other OS errors and invalid urls are not
+def test_IsRetryable():
+
+    assert all(fetch.define_IsRetryable(error) for error in [ConnectionRefusedError("refused"), socket.timeout("timed out"),
+                                                             socket.gaierror("name resolution"), http.client.RemoteDisconnected("closed"),
+                                                             urllib.error.URLError(ConnectionRefusedError("refused"))])
+    assert not any(fetch.define_IsRetryable(error) for error in [PermissionError("denied"), FileNotFoundError("missing"),
+                                                                 urllib.error.URLError("unknown url type: htp"),
+                                                                 urllib.error.URLError(PermissionError("denied"))])
+
+    downloadFunction = FailingDownload([PermissionError("denied")])
+    report, delays = define_JobRun(downloadFunction)
+    assert report["status"] == "Failed" and downloadFunction.calls == 1 and delays == []
+
+
+# Download failing part way through the body leaves no temporary file
+def test_DownloadURLFailure(tmp_path, monkeypatch):
+
+    def copyPartial(source, target, length):
+        target.write(source.read(10))
+        raise ConnectionResetError("reset")
+
+    inFile = tmp_path / "response.csv"
+    inFile.write_bytes(b"time,deficit\n" * 100)
+    monkeypatch.setattr(fetch.shutil, "copyfileobj", copyPartial)
+    with pytest.raises(ConnectionResetError):
+        fetch.downloadURL(inFile.as_uri(), str(tmp_path / "data.csv"))
+    assert os.listdir(str(tmp_path)) == ["response.csv"]
+
+
+# Backoff delay is between 0 and min(backoffMax, backoffBase * 2 ** attempt)
+def test_BackoffSeconds():
+
+    randomGenerator = random.Random(1)
+    for attempt in range(8):
+        delays = [fetch.define_BackoffSeconds(attempt, 0.5, 10.0, randomGenerator) for count in range(50)]
+        assert 0 <= min(delays) and max(delays) <= min(10.0, 0.5 * 2 ** attempt)
+
+
+# Concurrent requests per host never exceed 'perHostLimit' while the two hosts are downloaded at the same time
+def test_HostLimiterCap():
+
+    lock = threading.Lock()
+    active = {}
+    highWater = {"all": 0}
+
+    def downloadFunction(url, outFile, timeout):
+        host = url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            highWater[host] = max(highWater.get(host, 0), active[host])
+            highWater["all"] = max(highWater["all"], sum(active.values()))
+        time.sleep(0.02)
+        with lock:
+            active[host] -= 1
+        return {"bytesTransferred": 1, "ttfbSeconds": 0.0}
+
+    jobs = [{"url": "http://host-" + host + "/" + str(count), "outFile": str(count)} for count in range(12) for host in "ab"]
+    reports = fetch.runFetchJobs(jobs, maxWorkers=8, perHostLimit=2, downloadFunction=downloadFunction, seed=0)
+
+    assert [report["url"] for report in reports] == [job["url"] for job in jobs]
+    assert all(report["status"] == "Success" for report in reports)
+    assert highWater["host-a"] == 2 and highWater["host-b"] == 2 and highWater["all"] > 2
+
+
+@pytest.fixture
+def server():
+
+    ncssServer = NCSSServer()
+    ncssServer.start()
+    yield ncssServer
+    ncssServer.stop()
+
+
+# A slow consumer fills the bounded queue - the download workers wait (backpressure) and at most 'queueSize' bodies wait in memory.  A consumer
+# error fails its job only.
+def test_FetchPipelineBackpressure(server):
+
+    jobs = define_BenchmarkJobs(server.baseURL, [(40.3, -105.6), (40.55, -105.6)], ['CCSM4'], ['rcp45', 'rcp85'], range(2030, 2034))
+    failingJob = jobs[5]["outFile"]
+    lock = threading.Lock()
+    records = {}
+
+    def consumeFunction(job, body):
+        time.sleep(0.02)
+        if job["outFile"] == failingJob:
+            raise ValueError("Parse failed")
+        arrays = parse_NCSSPoint(io.BytesIO(body))
+        with lock:
+            records[job["outFile"]] = len(arrays["time"])
+
+    reports, stats = fetch.runFetchPipeline(jobs, consumeFunction, maxWorkers=8, perHostLimit=8, parseWorkers=1, queueSize=2, seed=0)
+
+    assert [report["outFile"] for report in reports] == [job["outFile"] for job in jobs]
+    assert [report["outFile"] for report in reports if report["status"] == "Failed"] == [failingJob]
+    assert reports[5]["error"] == "ValueError: Parse failed"
+    assert len(records) == len(jobs) - 1 and all(recordCount in (365, 366) for recordCount in records.values())
+    assert 1 <= stats["queueHighWater"] <= 2
+    assert stats["producerWaitSeconds"] > 0 and stats["consumerSeconds"] >= 0.02 * len(jobs)
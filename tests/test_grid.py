@@ -0,0 +1,51 @@
+# Tests of the grid cell lookup and the point grouping by grid cell (grid.py)
+
+import numpy as np
+
+from fire_ignition import grid
+
+# NCSS 'dataset.xml' with a regular latitude axis and a listed longitude axis (0 to 360)
+datasetXML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<gridDataset location="/thredds/ncss/daily/Deficit.nc">
+  <axis name="lat" shape="5" type="double" axisType="Lat"><values spacing="regular" start="40.0" increment="0.5" npts="5"/></axis>
+  <axis name="lon" shape="4" type="double" axisType="Lon"><values>254.0 254.5 255.0 255.5</values></axis>
+  <axis name="time" shape="2" type="double" axisType="Time"><values>0 1</values></axis>
+</gridDataset>
+"""
+
+
+def test_ParseGridAxes():
+
+    axes = grid.parse_GridAxes(datasetXML)
+
+    np.testing.assert_array_equal(axes["lat"], [40.0, 40.5, 41.0, 41.5, 42.0])
+    np.testing.assert_array_equal(axes["lon"], [254.0, 254.5, 255.0, 255.5])
+    assert grid.define_DatasetURL("http://host/thredds/ncss/daily/Deficit.nc?var=Deficit&latitude=40") == \
+        "http://host/thredds/ncss/daily/Deficit.nc/dataset.xml"
+
+
+# Points snap to the nearest cell (negative longitudes on the 0 to 360 axis), points more than half a cell outside the grid have no cell
+def test_GridCell():
+
+    axes = grid.parse_GridAxes(datasetXML)
+
+    assert grid.define_GridCell(40.6, -105.4, axes) == (1, 1)
+    assert grid.define_GridCell('41.9', '255.6', axes) == (4, 3)
+    assert grid.define_GridCell(39.76, -106.0, axes) == (0, 0)
+    assert grid.define_GridCell(39.7, -106.0, axes) is None
+    assert grid.define_GridCell(40.0, -104.2, axes) is None
+    assert grid.define_GridCell('', -105.0, axes) is None
+
+
+# One group per cell and request key - the representative is the first point of the cell, points outside the grid are their own group
+def test_CellGroups():
+
+    axes = grid.parse_GridAxes(datasetXML)
+    requestKey = ('daily', 'deficit', 'CCSM4', 'rcp45')
+    points = {'siteA': (40.6, -105.4, requestKey), 'siteB': (40.4, -105.6, requestKey), 'siteC': (40.6, -105.4, ('daily', 'deficit', 'MIROC5', 'rcp45')),
+              'outside': (45.0, -105.4, requestKey), 'siteD': (40.55, -105.45, requestKey), 'siteE': (41.0, -105.0, requestKey)}
+
+    groups = grid.define_CellGroups(points, axes)
+
+    assert groups == {'siteA': ['siteA', 'siteB', 'siteD'], 'siteC': ['siteC'], 'outside': ['outside'], 'siteE': ['siteE']}
+    assert grid.define_CellGroups(points, None) == {name: [name] for name in points}
@@ -0,0 +1,121 @@
+# Tests of the keep-alive fetch client (http_client.py) against a local HTTP/1.1 server
+
+import gzip
+import http.client
+import http.server
+import os
+import threading
+import urllib.error
+
+import pytest
+
+from fire_ignition.http_client import FetchClient
+
+responseBody = b"time,deficit\n" + b"".join(b"2030-01-%02dT00:00:00Z,%d\n" % (day, day * 7) for day in range(1, 29)) * 20
+
+
+class LocalRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+
+        pass
+
+    # '/missing' 404, '/truncated' half the response body then the connection is closed, otherwise the response body (gzip if requested) - with
+    # 'dropConnections' the connection is closed after the response without a 'Connection: close' header (i.e. a stale keep-alive connection on
+    # the client)
+    def do_GET(self):
+
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/truncated":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(responseBody)))
+            self.end_headers()
+            self.wfile.write(responseBody[:len(responseBody) // 2])
+            self.close_connection = True
+            return
+
+        body = responseBody
+        gzipBody = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipBody:
+            body = gzip.compress(body)
+        self.send_response(200)
+        if gzipBody:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = self.server.dropConnections
+
+
+# Local HTTP/1.1 server - Output base url
+@pytest.fixture
+def server():
+
+    httpServer = http.server.ThreadingHTTPServer(("127.0.0.1", 0), LocalRequestHandler)
+    httpServer.dropConnections = False
+    thread = threading.Thread(target=httpServer.serve_forever, daemon=True)
+    thread.start()
+    yield httpServer
+    httpServer.shutdown()
+    httpServer.server_close()
+
+
+# Requests reuse the keep-alive connection, and the gzip body is decompressed as it is read
+def test_FetchClientKeepAliveGzip(server):
+
+    client = FetchClient(timeout=10)
+    baseURL = "http://127.0.0.1:" + str(server.server_address[1])
+    for count in range(3):
+        body, stats = client.get(baseURL + "/data.csv")
+        assert body == responseBody
+        assert stats["contentEncoding"] == "gzip" and stats["complete"]
+        assert stats["bytesTransferred"] < stats["bytesDecoded"] == len(responseBody)
+
+    summary = client.summary()
+    assert summary["requests"] == 3 and summary["connectionsOpened"] == 1 and summary["reusedConnections"] == 2
+    client.close()
+
+
+# A keep-alive connection closed by the server is retried once on a new connection
+def test_FetchClientStaleConnection(server):
+
+    server.dropConnections = True
+    client = FetchClient(timeout=10)
+    baseURL = "http://127.0.0.1:" + str(server.server_address[1])
+    for count in range(3):
+        body, stats = client.get(baseURL + "/data.csv")
+        assert body == responseBody
+
+    summary = client.summary()
+    assert summary["requests"] == 3 and summary["connectionsOpened"] == 3
+    client.close()
+
+
+# Download writes the body to 'outFile' (no temporary file left, also on failure), HTTP errors raise 'urllib.error.HTTPError'
+def test_FetchClientDownload(server, tmp_path):
+
+    client = FetchClient(timeout=10)
+    baseURL = "http://127.0.0.1:" + str(server.server_address[1])
+    outFile = str(tmp_path / "data.csv")
+
+    stats = client.download(baseURL + "/data.csv", outFile)
+    with open(outFile, "rb") as inFile:
+        assert inFile.read() == responseBody
+    assert stats["bytesDecoded"] == len(responseBody)
+
+    with pytest.raises(urllib.error.HTTPError) as errorInfo:
+        client.download(baseURL + "/missing", str(tmp_path / "missing.csv"))
+    assert errorInfo.value.code == 404
+    assert sorted(os.listdir(str(tmp_path))) == ["data.csv"]
+
+    # Connection closed part way through the body - the temporary file is removed
+    with pytest.raises(http.client.IncompleteRead):
+        client.download(baseURL + "/truncated", str(tmp_path / "truncated.csv"))
+    assert sorted(os.listdir(str(tmp_path))) == ["data.csv"]
+    client.close()
@@ -0,0 +1,64 @@
+# Tests of the vectorized Fire Ignition Proportion (ignition.py) against the record by record loop the scripts used
+
+import numpy as np
+import pandas as pd
+
+from fire_ignition import ignition, reference
+
+
+# Baseline - record by record Percentile and Fire Ignition Proportion (the original loop of the scripts' 'define_IgnitionProportion')
+def define_BaselineLoop(movingAverage, refValues, equationType):
+
+    refValues = pd.Series(refValues)
+    percentiles = []
+    proportions = []
+    for checkValue in movingAverage:
+        percentile = (np.sum(refValues < checkValue) / refValues.shape[0]) * 100
+        percentiles.append(percentile)
+        proportions.append(ignition.forest_equation(percentile) if equationType == "Forest" else ignition.nonforest_equation(percentile))
+
+    return np.array(percentiles, dtype=float), np.array(proportions, dtype=float)
+
+
+# Projections batch (all series in one pass) equals the loop per series - fire season end day of year included, series values as the reference
+def test_IgnitionProportionBatch(projections):
+
+    df, fieldList = projections
+    dayOfYear = pd.to_datetime(df['time']).dt.dayofyear.to_numpy()
+    dfBatch = ignition.define_IgnitionProportionBatch(df, fieldList, 7, dayOfYear, True)
+    forestSeason, nonForestSeason = ignition.define_FireSeasons(dayOfYear, True)
+
+    for field in fieldList:
+        movingAverage = df[field].rolling(7, min_periods=1).mean()
+        percForest, propForest = define_BaselineLoop(movingAverage, df[field][forestSeason], "Forest")
+        percNonForest, propNonForest = define_BaselineLoop(movingAverage, df[field][nonForestSeason], "NonForest")
+
+        np.testing.assert_array_equal(dfBatch["PercForest" + field].to_numpy(), percForest)
+        np.testing.assert_array_equal(dfBatch["PropFiresForest" + field].to_numpy(), propForest)
+        np.testing.assert_array_equal(dfBatch["PercNonForest" + field].to_numpy(), percNonForest)
+        np.testing.assert_array_equal(dfBatch["PropFiresNonForest" + field].to_numpy(), propNonForest)
+
+
+# Station scoring (sorted reference, fire season end day of year excluded) equals the loop against the reference list
+def test_IgnitionProportionStation(projections):
+
+    df, fieldList = projections
+    stationData = pd.DataFrame({'DATE': pd.to_datetime(df['time']).dt.strftime('%m/%d/%Y'), 'D (MM)': df[fieldList[0]]})
+
+    dfAverage = ignition.define_MovingWindowAverage(stationData, 14, 'D (MM)')
+    refList = reference.define_ReferenceList(stationData, 'D (MM)', 'DATE', ignition.forest_start_DOY, ignition.forest_end_DOY)
+    refSorted = reference.define_ReferenceSorted(stationData, 'D (MM)', 'DATE', ignition.forest_start_DOY, ignition.forest_end_DOY)
+    dfScored = ignition.define_IgnitionProportion(dfAverage, 'D (MM)_14', refSorted, 'PercForest', 'PropFiresForest', 'Forest')
+
+    percForest, propForest = define_BaselineLoop(dfAverage['D (MM)_14'], refList['D (MM)'], "Forest")
+    np.testing.assert_array_equal(dfScored['PercForest'].to_numpy(), percForest)
+    np.testing.assert_array_equal(dfScored['PropFiresForest'].to_numpy(), propForest)
+
+
+# Percentile counts the reference values strictly less than the value (ties are not counted), NaN values have a Percentile of 0
+def test_PercentileSorted():
+
+    refSorted = np.array([1.0, 2.0, 2.0, 3.0, np.nan])
+    percentile = ignition.define_PercentileSorted(refSorted, refSorted.shape[0], [0.5, 2.0, 2.5, 4.0, np.nan])
+
+    np.testing.assert_array_equal(percentile, [0.0, 20.0, 60.0, 80.0, 0.0])
@@ -0,0 +1,48 @@
+# Tests of the extraction job manifest (manifest.py)
+
+import hashlib
+import io
+
+from fire_ignition.manifest import DigestReader, JobManifest, define_FileDigest, define_TaskKey
+
+
+# Tasks are replayed by a resumed manifest - the last record of a task wins, a partially written last line is ignored
+def test_JobManifestReplay(tmp_path):
+
+    manifestFile = str(tmp_path / "jobs" / "ExtractionJobs.jsonl")
+    manifest = JobManifest(manifestFile)
+    manifest.recordSuccess(define_TaskKey('siteA_1', 2030), 'deficit_CCSM4_rcp45', 'http://host/2030', 100, 'a' * 64, 0.5)
+    manifest.recordFailure(define_TaskKey('siteA_1', 2031), 'deficit_CCSM4_rcp45', 'http://host/2031', 'HTTPError: 503', 2.0, 5)
+    manifest.recordFailure(define_TaskKey('siteA_1', 2032), 'deficit_CCSM4_rcp45', 'http://host/2032', 'timed out', 2.0, 5)
+    manifest.recordSuccess(define_TaskKey('siteA_1', 2032), 'deficit_CCSM4_rcp45', 'http://host/2032', 50, 'b' * 64, source="cache")
+    with open(manifestFile, "a") as outFile:
+        outFile.write('{"task": "siteA_1_2033", "state": "succ')
+
+    resumed = JobManifest(manifestFile, resume=True)
+    assert resumed.isComplete('siteA_1_2030') and resumed.isComplete('siteA_1_2032')
+    assert resumed.state('siteA_1_2031') == 'failed' and not resumed.isComplete('siteA_1_2031')
+    assert resumed.state('siteA_1_2033') is None
+
+    summary = resumed.summary()
+    assert (summary['tasks'], summary['success'], summary['failed'], summary['bytes']) == (3, 2, 1, 150)
+    assert summary['failedTasks'] == [('siteA_1_2031', 'HTTPError: 503')]
+    assert summary['runDownloaded'] == 0 and summary['runBytes'] == 0
+
+    summary = manifest.summary()
+    assert (summary['runDownloaded'], summary['runCached'], summary['runFailed'], summary['runBytes']) == (1, 1, 2, 100)
+
+    assert JobManifest(manifestFile, resume=False).summary()['tasks'] == 0
+
+
+# Digest reader passes the content through and returns the size and sha256 - the rest of the source is read by 'finish'
+def test_DigestReader(tmp_path):
+
+    content = bytes(range(256)) * 5000
+    reader = DigestReader(io.BytesIO(content))
+    assert reader.read(1000) == content[:1000]
+    assert reader.finish() == (len(content), hashlib.sha256(content).hexdigest())
+
+    inFile = str(tmp_path / "response.csv")
+    with open(inFile, "wb") as outFile:
+        outFile.write(content)
+    assert define_FileDigest(inFile) == (len(content), hashlib.sha256(content).hexdigest())
@@ -0,0 +1,126 @@
+# Tests of the NetCDF-3 codec (netcdf.py) - files built byte by byte from the NetCDF classic format specification (i.e. not by 'write_NetCDF3')
+
+import struct
+
+import numpy as np
+
+from fire_ignition.netcdf import parse_NCSSPointNetCDF, read_NetCDF3, write_NetCDF3
+
+# NetCDF-3 type codes
+ncChar, ncShort, ncInt, ncFloat, ncDouble = 2, 3, 4, 5, 6
+typeFormats = {ncShort: "h", ncInt: "i", ncFloat: "f", ncDouble: "d"}
+
+
+def define_Padded(data):
+
+    return data + b"\x00" * (-len(data) % 4)
+
+
+def define_Name(name):
+
+    return struct.pack(">i", len(name)) + define_Padded(name.encode("utf-8"))
+
+
+def define_Attributes(attributes):
+
+    if len(attributes) == 0:
+        return struct.pack(">ii", 0, 0)
+    data = struct.pack(">ii", 12, len(attributes))
+    for name, (ncType, value) in attributes.items():
+        if ncType == ncChar:
+            data += define_Name(name) + struct.pack(">ii", ncChar, len(value)) + define_Padded(value.encode("utf-8"))
+        else:
+            data += define_Name(name) + struct.pack(">ii", ncType, 1) + define_Padded(struct.pack(">" + typeFormats[ncType], value))
+    return data
+
+
+# Function builds a CDF-1 file - dimensions [(name, length)] (length 0 the record dimension), variables [(name, dimension ids, attributes, type,
+# values)], record variables are interleaved per record
+def define_ClassicFile(dimensions, variables, recordCount=0):
+
+    def define_Header(begins):
+        header = b"CDF\x01" + struct.pack(">i", recordCount)
+        header += struct.pack(">ii", 10, len(dimensions)) + b"".join(define_Name(name) + struct.pack(">i", length) for name, length in dimensions)
+        header += struct.pack(">ii", 0, 0)   #No global attributes
+        header += struct.pack(">ii", 11, len(variables))
+        for (name, dimensionIds, attributes, ncType, values), begin in zip(variables, begins):
+            header += define_Name(name) + struct.pack(">i", len(dimensionIds)) + b"".join(struct.pack(">i", dimensionId) for dimensionId in dimensionIds)
+            header += define_Attributes(attributes) + struct.pack(">iii", ncType, define_VariableSize(ncType, values, dimensionIds), begin)
+        return header
+
+    def define_VariableSize(ncType, values, dimensionIds):
+        byteCount = struct.calcsize(">" + typeFormats[ncType])
+        isRecord = len(dimensionIds) > 0 and dimensions[dimensionIds[0]][1] == 0
+        return define_Padded(b"\x00" * (byteCount if isRecord else byteCount * len(values))).__len__()
+
+    isRecord = [len(variable[1]) > 0 and dimensions[variable[1][0]][1] == 0 for variable in variables]
+    headerLength = len(define_Header([0] * len(variables)))
+
+    # Fixed size variables, then the records
+    begins = [0] * len(variables)
+    data = b""
+    for count, (name, dimensionIds, attributes, ncType, values) in enumerate(variables):
+        if not isRecord[count]:
+            begins[count] = headerLength + len(data)
+            data += define_Padded(struct.pack(">" + str(len(values)) + typeFormats[ncType], *values))
+    recordStart = headerLength + len(data)
+    recordOffset = 0
+    for count, (name, dimensionIds, attributes, ncType, values) in enumerate(variables):
+        if isRecord[count]:
+            begins[count] = recordStart + recordOffset
+            recordOffset += define_VariableSize(ncType, values, dimensionIds)
+    for record in range(recordCount):
+        for count, (name, dimensionIds, attributes, ncType, values) in enumerate(variables):
+            if isRecord[count]:
+                data += define_Padded(struct.pack(">" + typeFormats[ncType], values[record]))
+
+    return define_Header(begins) + data
+
+
+pointVariables = [("latitude", [0], {"units": (ncChar, "degrees_north")}, ncFloat, [40.3]),
+                  ("longitude", [0], {"units": (ncChar, "degrees_east")}, ncFloat, [-105.6]),
+                  ("time", [1], {"units": (ncChar, "days since 1970-01-01 00:00:00"), "calendar": (ncChar, "standard")}, ncDouble,
+                   [21915.0, 21916.0, 21917.0, 21918.0]),
+                  ("Deficit", [1], {"units": (ncChar, "mm"), "_FillValue": (ncShort, -32768), "scale_factor": (ncDouble, 0.1)}, ncShort,
+                   [120, -32768, 35, -31000])]
+
+
+# NCSS point subset (station and observation dimensions) - coordinates, CF time, scale factor and fill values (attribute and below -30000)
+def test_ParseClassicPoint():
+
+    arrays = parse_NCSSPointNetCDF(define_ClassicFile([("station", 1), ("obs", 4)], pointVariables))
+
+    np.testing.assert_array_equal(arrays["time"], np.array(["2030-01-01", "2030-01-02", "2030-01-03", "2030-01-04"], dtype="datetime64[s]"))
+    np.testing.assert_array_equal(arrays["latitude"], [40.3] * 4)
+    np.testing.assert_array_equal(arrays["longitude"], [-105.6] * 4)
+    np.testing.assert_allclose(arrays["value"], [12.0, np.nan, 3.5, np.nan])
+    assert arrays["fields"] == ["time", 'latitude[unit="degrees_north"]', 'longitude[unit="degrees_east"]', 'Deficit[unit="mm"]']
+
+
+# Record (unlimited) dimension with two record variables - each variable's values are read from the interleaved records
+def test_ReadClassicRecords():
+
+    variables = [pointVariables[0], pointVariables[1], ("time", [1], pointVariables[2][2], ncDouble, pointVariables[2][4]),
+                 ("Deficit", [1], {"units": (ncChar, "mm")}, ncShort, [120, 7, 35, 0])]
+    dataset = read_NetCDF3(define_ClassicFile([("station", 1), ("obs", 0)], variables, recordCount=4))
+
+    assert dataset["dimensions"] == {"station": 1, "obs": 0}
+    np.testing.assert_array_equal(dataset["variables"]["time"]["values"], pointVariables[2][4])
+    np.testing.assert_array_equal(dataset["variables"]["Deficit"]["values"], [120, 7, 35, 0])
+    assert dataset["variables"]["Deficit"]["attributes"] == {"units": "mm"}
+
+
+# File written by 'write_NetCDF3' reads back the same dimensions, attributes and values
+def test_WriteReadRoundTrip():
+
+    values = np.array([0, 250, -32768, 32767], dtype=np.int16)
+    data = write_NetCDF3([("station", 1), ("obs", 4)],
+                         [("latitude", ["station"], np.array([40.3], dtype=np.float32), {"units": "degrees_north"}),
+                          ("time", ["obs"], np.arange(4, dtype=np.float64), {"units": "days since 2030-01-01"}),
+                          ("deficit", ["obs"], values, {"units": "mm", "_FillValue": np.int16(-32768)})], {"title": "round trip"})
+    dataset = read_NetCDF3(data)
+
+    assert dataset["attributes"] == {"title": "round trip"}
+    np.testing.assert_array_equal(dataset["variables"]["deficit"]["values"], values)
+    np.testing.assert_array_equal(dataset["variables"]["latitude"]["values"], np.array([40.3], dtype=np.float32))
+    assert dataset["variables"]["deficit"]["attributes"]["_FillValue"] == -32768
@@ -0,0 +1,22 @@
+# Tests of the parallel Fire Ignition Proportion (parallel.py) against the single process batch
+
+import pandas as pd
+
+from fire_ignition import ignition
+from fire_ignition.parallel import define_IgnitionProportionParallel
+
+
+# Projections batch with other fire seasons equals the parallel processing with the same fire seasons
+def test_IgnitionProportionParallelSeasons(projections):
+
+    df, fieldList = projections
+    dayOfYear = pd.to_datetime(df['time']).dt.dayofyear.to_numpy()
+    seasons = (30, 280, 90, 290)
+
+    dfBatch = ignition.define_IgnitionProportionBatch(df, fieldList, 7, dayOfYear, True, *seasons)
+    dfParallel, workerReport = define_IgnitionProportionParallel(df, fieldList, 7, dayOfYear, 2, True, *seasons)
+
+    assert [report['field'] for report in workerReport] == fieldList
+    assert all(report['status'] == 'Success' for report in workerReport)
+    pd.testing.assert_frame_equal(dfParallel[dfBatch.columns], dfBatch)
+    assert not dfBatch.equals(ignition.define_IgnitionProportionBatch(df, fieldList, 7, dayOfYear, True))
@@ -0,0 +1,52 @@
+# Tests of the in memory Fire Ignition Pipeline (pipeline.py) - stage Data Frames passed in memory equal the .csv hand off between the scripts
+
+import pandas as pd
+
+from fire_ignition.pipeline import FireIgnitionPipeline
+
+
+# Summarize Normals rows of the Historic stage output - 'inFile' the stage name or the exported .csv
+def define_ProcessList(inFile, siteName):
+
+    return [[inFile, 'SiteName', siteName, 'PercNonForest', 1991, 2020, 'Non-Forest', 'Mean', 'Normal', 'na', 'timeDate'],
+            [inFile, 'SiteName', 'Forest', 'PercForest', 1991, 2020, 'Forest', 'Mean', 'Normal', 'na', 'timeDate']]
+
+
+# Historic -> Summarize Normals in memory equals the Summarize Normals of the exported Historic .csv
+def test_PipelineNormalsMatchesCSV(stationCSV, tmp_path):
+
+    inFile, siteName, today = stationCSV
+    pipeline = FireIgnitionPipeline(siteName, today=today)
+    pipeline.loadStation(inFile)
+
+    dfHistoric = pipeline.historic()
+    assert set(dfHistoric['CoverType']) == {'Forest', 'Non-Forest'}
+    assert dfHistoric['timeDate'].min() == pd.Timestamp('1991-01-01')
+    assert dfHistoric['timeDate'].max() == pd.Timestamp('2020-12-30')
+
+    historicFile = str(tmp_path / "historic.csv")
+    dfHistoric.to_csv(historicFile, index=False)
+
+    dfMemory = pipeline.normals(define_ProcessList('historic', siteName))
+    dfCSV = pipeline.normals(define_ProcessList(historicFile, siteName))
+
+    pd.testing.assert_frame_equal(dfMemory, dfCSV)
+    assert list(dfMemory['DateTime']) == ['1991_2020', '1991_2020']
+    assert dfMemory[['High_Mean', 'Medium_Mean', 'Low_Mean']].sum(axis=1).between(365, 366).all()
+
+
+# The Now Cast stage summarizes the last 'yearsBack' years and the Now Cast days, the reference is derived once per pipeline
+def test_PipelineNowCast(stationCSV):
+
+    inFile, siteName, today = stationCSV
+    pipeline = FireIgnitionPipeline(siteName, today=today)
+    pipeline.loadStation(inFile)
+    pipeline.historic()
+    references = dict(pipeline.references)
+
+    dfNowCast = pipeline.nowcast(yearsBack=5)
+
+    assert pipeline.references["Forest"] is references["Forest"]
+    assert list(dfNowCast['DateTime'][:5]) == [str(year) + "_" + str(year) for year in range(2021, 2026)]
+    assert list(dfNowCast['DateTime'][-2:]) == ['NowCast_NowCast', 'NowCast_NowCast']
+    assert (dfNowCast['NowCastCount'].dropna() == 61).all()
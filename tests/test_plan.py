@@ -0,0 +1,54 @@
+# Tests of the fetch planning from the consumer needs (plan.py)
+
+import urllib.parse
+
+from fire_ignition import plan
+
+# Fire Ignition Projections needs (see 'consumerNeeds' of 'GCM_wb_thredds_point_extractor_v3.py')
+fireSeasonNeeds = [{'param': 'deficit', 'd_or_m': 'daily', 'startDOY': 7, 'endDOY': 301, 'leadDays': 6},
+                   {'param': 'deficit', 'd_or_m': 'daily', 'startDOY': 79, 'endDOY': 303, 'leadDays': 6}]
+
+dailyURL = ('http://host/thredds/ncss/V_1_5_2030_CCSM4_rcp45_Deficit.nc4?var=Deficit&latitude=40.3&longitude=-105.6&time_start=2030-01-01T00%3A00%3A00Z'
+            '&time_end=2031-01-01T00%3A00%3A00Z&accept=csv_file')
+
+
+# Needs of a parameter merge to one window (lead days before the earliest start), monthly and open needs are the full year
+def test_VariableWindows():
+
+    windows = plan.define_VariableWindows(fireSeasonNeeds + [{'param': 'AET', 'd_or_m': 'monthly', 'startDOY': 100, 'endDOY': 200},
+                                                             {'param': 'rain', 'd_or_m': 'daily'}])
+
+    assert windows == {('deficit', 'daily'): (1, 303), ('aet', 'monthly'): plan.fullYearWindow, ('rain', 'daily'): plan.fullYearWindow}
+    assert plan.define_VariableWindows([{'param': 'deficit', 'startDOY': 100, 'endDOY': 366, 'leadDays': 13}]) == {('deficit', 'daily'): (87, 366)}
+
+
+# Window url - 'time_start'/'time_end' set to the window dates (DOY 366 the last day of a non leap year), other parameters unchanged
+def test_WindowURL():
+
+    query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(plan.define_WindowURL(dailyURL, 2030, (87, 366))).query))
+    assert query['time_start'] == '2030-03-28T00:00:00Z' and query['time_end'] == '2030-12-31T23:59:59Z'
+    assert query['var'] == 'Deficit' and query['latitude'] == '40.3' and query['accept'] == 'csv_file'
+
+    query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(plan.define_WindowURL(dailyURL, 2032, (60, 303))).query))
+    assert query['time_start'] == '2032-02-29T00:00:00Z' and query['time_end'] == '2032-10-29T23:59:59Z'
+
+    assert plan.define_WindowURL(dailyURL, 2030, plan.fullYearWindow) == dailyURL
+    assert plan.define_WindowURL(dailyURL, 2030, None) == dailyURL
+
+
+# Places not needed are dropped, requested records are the window days - estimated requests and bytes against every place for the full year
+def test_FetchPlan():
+
+    points = {'siteA_deficit': ('deficit', 'daily'), 'siteB_deficit': ('Deficit', 'daily'), 'siteA_aet': ('aet', 'daily'),
+              'siteA_pet': ('pet', 'monthly')}
+    fetchPlan = plan.define_FetchPlan(points, range(2030, 2032), fireSeasonNeeds)
+
+    assert fetchPlan['places'] == ['siteA_deficit', 'siteB_deficit'] and fetchPlan['dropped'] == ['siteA_aet', 'siteA_pet']
+    assert fetchPlan['requests'] == 4 and fetchPlan['fullRequests'] == 8
+    assert fetchPlan['bytes'] == 4 * (plan.responseHeaderBytes['csv'] + 303 * plan.responseRecordBytes['csv'])
+    assert fetchPlan['fullBytes'] == 6 * (plan.responseHeaderBytes['csv'] + 365 * plan.responseRecordBytes['csv']) + \
+        2 * (plan.responseHeaderBytes['csv'] + 12 * plan.responseRecordBytes['csv'])
+
+    fullPlan = plan.define_FetchPlan(points, range(2030, 2032), None, "NetCDF")
+    assert fullPlan['dropped'] == [] and fullPlan['windows'] is None
+    assert fullPlan['requests'] == fullPlan['fullRequests'] == 8 and fullPlan['bytes'] == fullPlan['fullBytes']
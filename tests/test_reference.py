@@ -0,0 +1,63 @@
+# Tests of the fire season reference and the Reference Index (reference.py)
+
+import os
+
+import numpy as np
+
+from fire_ignition import ignition, reference
+from fire_ignition.climate_analyzer import read_ClimateAnalyzerCSV
+
+# Reference definition of the Historic station scripts
+referenceArgs = ('D (MM)', 'DATE', ignition.forest_start_DOY, ignition.forest_end_DOY, '1/1/1984', '12/31/2021')
+
+
+# Station table of the synthetic Climate Analyzer .csv fixture
+def define_StationData(stationCSV):
+
+    inFile, siteName, today = stationCSV
+    return read_ClimateAnalyzerCSV(inFile, siteName)
+
+
+# Index key is file name safe and differs by fire season and reference years
+def test_ReferenceIndexKey():
+
+    key = reference.define_ReferenceIndexKey('bear lake', 'D (MM)', 105, 274, '1/1/1984', '12/31/2021')
+
+    assert key == 'bear_lake_D__MM__DOY105_274_19840101_20211231'
+    assert reference.define_ReferenceIndexKey('bear lake', 'D (MM)', 105, 274, None, None).endswith('_AllYears')
+    assert key != reference.define_ReferenceIndexKey('bear lake', 'D (MM)', 100, 274, '1/1/1984', '12/31/2021')
+
+
+# First call saves the index, the second loads it (memory mapped) - both equal the derived sorted reference
+def test_ReferenceIndexSaveLoad(stationCSV, tmp_path):
+
+    stationData = define_StationData(stationCSV)
+    refSorted = reference.define_ReferenceSorted(stationData, *referenceArgs)
+
+    refSaved = reference.define_ReferenceIndex(stationData, *referenceArgs, 'bear_lake', str(tmp_path))
+    key = reference.define_ReferenceIndexKey('bear_lake', 'D (MM)', ignition.forest_start_DOY, ignition.forest_end_DOY, '1/1/1984', '12/31/2021')
+    assert os.path.exists(os.path.join(str(tmp_path), key + ".npy"))
+    assert os.path.exists(os.path.join(str(tmp_path), key + ".json"))
+
+    refLoaded = reference.define_ReferenceIndex(stationData.iloc[:0], *referenceArgs, 'bear_lake', str(tmp_path))
+    assert isinstance(refLoaded, np.memmap)
+    assert refSorted.shape[0] == 38 * (ignition.forest_end_DOY - ignition.forest_start_DOY)
+    np.testing.assert_array_equal(refSaved, refSorted)
+    np.testing.assert_array_equal(refLoaded, refSorted)
+
+
+# Index with other metadata (e.g. source file changed) or a record count mismatch is not loaded
+def test_ReferenceIndexMetadataMismatch(stationCSV, tmp_path):
+
+    stationData = define_StationData(stationCSV)
+    reference.define_ReferenceIndex(stationData, *referenceArgs, 'bear_lake', str(tmp_path), extraMetadata={"sourceSize": 10})
+    key = reference.define_ReferenceIndexKey('bear_lake', 'D (MM)', ignition.forest_start_DOY, ignition.forest_end_DOY, '1/1/1984', '12/31/2021')
+    metadata = {"station": 'bear_lake', "field": 'D (MM)', "startDOY": ignition.forest_start_DOY, "endDOY": ignition.forest_end_DOY,
+                "refYearStartDate": '1/1/1984', "refYearEndDate": '12/31/2021'}
+
+    assert reference.load_ReferenceIndex(str(tmp_path), key, dict(metadata, sourceSize=10)) is not None
+    assert reference.load_ReferenceIndex(str(tmp_path), key, dict(metadata, sourceSize=11)) is None
+
+    reference.save_ReferenceIndex(str(tmp_path), key, dict(metadata, sourceSize=10), np.arange(3.0))
+    np.save(os.path.join(str(tmp_path), key + ".npy"), np.arange(4.0))
+    assert reference.load_ReferenceIndex(str(tmp_path), key, dict(metadata, sourceSize=10)) is None
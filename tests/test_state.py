@@ -0,0 +1,65 @@
+# Tests of the incremental Now Cast state (state.py) - every run equals the Now Cast of the full series without a state
+
+from datetime import date
+
+import pandas as pd
+
+from fire_ignition.climate_analyzer import read_ClimateAnalyzerCSV, subsetToPlus60
+from fire_ignition.pipeline import FireIgnitionPipeline
+from fire_ignition.state import define_NowCastIncremental
+from fire_ignition.synthetic import write_ClimateAnalyzerCSV
+
+
+# Incremental Now Cast for 'today' compared with the Now Cast of the full series - output runInfo
+def check_NowCastIncremental(stationData, siteName, today, stateFolder):
+
+    pipeline = FireIgnitionPipeline(siteName, today=today)
+    dfState, runInfo = define_NowCastIncremental(pipeline, subsetToPlus60(stationData, today), stateFolder, yearsBack=5)
+
+    dfFull = FireIgnitionPipeline(siteName, today=today).nowcast(stationData, yearsBack=5)
+    pd.testing.assert_frame_equal(dfState, dfFull, check_dtype=False)
+    return runInfo
+
+
+# Daily runs - state created, unchanged window reused, next day and next year evaluated incrementally
+def test_NowCastIncrementalDaily(tmp_path):
+
+    inFile = str(tmp_path / "station.csv")
+    write_ClimateAnalyzerCSV(inFile, 'test_station', '1980-01-01', '2027-03-31', seed=5)
+    stationData = read_ClimateAnalyzerCSV(inFile, 'test_station')
+    stateFolder = str(tmp_path / "state")
+
+    runInfo = check_NowCastIncremental(stationData, 'test_station', date(2026, 12, 20), stateFolder)
+    assert runInfo['mode'] == 'full'
+
+    runInfo = check_NowCastIncremental(stationData, 'test_station', date(2026, 12, 20), stateFolder)
+    assert runInfo == {'mode': 'unchanged', 'recordsEvaluated': 0}
+
+    runInfo = check_NowCastIncremental(stationData, 'test_station', date(2026, 12, 21), stateFolder)
+    assert runInfo['mode'] == 'incremental'
+    assert 0 < runInfo['recordsEvaluated'] < 500
+
+    runInfo = check_NowCastIncremental(stationData, 'test_station', date(2027, 1, 5), stateFolder)
+    assert runInfo['mode'] == 'incremental'
+    assert 0 < runInfo['recordsEvaluated'] < 500
+
+
+# A revised closed year (hash mismatch) or other fire season days of year rebuild the state
+def test_NowCastIncrementalRebuild(stationCSV, tmp_path):
+
+    inFile, siteName, today = stationCSV
+    stationData = read_ClimateAnalyzerCSV(inFile, siteName)
+    stateFolder = str(tmp_path / "state")
+
+    assert check_NowCastIncremental(stationData, siteName, today, stateFolder)['mode'] == 'full'
+
+    stationRevised = stationData.copy()
+    stationRevised.loc[stationRevised['DATE'] == pd.Timestamp('2015-07-01'), 'D (MM)'] += 1.0
+    assert check_NowCastIncremental(stationRevised, siteName, today, stateFolder)['mode'] == 'full'
+    assert check_NowCastIncremental(stationRevised, siteName, today, stateFolder)['mode'] == 'unchanged'
+
+    pipeline = FireIgnitionPipeline(siteName, today=today, forestStartDOY=120)
+    dfState, runInfo = define_NowCastIncremental(pipeline, subsetToPlus60(stationRevised, today), stateFolder, yearsBack=5)
+    assert runInfo['mode'] == 'full'
+    pd.testing.assert_frame_equal(dfState, FireIgnitionPipeline(siteName, today=today, forestStartDOY=120).nowcast(stationRevised, yearsBack=5),
+                                  check_dtype=False)
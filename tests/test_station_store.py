@@ -0,0 +1,126 @@
+# Tests of the per station Parquet store (station_store.py) - round trip, open year tail, revised closed years and delta fetch
+
+import datetime
+import re
+
+import pandas as pd
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from fire_ignition.climate_analyzer import read_ClimateAnalyzerCSV, read_ClimateAnalyzerDaily
+from fire_ignition.station_store import isStoreCurrent, read_StationStore, updateStationStore, write_StationStore
+from fire_ignition.synthetic import write_ClimateAnalyzerCSV
+
+today = datetime.date(2026, 10, 18)
+
+
+@pytest.fixture
+def stationFile(tmp_path):
+
+    inFile = str(tmp_path / "gridmetData_wWB.csv")
+    write_ClimateAnalyzerCSV(inFile, 'bearlake_from_grid', '2021-01-01', today + datetime.timedelta(days=60), seed=5)
+    return inFile
+
+
+# Table read back from the store (float64 Parquet) equals the .csv parse - closed years and the open year tail
+def test_StationStoreRoundTrip(tmp_path, stationFile):
+
+    report = write_StationStore(str(tmp_path / "store"), 'bearlake_from_grid', read_ClimateAnalyzerDaily(stationFile, 'float64'), today)
+    assert report["closedWritten"] == [2021, 2022, 2023, 2024, 2025]
+    assert report["tailRecords"] == (today + datetime.timedelta(days=60) - datetime.date(2026, 1, 1)).days + 1
+
+    dfStore = read_StationStore(str(tmp_path / "store"), 'bearlake_from_grid')
+    pd.testing.assert_frame_equal(dfStore, read_ClimateAnalyzerCSV(stationFile, 'bearlake_from_grid'))
+    assert str(pq.read_schema(str(tmp_path / "store" / "bearlake_from_grid" / "year=2021.parquet")).field('D (MM)').type) == "double"
+    assert isStoreCurrent(str(tmp_path / "store"), 'bearlake_from_grid', 12, today + datetime.timedelta(days=60), today)
+    assert not isStoreCurrent(str(tmp_path / "store"), 'bearlake_from_grid', 12, today + datetime.timedelta(days=61), today)
+
+    endDate = today + datetime.timedelta(days=10)
+    pd.testing.assert_frame_equal(read_StationStore(str(tmp_path / "store"), 'bearlake_from_grid', endDate=endDate),
+                                  read_ClimateAnalyzerCSV(stationFile, 'bearlake_from_grid', endDate=endDate))
+
+
+# Revised closed year is reported and kept (refresh), or replaced (full refresh)
+def test_StationStoreRevisedYear(tmp_path, stationFile):
+
+    dfDaily = read_ClimateAnalyzerDaily(stationFile, 'float64')
+    write_StationStore(str(tmp_path / "store"), 'bearlake_from_grid', dfDaily, today)
+
+    dfRevised = dfDaily.copy()
+    dfRevised.loc['2023-07-01', 'D (MM)'] = 99.5
+    report = write_StationStore(str(tmp_path / "store"), 'bearlake_from_grid', dfRevised, today)
+    assert report["revisedYears"] == [2023] and report["replacedYears"] == []
+    assert read_StationStore(str(tmp_path / "store"), 'bearlake_from_grid').set_index('DATE').loc['2023-07-01', 'D (MM)'] != 99.5
+
+    report = write_StationStore(str(tmp_path / "store"), 'bearlake_from_grid', dfRevised, today, replaceClosed=True, fullRefresh=True)
+    assert report["replacedYears"] == [2023]
+    assert read_StationStore(str(tmp_path / "store"), 'bearlake_from_grid').set_index('DATE').loc['2023-07-01', 'D (MM)'] == 99.5
+
+
+# Climate Analyzer stand-in - the table from the service URL 'year1' through 'lastDate' (record numbers restart at 0 as in a pull from 'year1'), with
+# the values in 'revisions' (date: deficit) changed
+class StationService:
+
+    def __init__(self, stationFile):
+
+        with open(stationFile) as inFile:
+            lines = inFile.read().splitlines()
+        headerLine = next(count for count, line in enumerate(lines) if line.startswith("INDEX"))
+        self.preamble = lines[0:headerLine + 1]
+        self.records = [line.split(",") for line in lines[headerLine + 1:] if line[0].isdigit()]
+        self.lastDate = today + datetime.timedelta(days=60)
+        self.revisions = {}
+        self.urls = []
+
+    def __call__(self, serviceURL):
+
+        self.urls.append(serviceURL)
+        year1 = int(re.search(r"year1=(\d+)", serviceURL).group(1))
+        lines = list(self.preamble)
+        for fields in self.records:
+            recordDate = datetime.datetime.strptime(fields[1].strip(), "%m/%d/%Y").date()
+            if recordDate.year < year1 or recordDate > self.lastDate:
+                continue
+            deficit = self.revisions.get(recordDate, fields[4])
+            lines.append(",".join([str(len(lines) - len(self.preamble)), fields[1], fields[2], fields[3], str(deficit), fields[5]]))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# Refresh pulls the last closed year through the open year - the store equals a full pull.  A revised overlap year (or the full refresh interval)
+# pulls the full table.
+def test_StationStoreDeltaFetch(tmp_path):
+
+    stationFile = str(tmp_path / "gridmetData_wWB.csv")
+    write_ClimateAnalyzerCSV(stationFile, 'bearlake_from_grid', '2021-01-01', today + datetime.timedelta(days=70), seed=5, blankDays=0)
+    service = StationService(stationFile)
+    storeFolder = str(tmp_path / "store")
+    serviceURL = "http://climateanalyzer/wb2.py?station=bearlake_from_grid&year1=2021&year2=2026"
+
+    report = updateStationStore(storeFolder, 'bearlake_from_grid', serviceURL, fetchFunction=service, today=today, deltaFetch=True)
+    assert report["mode"] == "full" and report["closedWritten"] == [2021, 2022, 2023, 2024, 2025]
+
+    # Next day - delta pull from the last closed year
+    nextDay = today + datetime.timedelta(days=1)
+    service.lastDate = nextDay + datetime.timedelta(days=60)
+    report = updateStationStore(storeFolder, 'bearlake_from_grid', serviceURL, fetchFunction=service, today=nextDay, deltaFetch=True)
+    assert report["mode"] == "delta" and report["overlapYear"] == 2025 and report["overlapMatch"]
+    assert "year1=2025" in service.urls[-1]
+    assert report["fetchedRecords"] == (service.lastDate - datetime.date(2025, 1, 1)).days + 1
+    pd.testing.assert_frame_equal(read_StationStore(storeFolder, 'bearlake_from_grid'),
+                                  read_ClimateAnalyzerCSV(service(serviceURL), 'bearlake_from_grid'))
+
+    # Overlap year revised in Climate Analyzer - the full table is pulled and replaces the revised year
+    service.revisions[datetime.date(2025, 7, 1)] = 99.5
+    report = updateStationStore(storeFolder, 'bearlake_from_grid', serviceURL, fetchFunction=service, today=nextDay, deltaFetch=True)
+    assert report["mode"] == "full" and report["overlapMatch"] is False and report["replacedYears"] == [2025]
+    assert "year1=2021" in service.urls[-1]
+    pd.testing.assert_frame_equal(read_StationStore(storeFolder, 'bearlake_from_grid'),
+                                  read_ClimateAnalyzerCSV(service(serviceURL), 'bearlake_from_grid'))
+
+    # Full table every 'fullRefreshDays' days
+    report = updateStationStore(storeFolder, 'bearlake_from_grid', serviceURL, fetchFunction=service, today=nextDay, deltaFetch=True, fullRefreshDays=1)
+    assert report["mode"] == "delta"
+    report = updateStationStore(storeFolder, 'bearlake_from_grid', serviceURL, fetchFunction=service, today=nextDay + datetime.timedelta(days=1),
+                                deltaFetch=True, fullRefreshDays=1)
+    assert report["mode"] == "full"
@@ -0,0 +1,46 @@
+# Tests of the streaming evaluator (streaming.py) against the pandas rolling mean and the vectorized scoring
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fire_ignition import ignition
+from fire_ignition.streaming import StreamingIgnitionEvaluator
+
+
+# Kahan compensated rolling sum equals the pandas rolling mean (min_periods=1) bit for bit - missing days, negative values and repeated values
+@pytest.mark.parametrize("movingWindowDays", [1, 7, 14])
+def test_StreamingMovingAverage(deficitSeries, movingWindowDays):
+
+    evaluator = StreamingIgnitionEvaluator(np.sort(deficitSeries.dropna().to_numpy()), "Forest", movingWindowDays)
+    streamed = np.array([evaluator.update(value) for value in deficitSeries])
+
+    np.testing.assert_array_equal(streamed, deficitSeries.rolling(movingWindowDays, min_periods=1).mean().to_numpy())
+
+
+# Evaluator restored from a saved (.json) state continues exactly as the evaluator fed the full series, and scores as 'define_IgnitionProportion'
+def test_StreamingStateRoundTrip(deficitSeries):
+
+    refSorted = np.sort(deficitSeries.dropna().to_numpy())
+    evaluator = StreamingIgnitionEvaluator(refSorted, "NonForest", 14)
+    evaluator.prime(deficitSeries.iloc[0:250])
+
+    restored = StreamingIgnitionEvaluator(refSorted, "NonForest", 14)
+    restored.setState(json.loads(json.dumps(evaluator.getState())))
+    scored = [restored.score(restored.update(value)) for value in deficitSeries.iloc[250:]]
+
+    dfAverage = ignition.define_MovingWindowAverage(pd.DataFrame({'D (MM)': deficitSeries}), 14, 'D (MM)')
+    dfScored = ignition.define_IgnitionProportion(dfAverage, 'D (MM)_14', refSorted, 'PercNonForest', 'PropFiresNonForest', 'NonForest')
+
+    np.testing.assert_array_equal([score[0] for score in scored], dfScored['PercNonForest'].to_numpy()[250:])
+    np.testing.assert_array_equal([score[1] for score in scored], dfScored['PropFiresNonForest'].to_numpy()[250:])
+
+
+# State of another moving window length is rejected
+def test_StreamingStateWindowMismatch(deficitSeries):
+
+    evaluator = StreamingIgnitionEvaluator(np.sort(deficitSeries.dropna().to_numpy()), "Forest", 14)
+    with pytest.raises(ValueError):
+        StreamingIgnitionEvaluator(evaluator.refSorted, "Forest", 7).setState(evaluator.getState())